@@ -0,0 +1,182 @@
+"""Size benchmark: Ch-rima with operation texts inline (chrima_blobs: off) vs. the blob store per codec.
+
+Fills a throwaway database per mode with the same synthetic fleet run (every host running the same
+roles, so most stdout, diffs and arguments repeat across hosts, with a share of host-specific output),
+then reports the database size after a full VACUUM, the time it took to fill it and the time to stream
+every operation back (where the blobs get rehydrated).
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_blob_store.py [--hosts 300] [--operations 200] [--unique 0.1]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+RUN_ID = "bench-run"
+
+
+def _fleet_operations(
+    hosts: int, operations: int, unique: float, seed: int = 7
+) -> list[list[dict]]:
+    """The operations of every host, the same role on each one (like a real fleet)."""
+    rng = random.Random(seed)
+    names = [
+        "apt.packages",
+        "files.template",
+        "server.shell",
+        "systemd.service",
+        "files.put",
+    ]
+    packages = [f"lib{rng.randrange(10**6):06d}" for _ in range(400)]
+
+    role = []
+    for i in range(operations):
+        name = names[i % len(names)]
+        if name == "apt.packages":
+            picked = rng.sample(packages, 20)
+            stdout = (
+                "".join(
+                    f"Get:{j} http://deb.debian.org/debian bookworm/main amd64 {package} 1.{j}-2 [{rng.randrange(10**5)} kB]\n"
+                    for j, package in enumerate(picked)
+                )
+                + "Setting up everything...\n" * 10
+            )
+            arguments = {"packages": picked, "update": True, "present": True}
+        else:
+            stdout = f"{name} #{i} done\n" * rng.randrange(1, 20)
+            arguments = {
+                "path": f"/etc/app/{i}.conf",
+                "mode": "0644",
+                "user": "root",
+                "group": "root",
+            }
+        diff = (
+            "".join(
+                f"+ setting_{i}_{j} = {rng.random():.6f}\n"
+                for j in range(rng.randrange(5, 40))
+            )
+            if name == "files.template"
+            else ""
+        )
+        role.append(
+            {"name": name, "stdout": stdout, "diff": diff, "arguments": arguments}
+        )
+
+    fleet = []
+    for h in range(hosts):
+        host_ops = []
+        for i, op in enumerate(role):
+            stdout = op["stdout"]
+            if rng.random() < unique:
+                stdout += f"host-{h:04d} pid {rng.randrange(10**6)} took {rng.random():.6f}s\n"
+            host_ops.append(
+                {
+                    "op_hash": f"op-{i}",
+                    "name": op["name"],
+                    "changed": i % 3 == 0,
+                    "success": True,
+                    "duration": rng.random(),
+                    "timestamp": float(h * operations + i),
+                    "logs": {"stdout": stdout, "stderr": ""},
+                    "diff": op["diff"],
+                    "arguments": op["arguments"],
+                    "retry_stats": {
+                        "retry_attempts": 0,
+                        "max_retries": 0,
+                        "retry_info": {},
+                    },
+                    "command_n_facts": [
+                        {"context": "fact_gathering", "command": "server.Os"}
+                    ],
+                }
+            )
+        fleet.append(host_ops)
+    return fleet
+
+
+def _run(mode: str, fleet: list[list[dict]], tmp: str) -> dict:
+    from chaos.lib.limani.chrima import Chrima
+
+    os.environ["CHAOS_LOGBOOK_DIR"] = os.path.join(tmp, mode)
+    chrima = Chrima({"chrima_blobs": mode})
+    chrima.init_db()
+    try:
+        start = time.perf_counter()
+        chrima.create_run(RUN_ID, "chaos-bench", 0.0, {"user": "bench"}, set())
+        ids = chrima.register_hosts(
+            RUN_ID, [f"host-{h:04d}" for h in range(len(fleet))]
+        )
+        for h, host_ops in enumerate(fleet):
+            host_id = ids[f"host-{h:04d}"]
+            chrima.insert_many_operations(
+                [{"run_id": RUN_ID, "host_id": host_id, **op} for op in host_ops]
+            )
+            chrima.commit()
+        filled = time.perf_counter() - start
+
+        chrima.compact("full")
+        db_path = chrima.get_db_path()
+        size = sum(
+            p.stat().st_size
+            for p in db_path.parent.glob(f"{db_path.name}*")
+            if p.is_file()
+        )
+        blobs = chrima.connect().execute("SELECT count(*) FROM blobs").fetchone()[0]
+
+        start = time.perf_counter()
+        read = sum(1 for _ in chrima.iter_operations(RUN_ID, order_by="host"))
+        streamed = time.perf_counter() - start
+    finally:
+        chrima.disconnect()
+
+    return {
+        "size": size,
+        "blobs": blobs,
+        "filled": filled,
+        "streamed": streamed,
+        "read": read,
+    }
+
+
+def main() -> None:
+    from chaos.lib.limani.chrima import _zstd
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=300)
+    parser.add_argument(
+        "--operations", type=int, default=200, help="Operations per host."
+    )
+    parser.add_argument(
+        "--unique",
+        type=float,
+        default=0.1,
+        help="Share of operations with host-specific stdout.",
+    )
+    args = parser.parse_args()
+
+    fleet = _fleet_operations(args.hosts, args.operations, args.unique)
+    modes = ["off", "raw", "zlib"] + (["zstd"] if _zstd() is not None else [])
+    print(
+        f"{args.hosts} hosts x {args.operations} operations, "
+        f"{args.unique:.0%} with host-specific stdout"
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = None
+        for mode in modes:
+            stats = _run(mode, fleet, tmp)
+            baseline = baseline or stats["size"]
+            print(
+                f"{mode:<5} {stats['size'] / 1024 / 1024:8.1f} MiB ({stats['size'] / baseline:6.1%})"
+                f"  {stats['blobs']:7d} blobs  filled in {stats['filled']:6.2f}s"
+                f"  streamed {stats['read']} operations in {stats['streamed']:6.2f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
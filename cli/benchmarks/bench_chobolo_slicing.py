@@ -0,0 +1,110 @@
+"""Memory benchmark: whole Ch-obolo per (host, role) vs. the per-role read-only views.
+
+Simulates the context stage of `chaos apply` over a large fleet, with roles that deep-copy
+the Ch-obolo they receive (the worst, but common, case) and keep it in their context.
+
+Copying the whole document once per (host, role) at 1k hosts needs tens of GiB, so the contexts
+are only materialised for --sample hosts, and the per-host cost is extrapolated to --hosts
+(it is linear, every host holds the same contexts).
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_chobolo_slicing.py [--hosts 1000] [--roles 5] [--sample 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import gc
+import json
+import tracemalloc
+from typing import Any
+
+from chaos.lib.apply import build_role_chobolos
+
+
+class _CopyingRole:
+    def __init__(self, name: str, keys: list[str]):
+        self.name = name
+        self.necessary_chobolo_keys = keys
+
+    def get_context(self, chobolo: dict[str, Any]) -> dict[str, Any]:
+        return {"chobolo": copy.deepcopy(chobolo)}
+
+
+def _make_chobolo(hosts: int, roles: int) -> dict[str, Any]:
+    return {
+        "fleet": {
+            "parallelism": 50,
+            "hosts": {
+                f"host-{i:05d}.example.com": {
+                    "ssh_user": "chaos",
+                    "ssh_port": 22,
+                    "tags": {
+                        "environment": "prod" if i % 3 else "staging",
+                        "rack": f"r{i % 40}",
+                    },
+                    "notes": "x" * 2048,
+                    "extra_packages": [f"pkg-{j}" for j in range(64)],
+                }
+                for i in range(hosts)
+            },
+        },
+        **{
+            f"role_{r}": {
+                "items": [
+                    {"name": f"item-{r}-{j}", "state": "present"} for j in range(50)
+                ]
+            }
+            for r in range(roles)
+        },
+    }
+
+
+def _measure(run) -> int:
+    gc.collect()
+    tracemalloc.start()
+    contexts = run()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del contexts
+    return current
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=1000)
+    parser.add_argument("--roles", type=int, default=5)
+    parser.add_argument("--sample", type=int, default=20)
+    args = parser.parse_args()
+
+    chobolo = _make_chobolo(args.hosts, args.roles)
+    roles = [_CopyingRole(f"role_{r}", [f"role_{r}"]) for r in range(args.roles)]
+    sample = list(chobolo["fleet"]["hosts"])[: args.sample]
+
+    size = len(json.dumps(chobolo)) / 1024 / 1024
+    print(f"Ch-obolo: {size:.1f} MiB of JSON, {args.hosts} hosts, {len(roles)} roles")
+
+    def whole_document():
+        return [role.get_context(chobolo) for _ in sample for role in roles]
+
+    def sliced_views():
+        views = build_role_chobolos(roles, chobolo)  # type: ignore[arg-type]
+        return views, [
+            role.get_context(views[role.name]) for _ in sample for role in roles
+        ]
+
+    for label, run in (
+        ("whole document", whole_document),
+        ("per-role views", sliced_views),
+    ):
+        retained = _measure(run)
+        per_host = retained / len(sample)
+        print(
+            f"{label:<16} {per_host / 1024:10.1f} KiB/host"
+            f" -> {per_host * args.hosts / 1024 / 1024:10.1f} MiB at {args.hosts} hosts"
+        )
+
+
+if __name__ == "__main__":
+    main()
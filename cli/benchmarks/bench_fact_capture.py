@@ -0,0 +1,121 @@
+"""CPU benchmark: facts and commands parsed out of pyinfra's DEBUG logs vs. recorded by the capture hooks.
+
+Gathers facts on @local through pyinfra's real fact path, with the local connector swapped for one that
+logs like it does but returns at once (so the remote side costs nothing and only our overhead is left),
+once per capture mode (plus once without any telemetry, the baseline), and prints the time per fact,
+the telemetry overhead on top of the baseline and how many log records our handler went through.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_fact_capture.py [--facts 20000] [--noise 10]
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import queue
+import time
+
+
+class _CountingFilter(logging.Filter):
+    def __init__(self):
+        super().__init__()
+        self.records = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        self.records += 1
+        return True
+
+
+def _run(mode: str, facts: int, noise: int) -> tuple[float, int, int]:
+    from pyinfra.api import Config, Inventory, State
+    from pyinfra.api.connect import connect_all
+    from pyinfra.connectors.util import CommandOutput
+    from pyinfra.facts.server import Which
+
+    from chaos.lib.limani.chrima import Chrima
+    from chaos.lib.telemetry import ChaosTelemetry, EventSink, FactEventIndex
+
+    ChaosTelemetry._limani_plugin = Chrima({})
+    ChaosTelemetry._run_id = "bench-run"
+    ChaosTelemetry._db_queue = queue.Queue()
+    ChaosTelemetry._fact_events = FactEventIndex()
+    devnull = open(os.devnull, "w")
+    ChaosTelemetry.set_event_sink(EventSink(devnull))
+
+    inventory = Inventory((["@local"], {}))
+    state = State(inventory, Config())
+    connect_all(state)
+    host = inventory.get_host("@local")
+    connector_logger = logging.getLogger("pyinfra.connectors.local")
+    op_logger = logging.getLogger("pyinfra.api.operation")
+
+    def run_shell_command(command, *args, **kwargs):
+        # What LocalConnector logs per command, plus the debug chatter of an operation around it.
+        connector_logger.debug("--> Running command on localhost: %s", command)
+        for i in range(noise):
+            op_logger.debug("Operation detail %s for %s: %r", i, host.name, kwargs)
+        return True, CommandOutput([])
+
+    host.connector.run_shell_command = run_shell_command
+
+    pyinfra_logger = logging.getLogger("pyinfra")
+    handler = ChaosTelemetry.PyinfraFactLogHandler()
+    counter = _CountingFilter()
+    handler.addFilter(counter)
+    pyinfra_logger.addHandler(handler)
+    if mode == "hooks":
+        assert ChaosTelemetry.install_capture()
+        pyinfra_logger.setLevel(logging.INFO)
+    elif mode == "logs":
+        pyinfra_logger.setLevel(logging.DEBUG)
+    else:
+        pyinfra_logger.removeHandler(handler)
+        pyinfra_logger.setLevel(logging.INFO)
+
+    try:
+        start = time.perf_counter()
+        for i in range(facts):
+            host.get_fact(Which, command=f"tool{i}")
+        elapsed = time.perf_counter() - start
+    finally:
+        ChaosTelemetry.uninstall_capture()
+        pyinfra_logger.removeHandler(handler)
+        ChaosTelemetry._event_sink.close()
+        ChaosTelemetry._event_sink = None
+        devnull.close()
+
+    recorded = len(ChaosTelemetry._fact_events)
+    return elapsed, counter.records, recorded
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--facts", type=int, default=20000)
+    parser.add_argument(
+        "--noise", type=int, default=10, help="Unrelated DEBUG records per command."
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{args.facts} facts on @local, {args.noise} unrelated DEBUG records per command"
+    )
+    baseline, _, _ = _run("off", args.facts, args.noise)
+    print(f"{'off':<6} {baseline:8.3f}s ({baseline / args.facts * 1e6:7.1f} us/fact)")
+
+    overheads = {}
+    for mode in ("logs", "hooks"):
+        elapsed, records, recorded = _run(mode, args.facts, args.noise)
+        overheads[mode] = (elapsed - baseline) / args.facts * 1e6
+        print(
+            f"{mode:<6} {elapsed:8.3f}s ({elapsed / args.facts * 1e6:7.1f} us/fact, +{overheads[mode]:6.1f} us)"
+            f"  {records:8d} log records handled  {recorded:6d} events recorded"
+        )
+    print(
+        f"telemetry overhead per fact: {overheads['logs'] / max(overheads['hooks'], 1e-9):.1f}x lower with hooks"
+    )
+
+
+if __name__ == "__main__":
+    main()
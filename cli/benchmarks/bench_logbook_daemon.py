@@ -0,0 +1,136 @@
+"""Contention benchmark: several processes logging to one Ch-rima, each straight to SQLite vs. through the daemon.
+
+Every process plays a `chaos apply --logbook`: it creates its runs and writes their operations in small batches,
+committing each one, like the telemetry writer does. Reports the wall time, the operations written per second
+across all processes, the slowest batch (insert and commit) seen by any process and how many batches failed (eg: "database is
+locked"). The daemon runs in this process, the writers are separate processes.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_logbook_daemon.py [--processes 8] [--runs 4] [--batches 50] [--batch-size 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+
+def _writer(
+    mode: str, n: int, args: argparse.Namespace, socket_path: str, results
+) -> None:
+    from chaos.lib.limani.chrima import Chrima
+    from chaos.lib.limani.chrima_remote import RemoteChrima
+
+    limani = (
+        RemoteChrima({"chrima_socket": socket_path}) if mode == "daemon" else Chrima({})
+    )
+    failed, slowest, written = 0, 0.0, 0
+    for r in range(args.runs):
+        run_id = f"p{n}-r{r}"
+        limani.create_run(run_id, f"chaos-bench-{run_id}", time.time(), {}, set())
+        host_id = limani.register_hosts(run_id, ["web1"])["web1"]
+        for b in range(args.batches):
+            rows = [
+                {
+                    "run_id": run_id,
+                    "host_id": host_id,
+                    "op_hash": f"op-{b}-{i}",
+                    "name": "files.template",
+                    "changed": True,
+                    "success": True,
+                    "duration": 0.01,
+                    "timestamp": time.time(),
+                    "logs": {
+                        "stdout": f"batch {b} operation {i} of {run_id}\n" * 5,
+                        "stderr": "",
+                    },
+                    "diff": "",
+                    "arguments": {"path": f"/etc/{i}.conf"},
+                    "retry_stats": {},
+                    "command_n_facts": [],
+                }
+                for i in range(args.batch_size)
+            ]
+            start = time.perf_counter()
+            try:
+                limani.insert_many_operations(rows)
+                limani.commit()
+                written += args.batch_size
+            except Exception:
+                failed += 1
+                limani.connect().rollback()
+            slowest = max(slowest, time.perf_counter() - start)
+        limani.start_update_run(run_id, "success")
+    limani.disconnect()
+    results.put((written, failed, slowest))
+
+
+def _run(mode: str, args: argparse.Namespace, tmp: str) -> dict:
+    from chaos.lib.limani.chrima import Chrima
+    from chaos.lib.limani.chrima_remote import LogbookDaemon
+
+    os.environ["CHAOS_LOGBOOK_DIR"] = os.path.join(tmp, mode)
+    socket_path = os.path.join(tmp, f"{mode}.sock")
+    Chrima({}).init_db()
+
+    daemon = None
+    if mode == "daemon":
+        daemon = LogbookDaemon(Chrima({}), socket_path)
+        daemon.bind()
+        threading.Thread(target=daemon.serve_forever, daemon=True).start()
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    start = time.perf_counter()
+    processes = [
+        context.Process(target=_writer, args=(mode, n, args, socket_path, results))
+        for n in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    totals = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+
+    if daemon:
+        daemon.shutdown()
+    return {
+        "elapsed": elapsed,
+        "written": sum(total[0] for total in totals),
+        "failed": sum(total[1] for total in totals),
+        "slowest": max(total[2] for total in totals),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--runs", type=int, default=4, help="Runs per process.")
+    parser.add_argument(
+        "--batches", type=int, default=50, help="Committed batches per run."
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=20, help="Operations per batch."
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{args.processes} processes x {args.runs} runs x {args.batches} batches "
+        f"of {args.batch_size} operations"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("direct", "daemon"):
+            stats = _run(mode, args, tmp)
+            print(
+                f"{mode:<6} {stats['elapsed']:6.2f}s  {stats['written'] / stats['elapsed']:9.0f} operations/s"
+                f"  slowest batch {stats['slowest'] * 1000:7.1f} ms  {stats['failed']} failed batches"
+            )
+
+
+if __name__ == "__main__":
+    main()
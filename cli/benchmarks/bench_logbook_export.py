@@ -0,0 +1,202 @@
+"""Memory benchmark: materialized logbook export (get_run_data) vs. the streaming one (iter_* cursors).
+
+Fills a throwaway Ch-rima database with a synthetic run, then exports it with each exporter in its
+own process, reporting wall time, peak RSS and the size of the written report.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_logbook_export.py [--operations 1000000] [--hosts 500] [--skip-legacy]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RUN_ID = "bench-run"
+
+
+def _populate(operations: int, hosts: int) -> None:
+    from chaos.lib.limani.chrima import Chrima
+
+    chrima = Chrima({})
+    chrima.init_db()
+    chrima.create_run(RUN_ID, "chaos-bench", 0.0, {"user": "bench"}, set())
+    ids = chrima.register_hosts(RUN_ID, [f"host-{i:04d}" for i in range(hosts)])
+    host_ids = list(ids.values())
+    names = [
+        "files.put",
+        "apt.packages",
+        "server.shell",
+        "systemd.service",
+        "files.template",
+    ]
+
+    batch = []
+    for i in range(operations):
+        batch.append(
+            {
+                "run_id": RUN_ID,
+                "host_id": host_ids[i % hosts],
+                "op_hash": f"op-{i}",
+                "name": names[i % len(names)],
+                "changed": i % 3 == 0,
+                "success": i % 50 != 0,
+                "duration": (i * 7919 % 1000) / 1000,
+                "timestamp": float(i),
+                "logs": {"stdout": f"line {i}\n" * 4, "stderr": ""},
+                "diff": f"+ setting_{i} = true" if i % 3 == 0 else "",
+                "arguments": {"path": f"/etc/app/{i}.conf", "mode": "0644"},
+                "retry_stats": {
+                    "retry_attempts": 0,
+                    "max_retries": 0,
+                    "retry_info": {},
+                },
+                "command_n_facts": [
+                    {"context": "fact_gathering", "command": "server.Os"}
+                ],
+            }
+        )
+        if len(batch) == 10_000:
+            chrima.insert_many_operations(batch)
+            chrima.commit()
+            batch = []
+    if batch:
+        chrima.insert_many_operations(batch)
+    chrima.insert_many_snapshots(
+        [
+            {
+                "run_id": RUN_ID,
+                "host_id": host_id,
+                "stage": "start",
+                "timestamp": 0.0,
+                "metrics": {"ram": 1.0},
+            }
+            for host_id in host_ids
+        ]
+    )
+    chrima.commit()
+    chrima.disconnect()
+
+
+def _legacy_export(limani, path: Path) -> None:
+    """The export as it was: everything from get_run_data, built into lists and dumped at once."""
+    from chaos.lib.telemetry import ChaosTelemetry
+
+    data = limani.get_run_data(RUN_ID)
+    hosts, streamed, durations = {}, [], {}
+    for host in data["hosts"]:
+        history = []
+        for op in host["operations"]:
+            history.append(
+                {
+                    "operation": op["name"],
+                    "changed": bool(op["changed"]),
+                    "success": bool(op["success"]),
+                    "duration": op["duration"],
+                    "stdout": json.loads(op["logs_json"]).get("stdout", ""),
+                    "stderr": json.loads(op["logs_json"]).get("stderr", ""),
+                    "diff": op["diff"],
+                    "operation_arguments": json.loads(op["arguments_json"]),
+                    "retry_statistics": json.loads(op["retry_stats_json"]),
+                }
+            )
+            streamed.append(
+                {
+                    "type": "progress",
+                    "host": host["name"],
+                    "operation": op["name"],
+                    "changed": bool(op["changed"]),
+                    "success": bool(op["success"]),
+                    "duration": op["duration"],
+                    "logs": json.loads(op["logs_json"]),
+                    "diff": op["diff"],
+                    "operation_arguments": json.loads(op["arguments_json"]),
+                    "retry_statistics": json.loads(op["retry_stats_json"]),
+                    "command_n_fact_history": json.loads(
+                        op["command_n_facts_in_order_json"]
+                    ),
+                }
+            )
+            durations.setdefault(op["name"], []).append(op["duration"])
+        hosts[host["name"]] = json.dumps({"history": history}, indent=4)
+    with open(path, "w") as f:
+        f.write(json.dumps({"hosts": hosts, "streamed_history": streamed}, indent=4))
+        f.write(
+            json.dumps(ChaosTelemetry.add_operation_percentiles(durations), indent=4)
+        )
+
+
+def _export(mode: str, path: Path) -> None:
+    from chaos.lib.limani.chrima import Chrima
+    from chaos.lib.telemetry import ChaosTelemetry
+
+    chrima = Chrima({})
+    start = time.perf_counter()
+    if mode == "legacy":
+        _legacy_export(chrima, path)
+    else:
+        from chaos.lib.telemetry import ReportWriter
+
+        ChaosTelemetry._limani_plugin = chrima
+        run_info = chrima.get_run(RUN_ID)
+        with open(path, "w") as f, open(os.devnull, "w") as stream:
+            ChaosTelemetry._write_report(ReportWriter([f], [stream]), run_info or {})
+    elapsed = time.perf_counter() - start
+
+    peak_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"seconds": elapsed, "peak_rss_mib": peak_kib / 1024}))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--operations", type=int, default=1_000_000)
+    parser.add_argument("--hosts", type=int, default=500)
+    parser.add_argument("--skip-legacy", action="store_true")
+    parser.add_argument(
+        "--export", choices=["legacy", "streaming"], help=argparse.SUPPRESS
+    )
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.export:
+        _export(args.export, Path(args.output))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["CHAOS_LOGBOOK_DIR"] = tmp
+        start = time.perf_counter()
+        _populate(args.operations, args.hosts)
+        db_size = sum(
+            p.stat().st_size for p in Path(tmp).rglob("ch-rima.db*") if p.is_file()
+        )
+        print(
+            f"{args.operations} operations over {args.hosts} hosts, "
+            f"{db_size / 1024 / 1024:.0f} MiB database (filled in {time.perf_counter() - start:.1f}s)"
+        )
+
+        modes = ["streaming"] if args.skip_legacy else ["legacy", "streaming"]
+        for mode in modes:
+            output = Path(tmp) / f"{mode}.json"
+            result = subprocess.run(
+                [sys.executable, __file__, "--export", mode, "--output", str(output)],
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            stats = json.loads(result.stdout.strip().splitlines()[-1])
+            print(
+                f"{mode:<10} {stats['seconds']:8.1f}s  peak RSS {stats['peak_rss_mib']:8.0f} MiB"
+                f"  report {output.stat().st_size / 1024 / 1024:8.0f} MiB"
+            )
+            output.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+"""Overhead benchmark: what `--logbook` costs a run, callback by callback.
+
+Drives the ChaosTelemetry callbacks pyinfra would call (operation_host_start/success/error, the facts and commands
+of each operation, the diff lines through the log handler, record_snapshot) for a synthetic run of --hosts hosts
+times --ops operations, --parallel hosts at a time like pyinfra's waves, without connecting to anything. The state
+handed to the callbacks is built from pyinfra's own StateOperationMeta/StateOperationHostData/OperationMeta, the
+events go to /dev/null and the rows to a Limani (the in-memory one by default, so only the telemetry is measured).
+
+Reports the host operations per second (while calling back, and including the wait for the writer at the end),
+the p50/p99 latency of each callback, how deep the writer queue got and the peak RSS (which, with the in-memory
+Limani, includes every row it keeps). --save writes those to a JSON baseline, --baseline compares against one
+(taken with the same parameters) and exits with 1 if anything got more than --tolerance worse. Compare on the
+machine the baseline was taken on, the numbers are only meaningful next to each other.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_logbook_overhead.py [--hosts 200] [--ops 100] [--limani memory|chrima] [--save FILE] [--baseline FILE]
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+
+# Higher is better for these, lower for every other metric. Maxima are a single sample, too noisy to compare.
+HIGHER_IS_BETTER = ("ops_per_sec", "ops_per_sec_drained")
+NOT_COMPARED = ("queue_depth_max",)
+
+GLOBAL_ARGUMENTS = {
+    "_sudo": False,
+    "_sudo_user": None,
+    "_use_sudo_login": False,
+    "_sudo_password": None,
+    "_su_user": None,
+    "_shell_executable": "sh",
+    "_chdir": None,
+    "_env": {},
+    "_success_exit_codes": [0],
+    "_timeout": None,
+    "_get_pty": False,
+    "_stdin": None,
+    "_retries": 0,
+    "_retry_delay": 5,
+    "_ignore_errors": False,
+    "_continue_on_error": False,
+    "_if": [],
+}
+
+
+class _Host:
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+
+class _SyntheticState:
+    """Just what the callbacks read from a pyinfra State: the meta of each operation and its data on each host."""
+
+    def __init__(self):
+        self.op_meta = {}
+        self.op_data = {}
+
+    def get_op_meta(self, op_hash):
+        return self.op_meta[op_hash]
+
+    def get_op_data_for_host(self, host, op_hash):
+        return self.op_data[(host.name, op_hash)]
+
+
+def _rss_mb() -> float:
+    """Peak RSS of this process so far, in MiB (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _limani(name: str, tmp: str):
+    if name == "chrima":
+        from chaos.lib.limani.chrima import Chrima
+
+        os.environ["CHAOS_LOGBOOK_DIR"] = tmp
+        return Chrima({})
+
+    from chaos.lib.limani.memory import MemoryLimani
+
+    return MemoryLimani({})
+
+
+def _run(args: argparse.Namespace, limani) -> dict:
+    from pyinfra.api.operation import OperationMeta
+    from pyinfra.api.state import StateOperationHostData, StateOperationMeta
+
+    from chaos.lib.sketch import QuantileSketch
+    from chaos.lib.telemetry import ChaosTelemetry, EventSink
+
+    rng = random.Random(7)
+    hosts = [_Host(f"host-{i:04d}") for i in range(args.hosts)]
+    state = _SyntheticState()
+    handler = ChaosTelemetry.PyinfraFactLogHandler()
+    latencies = {
+        name: QuantileSketch()
+        for name in (
+            "operation_host_start",
+            "operation_host_success",
+            "operation_host_error",
+            "fact",
+            "diff_line",
+            "record_snapshot",
+        )
+    }
+
+    def timed(name, func, *call_args, **call_kwargs):
+        start = time.perf_counter()
+        func(*call_args, **call_kwargs)
+        # In microseconds, sketch percentiles are rounded to 4 decimals.
+        latencies[name].add((time.perf_counter() - start) * 1e6)
+
+    def log(message: str, level: int = logging.INFO) -> None:
+        handler.emit(
+            logging.LogRecord("pyinfra", level, __file__, 0, message, None, None)
+        )
+
+    def snapshot(host, stage: str, busy: int) -> None:
+        ram = {"percent": 40.0, "used_mb": 3200.0, "total_mb": 8000.0}
+        cpu = {"total": 10_000 + busy * 7, "idle": 9_000 + busy * 3, "cpus": 4}
+        timed(
+            "record_snapshot",
+            ChaosTelemetry.record_snapshot,
+            host,
+            ram,
+            (0.4, 0.3, 0.2),
+            stage,
+            cpu,
+        )
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        ChaosTelemetry._limani_plugin = limani
+        ChaosTelemetry.set_event_sink(EventSink(devnull))
+        ChaosTelemetry.start_run([host.name for host in hosts])
+        db_queue = ChaosTelemetry._db_queue
+        depths = []
+        rss_start = _rss_mb()
+
+        started = time.perf_counter()
+        for host in hosts:
+            snapshot(host, "pre_operations", 0)
+
+        for m in range(args.ops):
+            op_hash = f"op-{m:05d}"
+            meta = StateOperationMeta((m,))
+            meta.names.add(f"module{m % args.names}.operation")
+            state.op_meta[op_hash] = meta
+            changed = m % 3 == 0
+
+            for wave in range(0, len(hosts), args.parallel):
+                batch = hosts[wave : wave + args.parallel]
+                for host in batch:
+                    state.op_data[(host.name, op_hash)] = StateOperationHostData(
+                        command_generator=lambda: iter(()),
+                        global_arguments=dict(GLOBAL_ARGUMENTS),
+                        operation_meta=OperationMeta(op_hash, changed),
+                    )
+                    timed(
+                        "operation_host_start",
+                        ChaosTelemetry.operation_host_start,
+                        state,
+                        host,
+                        op_hash,
+                    )
+
+                for host in batch:
+                    for f in range(args.facts):
+                        command = f"pyinfra.facts.files.File (path=/etc/app/{m}/{f}.conf) (ensure_hosts: None)"
+                        timed(
+                            "fact",
+                            ChaosTelemetry._record_command,
+                            "fact_gathering",
+                            command,
+                            time.time(),
+                        )
+                    timed(
+                        "fact",
+                        ChaosTelemetry._record_command,
+                        f"running_command_on_{host.name}",
+                        f"install -m 644 /tmp/upload-{m} /etc/app/{m}.conf",
+                        time.time(),
+                    )
+                    if changed:
+                        timed(
+                            "diff_line",
+                            log,
+                            f"[{host.name}] Will modify /etc/app/{m}.conf",
+                        )
+                        for line in range(args.diff_lines):
+                            timed(
+                                "diff_line",
+                                log,
+                                f"[{host.name}]   + setting_{line} = {rng.random():.6f}",
+                            )
+                        timed("diff_line", log, f"[{host.name}] Success")
+
+                for host in batch:
+                    if rng.random() < args.error_rate:
+                        timed(
+                            "operation_host_error",
+                            ChaosTelemetry.operation_host_error,
+                            state,
+                            host,
+                            op_hash,
+                            0,
+                            0,
+                        )
+                    else:
+                        timed(
+                            "operation_host_success",
+                            ChaosTelemetry.operation_host_success,
+                            state,
+                            host,
+                            op_hash,
+                            0,
+                        )
+                    del state.op_data[(host.name, op_hash)]
+                depths.append(db_queue.qsize())
+
+            if args.snapshot_every and (m + 1) % args.snapshot_every == 0:
+                for host in hosts:
+                    snapshot(host, "checkpoint", m)
+
+        for host in hosts:
+            snapshot(host, "post_operations", args.ops)
+        called_back = time.perf_counter() - started
+
+        ChaosTelemetry.end_run()
+        drained = time.perf_counter() - started
+
+    host_ops = args.hosts * args.ops
+    result = {
+        "ops_per_sec": round(host_ops / called_back, 1),
+        "ops_per_sec_drained": round(host_ops / drained, 1),
+        "queue_depth_max": max(depths, default=0),
+        "queue_depth_p99": round(ChaosTelemetry.percentile(depths, 99), 1)
+        if depths
+        else 0,
+        "peak_rss_mb": round(_rss_mb(), 1),
+        "rss_growth_mb": round(_rss_mb() - rss_start, 1),
+    }
+    for name, sketch in latencies.items():
+        if sketch.count:
+            p50, p99 = sketch.percentiles((50, 99)).values()
+            result[f"{name}_p50_us"] = round(p50, 1)
+            result[f"{name}_p99_us"] = round(p99, 1)
+    return result
+
+
+def _compare(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    """The metrics of a result that are more than `tolerance` (relative) worse than in a baseline."""
+    regressions = []
+    for metric, before in baseline["metrics"].items():
+        now = result.get(metric)
+        if now is None or not before or metric in NOT_COMPARED:
+            continue
+        change = now / before - 1
+        worse = -change if metric in HIGHER_IS_BETTER else change
+        if worse > tolerance:
+            regressions.append(f"{metric}: {before} -> {now} ({change:+.0%})")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=200)
+    parser.add_argument(
+        "--ops", type=int, default=100, help="Operations, each one ran on every host."
+    )
+    parser.add_argument(
+        "--parallel", type=int, default=50, help="Hosts running an operation at once."
+    )
+    parser.add_argument(
+        "--names", type=int, default=20, help="Distinct operation names."
+    )
+    parser.add_argument(
+        "--facts", type=int, default=2, help="Facts gathered per host operation."
+    )
+    parser.add_argument(
+        "--diff-lines",
+        type=int,
+        default=3,
+        help="Diff lines of each changed host operation.",
+    )
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument(
+        "--snapshot-every",
+        type=int,
+        default=25,
+        help="Operations between health checkpoints, 0 for none.",
+    )
+    parser.add_argument("--limani", choices=("memory", "chrima"), default="memory")
+    parser.add_argument(
+        "--save", metavar="FILE", help="Write the results as a JSON baseline."
+    )
+    parser.add_argument(
+        "--baseline",
+        metavar="FILE",
+        help="Compare with a JSON baseline, exit 1 on regressions.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="How much worse (relative) is a regression.",
+    )
+    args = parser.parse_args()
+
+    params = {
+        key: getattr(args, key)
+        for key in (
+            "hosts",
+            "ops",
+            "parallel",
+            "names",
+            "facts",
+            "diff_lines",
+            "error_rate",
+            "snapshot_every",
+            "limani",
+        )
+    }
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["params"] != params:
+            parser.error(
+                f"{args.baseline} was taken with different parameters: {baseline['params']}"
+            )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        limani = _limani(args.limani, tmp)
+        result = _run(args, limani)
+
+    print(
+        f"{args.hosts} hosts x {args.ops} operations, {args.parallel} at a time, logging to {args.limani}"
+    )
+    for metric, value in result.items():
+        print(f"{value:>12}  {metric}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(
+                {
+                    "params": params,
+                    "python": platform.python_version(),
+                    "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPUs",
+                    "metrics": result,
+                },
+                f,
+                indent=4,
+            )
+            f.write("\n")
+        print(f"saved the baseline to {args.save}")
+
+    if baseline:
+        regressions = _compare(result, baseline, args.tolerance)
+        print(
+            f"compared with {args.baseline} ({baseline['machine']}, Python {baseline['python']}):"
+        )
+        for line in regressions:
+            print(f"  REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"  nothing more than {args.tolerance:.0%} worse")
+
+
+if __name__ == "__main__":
+    main()
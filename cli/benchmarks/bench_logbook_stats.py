@@ -0,0 +1,167 @@
+"""Latency benchmark: `chaos logbook stats` queries over a big Ch-rima logbook.
+
+Fills a throwaway database with finished runs spread over some days (every host running every operation once
+per run, a few hosts getting slower in the last week), writing the operation rows straight into SQLite since
+the writer isn't what's measured. Each run is folded into the daily rollups as it ends, like end_run_update does,
+and that cost is reported apart (per run, it's paid at the end of every `chaos apply --logbook`). Then times a
+few typical queries, best of --repeat.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_logbook_stats.py [--operations 10000000] [--hosts 500] [--names 40] [--days 90]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+DAY = 86400
+
+
+def _populate(
+    chrima, operations: int, hosts: int, names: int, days: int, now: float
+) -> tuple[int, list[float]]:
+    """Fills the runs, folding each one as it ends. Returns how many runs and how long each fold took."""
+    rng = random.Random(11)
+    host_names = [f"host-{i:04d}" for i in range(hosts)]
+    op_names = ["apt.packages"] + [f"module{i}.operation" for i in range(names - 1)]
+    medians = {name: rng.lognormvariate(-2, 1) for name in op_names}
+    regressed = set(rng.sample(host_names, max(1, hosts // 50)))
+
+    runs = max(1, operations // (hosts * names))
+    folds = []
+    conn = chrima.connect()
+    for r in range(runs):
+        run_id = f"run-{r:05d}"
+        start = now - days * DAY + (r + 0.5) * days * DAY / runs
+        chrima.create_run(run_id, f"chaos-bench-{r:05d}", start, {}, set())
+        ids = chrima.register_hosts(run_id, host_names)
+        late = start > now - 7 * DAY
+
+        rows = []
+        for h, host in enumerate(host_names):
+            slow = 3.0 if late and host in regressed else 1.0
+            for n, name in enumerate(op_names):
+                duration = medians[name] * slow * rng.lognormvariate(0, 0.3)
+                rows.append(
+                    (
+                        run_id,
+                        ids[host],
+                        name,
+                        n % 3 == 0,
+                        rng.random() > 0.002,
+                        duration,
+                        start + h * 0.01 + n,
+                    )
+                )
+        conn.executemany(
+            "INSERT INTO operations (run_id, host_id, name, changed, success, duration, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        conn.execute(
+            "UPDATE runs SET status = 'success', end_time = ? WHERE id = ?",
+            (start + names, run_id),
+        )
+        conn.commit()
+
+        started = time.perf_counter()
+        chrima._fold_daily_rollups()
+        folds.append(time.perf_counter() - started)
+    return runs, folds
+
+
+def _time(query, repeat: int) -> tuple[float, int]:
+    best, rows = float("inf"), 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = query()
+        best = min(best, time.perf_counter() - start)
+        assert result.success, result.error
+        rows = len(result.data["rows"])
+    return best, rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--operations", type=int, default=10_000_000)
+    parser.add_argument("--hosts", type=int, default=500)
+    parser.add_argument(
+        "--names", type=int, default=40, help="Distinct operation names."
+    )
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    from chaos.lib.args.dataclasses import LogbookPayload
+    from chaos.lib.limani.chrima import Chrima
+    from chaos.lib.logbook import stats
+
+    now = time.time()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["CHAOS_LOGBOOK_DIR"] = tmp
+        chrima = Chrima({})
+        chrima.init_db()
+        try:
+            start = time.perf_counter()
+            runs, folds = _populate(
+                chrima, args.operations, args.hosts, args.names, args.days, now
+            )
+            total = (
+                chrima.connect()
+                .execute("SELECT count(*) FROM operations")
+                .fetchone()[0]
+            )
+            print(
+                f"{total} operations in {runs} runs over {args.days} days "
+                f"({args.hosts} hosts, {args.names} operation names), filled in {time.perf_counter() - start:.0f}s"
+            )
+
+            rollups = (
+                chrima.connect()
+                .execute("SELECT count(*) FROM daily_rollups")
+                .fetchone()[0]
+            )
+            print(
+                f"folded into {rollups} daily rollups as the runs ended: {sum(folds):.1f}s in total, "
+                f"{sum(folds) / len(folds) * 1000:.0f} ms per run on average, {max(folds) * 1000:.0f} ms at most"
+            )
+
+            queries = {
+                "p95 of apt.packages per host, last 30 runs": {
+                    "runs": 30,
+                    "names": ["apt.packages"],
+                    "group_by": "host",
+                    "percentiles": "95",
+                },
+                "p50/p95/p99 per operation, last 30 days": {
+                    "since": "30d",
+                    "group_by": "name",
+                },
+                "hosts regressed this week vs the one before": {
+                    "since": "7d",
+                    "group_by": "host",
+                    "compare": True,
+                    "top": 10,
+                },
+                "fleet per day, last 90 days": {"since": "90d", "group_by": "day"},
+                "apt.packages per host and day, last 30 days": {
+                    "since": "30d",
+                    "names": ["apt.packages"],
+                    "group_by": "host,day",
+                },
+            }
+            for label, query in queries.items():
+                payload = LogbookPayload("stats", **query)
+                elapsed, rows = _time(
+                    lambda: stats(payload, chrima, now=now), args.repeat
+                )
+                print(f"{elapsed * 1000:8.1f} ms  {rows:6d} rows  {label}")
+        finally:
+            chrima.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""CPU benchmark: the per-call secret redaction vs. the precompiled SecretRedactor.
+
+Redacts a realistic logbook volume (diff lines, fact commands and stdout/stderr chunks, where only a
+small share actually contains a secret) with both engines, checks they produce the exact same output,
+and prints the time each one took.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_secret_redaction.py [--secrets 200] [--lines 20000] [--leak-ratio 0.02]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import time
+from urllib import parse as urllib_parse
+
+from chaos.lib.telemetry import SecretRedactor
+
+
+def legacy_sanitize(text: str, sensitive_strings: set[str]) -> str:
+    """ChaosTelemetry._sanitize_diff_text as it was before SecretRedactor."""
+    if not text:
+        return text
+
+    valid_secrets_set = set()
+    for s in sensitive_strings:
+        s_str = str(s)
+        if len(s_str) >= 4 and s_str.lower() not in ("true", "false", "null", "none"):
+            valid_secrets_set.add(s_str)
+        for line in s_str.splitlines():
+            clean_line = line.strip()
+            if len(clean_line) >= 4 and clean_line.lower() not in (
+                "true",
+                "false",
+                "null",
+                "none",
+            ):
+                valid_secrets_set.add(clean_line)
+
+    valid_secrets = list(valid_secrets_set)
+    valid_secrets.sort(key=len, reverse=True)
+
+    for term in valid_secrets:
+        text = re.sub(re.escape(term), "[REDACTED]", text, flags=re.IGNORECASE)
+
+        url_encoded = urllib_parse.quote(term)
+        if url_encoded != term:
+            text = re.sub(
+                re.escape(url_encoded), "[REDACTED_URL]", text, flags=re.IGNORECASE
+            )
+
+        json_escaped = json.dumps(term)[1:-1]
+        if json_escaped != term:
+            text = re.sub(
+                re.escape(json_escaped), "[REDACTED_JSON]", text, flags=re.IGNORECASE
+            )
+
+    for line in text.splitlines():
+        if len(line.strip()) >= 4 and any(
+            line in str(term)
+            for term in sensitive_strings
+            if len(str(term)) >= 4
+            and str(term).lower() not in ("true", "false", "null", "none")
+        ):
+            text = text.replace(line, "[REDACTED_LINE]")
+
+    return text
+
+
+def _make_secrets(count: int, rng: random.Random) -> set[str]:
+    alphabet = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789/+=-_@ "
+    secrets = {
+        "".join(rng.choice(alphabet) for _ in range(rng.randint(8, 48)))
+        for _ in range(count)
+    }
+    # A few multi-line ones, like keys and certificates.
+    secrets.update(
+        "-----BEGIN KEY-----\n"
+        + "".join(rng.choice(alphabet) for _ in range(64))
+        + "\n-----END KEY-----"
+        for _ in range(max(count // 50, 1))
+    )
+    return secrets
+
+
+def _make_texts(
+    lines: int, secrets: list[str], leak_ratio: float, rng: random.Random
+) -> list[str]:
+    templates = [
+        "+    ssh_port: {n}",
+        "-    listen_address: 10.0.{n}.1",
+        "sh -c 'apt-get install -y package-{n}'",
+        "Get-Service -Name svc{n} | Select-Object Status",
+        "@@ -{n},7 +{n},8 @@ server {{",
+        "+  location /api/v{n}/ {{ proxy_pass http://backend; }}",
+    ]
+    texts = []
+    for i in range(lines):
+        text = rng.choice(templates).format(n=i)
+        if rng.random() < leak_ratio:
+            secret = rng.choice(secrets)
+            text += " " + rng.choice(
+                [secret, urllib_parse.quote(secret), json.dumps(secret)[1:-1]]
+            )
+        texts.append(text)
+    return texts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--secrets", type=int, default=200)
+    parser.add_argument("--lines", type=int, default=20000)
+    parser.add_argument("--leak-ratio", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    secrets = _make_secrets(args.secrets, rng)
+    texts = _make_texts(args.lines, sorted(secrets), args.leak_ratio, rng)
+    print(
+        f"{len(secrets)} secrets, {len(texts)} texts, ~{args.leak_ratio:.0%} of them leaking one"
+    )
+
+    start = time.perf_counter()
+    legacy = [legacy_sanitize(text, secrets) for text in texts]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    redactor = SecretRedactor(secrets)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compiled = [redactor.redact(text) for text in texts]
+    compiled_time = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(legacy, compiled, strict=True) if a != b)
+
+    print(
+        f"{'per-call':<14} {legacy_time:8.3f}s ({legacy_time / len(texts) * 1e6:9.1f} us/text)"
+    )
+    print(
+        f"{'precompiled':<14} {compiled_time:8.3f}s ({compiled_time / len(texts) * 1e6:9.1f} us/text)"
+        f" + {build_time * 1000:.1f} ms to build"
+    )
+    print(
+        f"speedup: {legacy_time / compiled_time:.1f}x, mismatching outputs: {mismatches}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -227,6 +227,16 @@ def main():
 
                 handleInit(args)
 
+            case "agent":
+                from .lib.args.commands.agent import handleAgent
+
+                handleAgent(args)
+
+            case "logbook":
+                from .lib.args.commands.logbook import handleLogbook
+
+                handleLogbook(args)
+
             case _:
                 from .lib.args.commands.extras import handle_
 
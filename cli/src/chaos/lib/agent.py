@@ -0,0 +1,934 @@
+"""
+The chaos agent: a tiny background process that keeps OpenSSH ControlMaster connections open between `chaos apply` runs.
+
+pyinfra's own ssh connector lives and dies with the process that opened it, so every apply pays the full handshake
+for every host. The agent owns one `ssh -M` master per target instead (keyed by the ssh data of the host, so two
+inventory names pointing to the same box share a master), and `setup_pyinfra` swaps the ssh connector of any
+host the agent could attach for ControlMasterConnector, which just runs `ssh -S <control path>` through the master.
+
+Protocol: one JSON object per line over a unix socket, one JSON object back.
+    {"op": "attach", "hosts": {"name": {target}}} -> {"paths": {"name": "/control/path"}, "errors": {"name": "why"}}
+    {"op": "status"} -> {"pid": int, "connections": [...], ...}
+    {"op": "stop"} -> {"stopped": true}
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shlex
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from chaos.lib.args.dataclasses import ResultPayload
+
+if TYPE_CHECKING:
+    from pyinfra.api.host import Host
+    from pyinfra.api.state import State
+
+    from chaos.lib.args.dataclasses import AgentPayload
+
+DEFAULT_IDLE_TIMEOUT = 600.0
+DEFAULT_MAX_CONNECTIONS = 64
+DEFAULT_CONNECT_TIMEOUT = 10
+REQUEST_TIMEOUT = 120.0
+MASTER_CHECK_TIMEOUT = 5.0
+
+# What ControlMasterConnector runs on the remote side: reads the size of the command, then exactly that many bytes
+# of it, from stdin (dd one byte at a time, so nothing past the command is swallowed) and runs it, leaving the rest
+# of stdin to the command. The command itself never shows up in an argv, here or there.
+REMOTE_READER = 'IFS= read -r size && command=$(dd bs=1 count="$size" 2>/dev/null) && eval "$command"'
+
+
+def agent_runtime_dir() -> Path:
+    """Returns the directory holding the agent socket and control paths.
+
+    Uses $XDG_RUNTIME_DIR/chaos when available (it is per-user and tmpfs), falling back to /tmp/chaos-<uid>.
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / "chaos"
+    return Path(f"/tmp/chaos-{os.getuid()}")
+
+
+def agent_socket_path() -> Path:
+    """Returns the agent socket path, CHAOS_AGENT_SOCKET overrides the default <runtime dir>/agent.sock."""
+    override = os.environ.get("CHAOS_AGENT_SOCKET")
+    if override:
+        return Path(override)
+    return agent_runtime_dir() / "agent.sock"
+
+
+def _ssh_binary() -> str:
+    """The ssh client to use, CHAOS_AGENT_SSH overrides it (handy for tests and for odd ssh builds)."""
+    return os.environ.get("CHAOS_AGENT_SSH", "ssh")
+
+
+def ssh_target(host: Host) -> dict[str, Any] | None:
+    """Extracts the OpenSSH-relevant connection data of a pyinfra ssh host.
+
+    Args:
+        host: a pyinfra Host whose connector is the ssh connector.
+
+    Returns:
+        - The target dict (hostname, port, user, key, config_file, known_hosts_file, strict_host_key_checking),
+            or None when the host can't go through the agent (not ssh, or it needs a password, since the masters
+            run with BatchMode).
+    """
+    from pyinfra.connectors.ssh import SSHConnector
+
+    connector = getattr(host, "connector", None)
+    if not isinstance(connector, SSHConnector):
+        return None
+
+    data = connector.data
+    if data.get("ssh_password") or data.get("ssh_key_password"):
+        return None
+
+    return {
+        "hostname": data.get("ssh_hostname") or host.name,
+        "port": int(data.get("ssh_port") or 22),
+        "user": data.get("ssh_user") or None,
+        "key": data.get("ssh_key") or None,
+        "config_file": data.get("ssh_config_file") or None,
+        "known_hosts_file": data.get("ssh_known_hosts_file") or None,
+        "strict_host_key_checking": data.get("ssh_strict_host_key_checking")
+        or "accept-new",
+    }
+
+
+def target_key(target: dict[str, Any]) -> str:
+    """A stable short key for a target, also used as the control socket file name (unix sockets paths are short)."""
+    blob = json.dumps(target, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()[:16]
+
+
+def ssh_base_args(target: dict[str, Any]) -> list[str]:
+    """The ssh options shared by the master and by the commands that ride on it, minus the destination."""
+    args = ["-p", str(target["port"])]
+    if target.get("user"):
+        args += ["-l", str(target["user"])]
+    if target.get("key"):
+        args += ["-i", str(target["key"])]
+    if target.get("config_file"):
+        args += ["-F", str(target["config_file"])]
+    if target.get("known_hosts_file"):
+        args += ["-o", f"UserKnownHostsFile={target['known_hosts_file']}"]
+    args += ["-o", f"StrictHostKeyChecking={target['strict_host_key_checking']}"]
+    return args
+
+
+class MultiplexAgent:
+    """Bookkeeping for the ssh masters owned by the agent.
+
+    Every master is started with ControlPersist=yes, so ssh itself keeps it alive after forking into the background,
+    the agent only decides when it goes away: after idle_timeout seconds without an attach, when the cap is hit
+    (least recently used first), or on stop.
+    """
+
+    __slots__ = (
+        "control_dir",
+        "idle_timeout",
+        "max_connections",
+        "connect_timeout",
+        "started_at",
+        "_masters",
+        "_lock",
+    )
+
+    def __init__(
+        self,
+        control_dir: Path,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        connect_timeout: int = DEFAULT_CONNECT_TIMEOUT,
+    ):
+        self.control_dir = control_dir
+        self.idle_timeout = idle_timeout
+        self.max_connections = max_connections
+        self.connect_timeout = connect_timeout
+        self.started_at = time.time()
+        self._masters: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+        self.control_dir.mkdir(parents=True, exist_ok=True, mode=0o700)
+
+    def _control_command(self, control_path: str, command: str) -> bool:
+        """Runs `ssh -O <command>` against a master, returns whether ssh was happy."""
+        try:
+            result = subprocess.run(
+                [_ssh_binary(), "-S", control_path, "-O", command, "chaos-agent"],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                timeout=self.connect_timeout,
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            return False
+        return result.returncode == 0
+
+    def _spawn_master(self, target: dict[str, Any], control_path: str) -> str | None:
+        """Starts a master for target, returns an error message or None on success.
+
+        ssh -f forks after authentication, so by the time this returns the connection is up (or it failed).
+        stderr goes to a temporary file instead of a pipe since the forked master inherits it and would
+        keep a pipe open forever.
+        """
+        import tempfile
+
+        command = [
+            _ssh_binary(),
+            "-M",
+            "-N",
+            "-f",
+            "-S",
+            control_path,
+            "-o",
+            "ControlPersist=yes",
+            "-o",
+            "BatchMode=yes",
+            "-o",
+            f"ConnectTimeout={self.connect_timeout}",
+            *ssh_base_args(target),
+            str(target["hostname"]),
+        ]
+
+        with tempfile.TemporaryFile() as stderr:
+            try:
+                result = subprocess.run(
+                    command,
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.DEVNULL,
+                    stderr=stderr,
+                    timeout=self.connect_timeout + 5,
+                )
+            except subprocess.TimeoutExpired:
+                return f"timed out after {self.connect_timeout + 5}s"
+            except OSError as e:
+                return str(e)
+
+            if result.returncode != 0:
+                stderr.seek(0)
+                message = stderr.read().decode(errors="replace").strip()
+                return message or f"ssh exited with {result.returncode}"
+
+        return None
+
+    def _evict(self, key: str) -> None:
+        """Closes a master and forgets about it. Caller must NOT hold the lock (ssh -O exit may take a while)."""
+        with self._lock:
+            entry = self._masters.pop(key, None)
+        if entry is None:
+            return
+        self._control_command(entry["control_path"], "exit")
+        Path(entry["control_path"]).unlink(missing_ok=True)
+
+    def _attach_one(
+        self, name: str, target: dict[str, Any]
+    ) -> tuple[str | None, str | None]:
+        """Returns (control_path, error) for one host, reusing a live master when there is one."""
+        key = target_key(target)
+        control_path = str(self.control_dir / key)
+
+        with self._lock:
+            entry = self._masters.get(key)
+
+        if entry is not None:
+            if self._control_command(control_path, "check"):
+                with self._lock:
+                    entry["last_used"] = time.time()
+                    entry["hosts"].add(name)
+                return control_path, None
+            self._evict(key)
+
+        error = self._spawn_master(target, control_path)
+        if error is not None:
+            return None, error
+
+        now = time.time()
+        with self._lock:
+            self._masters[key] = {
+                "target": target,
+                "control_path": control_path,
+                "hosts": {name},
+                "created": now,
+                "last_used": now,
+            }
+        return control_path, None
+
+    def _make_room(self, wanted: set[str]) -> int:
+        """Evicts least recently used masters not in `wanted` until the new ones fit under the cap.
+
+        Returns:
+            - How many new masters may be opened.
+        """
+        with self._lock:
+            missing = [key for key in wanted if key not in self._masters]
+            spare = [
+                key
+                for key, _ in sorted(
+                    self._masters.items(), key=lambda item: item[1]["last_used"]
+                )
+                if key not in wanted
+            ]
+            overflow = len(self._masters) + len(missing) - self.max_connections
+
+        for key in spare[: max(overflow, 0)]:
+            self._evict(key)
+
+        with self._lock:
+            return max(self.max_connections - len(self._masters), 0)
+
+    def attach(self, hosts: dict[str, dict[str, Any]]) -> dict[str, Any]:
+        """Attaches every requested host, opening masters in parallel.
+
+        Args:
+            hosts: a mapping of inventory host names to targets (see ssh_target).
+
+        Returns:
+            - {"paths": {name: control_path}, "errors": {name: message}}. Hosts over the cap land in errors,
+                the client just keeps its normal ssh connector for those.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        keys = {name: target_key(target) for name, target in hosts.items()}
+        room = self._make_room(set(keys.values()))
+
+        paths: dict[str, str] = {}
+        errors: dict[str, str] = {}
+        accepted: dict[str, dict[str, Any]] = {}
+        new_keys: set[str] = set()
+
+        with self._lock:
+            known = set(self._masters)
+
+        for name, target in hosts.items():
+            key = keys[name]
+            if key not in known and key not in new_keys:
+                if len(new_keys) >= room:
+                    errors[name] = (
+                        f"agent is at its limit of {self.max_connections} connections"
+                    )
+                    continue
+                new_keys.add(key)
+            accepted[name] = target
+
+        if not accepted:
+            return {"paths": paths, "errors": errors}
+
+        # Hosts sharing a target share a master, so only the first of each key opens it.
+        by_key: dict[str, list[str]] = {}
+        for name in accepted:
+            by_key.setdefault(keys[name], []).append(name)
+
+        with ThreadPoolExecutor(max_workers=min(16, len(by_key))) as executor:
+            futures = {
+                key: executor.submit(self._attach_one, names[0], accepted[names[0]])
+                for key, names in by_key.items()
+            }
+
+        for key, future in futures.items():
+            control_path, error = future.result()
+            for name in by_key[key]:
+                if control_path is not None:
+                    paths[name] = control_path
+                else:
+                    errors[name] = error or "unknown error"
+
+        with self._lock:
+            for key, names in by_key.items():
+                if key in self._masters:
+                    self._masters[key]["hosts"].update(names)
+
+        return {"paths": paths, "errors": errors}
+
+    def evict_idle(self, now: float | None = None) -> list[str]:
+        """Closes every master unused for longer than idle_timeout, returns the evicted keys."""
+        now = time.time() if now is None else now
+        with self._lock:
+            idle = [
+                key
+                for key, entry in self._masters.items()
+                if now - entry["last_used"] > self.idle_timeout
+            ]
+        for key in idle:
+            self._evict(key)
+        return idle
+
+    def status(self) -> dict[str, Any]:
+        """A JSON-friendly snapshot of the agent and its masters (alive is checked live)."""
+        now = time.time()
+        with self._lock:
+            entries = list(self._masters.values())
+
+        connections = []
+        for entry in sorted(entries, key=lambda e: e["last_used"], reverse=True):
+            target = entry["target"]
+            connections.append(
+                {
+                    "hosts": sorted(entry["hosts"]),
+                    "hostname": target["hostname"],
+                    "user": target.get("user"),
+                    "port": target["port"],
+                    "control_path": entry["control_path"],
+                    "age": round(now - entry["created"], 1),
+                    "idle": round(now - entry["last_used"], 1),
+                    "alive": self._control_command(entry["control_path"], "check"),
+                }
+            )
+
+        return {
+            "pid": os.getpid(),
+            "uptime": round(now - self.started_at, 1),
+            "idle_timeout": self.idle_timeout,
+            "max_connections": self.max_connections,
+            "connections": connections,
+        }
+
+    def close_all(self) -> None:
+        """Closes every master, used on stop."""
+        with self._lock:
+            keys = list(self._masters)
+        for key in keys:
+            self._evict(key)
+
+
+class _AgentRequestHandler(socketserver.StreamRequestHandler):
+    """One request per connection: read a JSON line, answer with a JSON line."""
+
+    def handle(self) -> None:
+        server: AgentServer = self.server  # type: ignore[assignment]
+        try:
+            request = json.loads(self.rfile.readline() or b"{}")
+            match request.get("op"):
+                case "attach":
+                    response = server.agent.attach(request.get("hosts") or {})
+                case "status":
+                    response = server.agent.status()
+                case "stop":
+                    response = {"stopped": True}
+                    threading.Thread(target=server.shutdown, daemon=True).start()
+                case op:
+                    response = {"error": f"unknown op {op!r}"}
+        except Exception as e:
+            response = {"error": str(e)}
+
+        self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+class AgentServer(socketserver.ThreadingUnixStreamServer):
+    """The unix socket server, it only exists because socketserver wants a class to hang `agent` on."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: Path, agent: MultiplexAgent):
+        self.agent = agent
+        super().__init__(str(socket_path), _AgentRequestHandler)
+
+
+def serve(
+    socket_path: Path | None = None,
+    idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    ready: threading.Event | None = None,
+) -> None:
+    """Runs the agent in the current process until it is asked to stop.
+
+    Args:
+        socket_path: where to listen, defaults to agent_socket_path().
+        idle_timeout: seconds a master may go without an attach before being closed.
+        max_connections: maximum number of masters open at once.
+        ready: optional event set once the socket is listening (used by tests).
+    """
+    socket_path = socket_path or agent_socket_path()
+    socket_path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+    if socket_path.exists():
+        socket_path.unlink()
+
+    agent = MultiplexAgent(
+        socket_path.parent / "cm",
+        idle_timeout=idle_timeout,
+        max_connections=max_connections,
+    )
+
+    old_umask = os.umask(0o077)
+    try:
+        server = AgentServer(socket_path, agent)
+    finally:
+        os.umask(old_umask)
+
+    stop_reaper = threading.Event()
+
+    def _reap() -> None:
+        interval = max(min(idle_timeout / 4, 30.0), 0.05)
+        while not stop_reaper.wait(interval):
+            agent.evict_idle()
+
+    reaper = threading.Thread(target=_reap, daemon=True)
+    reaper.start()
+
+    if ready is not None:
+        ready.set()
+
+    try:
+        server.serve_forever(poll_interval=0.2)
+    finally:
+        stop_reaper.set()
+        server.server_close()
+        agent.close_all()
+        socket_path.unlink(missing_ok=True)
+
+
+def agent_request(
+    request: dict[str, Any],
+    socket_path: Path | None = None,
+    timeout: float = REQUEST_TIMEOUT,
+) -> ResultPayload[dict[str, Any] | None]:
+    """Sends one request to the agent and returns its answer in the data field.
+
+    Returns:
+        - A failed ResultPayload when the agent isn't running or answered with an error.
+    """
+    socket_path = socket_path or agent_socket_path()
+    if not socket_path.exists():
+        return ResultPayload(
+            success=False,
+            message=[],
+            error=[f"No chaos agent listening on {socket_path}."],
+            data=None,
+        )
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(socket_path))
+            sock.sendall(json.dumps(request).encode() + b"\n")
+            with sock.makefile("rb") as reader:
+                line = reader.readline()
+    except OSError as e:
+        return ResultPayload(
+            success=False,
+            message=[],
+            error=[f"Could not talk to the chaos agent at {socket_path}: {e}"],
+            data=None,
+        )
+
+    try:
+        response = json.loads(line)
+    except json.JSONDecodeError:
+        return ResultPayload(
+            success=False,
+            message=[],
+            error=["The chaos agent sent back garbage."],
+            data=None,
+        )
+
+    if "error" in response:
+        return ResultPayload(
+            success=False, message=[], error=[response["error"]], data=None
+        )
+
+    return ResultPayload(success=True, message=[], error=[], data=response)
+
+
+def start_agent(
+    idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    wait: float = 5.0,
+) -> ResultPayload[dict[str, Any] | None]:
+    """Starts the agent as a detached background process and waits for it to answer.
+
+    Returns:
+        - A ResultPayload with the agent status in data, failing if it is already running or never came up.
+    """
+    socket_path = agent_socket_path()
+    if agent_request({"op": "status"}, timeout=2).success:
+        return ResultPayload(
+            success=False,
+            message=[],
+            error=[f"A chaos agent is already running on {socket_path}."],
+            data=None,
+        )
+
+    subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "chaos.lib.agent",
+            "--socket",
+            str(socket_path),
+            "--idle-timeout",
+            str(idle_timeout),
+            "--max-connections",
+            str(max_connections),
+        ],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        status = agent_request({"op": "status"}, timeout=2)
+        if status.success:
+            return ResultPayload(
+                success=True,
+                message=[f"chaos agent listening on {socket_path}."],
+                error=[],
+                data=status.data,
+            )
+        time.sleep(0.05)
+
+    return ResultPayload(
+        success=False,
+        message=[],
+        error=[f"The chaos agent did not come up on {socket_path} within {wait}s."],
+        data=None,
+    )
+
+
+class ControlMasterConnector:
+    """A pyinfra connector that runs everything through an agent-owned OpenSSH master.
+
+    It is swapped in for the ssh connector by attach_agent_connections, keeping the original one around
+    as `fallback`: if the master died between the attach and the connect (evicted, remote reboot), the
+    host quietly goes back to its normal connector.
+
+    Commands go to the remote side through stdin (see REMOTE_READER), never through the argv of the local
+    `ssh`, since with sudo/su they carry the password and anyone on this machine can read an argv. Commands
+    that need a pty (where stdin is the terminal) and rsync go through the fallback connector instead.
+    """
+
+    handles_execution = True
+
+    def __init__(
+        self,
+        state: State,
+        host: Host,
+        control_path: str,
+        target: dict[str, Any],
+        fallback: Any,
+    ):
+        self.state = state
+        self.host = host
+        self.control_path = control_path
+        self.target = target
+        self.fallback = fallback
+        self.data = getattr(fallback, "data", {})
+        self._fallback_connected = False
+
+    def _ssh_prefix(self) -> str:
+        args = [
+            _ssh_binary(),
+            "-S",
+            self.control_path,
+            "-o",
+            "ControlMaster=no",
+            "-o",
+            "BatchMode=yes",
+            "-T",
+            *ssh_base_args(self.target),
+            str(self.target["hostname"]),
+        ]
+        return shlex.join(args)
+
+    def connect(self) -> None:
+        """Checks the master is still there, falling back to the original connector when it is not.
+
+        A master that doesn't answer the check within MASTER_CHECK_TIMEOUT is as good as dead: waiting on
+        it would hang the whole apply.
+        """
+        try:
+            check = subprocess.run(
+                [_ssh_binary(), "-S", self.control_path, "-O", "check", "chaos-agent"],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                timeout=MASTER_CHECK_TIMEOUT,
+            )
+            alive = check.returncode == 0
+        except (OSError, subprocess.TimeoutExpired):
+            alive = False
+        if alive:
+            return
+
+        self.host.connector = self.fallback
+        self.fallback.connect()
+
+    def disconnect(self) -> None:
+        """Nothing to do, the master belongs to the agent."""
+        return None
+
+    def _connected_fallback(self) -> Any:
+        """The fallback connector, connecting it the first time it's needed."""
+        if not self._fallback_connected:
+            self.fallback.connect()
+            self._fallback_connected = True
+        return self.fallback
+
+    def _run(
+        self,
+        command: Any,
+        data: bytes | None = None,
+        redirect: str = "",
+        print_output: bool = False,
+        print_input: bool = False,
+        **arguments: Any,
+    ) -> tuple[bool, Any]:
+        """Runs a pyinfra command on the remote side, feeding it `data` (for file uploads) and with an optional
+        local shell redirection of its output (for file downloads)."""
+        import tempfile
+
+        from pyinfra import logger
+        from pyinfra.api.output import echo
+        from pyinfra.connectors.util import (
+            execute_command_with_sudo_retry,
+            make_unix_command_for_host,
+            run_local_process,
+        )
+
+        if arguments.get("_get_pty"):
+            return self._connected_fallback().run_shell_command(
+                command, print_output=print_output, print_input=print_input, **arguments
+            )
+
+        arguments.pop("_get_pty", None)
+        timeout = arguments.pop("_timeout", None)
+        stdin = arguments.pop("_stdin", None)
+        success_exit_codes = arguments.pop("_success_exit_codes", None)
+
+        def execute_command() -> tuple[int, Any]:
+            unix_command = make_unix_command_for_host(
+                self.state, self.host, command, **arguments
+            )
+            remote_command = unix_command.get_raw_value().encode()
+
+            logger.debug(
+                "--> Running command on %s via agent: %s", self.host.name, unix_command
+            )
+            if print_input:
+                echo(f"{self.host.print_prefix}>>> {unix_command}", err=True)
+
+            # Private to this user (mkstemp's 0600), and gone as soon as the command is.
+            with tempfile.NamedTemporaryFile() as feed:
+                feed.write(b"%d\n" % len(remote_command) + remote_command)
+                if stdin:
+                    lines = stdin.readlines() if hasattr(stdin, "readlines") else stdin
+                    for line in lines if isinstance(lines, (list, tuple)) else [lines]:
+                        feed.write(
+                            (line if line.endswith("\n") else f"{line}\n").encode()
+                        )
+                if data:
+                    feed.write(data)
+                feed.flush()
+
+                local_command = (
+                    f"{self._ssh_prefix()} {shlex.quote(shlex.join(['sh', '-c', REMOTE_READER]))}"
+                    f" < {shlex.quote(feed.name)}{redirect}"
+                )
+                return run_local_process(
+                    local_command,
+                    timeout=timeout,
+                    print_output=print_output,
+                    print_prefix=self.host.print_prefix,
+                )
+
+        return_code, output = execute_command_with_sudo_retry(
+            self.host,
+            arguments,
+            execute_command,  # type: ignore[arg-type]
+        )
+
+        if success_exit_codes:
+            return return_code in success_exit_codes, output
+        return return_code == 0, output
+
+    def run_shell_command(
+        self,
+        command: Any,
+        print_output: bool = False,
+        print_input: bool = False,
+        **arguments: Any,
+    ) -> tuple[bool, Any]:
+        return self._run(
+            command, print_output=print_output, print_input=print_input, **arguments
+        )
+
+    def put_file(
+        self,
+        filename_or_io: Any,
+        remote_filename: str,
+        remote_temp_filename: str | None = None,
+        print_output: bool = False,
+        print_input: bool = False,
+        **arguments: Any,
+    ) -> bool:
+        """Streams the file into `cat > remote` on the other side, so sudo/su work like any other command."""
+        from pyinfra.api.command import QuoteString, StringCommand
+        from pyinfra.api.util import get_file_io
+
+        with get_file_io(filename_or_io) as file_io:
+            data = file_io.read()
+
+        status, output = self._run(
+            StringCommand("cat", ">", QuoteString(remote_filename)),
+            data=data.encode() if isinstance(data, str) else data,
+            print_output=print_output,
+            print_input=print_input,
+            **arguments,
+        )
+
+        if not status:
+            raise OSError(output.stderr)
+        return True
+
+    def get_file(
+        self,
+        remote_filename: str,
+        filename_or_io: Any,
+        remote_temp_filename: str | None = None,
+        print_output: bool = False,
+        print_input: bool = False,
+        **arguments: Any,
+    ) -> bool:
+        """Streams `cat remote` into a local temporary file, then into filename_or_io."""
+        import tempfile
+
+        from pyinfra.api.command import QuoteString, StringCommand
+        from pyinfra.api.util import get_file_io
+
+        with tempfile.NamedTemporaryFile() as local:
+            status, output = self._run(
+                StringCommand("cat", QuoteString(remote_filename)),
+                redirect=f" > {shlex.quote(local.name)}",
+                print_output=print_output,
+                print_input=print_input,
+                **arguments,
+            )
+            if not status:
+                raise OSError(output.stderr)
+
+            local.seek(0)
+            with get_file_io(filename_or_io, "wb") as file_io:
+                file_io.write(local.read())
+
+        return True
+
+    def check_can_rsync(self) -> None:
+        """rsync runs its own ssh, the fallback connector knows how to build it."""
+        self.fallback.check_can_rsync()
+
+    def rsync(
+        self, src, dest, flags, print_output=False, print_input=False, **arguments
+    ) -> bool:
+        """Runs rsync like the fallback connector would, it doesn't need the fallback to be connected."""
+        return self.fallback.rsync(
+            src,
+            dest,
+            flags,
+            print_output=print_output,
+            print_input=print_input,
+            **arguments,
+        )
+
+
+def attach_agent_connections(state: State) -> ResultPayload[dict[str, str]]:
+    """Asks a running agent for masters for every ssh host in the state and swaps their connectors.
+
+    Does nothing (successfully) when no agent is running, hosts the agent could not attach keep their
+    normal ssh connector and are reported in the error field as warnings.
+
+    Returns:
+        - A ResultPayload with {host name: control path} for the attached hosts in data.
+    """
+    targets: dict[str, dict[str, Any]] = {}
+    hosts_by_name: dict[str, Host] = {}
+    for host in state.inventory:
+        target = ssh_target(host)
+        if target is not None:
+            targets[host.name] = target
+            hosts_by_name[host.name] = host
+
+    if not targets or not agent_socket_path().exists():
+        return ResultPayload(success=True, message=[], error=[], data={})
+
+    response = agent_request({"op": "attach", "hosts": targets})
+    if not response.success or not response.data:
+        return ResultPayload(success=True, message=[], error=response.error, data={})
+
+    paths: dict[str, str] = response.data.get("paths", {})
+    for name, control_path in paths.items():
+        host = hosts_by_name.get(name)
+        if host is None:
+            continue
+        host.connector = ControlMasterConnector(  # type: ignore[assignment]
+            state, host, control_path, targets[name], host.connector
+        )
+
+    errors = [
+        f"chaos agent could not attach {name}: {error}"
+        for name, error in response.data.get("errors", {}).items()
+    ]
+    return ResultPayload(success=True, message=[], error=errors, data=paths)
+
+
+def handle_agent(payload: AgentPayload) -> ResultPayload[dict[str, Any] | None]:
+    """Entry point for `chaos agent start|stop|status`.
+
+    Returns:
+        - A ResultPayload, status and start carry the agent status in the data field.
+    """
+    match payload.agent_command:
+        case "start":
+            if payload.foreground:
+                serve(
+                    idle_timeout=payload.idle_timeout,
+                    max_connections=payload.max_connections,
+                )
+                return ResultPayload(success=True, message=[], error=[], data=None)
+            return start_agent(
+                idle_timeout=payload.idle_timeout,
+                max_connections=payload.max_connections,
+            )
+
+        case "stop":
+            result = agent_request({"op": "stop"})
+            if not result.success:
+                return result
+            return ResultPayload(
+                success=True, message=["chaos agent stopped."], error=[], data=None
+            )
+
+        case "status":
+            return agent_request({"op": "status"})
+
+    return ResultPayload(
+        success=False,
+        message=[],
+        error=[f"Unknown agent command: {payload.agent_command}"],
+        data=None,
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="chaos-agent")
+    parser.add_argument("--socket", default=None)
+    parser.add_argument("--idle-timeout", type=float, default=DEFAULT_IDLE_TIMEOUT)
+    parser.add_argument("--max-connections", type=int, default=DEFAULT_MAX_CONNECTIONS)
+    cli_args = parser.parse_args()
+
+    serve(
+        Path(cli_args.socket) if cli_args.socket else None,
+        idle_timeout=cli_args.idle_timeout,
+        max_connections=cli_args.max_connections,
+    )
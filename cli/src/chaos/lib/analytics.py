@@ -0,0 +1,268 @@
+"""
+Cross-run analytics over the logbook, what `chaos logbook stats` runs on.
+
+Two kinds of windows:
+    - time windows (whole UTC days): read from daily rollups, one row per day and operation name, one per day and
+        host and one over the whole fleet (ALL standing for every name or host), each carrying its counters and a
+        duration sketch. A query reads a handful of rows per day, no matter how many operations ran in it. There's
+        no rollup per name _and_ host (every host runs every operation, that'd be about as many rows as operations),
+        queries that need both are folded from the operations on the fly, like run windows.
+    - run windows (the last N runs): read the numbers of every operation of those runs, which Limanis can serve
+        from an index instead of the rows themselves.
+
+Either way rows are grouped by any of GROUP_KEYS and percentiles come out of merged sketches (see chaos.lib.sketch),
+so they are within 1% of the exact ones.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any
+
+from chaos.lib.sketch import QuantileSketch
+
+if TYPE_CHECKING:
+    from chaos.lib.limani.limani import Limani
+
+DAY = 86400
+ALL = "*"
+GROUP_KEYS = ("name", "host", "day", "run")
+# The daily rollups that are kept, as (by name, by host), see the module docstring.
+ROLLUP_LEVELS = ((True, False), (False, True), (False, False))
+
+
+def day_of(timestamp: float) -> int:
+    """The UTC day (days since the epoch) a timestamp falls in."""
+    return int(timestamp // DAY)
+
+
+def day_label(day: int) -> str:
+    """An ISO date for a day number."""
+    return datetime.fromtimestamp(day * DAY, tz=timezone.utc).date().isoformat()
+
+
+def new_entry() -> dict[str, Any]:
+    """Empty counters of a group of operations."""
+    return {
+        "count": 0,
+        "changed": 0,
+        "failed": 0,
+        "total_duration": 0.0,
+        "max_duration": 0.0,
+        "sketch": QuantileSketch(),
+    }
+
+
+def merge_entry(into: dict[str, Any], other: dict[str, Any]) -> dict[str, Any]:
+    """Adds the counters (and sketch) of `other` into `into`, in place."""
+    into["count"] += other["count"]
+    into["changed"] += other["changed"]
+    into["failed"] += other["failed"]
+    into["total_duration"] += other["total_duration"]
+    into["max_duration"] = max(into["max_duration"], other["max_duration"])
+    into["sketch"].merge(other["sketch"])
+    return into
+
+
+def entry_of(operations: list[dict[str, Any]]) -> dict[str, Any]:
+    """The counters of some operations (with duration, changed and success), all in one go."""
+    entry = new_entry()
+    durations = [op["duration"] for op in operations]
+    entry["count"] = len(operations)
+    entry["changed"] = sum(1 for op in operations if op["changed"])
+    entry["failed"] = sum(1 for op in operations if not op["success"])
+    entry["total_duration"] = sum(durations)
+    entry["max_duration"] = max(durations, default=0.0)
+    entry["sketch"].extend(durations)
+    return entry
+
+
+def fold_operations(
+    operations: Iterable[dict[str, Any]],
+    levels: Iterable[tuple[bool, bool]] = ROLLUP_LEVELS,
+) -> dict[tuple[int, str, str], dict[str, Any]]:
+    """Folds operations into daily rollups.
+
+    Args:
+        operations (Iterable[dict]): Operations with name, host, timestamp, duration, changed and success
+            (what Limani.iter_operation_stats yields).
+        levels (Iterable[tuple[bool, bool]]): Which rollups to build, as (by name, by host). A level not by
+            name (or host) gets ALL in its place.
+
+    Returns:
+        - The counters of each (day, name, host).
+    """
+    levels = list(levels)
+    groups: dict[tuple[int, str, str], list[dict[str, Any]]] = {}
+    for op in operations:
+        day = day_of(op["timestamp"])
+        for by_name, by_host in levels:
+            key = (day, op["name"] if by_name else ALL, op["host"] if by_host else ALL)
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = []
+            group.append(op)
+    return {key: entry_of(group) for key, group in groups.items()}
+
+
+def _group_rollups(
+    rollups: Iterable[dict[str, Any]], group_by: tuple[str, ...]
+) -> dict[tuple, dict[str, Any]]:
+    """Merges daily rollup rows (as Limani.iter_daily_rollups yields them) into groups."""
+    groups: dict[tuple, dict[str, Any]] = {}
+    for row in rollups:
+        key = tuple(row[column] for column in group_by)
+        entry = {
+            "count": row["count"],
+            "changed": row["changed"],
+            "failed": row["failed"],
+            "total_duration": row["total_duration"],
+            "max_duration": row["max_duration"],
+            "sketch": QuantileSketch.from_dict(row["sketch"]),
+        }
+        if key in groups:
+            merge_entry(groups[key], entry)
+        else:
+            groups[key] = entry
+    return groups
+
+
+def _group_operations(
+    operations: Iterable[dict[str, Any]], group_by: tuple[str, ...]
+) -> dict[tuple, dict[str, Any]]:
+    """Counts operations (as Limani.iter_operation_stats yields them) into groups."""
+    groups: dict[tuple, list[dict[str, Any]]] = {}
+    for op in operations:
+        key = tuple(
+            day_of(op["timestamp"])
+            if column == "day"
+            else op["run_id" if column == "run" else column]
+            for column in group_by
+        )
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = []
+        group.append(op)
+    return {key: entry_of(group) for key, group in groups.items()}
+
+
+def _rows(
+    groups: dict[tuple, dict[str, Any]],
+    group_by: tuple[str, ...],
+    percentiles: tuple[float, ...],
+    run_labels: dict[str, str] | None = None,
+) -> list[dict[str, Any]]:
+    """Turns groups into result rows, sorted by their group keys."""
+    rows = []
+    for key in sorted(groups):
+        entry = groups[key]
+        row: dict[str, Any] = {}
+        for column, value in zip(group_by, key):
+            if column == "day":
+                value = day_label(value)
+            elif column == "run" and run_labels:
+                value = run_labels.get(value, value)
+            row[column] = value
+
+        count = entry["count"]
+        row.update(
+            {
+                "count": count,
+                "changed": entry["changed"],
+                "failed": entry["failed"],
+                "total_duration": round(entry["total_duration"], 4),
+                "average_duration": round(entry["total_duration"] / count, 4)
+                if count
+                else 0.0,
+                "max_duration": round(entry["max_duration"], 4),
+            }
+        )
+        for p, value in entry["sketch"].percentiles(percentiles).items():
+            row[f"p{p:g}_duration"] = value
+        rows.append(row)
+    return rows
+
+
+def query_days(
+    limani: Limani,
+    since_day: int,
+    until_day: int,
+    group_by: tuple[str, ...] = ("name",),
+    percentiles: tuple[float, ...] = (50, 95, 99),
+    names: list[str] | None = None,
+    hosts: list[str] | None = None,
+) -> list[dict[str, Any]]:
+    """Stats of the operations between two UTC days (both included), from the daily rollups.
+
+    Raises:
+        ValueError: If grouping by run, which daily rollups don't know about.
+    """
+    if "run" in group_by:
+        raise ValueError("Grouping by run needs a run window (--runs).")
+
+    rollups = limani.iter_daily_rollups(
+        since_day,
+        until_day,
+        names=names,
+        hosts=hosts,
+        by_name="name" in group_by,
+        by_host="host" in group_by,
+    )
+    return _rows(_group_rollups(rollups, group_by), group_by, percentiles)
+
+
+def query_runs(
+    limani: Limani,
+    runs: list[dict[str, Any]],
+    group_by: tuple[str, ...] = ("name",),
+    percentiles: tuple[float, ...] = (50, 95, 99),
+    names: list[str] | None = None,
+    hosts: list[str] | None = None,
+) -> list[dict[str, Any]]:
+    """Stats of the operations of some runs (as Limani.list_runs returns them)."""
+    operations = limani.iter_operation_stats(
+        [run["id"] for run in runs], names=names, hosts=hosts
+    )
+    labels = {run["id"]: run["run_id_human"] for run in runs}
+    return _rows(_group_operations(operations, group_by), group_by, percentiles, labels)
+
+
+def comparison_metric(percentiles: tuple[float, ...]) -> str:
+    """The column windows are compared by: the highest percentile asked for, or the average without any."""
+    return f"p{max(percentiles):g}_duration" if percentiles else "average_duration"
+
+
+def compare(
+    current: list[dict[str, Any]],
+    previous: list[dict[str, Any]],
+    group_by: tuple[str, ...],
+    percentiles: tuple[float, ...],
+) -> list[dict[str, Any]]:
+    """Puts the stats of a previous window next to the current ones, slowest regressions first.
+
+    Each row gets the "previous" row of its group (or None) and the relative "change" of its comparison_metric
+        (0.25 being 25% slower, None without a previous row to compare to).
+    """
+    by_key = {tuple(row[column] for column in group_by): row for row in previous}
+    metric = comparison_metric(percentiles)
+
+    rows = []
+    for row in current:
+        before = by_key.get(tuple(row[column] for column in group_by))
+        change = None
+        if before and before[metric]:
+            change = round(row[metric] / before[metric] - 1, 4)
+        rows.append({**row, "previous": before, "change": change})
+
+    rows.sort(key=lambda row: (row["change"] is None, -(row["change"] or 0)))
+    return rows
+
+
+def iter_windowed_operations(
+    operations: Iterator[dict[str, Any]], since_day: int, until_day: int
+) -> Iterator[dict[str, Any]]:
+    """Keeps the operations that fall between two UTC days (both included)."""
+    for op in operations:
+        if since_day <= day_of(op["timestamp"]) <= until_day:
+            yield op
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import json
+import os
 from typing import TYPE_CHECKING, Literal
 
 from omegaconf import DictConfig, ListConfig
@@ -16,13 +17,17 @@ from chaos.lib.args.dataclasses import (
 )
 
 if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
     from typing import Any, TypedDict
 
+    from pyinfra.api.facts import FactBase
     from pyinfra.api.host import Host
     from pyinfra.api.inventory import Inventory
     from pyinfra.api.state import State
 
     from chaos.lib.boats.base import Boat
+    from chaos.lib.parallelism import ParallelismTuner
     from chaos.lib.roles.role import Role
 
     class GatherApplyResultData(TypedDict):
@@ -34,7 +39,7 @@ if TYPE_CHECKING:
     class GatherFleetResultData(TypedDict):
         hosts: list[tuple[str, dict[str, Any]] | str]
         is_fleet: bool
-        parallels: int
+        parallels: int | Literal["auto"]
 
     class FilteredContextRoles(TypedDict):
         role: Role
@@ -44,12 +49,39 @@ if TYPE_CHECKING:
         host: Host
         roles: dict[str, FilteredContextRoles]
 
+    class HostRoleDelta(TypedDict):
+        role: Role
+        role_name: str
+        result: ResultPayload[Delta]
+        cached: bool
+
+    class HostDeltaResultData(TypedDict):
+        host: Host
+        deltas: list[HostRoleDelta]
+
+    class HostRolePlan(TypedDict):
+        role: Role
+        role_name: str
+        result: ResultPayload[dict[Literal["plan"], ResultPayload[Any]]]
+
+    class HostPlanResultData(TypedDict):
+        host: Host
+        plans: list[HostRolePlan]
+
     class GetConfigsResultData(TypedDict):
         chobolo_path: str | None
         secrets_file_override: str | None
         sops_file_override: str | None
 
 
+# The health snapshots taken while the operations run, see FleetHealthSampler. Off unless `health_interval` is set,
+# HEALTH_SAMPLE_INTERVAL is just the default of the class itself.
+HEALTH_SAMPLE_INTERVAL = 30.0
+HEALTH_SAMPLE_BUDGET = 20
+HEALTH_SAMPLE_CONCURRENCY = 4
+HEALTH_SAMPLE_TIMEOUT = 10.0
+
+
 def gather_apply(
     payload: ApplyPayload,
 ) -> tuple[DataGatherRequest | None, ResultPayload[GatherApplyResultData | None]]:
@@ -177,7 +209,7 @@ def gather_fleet(
         Expected format in chobolo file:
         ```yaml
         fleet:
-            parallelism: int (optional, default 0 for no parallelism)
+            parallelism: int | auto (optional, default 0 for pyinfra's default, auto adapts it during the run)
             hosts:
                 host1:
                     param1: value1
@@ -242,6 +274,19 @@ def gather_fleet(
         return request, ResultPayload(success=True)
 
     parallels = fleet_config.get("parallelism", 0)
+    if isinstance(parallels, str) and parallels.strip().lower() == "auto":
+        parallels = "auto"
+    else:
+        try:
+            parallels = max(int(parallels or 0), 0)
+        except (TypeError, ValueError):
+            return None, ResultPayload(
+                success=False,
+                error=[
+                    f"Invalid fleet.parallelism '{parallels}' in {chobolo_path}, expected a number or 'auto'."
+                ],
+            )
+
     fleet_boats = fleet_config.get("boats", [])
 
     try:
@@ -347,6 +392,43 @@ def run_context(
             The context data is inside of the ResultPayload.data field, and any error messages are in the error field.
     """
 
+    secrets_result = _resolve_role_secrets(role, payload)
+    if not secrets_result.success:
+        return ResultPayload(
+            success=False, message=[], error=secrets_result.error, data={}
+        )
+
+    chobolo_for_role = chobolo_data
+    secrets_for_role = secrets_result.data or {}
+
+    if payload.pyinfra_state is None:
+        return ResultPayload(
+            success=False,
+            message=[],
+            data={},
+            error=["payload.pyinfra_state is not a State instance."],
+        )
+    context = role.get_context(
+        payload.pyinfra_state, host, chobolo_for_role, secrets_for_role
+    )
+
+    return ResultPayload(success=True, message=[], error=[], data=context)
+
+
+def _resolve_role_secrets(
+    role: Role, payload: ApplyPayload
+) -> ResultPayload[dict[str, Any]]:
+    """Checks that a role's secret requirements are met and returns the secrets for the role.
+
+    Args:
+        role: the Role for which to resolve secrets.
+        payload: the ApplyPayload containing the decrypted secrets.
+
+    Returns:
+        - A ResultPayload with the role's secrets in the data field (empty if the role needs no secrets),
+            or the reason they could not be resolved in the error field.
+    """
+
     if role.needs_secrets and not payload.secrets:
         return ResultPayload(
             success=False,
@@ -355,48 +437,546 @@ def run_context(
             data={},
         )
 
-    chobolo_for_role = chobolo_data
+    if not role.needs_secrets:
+        return ResultPayload(success=True, message=[], error=[], data={})
 
-    secrets_for_role = {}
-    secrets_result = None
+    secrets_result = _handle_secrets_for_role(role, payload)
 
-    if role.needs_secrets:
-        secrets_result = _handle_secrets_for_role(role, payload)
+    if not secrets_result.success:
+        return ResultPayload(
+            success=False,
+            message=[],
+            error=[
+                f"Role '{role.name}' requires secrets but they could not be loaded: {secrets_result.error}"
+            ],
+            data={},
+        )
 
-        if not secrets_result.success:
-            return ResultPayload(
-                success=False,
-                message=[],
-                error=[
-                    f"Role '{role.name}' requires secrets but they could not be loaded: {secrets_result.error}"
-                ],
-                data={},
-            )
+    if not secrets_result.data:
+        return ResultPayload(
+            success=False,
+            message=[],
+            error=[
+                f"Role '{role.name}' requires secrets but no secrets were provided."
+            ],
+            data={},
+        )
 
-        if not secrets_result.data:
-            return ResultPayload(
+    return ResultPayload(success=True, message=[], error=[], data=secrets_result.data)
+
+
+class FactCache:
+    """Per-host cache of pyinfra fact results, shared between every role of a run.
+
+    Notes:
+        Facts are keyed by their class and kwargs, so `(Packages, {})` fetched for one role is
+            the same entry for every other role that asks for it on that host.
+
+        pyinfra 3 does not cache facts on its own, so every host.get_fact call is a remote command.
+    """
+
+    def __init__(self):
+        self._facts: dict[str, dict[tuple[type[FactBase], str], Any]] = {}
+
+    @staticmethod
+    def key(
+        spec: type[FactBase] | tuple[type[FactBase], dict[str, Any]],
+    ) -> tuple[type[FactBase], str]:
+        """Normalizes a fact declaration (a class or a (class, kwargs) tuple) into a hashable cache key."""
+        if isinstance(spec, tuple):
+            fact_cls, fact_kwargs = spec
+        else:
+            fact_cls, fact_kwargs = spec, {}
+        return fact_cls, json.dumps(fact_kwargs, sort_keys=True, default=str)
+
+    def has(self, host: Host, fact_cls: type[FactBase], **kwargs: Any) -> bool:
+        """Returns whether a fact is already cached for a host."""
+        return self.key((fact_cls, kwargs)) in self._facts.get(host.name, {})
+
+    def set(
+        self, host: Host, fact_cls: type[FactBase], value: Any, **kwargs: Any
+    ) -> None:
+        """Stores a fact value for a host."""
+        self._facts.setdefault(host.name, {})[self.key((fact_cls, kwargs))] = value
+
+    def get(self, host: Host, fact_cls: type[FactBase], **kwargs: Any) -> Any:
+        """Returns a cached fact for a host, fetching (and caching) it if it was not prefetched."""
+        key = self.key((fact_cls, kwargs))
+        host_facts = self._facts.setdefault(host.name, {})
+        if key not in host_facts:
+            host_facts[key] = host.get_fact(fact_cls, **kwargs)
+        return host_facts[key]
+
+
+def group_roles_by_facts(
+    roles: list[Role],
+) -> dict[tuple[type[FactBase], str], list[str]]:
+    """Groups roles by the pyinfra facts they declare in necessary_facts.
+
+    Args:
+        roles: the loaded roles.
+
+    Returns:
+        dict: Each distinct fact key (see FactCache.key) mapped to the names of the roles that declared it.
+    """
+
+    groups: dict[tuple[type[FactBase], str], list[str]] = {}
+    for role in roles:
+        for spec in role.necessary_facts:
+            groups.setdefault(FactCache.key(spec), []).append(role.name)
+    return groups
+
+
+def prefetch_facts(
+    state: State,
+    host_facts: dict[Host, list[tuple[type[FactBase], str]]],
+    cache: FactCache | None = None,
+) -> FactCache:
+    """Fetches each distinct fact once per host, every host in parallel.
+
+    Args:
+        state: the pyinfra state, whose pool is used to parallelize hosts.
+        host_facts: the fact keys (see FactCache.key) to fetch for each host.
+        cache: an existing FactCache to fill, a new one is created if not given.
+
+    Returns:
+        FactCache: The cache with every requested fact. Facts that failed to be fetched are left out of it,
+            so they are retried on demand by FactCache.get.
+
+    Notes:
+        Facts of a single host are fetched sequentially, since they share the same connection.
+    """
+
+    from pyinfra.context import ctx_host
+
+    cache = cache or FactCache()
+
+    def _fetch_host(host: Host, keys: list[tuple[type[FactBase], str]]) -> None:
+        with ctx_host.use(host):
+            for fact_cls, kwargs_json in keys:
+                fact_kwargs = json.loads(kwargs_json)
+                if cache.has(host, fact_cls, **fact_kwargs):
+                    continue
+                try:
+                    value = host.get_fact(fact_cls, **fact_kwargs)
+                except Exception:
+                    continue
+                cache.set(host, fact_cls, value, **fact_kwargs)
+
+    if state.pool is not None:
+        import gevent
+
+        gevent.joinall(
+            [
+                state.pool.spawn(_fetch_host, host, keys)
+                for host, keys in host_facts.items()
+            ]
+        )
+    else:
+        for host, keys in host_facts.items():
+            _fetch_host(host, keys)
+
+    return cache
+
+
+def has_batch_context(role: Role) -> bool:
+    """Returns whether a role overrides Role.get_context_batch."""
+    from chaos.lib.roles.role import Role
+
+    return type(role).get_context_batch is not Role.get_context_batch
+
+
+def run_context_batch(
+    payload: ApplyPayload,
+    role: Role,
+    hosts: list[Host],
+    chobolo_data: dict[str, Any],
+    facts: FactCache | None = None,
+) -> dict[str, ResultPayload[dict[str, Any]]]:
+    """Runs the get_context_batch method of a role for all of its hosts at once.
+
+    Args:
+        payload: the ApplyPayload containing the initial data and flags for the apply operation.
+        role: the Role for which to gather context.
+        hosts: the hosts the role will be applied to.
+        chobolo_data: the chobolo configuration data passed to the role.
+        facts: the prefetched facts, handed to the role.
+
+    Returns:
+        dict[str, ResultPayload[dict[str, Any]]]: A run_context-like ResultPayload for each host, keyed by host name.
+    """
+
+    def _fail_all(error: str) -> dict[str, ResultPayload[dict[str, Any]]]:
+        return {
+            host.name: ResultPayload(success=False, message=[], error=[error], data={})
+            for host in hosts
+        }
+
+    secrets_result = _resolve_role_secrets(role, payload)
+    if not secrets_result.success:
+        return _fail_all("; ".join(secrets_result.error))
+
+    if payload.pyinfra_state is None:
+        return _fail_all("payload.pyinfra_state is not a State instance.")
+
+    try:
+        contexts = role.get_context_batch(
+            payload.pyinfra_state,
+            hosts,
+            chobolo_data,
+            secrets_result.data or {},
+            facts=facts,
+        )
+    except Exception as e:
+        return _fail_all(f"Error gathering batch context for role '{role.name}': {e}")
+
+    results: dict[str, ResultPayload[dict[str, Any]]] = {}
+    for host in hosts:
+        if host.name not in contexts:
+            results[host.name] = ResultPayload(
                 success=False,
                 message=[],
                 error=[
-                    f"Role '{role.name}' requires secrets but no secrets were provided."
+                    f"Batch context for role '{role.name}' returned nothing for host '{host.name}'."
                 ],
                 data={},
             )
+            continue
+        results[host.name] = ResultPayload(
+            success=True, message=[], error=[], data=contexts[host.name]
+        )
+    return results
 
-        secrets_for_role = secrets_result.data
 
-    if payload.pyinfra_state is None:
-        return ResultPayload(
-            success=False,
-            message=[],
-            data={},
-            error=["payload.pyinfra_state is not a State instance."],
+def run_batched_contexts(
+    payload: ApplyPayload,
+    roles: list[Role],
+    hosts: list[Host],
+    chobolo_config: dict[str, Any],
+    restrictions: dict[str, dict[str, dict[str, bool]]] | RestrictionIndex,
+    skip: dict[str, set[str]] | None = None,
+    role_chobolos: dict[str, FrozenDict] | None = None,
+) -> dict[str, dict[str, ResultPayload[dict[str, Any]]]]:
+    """Plans and runs the fleet-wide context gathering of every role implementing get_context_batch.
+
+    Args:
+        payload: the ApplyPayload containing the pyinfra state.
+        roles: the loaded roles.
+        hosts: the target hosts.
+        chobolo_config: the chobolo configuration data passed to the roles.
+        restrictions: the allow_list/black_list restrictions, roles are only batched over the hosts they may run on.
+        skip: role names to leave out per host name, e.g. the roles whose delta came from the delta cache.
+        role_chobolos: the per-role Ch-obolo views from build_role_chobolos, the whole chobolo_config is passed if not given.
+
+    Returns:
+        dict: The gathered contexts keyed by host name, then by role name. Meant to be passed as
+            run_filtered_context's batched_contexts. Roles without get_context_batch are left out.
+
+    Notes:
+        Facts declared by the batched roles are grouped, so a fact declared by three roles is fetched once per host.
+    """
+
+    batch_roles = [role for role in roles if has_batch_context(role)]
+    if not batch_roles or payload.pyinfra_state is None:
+        return {}
+
+    fact_groups = group_roles_by_facts(batch_roles)
+    index = RestrictionIndex.ensure(restrictions, [role.name for role in roles])
+
+    role_hosts: dict[str, list[Host]] = {}
+    host_facts: dict[Host, list[tuple[type[FactBase], str]]] = {}
+    for role in batch_roles:
+        allowed = [
+            host
+            for host in hosts
+            if index.allows(host.name, role.name)
+            and host.name not in index.conflicts
+            and role.name not in (skip or {}).get(host.name, ())
+        ]
+        role_hosts[role.name] = allowed
+        for host in allowed:
+            keys = host_facts.setdefault(host, [])
+            for key, role_names in fact_groups.items():
+                if role.name in role_names and key not in keys:
+                    keys.append(key)
+
+    facts = prefetch_facts(payload.pyinfra_state, host_facts)
+
+    batched: dict[str, dict[str, ResultPayload[dict[str, Any]]]] = {}
+    for role in batch_roles:
+        if not role_hosts[role.name]:
+            continue
+        results = run_context_batch(
+            payload,
+            role,
+            role_hosts[role.name],
+            (role_chobolos or {}).get(role.name, chobolo_config),
+            facts,
         )
-    context = role.get_context(
-        payload.pyinfra_state, host, chobolo_for_role, secrets_for_role
+        for host_name, result in results.items():
+            batched.setdefault(host_name, {})[role.name] = result
+
+    return batched
+
+
+def slice_chobolo(chobolo_config: dict[str, Any], keys: list[str]) -> dict[str, Any]:
+    """Projects the chobolo configuration down to the given dotted keys.
+
+    Args:
+        chobolo_config: the entire chobolo configuration data.
+        keys: dotted paths into the configuration, e.g. "users" or "fleet.hosts". "." selects the whole document.
+
+    Returns:
+        dict: A nested dictionary holding only the selected paths. Missing paths are left out.
+    """
+
+    if "." in keys:
+        return chobolo_config
+
+    sliced: dict[str, Any] = {}
+    for key in keys:
+        value: Any = chobolo_config
+        try:
+            for k in key.split("."):
+                value = value[k]
+        except (KeyError, TypeError, IndexError):
+            continue
+
+        target = sliced
+        path = key.split(".")
+        for k in path[:-1]:
+            target = target.setdefault(k, {})
+        target[path[-1]] = value
+    return sliced
+
+
+class FrozenDict(dict):
+    """Read-only dict, used for the per-role Ch-obolo views.
+
+    Notes:
+        It is still a dict, so isinstance checks, json.dumps and OmegaConf keep working.
+            copy.copy and copy.deepcopy return plain, mutable dicts, so roles that want to
+            mutate their input can still copy it.
+    """
+
+    __slots__ = ()
+
+    def _readonly(self, *args: Any, **kwargs: Any) -> None:
+        raise TypeError("The Ch-obolo view of a role is read-only, copy it first.")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly  # type: ignore[assignment]
+    clear = pop = popitem = setdefault = update = _readonly  # type: ignore[assignment]
+
+    def __copy__(self) -> dict[str, Any]:
+        return dict(self)
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> dict[str, Any]:
+        import copy
+
+        return {k: copy.deepcopy(v, memo) for k, v in self.items()}
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return (FrozenDict, (dict(self),))
+
+
+class FrozenList(list):
+    """Read-only list, the list counterpart of FrozenDict."""
+
+    __slots__ = ()
+
+    def _readonly(self, *args: Any, **kwargs: Any) -> None:
+        raise TypeError("The Ch-obolo view of a role is read-only, copy it first.")
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly  # type: ignore[assignment]
+    append = extend = insert = pop = remove = clear = sort = reverse = _readonly  # type: ignore[assignment]
+
+    def __copy__(self) -> list[Any]:
+        return list(self)
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> list[Any]:
+        import copy
+
+        return [copy.deepcopy(v, memo) for v in self]
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return (FrozenList, (list(self),))
+
+
+def freeze(value: Any) -> Any:
+    """Recursively converts dicts and lists into FrozenDict and FrozenList."""
+    if isinstance(value, FrozenDict | FrozenList):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return FrozenList(freeze(v) for v in value)
+    return value
+
+
+def build_role_chobolos(
+    roles: list[Role], chobolo_config: dict[str, Any]
+) -> dict[str, FrozenDict]:
+    """Builds the read-only Ch-obolo view of every role, once.
+
+    Args:
+        roles: the loaded roles.
+        chobolo_config: the entire chobolo configuration data.
+
+    Returns:
+        dict: Each role name mapped to its view, holding only its necessary_chobolo_keys (see slice_chobolo).
+            The same view object is handed to every host.
+
+    Notes:
+        Roles that declare no necessary_chobolo_keys get a view of the whole document, shared between all of them.
+    """
+
+    whole: FrozenDict | None = None
+    views: dict[str, FrozenDict] = {}
+    for role in roles:
+        if not role.necessary_chobolo_keys:
+            if whole is None:
+                whole = freeze(chobolo_config)
+            views[role.name] = whole
+            continue
+        views[role.name] = freeze(
+            slice_chobolo(chobolo_config, role.necessary_chobolo_keys)
+        )
+    return views
+
+
+def _delta_cache_dir() -> Path:
+    from pathlib import Path
+
+    cache_dir = os.getenv("CHAOS_CACHE_DIR", Path.home() / ".cache" / "chaos")
+    return Path(cache_dir) / "deltas"
+
+
+def _delta_cache_path(host_name: str, role_name: str) -> Path:
+    import hashlib
+
+    digest = hashlib.sha256(f"{host_name}\0{role_name}".encode()).hexdigest()
+    return _delta_cache_dir() / f"{digest}.json"
+
+
+def chobolo_digest(chobolo_view: dict[str, Any]) -> str:
+    """Returns a stable hash of a role's Ch-obolo view, part of its delta cache key."""
+    import hashlib
+
+    return hashlib.sha256(
+        json.dumps(chobolo_view, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def secrets_digest(secrets: dict[str, Any]) -> str:
+    """Returns a stable hash of a role's resolved secrets, part of its delta cache key.
+
+    Notes:
+        Only the hash ends up in the key (and the cache), never the secret values themselves.
+    """
+    import hashlib
+
+    return hashlib.sha256(
+        json.dumps(secrets, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def delta_cache_key(
+    role: Role,
+    host_name: str,
+    chobolo_hash: str,
+    fingerprint: str,
+    secrets_hash: str,
+) -> str:
+    """Computes the delta cache key of a role on a host.
+
+    Args:
+        role: the Role the key is computed for.
+        host_name: the name of the host.
+        chobolo_hash: the chobolo_digest of the role's Ch-obolo view, so only its necessary_chobolo_keys count.
+        fingerprint: the host fingerprint, as returned by the HostFingerprint fact.
+        secrets_hash: the secrets_digest of the role's resolved secrets, so rotating a secret misses the cache.
+
+    Returns:
+        str: A hex digest that changes whenever the role, its slice of the Ch-obolo, its secrets or the host
+            fingerprint changes.
+    """
+    import hashlib
+
+    material = json.dumps(
+        [role.name, role.version, host_name, fingerprint, chobolo_hash, secrets_hash]
     )
+    return hashlib.sha256(material.encode()).hexdigest()
 
-    return ResultPayload(success=True, message=[], error=[], data=context)
+
+def load_cached_delta(role: Role, host_name: str, key: str) -> Delta | None:
+    """Returns the cached delta of a role on a host, or None if there is none or its key does not match."""
+    path = _delta_cache_path(host_name, role.name)
+    try:
+        with open(path, "r") as f:
+            entry = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+    if not isinstance(entry, dict) or entry.get("key") != key:
+        return None
+
+    try:
+        return Delta.from_dict(entry["delta"])
+    except (KeyError, TypeError):
+        return None
+
+
+def store_cached_delta(role: Role, host_name: str, key: str, delta: Delta) -> None:
+    """Stores the delta of a role on a host in the delta cache, replacing whatever was there.
+
+    Notes:
+        Only deltas without changes are stored. A delta with changes is about to be applied,
+            so the state it was computed from won't last past this run.
+
+        Deltas that can't be serialized to JSON are silently not cached.
+    """
+    path = _delta_cache_path(host_name, role.name)
+    if delta.to_add or delta.to_remove:
+        path.unlink(missing_ok=True)
+        return
+
+    try:
+        data = json.dumps(
+            {
+                "key": key,
+                "role": role.name,
+                "host": host_name,
+                "delta": delta.to_dict(),
+            }
+        )
+    except (TypeError, ValueError):
+        return
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def fetch_host_fingerprints(state: State, hosts: list[Host]) -> dict[str, str]:
+    """Fetches the HostFingerprint fact of every host, in parallel.
+
+    Returns:
+        dict: The fingerprints keyed by host name. Hosts where the fact failed are left out, and never hit the cache.
+    """
+    from chaos.lib.facts.facts import HostFingerprint
+
+    facts = prefetch_facts(
+        state, {host: [FactCache.key(HostFingerprint)] for host in hosts}
+    )
+    fingerprints: dict[str, str] = {}
+    for host in hosts:
+        if facts.has(host, HostFingerprint):
+            fingerprint = facts.get(host, HostFingerprint)
+            if fingerprint:
+                fingerprints[host.name] = fingerprint
+    return fingerprints
 
 
 def run_delta(
@@ -483,6 +1063,10 @@ def execute_plans(payload: ApplyPayload) -> ResultPayload[None]:
     Args:
         payload: the ApplyPayload containing the pyinfra state with the computed plans for each role and host
             as well as any flags for telemetry.
+
+    Returns:
+        - ResultPayload indicating whether the operations ran. Failed health samples (see FleetHealthSampler) show up
+            as warnings in the error field of a successful result.
     """
 
     from pyinfra.api.operations import run_ops
@@ -491,10 +1075,30 @@ def execute_plans(payload: ApplyPayload) -> ResultPayload[None]:
         if payload.dry:
             return ResultPayload(success=True, message=[], error=[])
 
+        if payload.connections:
+            connect_result = payload.connections.join()
+            if not connect_result.success:
+                return connect_result
+
+        sampler = None
         if payload.pyinfra_state:
-            run_ops(payload.pyinfra_state, payload.serial, payload.no_wait)
-        return ResultPayload(success=True, message=[], error=[])
-    except Exception as e:
+            if payload.logbook or payload.tuner is not None:
+                sampler = FleetHealthSampler.from_config(
+                    payload.pyinfra_state,
+                    payload.global_config or {},
+                    tuner=payload.tuner,
+                )
+            if sampler:
+                sampler.start()
+            try:
+                run_ops(payload.pyinfra_state, payload.serial, payload.no_wait)
+            finally:
+                if sampler:
+                    sampler.stop()
+        return ResultPayload(
+            success=True, message=[], error=sampler.warnings() if sampler else []
+        )
+    except Exception as e:
         return ResultPayload(
             success=False,
             message=[],
@@ -585,31 +1189,523 @@ def resolve_aliases(payload: ApplyPayload) -> ResultPayload[list[str]]:
     return ResultPayload(success=True, message=warnings, error=[], data=resolved_tags)
 
 
-def setup_pyinfra(payload: ApplyPayload) -> ResultPayload[State | None]:
+def match_host_selector(
+    selector: str, host_name: str, host_data: dict[str, Any]
+) -> bool:
+    """Checks a single --limit selector (without its "!" prefix) against a host.
+
+    Args:
+        selector: either a glob on the host name ("web-*"), or a "dotted.key=glob" match on the host data ("tags.environment=prod").
+        host_name: the name of the host.
+        host_data: the host data from the fleet configuration.
+
+    Returns:
+        bool: Whether the host matches. For data matches, list values match if any of their items match,
+            and missing keys never match.
+    """
+    from fnmatch import fnmatchcase
+
+    if "=" not in selector:
+        return fnmatchcase(host_name, selector)
+
+    key, pattern = selector.split("=", 1)
+    value: Any = host_data
+    try:
+        for k in key.strip().split("."):
+            value = value[k]
+    except (KeyError, TypeError, IndexError):
+        return False
+
+    pattern = pattern.strip()
+    if isinstance(value, list | tuple):
+        return any(fnmatchcase(str(item), pattern) for item in value)
+    if isinstance(value, bool):
+        value = str(value).lower()
+    return fnmatchcase(str(value), pattern)
+
+
+def resolve_limit(
+    payload: ApplyPayload,
+) -> ResultPayload[list[tuple[str, dict[str, Any]] | str]]:
+    """Filters payload.target_hosts down to the hosts selected by the --limit selectors.
+
+    Args:
+        payload: the ApplyPayload containing the target hosts and the limit selectors.
+
+    Returns:
+        - A ResultPayload with the selected hosts in the data field, in their original order.
+            It fails if the selectors leave no hosts behind.
+
+    Notes:
+        Every --limit value may hold several comma separated selectors. A host is kept if it matches
+            any of the include selectors (or if there are none), and none of the "!" prefixed exclude selectors.
+
+        Meant to run before setup_pyinfra, so no connection is ever opened to the hosts left out.
+    """
+
+    selectors = [
+        selector.strip()
+        for value in payload.limit
+        for selector in value.split(",")
+        if selector.strip()
+    ]
+    if not selectors:
+        return ResultPayload(
+            success=True, message=[], error=[], data=list(payload.target_hosts)
+        )
+
+    includes = [s for s in selectors if not s.startswith("!")]
+    excludes = [s[1:].strip() for s in selectors if s.startswith("!")]
+
+    selected: list[tuple[str, dict[str, Any]] | str] = []
+    for host in payload.target_hosts:
+        if isinstance(host, str):
+            host_name, host_data = host, {}
+        else:
+            host_name, host_data = host
+
+        if includes and not any(
+            match_host_selector(s, host_name, host_data) for s in includes
+        ):
+            continue
+        if any(match_host_selector(s, host_name, host_data) for s in excludes):
+            continue
+        selected.append(host)
+
+    if not selected:
+        return ResultPayload(
+            success=False,
+            message=[],
+            error=[f"No hosts matched --limit '{','.join(selectors)}'."],
+            data=[],
+        )
+
+    return ResultPayload(success=True, message=[], error=[], data=selected)
+
+
+def _cap_connect_timeout(host: Host, seconds: float) -> None:
+    """Caps how long a host's SSH connector may take to connect at `seconds`, and drops its retries.
+
+    Paramiko's connect blocks (nothing is monkey-patched), so no gevent.Timeout can stop it halfway: its own
+        socket, banner and auth timeouts are the only thing that can. Retries are dropped since their delays
+        block too. Connectors without SSH connect kwargs (eg: @local) are left alone.
+    """
+    connector = getattr(host, "connector", None)
+    connector = getattr(connector, "fallback", None) or connector
+    data = getattr(connector, "data", None)
+    if not isinstance(data, dict) or "ssh_paramiko_connect_kwargs" not in data:
+        return
+
+    kwargs = dict(data.get("ssh_paramiko_connect_kwargs") or {})
+    defaults = {
+        "timeout": connector.state.config.CONNECT_TIMEOUT,
+        "banner_timeout": 15,
+        "auth_timeout": 30,
+    }
+    for key, default in defaults.items():
+        kwargs[key] = min(float(kwargs.get(key) or default or seconds), seconds)
+    data["ssh_paramiko_connect_kwargs"] = kwargs
+    data["ssh_connect_retries"] = 0
+
+
+class ConnectionManager:
+    """Connects to the fleet in the background, letting each host start working as soon as it is connected.
+
+    Usage:
+        ```python
+        connections = ConnectionManager(state, deadline=30)
+        connections.start()
+        for host in connections.hosts:
+            if connections.wait(host):  # blocks only until this host is connected (or given up on)
+                ...
+        result = connections.join()  # fails the unreachable hosts in pyinfra
+        ```
+
+    Attributes:
+        hosts (list[Host]): The hosts being connected to.
+        unreachable (dict[str, str]): The hosts that could not be connected to, mapped to the reason.
+        latencies (dict[str, float]): How long each connection attempt took, in seconds.
+
+    Notes:
+        At most max_concurrent connections are attempted at once (defaults to the pyinfra PARALLEL setting).
+            Ch-aOS doesn't monkey-patch gevent, so connectors doing blocking I/O (SSH, through paramiko) would
+            hold the hub while they connect: each host.connect runs in a thread pool of that size instead,
+            leaving the hub free to start working on the hosts that are already connected.
+
+        The deadline is counted from start(), hosts that aren't connected by then are marked unreachable,
+            instead of holding the whole run until their connector times out. Since a gevent.Timeout can't
+            interrupt a blocking connect, each SSH connect also gets its timeouts capped at the time left before
+            the deadline (and no retries, see _cap_connect_timeout). A host that still connects after being given
+            up on is disconnected right away.
+
+        With a tuner (`parallelism: auto`), the RAM/load snapshot of each host is taken right after it connects
+            even without the logbook, so the tuner knows which targets are already saturated.
+    """
+
+    def __init__(
+        self,
+        state: State,
+        hosts: list[Host] | None = None,
+        max_concurrent: int | None = None,
+        deadline: float | None = None,
+        telemetry: bool = False,
+        tuner: ParallelismTuner | None = None,
+    ):
+        from gevent.event import AsyncResult
+        from gevent.lock import BoundedSemaphore
+
+        self.state = state
+        self.hosts = (
+            hosts
+            if hosts is not None
+            else [host for host in state.inventory if state.is_host_in_limit(host)]
+        )
+        self.deadline = deadline
+        self.telemetry = telemetry
+        self.tuner = tuner
+        self.unreachable: dict[str, str] = {}
+        self.latencies: dict[str, float] = {}
+
+        self._size = max_concurrent or state.config.PARALLEL or len(self.hosts) or 1
+        self._semaphore = BoundedSemaphore(self._size)
+        self._pool: Any = None
+        self._results: dict[str, AsyncResult] = {
+            host.name: AsyncResult() for host in self.hosts
+        }
+        self._greenlets: list[Any] = []
+        self._started_at = 0.0
+        self._joined = False
+
+    def start(self) -> None:
+        """Starts connecting to every host, without waiting for any of them."""
+        import time
+
+        import gevent
+        from gevent.threadpool import ThreadPool
+
+        self._started_at = time.perf_counter()
+        self._pool = ThreadPool(self._size)
+        self._greenlets = [gevent.spawn(self._connect, host) for host in self.hosts]
+
+    def wait(self, host: Host) -> bool:
+        """Waits for a host's connection attempt, returning whether it is connected."""
+        result = self._results.get(host.name)
+        if result is None:
+            return bool(host.connected)
+        return result.get()
+
+    def join(self) -> ResultPayload[None]:
+        """Waits for every connection attempt and fails the unreachable hosts in the pyinfra state.
+
+        Returns:
+            - A ResultPayload listing the unreachable hosts in the message field. It only fails if no host could be connected to.
+        """
+        import gevent
+        from pyinfra.api.exceptions import PyinfraError
+
+        gevent.joinall(self._greenlets)
+        if self._pool is not None:
+            self._pool.kill()
+        messages = [
+            f"Host '{name}' is unreachable: {reason}"
+            for name, reason in self.unreachable.items()
+        ]
+
+        if self._joined:
+            return ResultPayload(success=True, message=messages, error=[])
+        self._joined = True
+
+        failed = {host for host in self.hosts if host.name in self.unreachable}
+        try:
+            self.state.fail_hosts(failed, activated_count=len(self.hosts))
+        except PyinfraError as e:
+            return ResultPayload(success=False, message=messages, error=[str(e)])
+        return ResultPayload(success=True, message=messages, error=[])
+
+    def close(self) -> None:
+        """Stops any connection attempt still running."""
+        import gevent
+
+        gevent.killall([g for g in self._greenlets if not g.dead])
+        if self._pool is not None:
+            self._pool.kill()
+        for name, result in self._results.items():
+            if not result.ready():
+                self.unreachable.setdefault(name, "connection attempt cancelled.")
+                result.set(False)
+
+    def _connect(self, host: Host) -> None:
+        import time
+
+        import gevent
+        from pyinfra.api.exceptions import ConnectError
+
+        error = None
+        pending = None
+        timeout = None
+        if self.deadline is not None:
+            remaining = self._started_at + self.deadline - time.perf_counter()
+            timeout = gevent.Timeout(max(remaining, 0))
+            timeout.start()
+
+        start = time.perf_counter()
+        try:
+            with self._semaphore:
+                start = time.perf_counter()
+                if self.deadline is not None:
+                    remaining = self._started_at + self.deadline - start
+                    if remaining <= 0:
+                        raise timeout
+                    _cap_connect_timeout(host, remaining)
+                pending = self._pool.spawn(self._connect_in_thread, host)
+                failure = pending.get()
+                if failure is not None:
+                    raise failure
+        except gevent.Timeout as t:
+            if t is not timeout:
+                raise
+            error = f"not connected within the {self.deadline}s deadline."
+            if pending is not None:
+                pending.rawlink(lambda _: self._disconnect_late(host))
+        except ConnectError as e:
+            error = str(e.args[0]) if e.args else "connection failed."
+        except Exception as e:
+            error = str(e)
+        finally:
+            if timeout is not None:
+                timeout.cancel()
+
+        latency = time.perf_counter() - start
+        self.latencies[host.name] = latency
+
+        connected = error is None and bool(host.connected)
+        if connected:
+            self.state.activate_host(host)
+        else:
+            self.unreachable[host.name] = error or "connection failed."
+
+        try:
+            if self.telemetry:
+                from .telemetry import ChaosTelemetry
+
+                ChaosTelemetry.record_setup_phase(
+                    self.state,
+                    latency,
+                    host=host,
+                    error=self.unreachable.get(host.name),
+                )
+            if connected and (self.telemetry or self.tuner is not None):
+                _collect_host_health(host, stage="pre_operations", tuner=self.tuner)
+        except Exception:
+            pass
+        finally:
+            self._results[host.name].set(connected)
+
+    @staticmethod
+    def _connect_in_thread(host: Host) -> Exception | None:
+        """Connects a host from the thread pool, handing any failure back (the pool would print it otherwise)."""
+        try:
+            host.connect(raise_exceptions=True)
+        except Exception as e:
+            return e
+        return None
+
+    @staticmethod
+    def _disconnect_late(host: Host) -> None:
+        """Disconnects a host whose connect finished after it was marked unreachable."""
+        if host.connected:
+            try:
+                host.disconnect()
+            except Exception:
+                pass
+
+
+class FleetHealthSampler:
+    """Takes health snapshots of the fleet every few seconds while the operations run.
+
+    Usage:
+        ```python
+        sampler = FleetHealthSampler.from_config(state, global_config, tuner=tuner)  # None if turned off
+        sampler.start()
+        run_ops(state)
+        sampler.stop()
+        ```
+
+    Attributes:
+        samples (int): How many snapshots were taken.
+        failures (int): How many samples failed or timed out.
+        errors (dict[str, str]): The last failure of each host that had one, see `warnings`.
+
+    Notes:
+        The sampling has a budget, to keep what it takes from the operations small: each round samples at most
+            `budget` hosts, HEALTH_SAMPLE_CONCURRENCY at a time, picking up where the previous round left off (a big
+            fleet is covered over a few rounds instead of all at once). Rounds never overlap, a slow one just delays
+            the next. Hosts that failed, aren't connected or that the tuner sees as saturated are skipped.
+
+        It does compete with them though: nothing is monkey-patched, so paramiko's I/O blocks the gevent hub and
+            the operations wait while a sample talks to its host (like they do for each other's commands). For the
+            same reason HEALTH_SAMPLE_TIMEOUT can only fire between reads, not in the middle of one; a host that
+            hangs mid-read holds everything until paramiko gives up on it. That's why it's opt-in: from_config
+            only builds a sampler when the global config sets `health_interval`.
+
+        Each snapshot is a single HostResources fact, gathered outside of the logbook's fact log (see
+            ChaosTelemetry.unrecorded) so it doesn't end up in the history of the operations running meanwhile.
+    """
+
+    def __init__(
+        self,
+        state: State,
+        interval: float = HEALTH_SAMPLE_INTERVAL,
+        budget: int = HEALTH_SAMPLE_BUDGET,
+        tuner: ParallelismTuner | None = None,
+    ):
+        from gevent.pool import Pool
+
+        self.state = state
+        self.interval = interval
+        self.budget = max(budget, 1)
+        self.tuner = tuner
+        self.samples = 0
+        self.failures = 0
+        self.errors: dict[str, str] = {}
+        self._pool = Pool(min(HEALTH_SAMPLE_CONCURRENCY, self.budget))
+        self._cursor = 0
+        self._greenlet: Any = None
+
+    @classmethod
+    def from_config(
+        cls,
+        state: State,
+        global_config: dict[str, Any],
+        tuner: ParallelismTuner | None = None,
+    ) -> FleetHealthSampler | None:
+        """Builds the sampler from `health_interval` (seconds between rounds, unset or 0 turns it off) and
+        `health_budget` (hosts per round) of the global config."""
+        interval = float(global_config.get("health_interval") or 0)
+        if interval <= 0:
+            return None
+        budget = int(
+            global_config.get("health_budget", HEALTH_SAMPLE_BUDGET)
+            or HEALTH_SAMPLE_BUDGET
+        )
+        return cls(state, interval=interval, budget=budget, tuner=tuner)
+
+    def start(self) -> None:
+        """Starts sampling in the background, the first round one interval from now."""
+        import gevent
+
+        self._greenlet = gevent.spawn(self._loop)
+
+    def stop(self) -> None:
+        """Stops sampling, cancelling a round in progress."""
+        if self._greenlet is not None:
+            self._greenlet.kill()
+            self._greenlet = None
+        self._pool.kill()
+
+    def _loop(self) -> None:
+        import gevent
+
+        while True:
+            gevent.sleep(self.interval)
+            self.sample_round()
+
+    def sample_round(self) -> None:
+        """Samples the next `budget` hosts of the fleet, waiting for them."""
+        saturated = (
+            set(self.tuner.saturated_hosts()) if self.tuner is not None else set()
+        )
+        hosts = sorted(
+            (
+                host
+                for host in self.state.inventory.iter_activated_hosts()
+                if host.connected
+                and host not in self.state.failed_hosts
+                and host.name not in saturated
+            ),
+            key=lambda host: host.name,
+        )
+        if not hosts:
+            return
+
+        start = self._cursor % len(hosts)
+        picked = (hosts[start:] + hosts[:start])[: self.budget]
+        self._cursor = start + len(picked)
+        self._pool.map(self._sample, picked)
+
+    def warnings(self, limit: int = 5) -> list[str]:
+        """The failed samples, as warnings for the end of the run (the first `limit` hosts, then how many more)."""
+        if not self.failures:
+            return []
+        hosts = sorted(self.errors.items())
+        warnings = [f"{self.failures} health sample(s) failed on {len(hosts)} host(s)."]
+        warnings += [
+            f"Health sample of host '{name}' failed: {reason}"
+            for name, reason in hosts[:limit]
+        ]
+        if len(hosts) > limit:
+            warnings.append(
+                f"...and {len(hosts) - limit} more host(s) with failed health samples."
+            )
+        return warnings
+
+    def _sample(self, host: Host) -> None:
+        import gevent
+
+        from .telemetry import ChaosTelemetry
+
+        timeout = gevent.Timeout(HEALTH_SAMPLE_TIMEOUT)
+        try:
+            with timeout, ChaosTelemetry.unrecorded():
+                _collect_host_health(host, stage="checkpoint", tuner=self.tuner)
+            self.samples += 1
+        except gevent.Timeout as e:
+            if e is not timeout:
+                raise
+            self._failed(host, f"no answer within {HEALTH_SAMPLE_TIMEOUT:g}s")
+        except Exception as e:
+            self._failed(host, str(e) or type(e).__name__)
+
+    def _failed(self, host: Host, reason: str) -> None:
+        self.failures += 1
+        self.errors[host.name] = reason
+
+
+def setup_pyinfra(
+    payload: ApplyPayload, wait_for_connections: bool = True
+) -> ResultPayload[State | None]:
     """Set up the pyinfra state and inventory based on the gathered fleet configuration, and establish connections to the target hosts.
 
     Args:
         payload: the ApplyPayload containing the gathered data for the apply operation, including fleet configuration and sudo password.
+        wait_for_connections: if False, returns right after starting the connections, which keep going in the background
+            through payload.connections (see ConnectionManager).
 
     Returns:
         - ResultPayload indicating the success or failure of the pyinfra setup process, with any error messages in the error field.
             Additionally, if successful, the ResultPayload.data field will contain the initialized pyinfra State object that is ready
-            for executing plans.
+            for executing plans. Unreachable hosts are listed in the message field when waiting for connections.
+            Hosts a running `chaos agent` could not attach show up as warnings in the error field of a successful result.
     """
 
     import logging
-    import time
 
     from pyinfra.api.config import Config
-    from pyinfra.api.connect import connect_all
     from pyinfra.api.state import State, StateStage
     from pyinfra.context import ctx_state
 
-    from .telemetry import ChaosTelemetry
+    from .telemetry import ChaosTelemetry, EventSink
 
     try:
         inventory, _, parallels = _setup_hosts(payload)
 
+        auto_parallelism = parallels == "auto"
+        if auto_parallelism:
+            from .parallelism import AUTO_START_WORKERS, max_auto_workers
+
+            max_workers = max_auto_workers(len(inventory))
+            parallels = min(AUTO_START_WORKERS, max_workers)
+
         config = Config(
             PARALLEL=parallels,
             DIFF=payload.logbook,
@@ -618,8 +1714,6 @@ def setup_pyinfra(payload: ApplyPayload) -> ResultPayload[State | None]:
         state = State(inventory, config)
         state.current_stage = StateStage.Prepare
 
-        start_time = time.time()
-
         if payload.logbook:
             limani_result = _resolve_limani(payload.global_config, payload)
             if not limani_result.success:
@@ -642,10 +1736,16 @@ def setup_pyinfra(payload: ApplyPayload) -> ResultPayload[State | None]:
 
             state.add_callback_handler(ChaosTelemetry())
             pyinfra_logger = logging.getLogger("pyinfra")
-            pyinfra_logger.setLevel(logging.DEBUG)
+            if not ChaosTelemetry.install_capture():
+                # No hooks, facts and commands have to be parsed out of pyinfra's DEBUG logs.
+                pyinfra_logger.setLevel(logging.DEBUG)
+            elif pyinfra_logger.getEffectiveLevel() > logging.INFO:
+                # Diffs are still read from its INFO logs.
+                pyinfra_logger.setLevel(logging.INFO)
             handler = ChaosTelemetry.PyinfraFactLogHandler()
             pyinfra_logger.addHandler(handler)
-            ChaosTelemetry.start_run()
+            ChaosTelemetry.set_event_sink(EventSink.from_config(payload.global_config))
+            ChaosTelemetry.start_run([host.name for host in inventory])
 
         ctx_state.set(state)
 
@@ -653,16 +1753,42 @@ def setup_pyinfra(payload: ApplyPayload) -> ResultPayload[State | None]:
         state.config.SU_PASSWORD = password
         state.config.SUDO_PASSWORD = password
 
-        connect_all(state)
+        # A running `chaos agent` already holds ssh masters for (some of) these hosts,
+        # hosts it couldn't attach keep pyinfra's ssh connector, so failures are just warnings.
+        from .agent import attach_agent_connections
 
-        end_time = time.time()
-        setup_duration = end_time - start_time
+        agent_result = attach_agent_connections(state)
 
-        if payload.logbook:
-            ChaosTelemetry.record_setup_phase(state, setup_duration)
-            _collect_fleet_health(state, stage="pre_operations")
+        payload.tuner = None
+        if auto_parallelism:
+            from .parallelism import ParallelismTuner
 
-        return ResultPayload(success=True, message=[], error=[], data=state)
+            payload.tuner = ParallelismTuner(
+                state, max_workers=max_workers, telemetry=payload.logbook
+            )
+            payload.tuner.install()
+
+        payload.connections = ConnectionManager(
+            state,
+            max_concurrent=payload.tuner.max_workers if payload.tuner else None,
+            deadline=payload.connect_deadline,
+            telemetry=payload.logbook,
+            tuner=payload.tuner,
+        )
+        payload.connections.start()
+
+        if not wait_for_connections:
+            return ResultPayload(
+                success=True, message=[], error=agent_result.error, data=state
+            )
+
+        connect_result = payload.connections.join()
+        return ResultPayload(
+            success=connect_result.success,
+            message=connect_result.message,
+            error=agent_result.error + connect_result.error,
+            data=state,
+        )
     except Exception as e:
         return ResultPayload(
             success=False,
@@ -689,11 +1815,16 @@ def teardown_pyinfra(
     from pyinfra.api.connect import disconnect_all
 
     try:
+        if payload.connections:
+            payload.connections.close()
+
         if payload.logbook:
             from .telemetry import ChaosTelemetry
 
             if payload.export_logs:
-                ChaosTelemetry.export_report()
+                ChaosTelemetry.export_report(
+                    compression=payload.global_config.get("logbook_compression")
+                )
             if payload.pyinfra_state:
                 _collect_fleet_health(payload.pyinfra_state, stage="post_operations")
             ChaosTelemetry.end_run(run_status)
@@ -709,6 +1840,125 @@ def teardown_pyinfra(
         )
 
 
+class RestrictionIndex:
+    """The fleet restrictions, compiled once into a per-host bitset of allowed roles.
+
+    Attributes:
+        conflicts (dict[str, list[str]]): The conflict errors found while compiling, keyed by host name.
+
+    Notes:
+        Hosts that aren't mentioned in the restrictions can run every role, and aren't stored at all.
+            Conflicting roles are left out of their host's allowed roles.
+
+        Roles that weren't compiled in fall back to resolving the raw restrictions, so the index
+            can still answer for them.
+    """
+
+    __slots__ = ("conflicts", "_bits", "_masks", "_black_list", "_allow_list")
+
+    def __init__(
+        self,
+        role_names: list[str],
+        restrictions: dict[str, dict[str, dict[str, bool]]],
+    ):
+        self._black_list = restrictions.get("black_list") or {}
+        self._allow_list = restrictions.get("allow_list") or {}
+        self._bits = {name: 1 << i for i, name in enumerate(role_names)}
+        self._masks: dict[str, int] = {}
+        self.conflicts: dict[str, list[str]] = {}
+
+        for host_name in dict.fromkeys([*self._allow_list, *self._black_list]):
+            mask = 0
+            for role_name, bit in self._bits.items():
+                verdict = self._verdict(host_name, role_name)
+                if verdict is None:
+                    self.conflicts.setdefault(host_name, []).append(
+                        f"Role '{role_name}' is both blacklisted and allowlisted for host '{host_name}'. Please resolve this conflict in your configuration."
+                    )
+                elif verdict:
+                    mask |= bit
+            self._masks[host_name] = mask
+
+    @classmethod
+    def ensure(
+        cls,
+        restrictions: dict[str, dict[str, dict[str, bool]]] | RestrictionIndex,
+        role_names: list[str],
+    ) -> RestrictionIndex:
+        """Returns restrictions as-is if already compiled, compiling them for role_names otherwise."""
+        if isinstance(restrictions, RestrictionIndex):
+            return restrictions
+        return cls(role_names, restrictions or {})
+
+    def _verdict(self, host_name: str, role_name: str) -> bool | None:
+        host_black = self._black_list.get(host_name) or {}
+        host_allow = self._allow_list.get(host_name) or {}
+        in_allow = host_allow.get(role_name, False)
+        in_black = host_black.get(role_name, False)
+
+        if in_allow and in_black:
+            return None
+        if in_black:
+            return False
+        if host_name in self._black_list and not host_black and not host_allow:
+            return False
+        if host_name in self._allow_list and not in_allow:
+            return False
+        return True
+
+    def allows(self, host_name: str, role_name: str) -> bool:
+        """Returns whether a role may run on a host. Conflicting roles are never allowed."""
+        mask = self._masks.get(host_name)
+        if mask is None:
+            return True
+        bit = self._bits.get(role_name)
+        if bit is None:
+            return bool(self._verdict(host_name, role_name))
+        return bool(mask & bit)
+
+    def filter(self, host_name: str, roles: list[Role]) -> list[Role]:
+        """Returns the roles allowed on a host, in their original order."""
+        mask = self._masks.get(host_name)
+        if mask is None:
+            return roles
+        return [role for role in roles if self.allows(host_name, role.name)]
+
+
+def compile_restrictions(
+    restrictions: dict[str, dict[str, dict[str, bool]]] | RestrictionIndex,
+    role_names: list[str],
+) -> ResultPayload[RestrictionIndex]:
+    """Compiles the fleet restrictions into a RestrictionIndex for the given roles.
+
+    Args:
+        restrictions: the allow_list/black_list restrictions (see resolve_allowlist_blacklist), or an already compiled index.
+        role_names: the names of the roles being applied.
+
+    Returns:
+        - A ResultPayload with the index in the data field. It fails, listing every conflict of the whole fleet at once,
+            if any role is both allowlisted and blacklisted for a host. The index is still returned in that case.
+    """
+
+    index = RestrictionIndex.ensure(restrictions, role_names)
+    errors = [
+        error for host_errors in index.conflicts.values() for error in host_errors
+    ]
+    return ResultPayload(success=not errors, message=[], error=errors, data=index)
+
+
+def get_restrictions(
+    chobolo_config: dict[str, Any],
+) -> dict[str, dict[str, dict[str, bool]]]:
+    """Returns the restrictions of a chobolo configuration, from fleet.restrictions.
+
+    Notes:
+        A top-level "restrictions" key is still read if fleet.restrictions is missing, for older Ch-obolos.
+    """
+    fleet = chobolo_config.get("fleet") or {}
+    restrictions = fleet.get("restrictions") if isinstance(fleet, dict) else None
+    return restrictions or chobolo_config.get("restrictions") or {}
+
+
 def resolve_allowlist_blacklist(
     restrictions: dict[str, dict[str, dict[str, bool]]],
     role_name: str,
@@ -804,7 +2054,9 @@ def run_filtered_context(
     roles: list[Role],
     payload: ApplyPayload,
     chobolo_config: dict[str, Any],
-    restrictions: dict[str, dict[str, dict[str, bool]]],
+    restrictions: dict[str, dict[str, dict[str, bool]]] | RestrictionIndex,
+    batched_contexts: dict[str, ResultPayload[dict[str, Any]]] | None = None,
+    role_chobolos: dict[str, FrozenDict] | None = None,
 ) -> ResultPayload[FilteredContextResultData]:
     """
     run_context implementation integrated with resolve_allowlist_blacklist to filter out roles that should not be applied to the host
@@ -817,6 +2069,10 @@ def run_filtered_context(
         chobolo_config (dict[str, Any]): The entire chobolo configuration data, used for passing to the context method of the roles.
         restrictions (dict[str, dict[str, dict[str, bool]]]): A dictionary containing any allowlist or blacklist restrictions for
             roles and hosts, used to determine if each role should be applied to the host or if there are any conflicts in the configuration.
+        batched_contexts (dict[str, ResultPayload[dict[str, Any]]] | None): Contexts already gathered for this host by
+            run_batched_contexts, keyed by role name. Roles in here don't have run_context called again.
+        role_chobolos (dict[str, FrozenDict] | None): The per-role Ch-obolo views from build_role_chobolos.
+            If not given, every role receives the whole chobolo_config.
 
     Returns:
         ResultPayload[FilteredContextResultData]: A ResultPayload indicating the success or failure of the context gathering process for the host,
@@ -851,22 +2107,24 @@ def run_filtered_context(
     result: ResultPayload[FilteredContextResultData] = ResultPayload(
         success=True, message=[], error=[]
     )
-    for role in roles:
-        allowlist_blacklist_result = resolve_allowlist_blacklist(
-            restrictions, role.name, host
-        )
-        if allowlist_blacklist_result and not allowlist_blacklist_result.success:
-            result.error = allowlist_blacklist_result.error
-            result.success = False
-            break
-        elif (
-            allowlist_blacklist_result
-            and allowlist_blacklist_result.success
-            and allowlist_blacklist_result.message
-        ):
-            continue
 
-        context_result = run_context(payload, role, host, chobolo_config)
+    index = RestrictionIndex.ensure(restrictions, [role.name for role in roles])
+    if host.name in index.conflicts:
+        result.error = list(index.conflicts[host.name])
+        result.success = False
+        result.data = host_data
+        return result
+
+    for role in index.filter(host.name, roles):
+        if batched_contexts and role.name in batched_contexts:
+            context_result = batched_contexts[role.name]
+        else:
+            context_result = run_context(
+                payload,
+                role,
+                host,
+                (role_chobolos or {}).get(role.name, chobolo_config),
+            )
         if not context_result.success:
             result.error.extend(context_result.error)
             continue
@@ -885,6 +2143,448 @@ def run_filtered_context(
     return result
 
 
+def run_host_deltas(
+    host: Host,
+    roles: list[Role],
+    payload: ApplyPayload,
+    chobolo_config: dict[str, Any],
+    restrictions: dict[str, dict[str, dict[str, bool]]] | RestrictionIndex,
+    batched_contexts: dict[str, ResultPayload[dict[str, Any]]] | None = None,
+    cached_deltas: dict[str, Delta] | None = None,
+    role_chobolos: dict[str, FrozenDict] | None = None,
+) -> ResultPayload[HostDeltaResultData]:
+    """Runs the context and delta stages of every applicable role for a single host.
+
+    Args:
+        host: the Host object representing the target host.
+        roles: the list of loaded roles, in the order they should be applied.
+        payload: the ApplyPayload containing the initial data and flags for the apply operation.
+        chobolo_config: the entire chobolo configuration data, passed to the roles' context methods.
+        restrictions: the allow_list/black_list restrictions, see resolve_allowlist_blacklist.
+        batched_contexts: the contexts already gathered for this host by run_batched_contexts, keyed by role name.
+        cached_deltas: deltas loaded from the delta cache for this host, keyed by role name.
+            These roles skip both get_context and delta.
+        role_chobolos: the per-role Ch-obolo views from build_role_chobolos.
+
+    Returns:
+        ResultPayload[HostDeltaResultData]: The per-role delta results for the host, in role order.
+            The ResultPayload fails if the context gathering for the host failed.
+    """
+
+    cached_deltas = cached_deltas or {}
+    context_result = run_filtered_context(
+        host,
+        [role for role in roles if role.name not in cached_deltas],
+        payload,
+        chobolo_config,
+        restrictions,
+        batched_contexts,
+        role_chobolos,
+    )
+    if not context_result.success or not context_result.data:
+        return ResultPayload(
+            success=False,
+            message=context_result.message,
+            error=context_result.error
+            or [f"No data returned from context gathering on host '{host.name}'."],
+            data={"host": host, "deltas": []},
+        )
+
+    contexts = context_result.data["roles"]
+    deltas: list[HostRoleDelta] = []
+    for role in roles:
+        if role.name in cached_deltas:
+            deltas.append(
+                {
+                    "role": role,
+                    "role_name": role.name,
+                    "result": ResultPayload(
+                        success=True,
+                        message=[],
+                        error=[],
+                        data=cached_deltas[role.name],
+                    ),
+                    "cached": True,
+                }
+            )
+            continue
+        if role.name not in contexts:
+            continue
+
+        delta_result = run_delta(contexts[role.name]["context"], role, role.name)
+        if delta_result.success and delta_result.data is None:
+            delta_result = ResultPayload(
+                success=False,
+                error=[
+                    f"No delta data returned for role {role.name} on host {host.name}."
+                ],
+            )
+        deltas.append(
+            {
+                "role": role,
+                "role_name": role.name,
+                "result": delta_result,
+                "cached": False,
+            }
+        )
+
+    return ResultPayload(
+        success=True,
+        message=[],
+        error=context_result.error,
+        data={"host": host, "deltas": deltas},
+    )
+
+
+def run_host_plans(
+    payload: ApplyPayload, host_deltas: HostDeltaResultData
+) -> ResultPayload[HostPlanResultData]:
+    """Runs the plan stage for every role of a host whose delta has changes to apply.
+
+    Args:
+        payload: the ApplyPayload containing the pyinfra state.
+        host_deltas: the data returned by run_host_deltas for the host.
+
+    Returns:
+        ResultPayload[HostPlanResultData]: The per-role plan results for the host, in role order.
+            The ResultPayload fails if any of the plans failed.
+
+    Notes:
+        Roles of a single host are planned sequentially, since pyinfra orders operations per host
+        in the order they were added.
+    """
+
+    host = host_deltas["host"]
+    plans: list[HostRolePlan] = []
+    success = True
+    for entry in host_deltas["deltas"]:
+        delta = entry["result"].data
+        if not entry["result"].success or not delta:
+            continue
+        if not (delta.to_add or delta.to_remove):
+            continue
+
+        plan_result = run_plan(payload, delta, entry["role"], entry["role_name"], host)
+        success = success and plan_result.success
+        plans.append(
+            {
+                "role": entry["role"],
+                "role_name": entry["role_name"],
+                "result": plan_result,
+            }
+        )
+
+    return ResultPayload(
+        success=success, message=[], error=[], data={"host": host, "plans": plans}
+    )
+
+
+class ApplyPipeline:
+    """Streaming per-host apply engine.
+
+    Each host runs its whole context -> delta -> plan chain inside of its own greenlet, doing the work of each
+        stage in the pyinfra pool (so PARALLEL still bounds it), and reports each stage back through a queue
+        as soon as it finishes.
+
+    Usage:
+        ```python
+        pipeline = ApplyPipeline(payload, roles, hosts, chobolo_config, restrictions)
+        pipeline.start()
+        try:
+            for host_result in pipeline.iter_deltas():
+                ...  # render the deltas
+            pipeline.release(approved=True)  # confirmation gate, no plan runs before this
+            for host_result in pipeline.iter_plans():
+                ...
+        finally:
+            pipeline.close()
+        ```
+
+    Notes:
+        Results are yielded in host order (and role order inside a host), regardless of which host finished first.
+            Hosts that finish early are buffered until every host before them has been yielded.
+
+        release() may be called before iter_deltas() to skip the gate, in which case every host plans right after
+            computing its own deltas.
+
+        If the pyinfra state has no pool, every stage runs sequentially on the calling thread.
+
+        If payload.connections is set (see setup_pyinfra's wait_for_connections), each host waits for its own
+            connection only, and unreachable hosts are left out of the results.
+    """
+
+    def __init__(
+        self,
+        payload: ApplyPayload,
+        roles: list[Role],
+        hosts: list[Host],
+        chobolo_config: dict[str, Any],
+        restrictions: dict[str, dict[str, dict[str, bool]]] | RestrictionIndex,
+    ):
+        from gevent.event import AsyncResult
+        from gevent.queue import Queue
+
+        self.payload = payload
+        self.roles = roles
+        self.hosts = hosts
+        self.chobolo_config = chobolo_config
+        self.restrictions = RestrictionIndex.ensure(
+            restrictions, [role.name for role in roles]
+        )
+
+        self._events: Queue = Queue()
+        self._gate: AsyncResult = AsyncResult()
+        self._greenlets: list[Any] = []
+        self._delta_results: list[ResultPayload[HostDeltaResultData]] = []
+        self._pending: dict[str, dict[int, ResultPayload[Any] | None]] = {
+            "delta": {},
+            "plan": {},
+        }
+        self._batched_contexts: dict[str, dict[str, ResultPayload[dict[str, Any]]]] = {}
+        self._cache_keys: dict[str, dict[str, str]] = {}
+        self._cached_deltas: dict[str, dict[str, Delta]] = {}
+        self._role_chobolos: dict[str, FrozenDict] = build_role_chobolos(
+            roles, chobolo_config
+        )
+
+    def start(self) -> None:
+        """Runs the fleet-wide batched contexts, then spawns one pipeline greenlet per host in the pyinfra pool.
+
+        Notes:
+            The fleet-wide stages (delta cache and batched contexts) need every connection to be settled first,
+                without them, each host starts as soon as its own connection is up.
+        """
+        use_cache = self.payload.trust_cache or self.payload.refresh_cache
+        fleet_hosts = self.hosts
+        if use_cache or any(has_batch_context(role) for role in self.roles):
+            fleet_hosts = [host for host in self.hosts if self._connected(host)]
+
+        if use_cache:
+            self._load_delta_cache(fleet_hosts)
+
+        self._batched_contexts = run_batched_contexts(
+            self.payload,
+            self.roles,
+            fleet_hosts,
+            self.chobolo_config,
+            self.restrictions,
+            skip={
+                host_name: set(deltas)
+                for host_name, deltas in self._cached_deltas.items()
+            },
+            role_chobolos=self._role_chobolos,
+        )
+
+        state = self.payload.pyinfra_state
+        if state is None or state.pool is None:
+            return
+
+        import gevent
+
+        self._greenlets = [
+            gevent.spawn(self._run_host_pipeline, index, host)
+            for index, host in enumerate(self.hosts)
+        ]
+
+    def release(self, approved: bool) -> None:
+        """Opens the confirmation gate, letting hosts run their plans (or stop, if not approved)."""
+        if not self._gate.ready():
+            self._gate.set(approved)
+
+    def iter_deltas(self) -> Iterator[ResultPayload[HostDeltaResultData]]:
+        """Yields the delta results of every host, in host order, as they become available."""
+        if not self._greenlets:
+            for host in self.hosts:
+                if not self._connected(host):
+                    continue
+                result = self._safe_host_deltas(host)
+                self._delta_results.append(result)
+                yield result
+            return
+
+        yield from self._iter_stage("delta")
+
+    def iter_plans(self) -> Iterator[ResultPayload[HostPlanResultData]]:
+        """Yields the plan results of every host, in host order, as they become available.
+
+        Notes:
+            Must only be called after iter_deltas() was exhausted and release() was called.
+        """
+        if not self._gate.ready() or not self._gate.get():
+            return
+
+        if not self._greenlets:
+            for delta_result in self._delta_results:
+                if delta_result.success and delta_result.data:
+                    yield self._safe_host_plans(delta_result.data)
+            return
+
+        yield from self._iter_stage("plan")
+
+    def close(self) -> None:
+        """Denies the gate if it was never opened and waits for every host greenlet to finish.
+
+        Notes:
+            Should be used inside of a finally block, so no greenlet is left hogging the pyinfra pool.
+        """
+        import gevent
+
+        self.release(False)
+        if self._greenlets:
+            gevent.joinall(self._greenlets)
+
+    def _iter_stage(
+        self, stage: Literal["delta", "plan"]
+    ) -> Iterator[ResultPayload[Any]]:
+        pending = self._pending[stage]
+        next_index = 0
+        while next_index < len(self.hosts):
+            while next_index not in pending:
+                event_stage, index, result = self._events.get()
+                self._pending[event_stage][index] = result
+
+            result = pending.pop(next_index)
+            next_index += 1
+            if result is not None:
+                yield result
+
+    def _connected(self, host: Host) -> bool:
+        connections = self.payload.connections
+        return connections.wait(host) if connections else True
+
+    def _run_host_pipeline(self, index: int, host: Host) -> None:
+        """Runs one host through the pipeline, taking a pool slot only while there is actual work to do.
+
+        Waiting for the connection or for the gate happens outside of the pool, otherwise a fleet bigger than the
+            pool would have every slot held by hosts waiting on a gate that only opens once every host is done.
+        """
+        pool = self.payload.pyinfra_state.pool
+
+        delta_result = None
+        if self._connected(host):
+            delta_result = pool.spawn(self._timed_host_deltas, host).get()
+        self._events.put(("delta", index, delta_result))
+
+        if not self._gate.get():
+            return
+
+        plan_result = None
+        if delta_result and delta_result.success and delta_result.data:
+            plan_result = pool.spawn(self._safe_host_plans, delta_result.data).get()
+        self._events.put(("plan", index, plan_result))
+
+    def _timed_host_deltas(self, host: Host) -> ResultPayload[HostDeltaResultData]:
+        """_safe_host_deltas, reporting how long the host took to the parallelism tuner (if any)."""
+        import time
+
+        started = time.perf_counter()
+        result = self._safe_host_deltas(host)
+        tuner = getattr(self.payload, "tuner", None)
+        if tuner is not None:
+            tuner.observe_latency(time.perf_counter() - started)
+        return result
+
+    def _load_delta_cache(self, hosts: list[Host]) -> None:
+        """Computes the delta cache key of every (host, role) pair and loads the matching cached deltas.
+
+        Notes:
+            With --refresh-cache the keys are still computed, so fresh deltas get stored, but nothing is loaded.
+        """
+        state = self.payload.pyinfra_state
+        if state is None:
+            return
+
+        fingerprints = fetch_host_fingerprints(state, hosts)
+        chobolo_hashes = {
+            role.name: chobolo_digest(self._role_chobolos[role.name])
+            for role in self.roles
+        }
+        # Roles whose secrets can't be resolved aren't cached, their deltas fail with the reason anyway.
+        secrets_hashes = {}
+        for role in self.roles:
+            secrets_result = _resolve_role_secrets(role, self.payload)
+            if secrets_result.success:
+                secrets_hashes[role.name] = secrets_digest(secrets_result.data or {})
+        for host in hosts:
+            fingerprint = fingerprints.get(host.name)
+            if not fingerprint:
+                continue
+
+            for role in self.roles:
+                if not self.restrictions.allows(host.name, role.name):
+                    continue
+                if role.name not in secrets_hashes:
+                    continue
+
+                key = delta_cache_key(
+                    role,
+                    host.name,
+                    chobolo_hashes[role.name],
+                    fingerprint,
+                    secrets_hashes[role.name],
+                )
+                self._cache_keys.setdefault(host.name, {})[role.name] = key
+                if self.payload.refresh_cache:
+                    continue
+
+                delta = load_cached_delta(role, host.name, key)
+                if delta is not None:
+                    self._cached_deltas.setdefault(host.name, {})[role.name] = delta
+
+    def _store_delta_cache(self, result: ResultPayload[HostDeltaResultData]) -> None:
+        if not result.data:
+            return
+
+        host_name = result.data["host"].name
+        keys = self._cache_keys.get(host_name, {})
+        for entry in result.data["deltas"]:
+            key = keys.get(entry["role_name"])
+            delta = entry["result"].data
+            if entry["cached"] or not key or not entry["result"].success or not delta:
+                continue
+            try:
+                store_cached_delta(entry["role"], host_name, key, delta)
+            except OSError:
+                continue
+
+    def _safe_host_deltas(self, host: Host) -> ResultPayload[HostDeltaResultData]:
+        try:
+            result = run_host_deltas(
+                host,
+                self.roles,
+                self.payload,
+                self.chobolo_config,
+                self.restrictions,
+                self._batched_contexts.get(host.name),
+                self._cached_deltas.get(host.name),
+                self._role_chobolos,
+            )
+        except Exception as e:
+            return ResultPayload(
+                success=False,
+                error=[f"Error computing deltas on host '{host.name}': {str(e)}"],
+                data={"host": host, "deltas": []},
+            )
+
+        if self._cache_keys:
+            self._store_delta_cache(result)
+        return result
+
+    def _safe_host_plans(
+        self, host_deltas: HostDeltaResultData
+    ) -> ResultPayload[HostPlanResultData]:
+        try:
+            return run_host_plans(self.payload, host_deltas)
+        except Exception as e:
+            return ResultPayload(
+                success=False,
+                error=[
+                    f"Error computing plans on host '{host_deltas['host'].name}': {str(e)}"
+                ],
+                data={"host": host_deltas["host"], "plans": []},
+            )
+
+
 def get_configs(
     payload: ApplyPayload,
 ) -> tuple[DictConfig, ResultPayload[GetConfigsResultData | None]]:
@@ -979,7 +2679,7 @@ def _collect_fleet_health(
     state: State, stage: Literal["pre_operations", "post_operations"]
 ) -> None:
     """
-    Asyncronously collects RAM and Load Average facts from all hosts in the fleet and records them in the telemetry system.
+    Asyncronously collects a HostResources fact (RAM, load and CPU counters) from all hosts in the fleet and records them in the telemetry system.
 
     if state.pool is available, it uses it to parallelize fact collection across hosts.
     Otherwise, it falls back to sequential collection.
@@ -987,21 +2687,42 @@ def _collect_fleet_health(
         state (State): The current pyinfra state containing the inventory and connection pool.
         stage (str): The stage of the operation (e.g., "pre_operations", "post_operations") for telemetry recording.
     """
-    from .facts.facts import LoadAverage, RamUsage
-    from .telemetry import ChaosTelemetry
 
     def _fetch_and_record(host: Host) -> None:
-        ram_data: dict[str, float] = host.get_fact(RamUsage)
-        load_data: tuple[float, float, float] = host.get_fact(LoadAverage)
-        ChaosTelemetry.record_snapshot(host, ram_data, load_data, stage=stage)
+        _collect_host_health(host, stage)
 
-    if state.pool:
+    if state.pool is not None:
         _ = state.pool.map(_fetch_and_record, state.inventory.iter_activated_hosts())
     else:
         for host in state.inventory.iter_activated_hosts():
             _fetch_and_record(host)
 
 
+def _collect_host_health(
+    host: Host,
+    stage: Literal["pre_operations", "post_operations", "checkpoint"],
+    tuner: ParallelismTuner | None = None,
+) -> None:
+    """Collects the RAM, load average and CPU counters of a single host (one HostResources fact, so one command)
+    and records them in the telemetry system.
+
+    If a tuner is given, the snapshot (plus the CPU count of the host, to make sense of the load) is fed to it too.
+    """
+    from .facts.facts import HostResources
+    from .telemetry import ChaosTelemetry
+
+    resources: dict[str, Any] = host.get_fact(HostResources) or {}
+    ram_data: dict[str, float] = resources.get("ram", {})
+    load_data: list[float] = resources.get("load", [])
+    cpu_data: dict[str, int] = resources.get("cpu", {})
+    ChaosTelemetry.record_snapshot(
+        host, ram_data, load_data, stage=stage, cpu_data=cpu_data
+    )
+
+    if tuner is not None:
+        tuner.observe_health(host, ram_data, load_data, cpus=cpu_data.get("cpus", 1))
+
+
 def _resolve_limani(
     global_config: dict[str, Any], payload: ApplyPayload
 ) -> ResultPayload[str]:
@@ -1146,7 +2867,7 @@ def _handle_boats(
 
 def _setup_hosts(
     payload: ApplyPayload,
-) -> tuple[Inventory, list[tuple[str, dict[str, Any]]], int]:
+) -> tuple[Inventory, list[tuple[str, dict[str, Any]]], int | Literal["auto"]]:
     """Sets up the inventory of hosts for pyinfra based on the fleet configuration gathered from the chobolo file,
          and determines the parallelism settings for executing plans on the fleet.
 
@@ -1157,7 +2878,7 @@ def _setup_hosts(
     Returns:
         - An inventory object compatible with pyinfra, constructed based on the target hosts specified in the payload.
         - A list of tuples representing the target hosts and their associated data, extracted from the payload
-        - An integer representing the parallelism settings for executing plans on the fleet, extracted from the payload.
+        - The parallelism settings for executing plans on the fleet (an integer, or "auto"), extracted from the payload.
     """
 
     from pyinfra.api.inventory import Inventory  # type: ignore
@@ -1238,7 +2959,7 @@ def _handle_secrets_for_role(
             _get_secret_strings(decrypted_secrets) if decrypted_secrets else set()
         )
 
-        ChaosTelemetry._secret_strings = secret_strings
+        ChaosTelemetry.set_secret_strings(secret_strings)
 
     if role.needs_secrets and payload.secrets:
         if not decrypted_secrets:
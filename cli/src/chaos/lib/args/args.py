@@ -186,6 +186,8 @@ def argParsing():
         $ {GOLD}chaos{RESET} {PURP}check{RESET} {PURP}explanations{RESET}
         $ {GOLD}chaos{RESET} {PURP}set{RESET} {PURP}(ch|sec|sop){RESET} /path/to/file
         $ {GOLD}chaos{RESET} {PURP}init{RESET} {PURP}secrets{RESET}
+        $ {GOLD}chaos{RESET} {PURP}agent{RESET} {PURP}(start|stop|status){RESET}
+        $ {GOLD}chaos{RESET} {PURP}logbook{RESET} {PURP}(prune|compact|stats|serve){RESET}
 """
     parser = ChaosParser(
         description="Ch-aOS system management CLI.",
@@ -345,6 +347,35 @@ def argParsing():
         formatter_class=argparse.RawDescriptionHelpFormatter,
     )
 
+    agent_usage = f"""{GOLD}chaos{RESET} {PURP}agent{RESET} {PURP}<subcommand>{RESET} {GRAY}[options]{RESET}
+        $ {GOLD}chaos{RESET} {PURP}agent{RESET} {PURP}start{RESET} {GRAY}--idle-timeout 900 --max-connections 32{RESET}
+        $ {GOLD}chaos{RESET} {PURP}agent{RESET} {PURP}status{RESET} {GRAY}-j{RESET}
+        $ {GOLD}chaos{RESET} {PURP}agent{RESET} {PURP}stop{RESET}
+"""
+    agentParser = subParser.add_parser(
+        "agent",
+        help="Keep SSH connections open between applies.",
+        description="Keep SSH connections open between applies.",
+        usage=agent_usage,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+
+    logbook_usage = f"""{GOLD}chaos{RESET} {PURP}logbook{RESET} {PURP}<subcommand>{RESET} {GRAY}[options]{RESET}
+        $ {GOLD}chaos{RESET} {PURP}logbook{RESET} {PURP}prune{RESET} {GRAY}--older-than 90d --keep 200 --archive{RESET}
+        $ {GOLD}chaos{RESET} {PURP}logbook{RESET} {PURP}prune{RESET} {GRAY}--keep 50 --dry-run{RESET}
+        $ {GOLD}chaos{RESET} {PURP}logbook{RESET} {PURP}compact{RESET} {GRAY}--full{RESET}
+        $ {GOLD}chaos{RESET} {PURP}logbook{RESET} {PURP}stats{RESET} {GRAY}--runs 30 -n apt.packages -g host -p 95{RESET}
+        $ {GOLD}chaos{RESET} {PURP}logbook{RESET} {PURP}stats{RESET} {GRAY}--since 7d -g host --compare --top 10{RESET}
+        $ {GOLD}chaos{RESET} {PURP}logbook{RESET} {PURP}serve{RESET}
+"""
+    logbookParser = subParser.add_parser(
+        "logbook",
+        help="Prune, compact, query and serve the logbook's stored runs.",
+        description="Prune, compact, query and serve the logbook's stored runs.",
+        usage=logbook_usage,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+
     if "_ARGCOMPLETE" in os.environ:
         import argcomplete
 
@@ -358,6 +389,8 @@ def argParsing():
         addSetParsers(setParser)
         addRambleParsers(rambleParser)
         addInitParsers(initParser)
+        addAgentParsers(agentParser)
+        addLogbookParsers(logbookParser)
 
         argcomplete.autocomplete(parser)
 
@@ -384,6 +417,10 @@ def argParsing():
                 addRambleParsers(rambleParser)
             case "init":
                 addInitParsers(initParser)
+            case "agent":
+                addAgentParsers(agentParser)
+            case "logbook":
+                addLogbookParsers(logbookParser)
 
     return parser
 
@@ -1031,6 +1068,29 @@ def addApplyParsers(applyParser):
         action="store_true",
         help="Run all ops in parallel all servers at once.",
     )
+    exec_opts.add_argument(
+        "--trust-cache",
+        action="store_true",
+        help="Skip roles whose cached delta is still valid for the host (no-op deltas only).",
+    )
+    exec_opts.add_argument(
+        "--refresh-cache",
+        action="store_true",
+        help="Ignore the delta cache and store freshly computed deltas.",
+    )
+    exec_opts.add_argument(
+        "-L",
+        "--limit",
+        action="append",
+        default=[],
+        help="Only target matching hosts: a glob on host names, 'key.path=value' on host data, '!' to exclude. Comma separated, repeatable.",
+    )
+    exec_opts.add_argument(
+        "--connect-deadline",
+        type=float,
+        metavar="SECONDS",
+        help="Skip hosts that are still not connected this many seconds into the run, instead of waiting for them. Caps each SSH connect's timeouts at the time left (and drops its retries).",
+    )
     exec_opts.add_argument(
         "-ikwid",
         "-y",
@@ -1297,6 +1357,190 @@ def addStyxParsers(styxParser):
     )
 
 
+def addAgentParsers(agentParser):
+    agentSubParser = agentParser.add_subparsers(
+        dest="agent_command",
+        help="Agent subcommands",
+        required=True,
+        parser_class=ChaosParser,
+    )
+
+    agentStart = agentSubParser.add_parser(
+        "start", help="Start the agent in the background."
+    )
+    as_opts = agentStart.add_argument_group("Agent Options")
+    as_opts.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=600.0,
+        metavar="SECONDS",
+        help="Close connections that went unused for this long (default: 600).",
+    )
+    as_opts.add_argument(
+        "--max-connections",
+        type=int,
+        default=64,
+        help="Maximum number of connections kept open, least recently used ones are closed first (default: 64).",
+    )
+    as_opts.add_argument(
+        "--foreground",
+        action="store_true",
+        help="Run the agent in this terminal instead of detaching it.",
+    )
+
+    agentSubParser.add_parser("stop", help="Stop the agent and close its connections.")
+
+    agentStatus = agentSubParser.add_parser(
+        "status", help="Show the agent and its open connections."
+    )
+    ast_out = agentStatus.add_argument_group("Output Options")
+    ast_out.add_argument(
+        "-j",
+        "--json",
+        action="store_true",
+        help="Output in JSON format.",
+        default=False,
+    )
+
+
+def addLogbookParsers(logbookParser):
+    logbookSubParser = logbookParser.add_subparsers(
+        dest="logbook_command",
+        help="Logbook subcommands",
+        required=True,
+        parser_class=ChaosParser,
+    )
+
+    logbookPrune = logbookSubParser.add_parser(
+        "prune", help="Delete (and optionally archive) runs out of the retention."
+    )
+    lp_opts = logbookPrune.add_argument_group("Retention Options")
+    lp_opts.add_argument(
+        "--older-than",
+        metavar="AGE",
+        help="Prune runs that started longer ago than this, like 90d, 12h or 2w (a bare number is days).",
+    )
+    lp_opts.add_argument(
+        "--keep",
+        type=int,
+        metavar="N",
+        help="Prune everything but the newest N runs.",
+    )
+    lp_opts.add_argument(
+        "--archive",
+        action="store_true",
+        help="Write each pruned run to a compressed archive first, it stays readable by the Limani.",
+    )
+    lp_opts.add_argument(
+        "--vacuum",
+        choices=["incremental", "full", "none"],
+        default="incremental",
+        help="How to compact the Limani afterwards (default: incremental).",
+    )
+    lp_opts.add_argument(
+        "-d",
+        "--dry-run",
+        action="store_true",
+        help="Only show what would be pruned.",
+    )
+
+    logbookCompact = logbookSubParser.add_parser(
+        "compact", help="Give the space of deleted runs back to the system."
+    )
+    lc_opts = logbookCompact.add_argument_group("Compaction Options")
+    lc_opts.add_argument(
+        "--full",
+        action="store_true",
+        help="Rewrite the whole database (VACUUM) instead of freeing pages incrementally.",
+    )
+
+    logbookStats = logbookSubParser.add_parser(
+        "stats", help="Operation stats across runs, grouped and with percentiles."
+    )
+    ls_window = logbookStats.add_argument_group("Window Options")
+    ls_window.add_argument(
+        "--since",
+        metavar="AGE",
+        help="Start of the time window, like 30d or 2w (default: 30d). Windows are whole UTC days.",
+    )
+    ls_window.add_argument(
+        "--until",
+        metavar="AGE",
+        help="End of the time window, like 7d (default: now).",
+    )
+    ls_window.add_argument(
+        "--runs",
+        type=int,
+        metavar="N",
+        help="Use the last N finished runs as the window instead.",
+    )
+    ls_window.add_argument(
+        "--compare",
+        action="store_true",
+        help="Compare against the window right before this one, slowest regressions first.",
+    )
+    ls_query = logbookStats.add_argument_group("Query Options")
+    ls_query.add_argument(
+        "-n",
+        "--name",
+        dest="names",
+        action="append",
+        metavar="OPERATION",
+        help="Only this operation name (repeatable).",
+    )
+    ls_query.add_argument(
+        "--host",
+        dest="hosts",
+        action="append",
+        metavar="HOST",
+        help="Only this host (repeatable).",
+    )
+    ls_query.add_argument(
+        "-g",
+        "--group-by",
+        default="name",
+        help="Comma separated keys to group by: name, host, day and/or run (run needs --runs). Default: name.",
+    )
+    ls_query.add_argument(
+        "-p",
+        "--percentiles",
+        default="50,95,99",
+        help="Comma separated duration percentiles to compute, or 'none' (default: 50,95,99).",
+    )
+    ls_query.add_argument(
+        "--top",
+        type=int,
+        metavar="N",
+        help="Only show the first N rows.",
+    )
+
+    logbookServe = logbookSubParser.add_parser(
+        "serve",
+        help="Run the logbook daemon, so many chaos processes can write to Ch-rima at once (limani: chrima-remote).",
+    )
+    lsv_opts = logbookServe.add_argument_group("Daemon Options")
+    lsv_opts.add_argument(
+        "--socket",
+        metavar="PATH",
+        help="The unix socket to listen on (default: chrima_socket in your config, or next to the database).",
+    )
+
+    for sub in (logbookPrune, logbookCompact, logbookStats):
+        l_out = sub.add_argument_group("Output Options")
+        l_out.add_argument(
+            "-i",
+            "--limani",
+            help="The Limani to work on (default: the one in your config, or chrima).",
+        )
+        l_out.add_argument(
+            "-j",
+            "--json",
+            action="store_true",
+            help="Output in JSON format.",
+            default=False,
+        )
+
+
 def handleGenerateTab():
     subprocess.run(["register-python-argcomplete", "chaos"])
 
@@ -0,0 +1,69 @@
+import sys
+
+
+def handleAgent(args):
+    from rich.console import Console
+
+    from chaos.lib.agent import handle_agent
+    from chaos.lib.args.dataclasses import AgentPayload, ResultPayload
+
+    console = Console()
+
+    payload = AgentPayload(
+        agent_command=args.agent_command,
+        idle_timeout=getattr(args, "idle_timeout", 600.0),
+        max_connections=getattr(args, "max_connections", 64),
+        foreground=getattr(args, "foreground", False),
+        json=getattr(args, "json", False),
+    )
+
+    result: ResultPayload = handle_agent(payload)
+
+    for msg in result.message:
+        console.print(f"[green]{msg}[/]")
+
+    for err in result.error:
+        console.print(f"[bold red]ERROR:[/] {err}")
+
+    if not result.success:
+        sys.exit(1)
+
+    if payload.agent_command != "status" or not result.data:
+        return
+
+    status = result.data
+    if payload.json:
+        import json
+
+        print(json.dumps(status, indent=2))
+        return
+
+    from rich.table import Table
+
+    console.print(
+        f"[bold blue]INFO:[/] agent pid {status['pid']}, up {status['uptime']}s, "
+        f"{len(status['connections'])}/{status['max_connections']} connections, "
+        f"idle timeout {status['idle_timeout']}s"
+    )
+
+    if not status["connections"]:
+        return
+
+    table = Table(show_lines=False)
+    table.add_column("Hosts", style="cyan")
+    table.add_column("Target")
+    table.add_column("Age (s)", justify="right")
+    table.add_column("Idle (s)", justify="right")
+    table.add_column("Alive", justify="center")
+
+    for conn in status["connections"]:
+        user = f"{conn['user']}@" if conn["user"] else ""
+        table.add_row(
+            ", ".join(conn["hosts"]),
+            f"{user}{conn['hostname']}:{conn['port']}",
+            str(conn["age"]),
+            str(conn["idle"]),
+            "[green]yes[/]" if conn["alive"] else "[red]no[/]",
+        )
+
+    console.print(table)
@@ -14,14 +14,15 @@ def handleApply(args):  # noqa: C901
     console = Console()
 
     from chaos.lib.apply import (
+        ApplyPipeline,
+        compile_restrictions,
         execute_plans,
         gather_apply,
         gather_fleet,
         get_configs,
+        get_restrictions,
         resolve_aliases,
-        run_delta,
-        run_filtered_context,
-        run_plan,
+        resolve_limit,
         setup_pyinfra,
         teardown_pyinfra,
     )
@@ -84,6 +85,10 @@ def handleApply(args):  # noqa: C901
         no_wait=getattr(args, "no_wait", False),
         export_logs=getattr(args, "export_logs", False),
         secrets_context=secrets_context,
+        trust_cache=getattr(args, "trust_cache", False),
+        refresh_cache=getattr(args, "refresh_cache", False),
+        limit=getattr(args, "limit", []),
+        connect_deadline=getattr(args, "connect_deadline", None),
     )
 
     _handle_verbose(payload)
@@ -194,10 +199,27 @@ def handleApply(args):  # noqa: C901
         payload.is_fleet_active = fleet_result.data.get("is_fleet", False)
         payload.parallelism = fleet_result.data.get("parallels", 0)
 
+    if payload.limit:
+        limit_result = resolve_limit(payload)
+        _check_and_exit_on_error(limit_result, console, "host limit")
+        payload.target_hosts = limit_result.data
+
+    chobolo_config = OmegaConf.to_container(chobolo_config_oc, resolve=False)
+    chobolo_config = cast(dict[str, Any], chobolo_config)
+
+    restrictions_result = compile_restrictions(
+        get_restrictions(chobolo_config),
+        [role.name for role in loaded_roles.values()],
+    )
+    _check_and_exit_on_error(restrictions_result, console, "fleet restrictions")
+    restrictions = restrictions_result.data or {}
+
     run_status = "success"
     try:
-        setup_result = setup_pyinfra(payload)
+        setup_result = setup_pyinfra(payload, wait_for_connections=False)
         _check_and_exit_on_error(setup_result, console, "setup pyinfra")
+        for warning in setup_result.error:
+            console.print(f"[bold yellow]WARNING:[/] {warning}")
 
         payload.pyinfra_state = setup_result.data
 
@@ -232,81 +254,68 @@ def handleApply(args):  # noqa: C901
 
             payload.decrypted_secrets = cast(dict[str, Any], raw_container)
 
-        chobolo_config = OmegaConf.to_container(chobolo_config_oc, resolve=False)
-        chobolo_config = cast(dict[str, Any], chobolo_config)
-
-        restrictions = chobolo_config.get("restrictions", {})
-
         roles = list(loaded_roles.values())
-        hosts = list(payload.pyinfra_state.inventory.iter_activated_hosts())
+        hosts = (
+            payload.connections.hosts
+            if payload.connections
+            else list(payload.pyinfra_state.inventory.iter_activated_hosts())
+        )
 
         console.print("[bold blue]INFO:[/] Collecting host contexts...")
 
-        if payload.pyinfra_state.pool:
-            from functools import partial
-
-            gathered_results = payload.pyinfra_state.pool.map(
-                partial(
-                    run_filtered_context,
-                    roles=roles,
-                    payload=payload,
-                    chobolo_config=chobolo_config,
-                    restrictions=restrictions,
-                ),
-                hosts,
-            )
-        else:
-            gathered_results = [
-                run_filtered_context(h, roles, payload, chobolo_config, restrictions)
-                for h in hosts
-            ]
-
+        needs_confirmation = not payload.i_know_what_im_doing and sys.stdin.isatty()
+        pipeline = ApplyPipeline(payload, roles, hosts, chobolo_config, restrictions)
         has_changes_to_apply = False
-        prepared_plans = []
-
-        for host_result in gathered_results:
-            if not host_result.success:
-                _print_messages(host_result, console)
-                run_status = "failure"
-                continue
-            if not host_result.data:
-                console.print(
-                    "[bold red]ERROR:[/] No data returned from host context gathering."
-                )
-                run_status = "failure"
-                continue
-            host = host_result.data["host"]
 
-            for role_name, data in host_result.data["roles"].items():
-                role = data["role"]
-                context = data["context"]
+        try:
+            pipeline.start()
+            if not needs_confirmation:
+                pipeline.release(approved=True)
 
-                delta_result = run_delta(context, role, role_name)
-                _print_messages(delta_result, console)
-                if not delta_result.success:
+            for host_result in pipeline.iter_deltas():
+                if not host_result.success:
+                    _print_messages(host_result, console)
                     run_status = "failure"
                     continue
-
-                if delta_result.data is None:
+                if not host_result.data:
                     console.print(
-                        f"[bold red]ERROR:[/] No delta data returned for role {role.name} on host {host.name}."
+                        "[bold red]ERROR:[/] No data returned from host context gathering."
                     )
                     run_status = "failure"
                     continue
+                host = host_result.data["host"]
+
+                for entry in host_result.data["deltas"]:
+                    role = entry["role"]
+                    role_name = entry["role_name"]
+                    delta_result = entry["result"]
 
-                delta: Delta = delta_result.data
-                _render_delta(delta, role_name, host.name, console)
+                    _print_messages(delta_result, console)
+                    if not delta_result.success or delta_result.data is None:
+                        run_status = "failure"
+                        continue
 
-                if delta.to_add or delta.to_remove:
-                    has_changes_to_apply = True
-                    prepared_plans.append((delta, role, role_name, host))
-                else:
+                    delta: Delta = delta_result.data
+                    _render_delta(delta, role_name, host.name, console)
+
+                    if delta.to_add or delta.to_remove:
+                        has_changes_to_apply = True
+                    elif entry["cached"]:
+                        console.print(
+                            f"[bold green]NOOP:[/] Role '{role.name}' on host '{host.name}' is unchanged since its last cached delta."
+                        )
+                    else:
+                        console.print(
+                            f"[bold green]NOOP:[/] Role '{role.name}' on host '{host.name}' is already in the desired state."
+                        )
+
+            if payload.connections:
+                for name, reason in payload.connections.unreachable.items():
                     console.print(
-                        f"[bold green]NOOP:[/] Role '{role.name}' on host '{host.name}' is already in the desired state."
+                        f"[bold yellow]WARNING:[/] Host '{name}' is unreachable, skipping it: {reason}"
                     )
 
-        if has_changes_to_apply and not payload.i_know_what_im_doing:
-            if sys.stdin.isatty():
+            if has_changes_to_apply and needs_confirmation:
                 if not prompt or not confirm:
                     from rich.prompt import Confirm, Prompt
 
@@ -320,11 +329,17 @@ def handleApply(args):  # noqa: C901
                     console.print("[bold red]Aborting apply due to user response.[/]")
                     sys.exit(1)
 
-        for delta, role, role_name, host in prepared_plans:
-            plan_result = run_plan(payload, delta, role, role_name, host)
-            _print_messages(plan_result, console)
-            if not plan_result.success:
-                run_status = "failure"
+            pipeline.release(approved=True)
+
+            for host_plans in pipeline.iter_plans():
+                if not host_plans.data:
+                    continue
+                for entry in host_plans.data["plans"]:
+                    _print_messages(entry["result"], console)
+                    if not entry["result"].success:
+                        run_status = "failure"
+        finally:
+            pipeline.close()
 
         if has_changes_to_apply or payload.i_know_what_im_doing:
             console.print("[bold blue]INFO:[/] Executing apply plans...")
@@ -334,6 +349,8 @@ def handleApply(args):  # noqa: C901
                 run_status = "failure"
                 console.print("[bold red]Apply execution completed with errors.[/]")
                 sys.exit(1)
+            for warning in execute_result.error:
+                console.print(f"[bold yellow]WARNING:[/] {warning}")
 
     except Exception as e:
         console.print(f"[bold red]ERROR:[/] Failed to import pyinfra: {e}")
@@ -0,0 +1,102 @@
+import sys
+
+
+def _statsTable(data):
+    from rich.table import Table
+
+    rows = data["rows"]
+    metric = data["compared_by"]
+    percentiles = [
+        key
+        for key in (rows[0] if rows else {})
+        if key.startswith("p") and key.endswith("_duration")
+    ]
+
+    table = Table(show_lines=False)
+    for key in data["group_by"]:
+        table.add_column(key.capitalize(), style="cyan")
+    for header in ["Count", "Changed", "Failed", "Avg (s)", "Max (s)"]:
+        table.add_column(header, justify="right")
+    for key in percentiles:
+        table.add_column(f"{key.removesuffix('_duration')} (s)", justify="right")
+    if metric:
+        table.add_column(
+            f"Before {metric.removesuffix('_duration')} (s)", justify="right"
+        )
+        table.add_column("Change", justify="right")
+
+    for row in rows:
+        cells = [str(row[key]) for key in data["group_by"]]
+        cells += [
+            str(row["count"]),
+            str(row["changed"]),
+            f"[red]{row['failed']}[/]" if row["failed"] else "0",
+            f"{row['average_duration']:.4f}",
+            f"{row['max_duration']:.4f}",
+        ]
+        cells += [f"{row[key]:.4f}" for key in percentiles]
+        if metric:
+            before, change = row["previous"], row["change"]
+            cells.append(f"{before[metric]:.4f}" if before else "[dim]-[/]")
+            if change is None:
+                cells.append("[dim]new[/]")
+            else:
+                color = "red" if change > 0.1 else "green" if change < -0.1 else "white"
+                cells.append(f"[{color}]{change:+.1%}[/]")
+        table.add_row(*cells)
+    return table
+
+
+def handleLogbook(args):
+    from rich.console import Console
+
+    from chaos.lib.args.dataclasses import LogbookPayload, ResultPayload
+    from chaos.lib.logbook import handle_logbook
+
+    console = Console()
+
+    payload = LogbookPayload(
+        logbook_command=args.logbook_command,
+        limani=getattr(args, "limani", None),
+        older_than=getattr(args, "older_than", None),
+        keep=getattr(args, "keep", None),
+        archive=getattr(args, "archive", False),
+        vacuum=getattr(args, "vacuum", "incremental"),
+        dry_run=getattr(args, "dry_run", False),
+        full=getattr(args, "full", False),
+        since=getattr(args, "since", None),
+        until=getattr(args, "until", None),
+        runs=getattr(args, "runs", None),
+        names=getattr(args, "names", None),
+        hosts=getattr(args, "hosts", None),
+        group_by=getattr(args, "group_by", "name"),
+        percentiles=getattr(args, "percentiles", "50,95,99"),
+        compare=getattr(args, "compare", False),
+        top=getattr(args, "top", None),
+        socket=getattr(args, "socket", None),
+        json=getattr(args, "json", False),
+    )
+
+    result: ResultPayload = handle_logbook(payload)
+
+    if payload.json and result.success:
+        import json
+
+        print(json.dumps(result.data, indent=2))
+        return
+
+    for msg in result.message:
+        console.print(f"[green]{msg}[/]")
+
+    for err in result.error:
+        console.print(f"[bold red]ERROR:[/] {err}")
+
+    if not result.success:
+        sys.exit(1)
+
+    if payload.logbook_command == "stats" and result.data:
+        console.print(_statsTable(result.data))
+
+    if payload.logbook_command == "prune" and payload.dry_run and result.data:
+        for run_id in result.data["pruned"]:
+            console.print(f"  [dim]-[/] {run_id}")
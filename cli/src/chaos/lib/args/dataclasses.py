@@ -7,6 +7,9 @@ if TYPE_CHECKING:
     from pulumi.automation._workspace import PulumiFn
     from pyinfra.api.state import State
 
+    from chaos.lib.apply import ConnectionManager
+    from chaos.lib.parallelism import ParallelismTuner
+
 T = TypeVar("T", covariant=True)
 
 """
@@ -577,6 +580,132 @@ class StyxPayload(BasePayload):
         self.registry_url = registry_url
 
 
+class AgentPayload(BasePayload):
+    """
+    Payload for managing the chaos agent, the background process that keeps SSH connections open between applies.
+
+    Attributes:
+        agent_command (Literal): The agent action to perform ('start', 'stop' or 'status').
+        idle_timeout (float): Seconds a connection may sit unused before the agent closes it (applicable for 'start').
+        max_connections (int): Maximum number of connections the agent keeps open at once (applicable for 'start').
+        foreground (bool): If True, runs the agent in the current process instead of detaching it (applicable for 'start').
+        json (bool): If True, forces the output of the command to be in JSON format (applicable for 'status').
+    """
+
+    __slots__ = (
+        "agent_command",
+        "idle_timeout",
+        "max_connections",
+        "foreground",
+        "json",
+    )
+
+    def __init__(
+        self,
+        agent_command: Literal["start", "stop", "status"],
+        idle_timeout: float = 600.0,
+        max_connections: int = 64,
+        foreground: bool = False,
+        json: bool = False,
+    ):
+        self.agent_command = agent_command
+        self.idle_timeout = idle_timeout
+        self.max_connections = max_connections
+        self.foreground = foreground
+        self.json = json
+
+
+class LogbookPayload(BasePayload):
+    """
+    Payload for the logbook commands (pruning old runs, compacting the Limani, cross-run stats and the daemon).
+
+    Attributes:
+        logbook_command (Literal): The logbook action to perform ('prune', 'compact', 'stats' or 'serve').
+        limani (Optional[str]): The Limani to work on, defaults to the one in the global config (or chrima).
+        older_than (Optional[str]): Prune runs older than this age, like '30d' or '12h' (applicable for 'prune').
+        keep (Optional[int]): Prune everything but the newest N runs (applicable for 'prune').
+        archive (bool): If True, archives each pruned run before deleting it (applicable for 'prune').
+        vacuum (Literal): How to compact after pruning: 'incremental', 'full' or 'none' (applicable for 'prune').
+        dry_run (bool): If True, only reports what would be pruned (applicable for 'prune').
+        full (bool): If True, compacts with a full VACUUM instead of incrementally (applicable for 'compact').
+        since (Optional[str]): Start of the time window, as an age like '30d' (applicable for 'stats').
+        until (Optional[str]): End of the time window, as an age, defaults to now (applicable for 'stats').
+        runs (Optional[int]): Use the last N finished runs as the window instead of a time window (applicable for 'stats').
+        names (list[str]): Only these operation names (applicable for 'stats').
+        hosts (list[str]): Only these hosts (applicable for 'stats').
+        group_by (str): Comma separated keys to group by: name, host, day and/or run (applicable for 'stats').
+        percentiles (str): Comma separated percentiles to compute, or 'none' (applicable for 'stats').
+        compare (bool): If True, compares against the window right before, slowest regressions first (applicable for 'stats').
+        top (Optional[int]): Only the first N rows (applicable for 'stats').
+        socket (Optional[str]): The unix socket to listen on, defaults to the one of Ch-rima (applicable for 'serve').
+        json (bool): If True, forces the output of the command to be in JSON format.
+    """
+
+    __slots__ = (
+        "logbook_command",
+        "limani",
+        "older_than",
+        "keep",
+        "archive",
+        "vacuum",
+        "dry_run",
+        "full",
+        "since",
+        "until",
+        "runs",
+        "names",
+        "hosts",
+        "group_by",
+        "percentiles",
+        "compare",
+        "top",
+        "socket",
+        "json",
+    )
+
+    def __init__(
+        self,
+        logbook_command: Literal["prune", "compact", "stats", "serve"],
+        limani: str | None = None,
+        older_than: str | None = None,
+        keep: int | None = None,
+        archive: bool = False,
+        vacuum: Literal["incremental", "full", "none"] = "incremental",
+        dry_run: bool = False,
+        full: bool = False,
+        since: str | None = None,
+        until: str | None = None,
+        runs: int | None = None,
+        names: list[str] | None = None,
+        hosts: list[str] | None = None,
+        group_by: str = "name",
+        percentiles: str = "50,95,99",
+        compare: bool = False,
+        top: int | None = None,
+        socket: str | None = None,
+        json: bool = False,
+    ):
+        self.logbook_command = logbook_command
+        self.limani = limani
+        self.older_than = older_than
+        self.keep = keep
+        self.archive = archive
+        self.vacuum = vacuum
+        self.dry_run = dry_run
+        self.full = full
+        self.since = since
+        self.until = until
+        self.runs = runs
+        self.names = names or []
+        self.hosts = hosts or []
+        self.group_by = group_by
+        self.percentiles = percentiles
+        self.compare = compare
+        self.top = top
+        self.socket = socket
+        self.json = json
+
+
 class InitPayload(BasePayload):
     """
     Payload for generating boilerplate configuration files via the initialization wizard.
@@ -1223,12 +1352,19 @@ class ApplyPayload(BasePayload):
         serial (bool): If True, executes pyinfra operations serially across the fleet instead of in parallel.
         no_wait (bool): If True, executes pyinfra operations concurrently without waiting for slow hosts.
         export_logs (bool): If True, exports the telemetry logbook to a JSON file after the run finishes.
+        trust_cache (bool): If True, roles whose delta cache key is unchanged reuse their cached no-op delta instead of gathering context.
+        refresh_cache (bool): If True, ignores the cached deltas and stores freshly computed ones.
+        limit (list[str]): Host selectors narrowing down the target hosts, see resolve_limit.
+        connect_deadline (float | None): Seconds after which hosts that are still not connected are skipped as unreachable.
+        connections (ConnectionManager | None): Internal state holding the background connections started by setup_pyinfra.
         secrets_context (SecretsContext | dict[str, Any]): The context containing secret file paths and provider configurations.
         confirmed_password (str): Internal state holding the verified sudo password if gathered interactively.
         pyinfra_state (State | None): Internal state storing the initialized pyinfra State object after setup.
         target_hosts (list | None): Internal state containing the parsed list of hosts to apply the roles to.
         is_fleet_active (bool): Internal state tracking whether a remote fleet is actively being targeted.
-        parallelism (int): Internal state tracking the maximum number of concurrent hosts to apply changes to.
+        parallelism (int | Literal["auto"]): Internal state tracking the maximum number of concurrent hosts to apply changes to,
+            or "auto" to let a ParallelismTuner pick (and keep adjusting) it during the run.
+        tuner (ParallelismTuner | None): Internal state holding the tuner of an `auto` parallelism run, set by setup_pyinfra.
         fallback_to_local (bool): Internal state tracking if fleet failed to resolve and fallback to local was permitted.
         decrypted_secrets (dict[str, Any] | None): Internal state caching the decrypted YAML/JSON secrets dictionary for role consumption.
         global_config (dict[str, Any] | None): Internal state caching the global `~/.config/chaos/config.yml` data.
@@ -1251,6 +1387,12 @@ class ApplyPayload(BasePayload):
         "serial",
         "no_wait",
         "export_logs",
+        "trust_cache",
+        "refresh_cache",
+        "limit",
+        "connect_deadline",
+        "connections",
+        "tuner",
         "secrets_context",
         "confirmed_password",
         "pyinfra_state",
@@ -1285,10 +1427,16 @@ class ApplyPayload(BasePayload):
         pyinfra_state: State | None = None,
         target_hosts: list | None = None,
         is_fleet_active: bool = False,
-        parallelism: int = 0,
+        parallelism: int | Literal["auto"] = 0,
         fallback_to_local: bool = False,
         decrypted_secrets: dict[str, Any] | None = None,
         global_config: dict[str, Any] | None = None,
+        trust_cache: bool = False,
+        refresh_cache: bool = False,
+        limit: list[str] | None = None,
+        connect_deadline: float | None = None,
+        connections: ConnectionManager | None = None,
+        tuner: ParallelismTuner | None = None,
     ):
         self.update_plugins = update_plugins
         self.i_know_what_im_doing = i_know_what_im_doing
@@ -1315,3 +1463,9 @@ class ApplyPayload(BasePayload):
         self.fallback_to_local = fallback_to_local
         self.decrypted_secrets = decrypted_secrets or {}
         self.global_config = global_config or {}
+        self.trust_cache = trust_cache
+        self.refresh_cache = refresh_cache
+        self.limit = limit or []
+        self.connect_deadline = connect_deadline
+        self.connections = connections
+        self.tuner = tuner
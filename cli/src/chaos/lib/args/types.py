@@ -30,6 +30,8 @@ class GlobalArgs(Protocol):
     ramble_commands: Optional[str]
     set_command: Optional[str]
     init_command: Optional[str]
+    agent_command: Optional[str]
+    logbook_command: Optional[str]
 
 
 class ApplyArgs(Protocol):
@@ -90,6 +92,31 @@ class TeamArgs(Protocol):
     teams: Optional[List[str]]
 
 
+class AgentArgs(Protocol):
+    idle_timeout: float
+    max_connections: int
+    foreground: bool
+
+
+class LogbookArgs(Protocol):
+    older_than: Optional[str]
+    keep: Optional[int]
+    archive: bool
+    vacuum: str
+    dry_run: bool
+    full: bool
+    since: Optional[str]
+    until: Optional[str]
+    runs: Optional[int]
+    names: Optional[list[str]]
+    hosts: Optional[list[str]]
+    group_by: str
+    percentiles: str
+    compare: bool
+    top: Optional[int]
+    socket: Optional[str]
+
+
 class ChaosArguments(
     GlobalArgs,
     ProviderArgs,
@@ -100,6 +127,8 @@ class ChaosArguments(
     CheckArgs,
     SetArgs,
     TeamArgs,
+    AgentArgs,
+    LogbookArgs,
     Protocol,
 ):
     pass
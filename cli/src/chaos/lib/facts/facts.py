@@ -1,6 +1,77 @@
 from pyinfra.api.facts import FactBase
 
 
+def _ram_usage(lines) -> dict[str, float]:
+    """The RAM usage (totals in MB and a percentage) out of the lines of /proc/meminfo."""
+    data = {}
+
+    for line in lines:
+        parts = line.split(":")
+        if len(parts) != 2:
+            raise ValueError(f"Unexpected line format: {line}")
+
+        key = parts[0].strip()
+        try:
+            value_kb = int(parts[1].strip().split()[0])
+            data[key] = value_kb
+        except ValueError:
+            continue
+
+    total_kb = data.get("MemTotal", 0)
+    available_kb = data.get("MemAvailable")
+
+    if available_kb is None:
+        free_kb = (
+            data.get("MemFree", 0) + data.get("Buffers", 0) + data.get("Cached", 0)
+        )
+        buffers_kb = data.get("Buffers", 0)
+        cached_kb = data.get("Cached", 0)
+        available_kb = free_kb + buffers_kb + cached_kb
+
+    used_kb = total_kb - available_kb
+
+    percent = 0.0
+    if total_kb > 0:
+        percent = (used_kb / total_kb) * 100
+
+    return {
+        "total_mb": round(total_kb / 1024, 2),
+        "used_mb": round(used_kb / 1024, 2),
+        "available_mb": round(available_kb / 1024, 2),
+        "percent": round(percent, 1),
+    }
+
+
+def _load_average(lines) -> list[float]:
+    """The 1, 5 and 15 minutes load averages out of the lines of /proc/loadavg."""
+    lines = list(lines)
+    if not lines:
+        return [0.0, 0.0, 0.0]
+    try:
+        parts = lines[0].split()
+        return [float(x) for x in parts[:3]]
+    except (IndexError, ValueError):
+        return [0.0, 0.0, 0.0]
+
+
+def _cpu_counters(lines) -> dict[str, int]:
+    """The CPU time counters (in jiffies, since boot) out of the cpu lines of /proc/stat, plus the CPU count."""
+    counters = {"total": 0, "idle": 0, "cpus": 0}
+    for line in lines:
+        fields = line.split()
+        if not fields:
+            continue
+        if fields[0] == "cpu":
+            # user nice system idle iowait irq softirq steal (guest time is already counted in user)
+            values = [int(value) for value in fields[1:9]]
+            counters["total"] = sum(values)
+            counters["idle"] = sum(values[3:5])
+        elif fields[0].startswith("cpu"):
+            counters["cpus"] += 1
+    counters["cpus"] = max(counters["cpus"], 1)
+    return counters
+
+
 class RamUsage(FactBase):
     """
     Returns the current RAM usage as a percentage.
@@ -10,43 +81,7 @@ class RamUsage(FactBase):
         return "cat /proc/meminfo"
 
     def process(self, output):
-        data = {}
-
-        for line in output:
-            parts = line.split(":")
-            if len(parts) != 2:
-                raise ValueError(f"Unexpected line format: {line}")
-
-            key = parts[0].strip()
-            try:
-                value_kb = int(parts[1].strip().split()[0])
-                data[key] = value_kb
-            except ValueError:
-                continue
-
-        total_kb = data.get("MemTotal", 0)
-        available_kb = data.get("MemAvailable")
-
-        if available_kb is None:
-            free_kb = (
-                data.get("MemFree", 0) + data.get("Buffers", 0) + data.get("Cached", 0)
-            )
-            buffers_kb = data.get("Buffers", 0)
-            cached_kb = data.get("Cached", 0)
-            available_kb = free_kb + buffers_kb + cached_kb
-
-        used_kb = total_kb - available_kb
-
-        percent = 0.0
-        if total_kb > 0:
-            percent = (used_kb / total_kb) * 100
-
-        return {
-            "total_mb": round(total_kb / 1024, 2),
-            "used_mb": round(used_kb / 1024, 2),
-            "available_mb": round(available_kb / 1024, 2),
-            "percent": round(percent, 1),
-        }
+        return _ram_usage(output)
 
 
 class LoadAverage(FactBase):
@@ -57,12 +92,84 @@ class LoadAverage(FactBase):
     def command(self) -> str:
         return "cat /proc/loadavg"
 
+    def process(self, output):
+        return _load_average(output)
+
+
+class CpuCount(FactBase):
+    """
+    Returns the number of online CPUs, used to tell a busy host from a saturated one.
+    """
+
+    def command(self) -> str:
+        return "nproc 2>/dev/null || getconf _NPROCESSORS_ONLN 2>/dev/null || echo 1"
+
     def process(self, output):
         lines = list(output)
-        if not lines:
-            return [0.0, 0.0, 0.0]
         try:
-            parts = lines[0].split()
-            return [float(x) for x in parts[:3]]
+            return max(int(lines[0].strip()), 1)
         except (IndexError, ValueError):
-            return [0.0, 0.0, 0.0]
+            return 1
+
+
+class HostResources(FactBase):
+    """
+    Returns the RAM usage, load averages and CPU counters of the host in one go (one command instead of one per
+    fact), for the health snapshots.
+
+    The CPU counters only mean something next to an earlier sample, see cpu_percent.
+    """
+
+    def command(self) -> str:
+        return "cat /proc/meminfo; echo --; cat /proc/loadavg; echo --; grep '^cpu' /proc/stat"
+
+    def process(self, output):
+        sections: list[list[str]] = [[]]
+        for line in output:
+            if line.strip() == "--":
+                sections.append([])
+            else:
+                sections[-1].append(line)
+        sections += [[]] * (3 - len(sections))
+
+        return {
+            "ram": _ram_usage(sections[0]),
+            "load": _load_average(sections[1]),
+            "cpu": _cpu_counters(sections[2]),
+        }
+
+    @staticmethod
+    def cpu_percent(
+        before: dict[str, int] | None, after: dict[str, int] | None
+    ) -> float | None:
+        """The CPU utilisation between two samples of the counters, or None without a usable earlier one."""
+        if not before or not after:
+            return None
+        total = after["total"] - before["total"]
+        if total <= 0:
+            return None
+        busy = total - (after["idle"] - before["idle"])
+        return round(min(max(busy / total, 0.0), 1.0) * 100, 1)
+
+
+class HostFingerprint(FactBase):
+    """
+    Returns a cheap fingerprint of the host state, used to key the apply delta cache.
+
+    It hashes the boot id alongside the modification times of the package databases and of the
+    most commonly managed configuration paths, so a reboot, a package transaction or an edit
+    to those paths invalidates every cached delta of the host.
+    """
+
+    def command(self):
+        return (
+            "cat /proc/sys/kernel/random/boot_id 2>/dev/null; "
+            "stat -c '%n %Y' /etc /etc/passwd /etc/group /etc/fstab /etc/systemd/system "
+            "/var/lib/pacman/local /var/lib/dpkg/status /var/lib/rpm /var/lib/flatpak "
+            "2>/dev/null; true"
+        )
+
+    def process(self, output):
+        import hashlib
+
+        return hashlib.sha256("\n".join(output).encode()).hexdigest()
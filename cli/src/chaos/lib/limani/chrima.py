@@ -2,16 +2,92 @@ import json
 import os
 import sqlite3
 import threading
+from collections.abc import Iterable, Iterator
 from pathlib import Path
+from typing import Any
 
-from .limani import Limani
+from .limani import Limani, add_to_rollup, empty_rollup, rollup_summary
 
 _thread_local = threading.local()
 
+# Operation text columns that move to the blobs table once they're big enough, and the column that
+# keeps their hash. The same stdout, diff or arguments repeat on every host of a fleet.
+BLOB_COLUMNS = {
+    "logs_json": "logs_hash",
+    "diff": "diff_hash",
+    "arguments_json": "arguments_hash",
+}
+BLOB_MIN_SIZE = 64
+BLOB_CODECS = ("zlib", "zstd", "raw", "off")
+
+# Bumped once a database has no big inline texts left, see _migrate_inline_texts.
+BLOB_SCHEMA_VERSION = 1
+
+
+def _zstd() -> Any:
+    """Returns compression.zstd (Python 3.14+) or the zstandard package, None without either."""
+    try:
+        from compression import zstd  # type: ignore[import-not-found]
+
+        return zstd
+    except ImportError:
+        pass
+    try:
+        import zstandard  # type: ignore[import-not-found]
+
+        return zstandard
+    except ImportError:
+        return None
+
+
+def _blob_codec(codec: str) -> Any:
+    """Returns the module compressing a codec (both zlib and zstd have compress/decompress), None for raw.
+
+    Raises:
+        ImportError: If the codec is zstd and there is no zstd around.
+    """
+    if codec == "zlib":
+        import zlib
+
+        return zlib
+    if codec == "zstd":
+        zstd = _zstd()
+        if zstd is None:
+            raise ImportError(
+                "zstd blobs need Python 3.14+ or the 'zstandard' package."
+            )
+        return zstd
+    return None
+
 
 class Chrima(Limani):
     """Limani implementation for a SQLite database."""
 
+    def __init__(self, config: dict[str, Any]):
+        """Initializes Ch-rima.
+
+        Args:
+            config (dict): The global configuration, `chrima_blobs` picks how operation texts are stored:
+                zlib (default), zstd, raw (deduplicated, uncompressed) or off (inline, like before blobs).
+
+        Raises:
+            ValueError: If `chrima_blobs` isn't a known codec.
+        """
+        import sys
+
+        super().__init__(config)
+        self.blob_codec = str(self.config.get("chrima_blobs", "zlib") or "zlib")
+        if self.blob_codec not in BLOB_CODECS:
+            raise ValueError(
+                f"Unknown chrima_blobs codec '{self.blob_codec}', use one of: {', '.join(BLOB_CODECS)}."
+            )
+        if self.blob_codec == "zstd" and _zstd() is None:
+            print(
+                "Warning: zstd needs Python 3.14+ or the 'zstandard' package, storing the logbook blobs with zlib.",
+                file=sys.stderr,
+            )
+            self.blob_codec = "zlib"
+
     def connect(self):
         """
         Gets a thread-local database connection.
@@ -25,6 +101,9 @@ class Chrima(Limani):
 
             conn.row_factory = sqlite3.Row
 
+            # Only takes on a new database (and has to come before WAL does), older ones are switched
+            # over by their next full VACUUM, see compact.
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL;")
             conn.execute("PRAGMA journal_mode=WAL;")
             conn.execute("PRAGMA synchronous=NORMAL;")
 
@@ -69,6 +148,10 @@ class Chrima(Limani):
 
         cursor.execute("PRAGMA foreign_keys = ON;")
 
+        fresh = not cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'operations'"
+        ).fetchone()
+
         cursor.execute("""
         CREATE TABLE IF NOT EXISTS runs (
             id TEXT PRIMARY KEY,
@@ -82,6 +165,23 @@ class Chrima(Limani):
         )
         """)
 
+        # Counters of each run, kept up to date as its operations are inserted (the hosts keep theirs in
+        # summary_json). Runs logged before rollups don't have a row, their summaries are counted instead.
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS run_rollups (
+            run_id TEXT PRIMARY KEY,
+            total_operations INTEGER NOT NULL DEFAULT 0,
+            changed_operations INTEGER NOT NULL DEFAULT 0,
+            failed_operations INTEGER NOT NULL DEFAULT 0,
+            total_duration REAL NOT NULL DEFAULT 0,
+            slowest_name TEXT,
+            slowest_host TEXT,
+            slowest_duration REAL,
+            updated_at REAL,
+            FOREIGN KEY (run_id) REFERENCES runs (id) ON DELETE CASCADE
+        )
+        """)
+
         cursor.execute("""
         CREATE TABLE IF NOT EXISTS hosts (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -110,11 +210,34 @@ class Chrima(Limani):
             arguments_json TEXT,
             retry_stats_json TEXT,
             command_n_facts_in_order_json TEXT,
+            logs_hash BLOB,
+            diff_hash BLOB,
+            arguments_hash BLOB,
             FOREIGN KEY (run_id) REFERENCES runs (id) ON DELETE CASCADE,
             FOREIGN KEY (host_id) REFERENCES hosts (id) ON DELETE CASCADE
         )
         """)
 
+        # Databases from before the blobs table: add the hash columns, their old rows stay inline until
+        # the next compaction moves them over.
+        columns = {
+            row["name"] for row in cursor.execute("PRAGMA table_info(operations)")
+        }
+        for hash_column in BLOB_COLUMNS.values():
+            if hash_column not in columns:
+                cursor.execute(f"ALTER TABLE operations ADD COLUMN {hash_column} BLOB")
+
+        # Big operation texts, stored once per content (see BLOB_COLUMNS) and counted by reference
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS blobs (
+            hash BLOB PRIMARY KEY,
+            codec TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            refs INTEGER NOT NULL,
+            data BLOB NOT NULL
+        )
+        """)
+
         # Table for resource snapshots
         cursor.execute("""
         CREATE TABLE IF NOT EXISTS resource_snapshots (
@@ -142,9 +265,56 @@ class Chrima(Limani):
         )
         """)
 
+        # Duration sketches of each operation name (see chaos.lib.sketch), kept up to date during the run
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS operation_sketches (
+            run_id TEXT NOT NULL,
+            name TEXT NOT NULL,
+            sketch_json TEXT NOT NULL,
+            PRIMARY KEY (run_id, name),
+            FOREIGN KEY (run_id) REFERENCES runs (id) ON DELETE CASCADE
+        )
+        """)
+
+        # Daily rollups for `chaos logbook stats` (see chaos.lib.analytics), '*' standing for every name and/or
+        # every host. Runs are folded in as they end (see end_run_update).
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS daily_rollups (
+            day INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            host TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            changed INTEGER NOT NULL,
+            failed INTEGER NOT NULL,
+            total_duration REAL NOT NULL,
+            max_duration REAL NOT NULL,
+            sketch_json TEXT NOT NULL,
+            UNIQUE (day, name, host)
+        )
+        """)
+
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS daily_rollup_runs (
+            run_id TEXT PRIMARY KEY,
+            folded_at REAL NOT NULL
+        )
+        """)
+
         cursor.execute(
             "CREATE INDEX IF NOT EXISTS idx_operations_run_host ON operations (run_id, host_id);"
         )
+        # Covers every column stats read, so run windows never touch the operation rows themselves.
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_operations_stats ON operations (run_id, name, host_id, timestamp, duration, changed, success);"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_daily_rollups_name ON daily_rollups (name, host, day);"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_daily_rollups_host ON daily_rollups (host, name, day);"
+        )
+        # Rollups per name and host aren't kept anymore (see chaos.lib.analytics.ROLLUP_LEVELS).
+        cursor.execute("DELETE FROM daily_rollups WHERE name != '*' AND host != '*'")
         cursor.execute(
             "CREATE INDEX IF NOT EXISTS idx_snapshots_run_host ON resource_snapshots (run_id, host_id);"
         )
@@ -152,6 +322,9 @@ class Chrima(Limani):
             "CREATE INDEX IF NOT EXISTS idx_facts_run_timestamp ON command_n_facts_in_order (run_id, timestamp);"
         )
 
+        if fresh and self.blob_codec != "off":
+            cursor.execute(f"PRAGMA user_version = {BLOB_SCHEMA_VERSION}")
+
         conn.commit()
 
     def get_or_create_host(self, run_id: str, host_name: str) -> int:
@@ -169,7 +342,8 @@ class Chrima(Limani):
             return row["id"]
         else:
             cursor.execute(
-                "INSERT INTO hosts (run_id, name) VALUES (?, ?)", (run_id, host_name)
+                "INSERT INTO hosts (run_id, name, summary_json) VALUES (?, ?, ?)",
+                (run_id, host_name, json.dumps(empty_rollup())),
             )
             conn.commit()
             if not cursor.lastrowid:
@@ -177,6 +351,21 @@ class Chrima(Limani):
 
             return cursor.lastrowid
 
+    def register_hosts(self, run_id: str, host_names: list[str]) -> dict[str, int]:
+        """Creates the missing hosts of a run in one transaction and returns the ID of every host of it."""
+        conn = self.connect()
+        rollup = json.dumps(empty_rollup())
+        conn.executemany(
+            "INSERT OR IGNORE INTO hosts (run_id, name, summary_json) VALUES (?, ?, ?)",
+            [(run_id, name, rollup) for name in host_names],
+        )
+        conn.commit()
+
+        rows = conn.execute(
+            "SELECT id, name FROM hosts WHERE run_id = ?", (run_id,)
+        ).fetchall()
+        return {row["name"]: row["id"] for row in rows}
+
     def insert_operation(
         self,
         run_id: str,
@@ -194,29 +383,26 @@ class Chrima(Limani):
         command_n_facts: list,
     ):
         """Inserts a new operation into the database."""
-        conn = self.connect()
-        conn.execute(
-            """
-            INSERT INTO operations (run_id, host_id, op_hash, name, changed, success, duration, timestamp, logs_json, diff, arguments_json, retry_stats_json, command_n_facts_in_order_json)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                run_id,
-                host_id,
-                op_hash,
-                name,
-                int(changed),
-                int(success),
-                duration,
-                timestamp,
-                json.dumps(logs),
-                diff,
-                json.dumps(arguments),
-                json.dumps(retry_stats),
-                json.dumps(command_n_facts),
-            ),
+        self.insert_many_operations(
+            [
+                {
+                    "run_id": run_id,
+                    "host_id": host_id,
+                    "op_hash": op_hash,
+                    "name": name,
+                    "changed": changed,
+                    "success": success,
+                    "duration": duration,
+                    "timestamp": timestamp,
+                    "logs": logs,
+                    "diff": diff,
+                    "arguments": arguments,
+                    "retry_stats": retry_stats,
+                    "command_n_facts": command_n_facts,
+                }
+            ]
         )
-        conn.commit()
+        self.commit()
 
     def create_run(
         self,
@@ -239,6 +425,10 @@ class Chrima(Limani):
                 json.dumps(list(needed_secrets)),
             ),
         )
+        conn.execute(
+            "INSERT INTO run_rollups (run_id, updated_at) VALUES (?, ?)",
+            (run_id, start_time),
+        )
         conn.commit()
         return run_id
 
@@ -264,6 +454,397 @@ class Chrima(Limani):
         )
         conn.commit()
 
+    def insert_many_operations(self, rows: list[dict]):
+        """Inserts several operations in one executemany, leaving the commit to `commit`.
+
+        Their big texts go to the blobs table (see _store_texts), the operation keeps the hashes.
+        """
+        conn = self.connect()
+        values = [
+            [
+                row["run_id"],
+                row["host_id"],
+                row["op_hash"],
+                row["name"],
+                int(row["changed"]),
+                int(row["success"]),
+                row["duration"],
+                row["timestamp"],
+                json.dumps(row["logs"]),
+                row["diff"],
+                json.dumps(row["arguments"]),
+                json.dumps(row["retry_stats"]),
+                json.dumps(row["command_n_facts"]),
+            ]
+            for row in rows
+        ]
+        texts = [[value[8], value[9], value[10]] for value in values]
+        hashes = self._store_texts(conn, texts)
+        conn.executemany(
+            """
+            INSERT INTO operations (run_id, host_id, op_hash, name, changed, success, duration, timestamp, logs_json, diff, arguments_json, retry_stats_json, command_n_facts_in_order_json, logs_hash, diff_hash, arguments_hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (*value[:8], *inline, *value[11:], *digests)
+                for value, inline, digests in zip(values, texts, hashes)
+            ],
+        )
+        self._update_rollups(conn, rows)
+
+    def _update_rollups(self, conn: sqlite3.Connection, rows: list[dict]):
+        """Counts some operations into the rollups of their hosts (hosts.summary_json) and runs (run_rollups),
+        in the same transaction as the operations themselves.
+
+        Hosts and runs logged before rollups existed have none, and are left that way.
+        """
+        import time
+
+        hosts: dict[int, dict] = {}
+        host_ids = list({row["host_id"] for row in rows})
+        for start in range(0, len(host_ids), 500):
+            chunk = host_ids[start : start + 500]
+            marks = ", ".join("?" for _ in chunk)
+            for host in conn.execute(
+                f"SELECT id, name, summary_json FROM hosts WHERE id IN ({marks})", chunk
+            ):
+                hosts[host["id"]] = {
+                    "name": host["name"],
+                    "rollup": json.loads(host["summary_json"])
+                    if host["summary_json"]
+                    else None,
+                }
+
+        runs: dict[str, dict] = {}
+        for row in rows:
+            host = hosts.get(row["host_id"], {"name": None, "rollup": None})
+            op = (
+                row["name"],
+                host["name"],
+                row["duration"],
+                row["changed"],
+                row["success"],
+            )
+            add_to_rollup(runs.setdefault(row["run_id"], empty_rollup()), *op)
+            if host["rollup"] is not None:
+                add_to_rollup(host["rollup"], *op)
+
+        conn.executemany(
+            "UPDATE hosts SET summary_json = ? WHERE id = ?",
+            [
+                (json.dumps(host["rollup"]), host_id)
+                for host_id, host in hosts.items()
+                if host["rollup"] is not None
+            ],
+        )
+
+        now = time.time()
+        params = []
+        for run_id, rollup in runs.items():
+            slowest = rollup["slowest_operation"]
+            params.append(
+                {
+                    "run_id": run_id,
+                    "total": rollup["total_operations"],
+                    "changed": rollup["changed_operations"],
+                    "failed": rollup["failed_operations"],
+                    "duration": rollup["total_duration"],
+                    "slowest_name": slowest["name"],
+                    "slowest_host": slowest["host"],
+                    "slowest_duration": slowest["duration"],
+                    "now": now,
+                }
+            )
+        # Every SET expression sees the old row, so the slowest columns all compare against the old slowest.
+        conn.executemany(
+            """
+            UPDATE run_rollups SET
+                total_operations = total_operations + :total,
+                changed_operations = changed_operations + :changed,
+                failed_operations = failed_operations + :failed,
+                total_duration = total_duration + :duration,
+                slowest_name = CASE WHEN slowest_duration IS NULL OR :slowest_duration > slowest_duration THEN :slowest_name ELSE slowest_name END,
+                slowest_host = CASE WHEN slowest_duration IS NULL OR :slowest_duration > slowest_duration THEN :slowest_host ELSE slowest_host END,
+                slowest_duration = CASE WHEN slowest_duration IS NULL OR :slowest_duration > slowest_duration THEN :slowest_duration ELSE slowest_duration END,
+                updated_at = :now
+            WHERE run_id = :run_id
+            """,
+            params,
+        )
+
+    def _store_texts(
+        self, conn: sqlite3.Connection, texts: list[list[str | None]]
+    ) -> list[list[bytes | None]]:
+        """Moves the big texts of some operations to the blobs table, without committing.
+
+        Args:
+            conn (sqlite3.Connection): The connection to write with.
+            texts (list[list]): One [logs_json, diff, arguments_json] per operation. The texts that go to
+                the blobs table are replaced by None, in place.
+
+        Returns:
+            - One [logs_hash, diff_hash, arguments_hash] per operation, None where the text stayed inline.
+        """
+        import hashlib
+        from collections import Counter
+
+        hashes: list[list[bytes | None]] = [[None] * len(BLOB_COLUMNS) for _ in texts]
+        if self.blob_codec == "off":
+            return hashes
+
+        refs: Counter[bytes] = Counter()
+        contents: dict[bytes, bytes] = {}
+        for row_texts, row_hashes in zip(texts, hashes):
+            for i, text in enumerate(row_texts):
+                if text is None or len(text) < BLOB_MIN_SIZE:
+                    continue
+                content = text.encode("utf-8")
+                digest = hashlib.blake2b(content, digest_size=16).digest()
+                refs[digest] += 1
+                contents.setdefault(digest, content)
+                row_texts[i] = None
+                row_hashes[i] = digest
+
+        if not refs:
+            return hashes
+
+        # Only compress what the database doesn't have yet, the rest just gets its references counted.
+        digests = list(refs)
+        known: set[bytes] = set()
+        for start in range(0, len(digests), 500):
+            chunk = digests[start : start + 500]
+            marks = ", ".join("?" for _ in chunk)
+            known.update(
+                row[0]
+                for row in conn.execute(
+                    f"SELECT hash FROM blobs WHERE hash IN ({marks})", chunk
+                )
+            )
+
+        codec = _blob_codec(self.blob_codec)
+        conn.executemany(
+            "UPDATE blobs SET refs = refs + ? WHERE hash = ?",
+            [(refs[digest], digest) for digest in digests if digest in known],
+        )
+        conn.executemany(
+            """
+            INSERT INTO blobs (hash, codec, size, refs, data) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (hash) DO UPDATE SET refs = refs + excluded.refs
+            """,
+            [
+                (
+                    digest,
+                    self.blob_codec,
+                    len(contents[digest]),
+                    refs[digest],
+                    codec.compress(contents[digest]) if codec else contents[digest],
+                )
+                for digest in digests
+                if digest not in known
+            ],
+        )
+        return hashes
+
+    def _load_blobs(
+        self, conn: sqlite3.Connection, digests: Iterable[bytes]
+    ) -> dict[bytes, str]:
+        """Fetches and decompresses some blobs, by hash."""
+        digests = list(digests)
+        texts = {}
+        for start in range(0, len(digests), 500):
+            chunk = digests[start : start + 500]
+            marks = ", ".join("?" for _ in chunk)
+            for row in conn.execute(
+                f"SELECT hash, codec, data FROM blobs WHERE hash IN ({marks})", chunk
+            ):
+                codec = _blob_codec(row["codec"])
+                data = codec.decompress(row["data"]) if codec else row["data"]
+                texts[row["hash"]] = bytes(data).decode("utf-8")
+        return texts
+
+    def _hydrate(
+        self, rows: Iterable[sqlite3.Row], cache_size: int = 1024
+    ) -> Iterator[dict]:
+        """Turns operation rows back into what they were before the blobs table, one row at a time.
+
+        Rows are read in small batches so each batch takes a single blobs query, and the latest texts
+            are kept around, since the same text usually shows up again a few hosts later.
+        """
+        from collections import OrderedDict
+        from itertools import islice
+
+        conn = self.connect()
+        cache: OrderedDict[bytes, str] = OrderedDict()
+        rows = iter(rows)
+        while batch := [dict(row) for row in islice(rows, 256)]:
+            missing = {
+                row[hash_column]
+                for row in batch
+                for hash_column in BLOB_COLUMNS.values()
+                if row.get(hash_column) is not None and row[hash_column] not in cache
+            }
+            texts = self._load_blobs(conn, missing) if missing else {}
+
+            for row in batch:
+                for column, hash_column in BLOB_COLUMNS.items():
+                    digest = row.pop(hash_column, None)
+                    if digest is None:
+                        continue
+                    text = texts.get(digest)
+                    if text is None and digest in cache:
+                        cache.move_to_end(digest)
+                        text = cache[digest]
+                    row[column] = text
+                yield row
+
+            cache.update(texts)
+            while len(cache) > cache_size:
+                cache.popitem(last=False)
+
+    def _release_blobs(self, conn: sqlite3.Connection, where: str, params: list):
+        """Drops the references the operations matching `where` hold, deleting the blobs left without any.
+
+        Doesn't commit, and has to run before those operations are deleted.
+        """
+        from collections import Counter
+
+        refs: Counter[bytes] = Counter()
+        for hash_column in BLOB_COLUMNS.values():
+            rows = conn.execute(
+                f"SELECT {hash_column}, count(*) FROM operations WHERE ({where}) AND {hash_column} IS NOT NULL GROUP BY {hash_column}",
+                params,
+            )
+            for digest, count in rows:
+                refs[digest] += count
+
+        conn.executemany(
+            "UPDATE blobs SET refs = refs - ? WHERE hash = ?",
+            [(count, digest) for digest, count in refs.items()],
+        )
+        conn.executemany(
+            "DELETE FROM blobs WHERE hash = ? AND refs <= 0",
+            [(digest,) for digest in refs],
+        )
+
+    def _migrate_inline_texts(self, batch_size: int = 1000) -> int:
+        """Moves the big texts operations still keep inline (logged before the blobs table) to it.
+
+        Runs once per database, committing every batch, so it can be interrupted and picked up again.
+
+        Returns:
+            - How many operations were moved.
+        """
+        conn = self.connect()
+        if self.blob_codec == "off":
+            return 0
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= BLOB_SCHEMA_VERSION:
+            return 0
+
+        columns = ", ".join(BLOB_COLUMNS)
+        condition = " OR ".join(
+            f"length({column}) >= {BLOB_MIN_SIZE}" for column in BLOB_COLUMNS
+        )
+        assignments = ", ".join(
+            [f"{column} = ?" for column in BLOB_COLUMNS]
+            + [
+                f"{hash_column} = coalesce(?, {hash_column})"
+                for hash_column in BLOB_COLUMNS.values()
+            ]
+        )
+
+        migrated, last_id = 0, 0
+        while True:
+            rows = conn.execute(
+                f"SELECT id, {columns} FROM operations WHERE id > ? AND ({condition}) ORDER BY id LIMIT ?",
+                (last_id, batch_size),
+            ).fetchall()
+            if not rows:
+                break
+
+            texts = [[row[column] for column in BLOB_COLUMNS] for row in rows]
+            hashes = self._store_texts(conn, texts)
+            conn.executemany(
+                f"UPDATE operations SET {assignments} WHERE id = ?",
+                [
+                    (*inline, *digests, row["id"])
+                    for row, inline, digests in zip(rows, texts, hashes)
+                ],
+            )
+            conn.commit()
+            migrated += len(rows)
+            last_id = rows[-1]["id"]
+
+        conn.execute(f"PRAGMA user_version = {BLOB_SCHEMA_VERSION}")
+        conn.commit()
+        return migrated
+
+    def insert_many_snapshots(self, rows: list[dict]):
+        """Inserts several resource snapshots in one executemany, leaving the commit to `commit`."""
+        conn = self.connect()
+        conn.executemany(
+            "INSERT INTO resource_snapshots (run_id, host_id, stage, timestamp, metrics_json) VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    row["run_id"],
+                    row["host_id"],
+                    row["stage"],
+                    row["timestamp"],
+                    json.dumps(row["metrics"]),
+                )
+                for row in rows
+            ],
+        )
+
+    def insert_many_fact_logs(self, rows: list[dict]):
+        """Inserts several fact log entries in one executemany, leaving the commit to `commit`."""
+        conn = self.connect()
+        conn.executemany(
+            "INSERT INTO command_n_facts_in_order (run_id, timestamp, log_level, context, command) VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    row["run_id"],
+                    row["timestamp"],
+                    row["log_level"],
+                    row["context"],
+                    row["command"],
+                )
+                for row in rows
+            ],
+        )
+
+    def commit(self):
+        """Commits the current transaction of this thread's connection."""
+        self.connect().commit()
+
+    def rollback(self):
+        """Rolls back the current transaction of this thread's connection."""
+        self.connect().rollback()
+
+    def save_operation_sketches(self, run_id: str, sketches: dict):
+        """Upserts the duration sketches of some operations of a run, without committing."""
+        self.connect().executemany(
+            """
+            INSERT INTO operation_sketches (run_id, name, sketch_json) VALUES (?, ?, ?)
+            ON CONFLICT (run_id, name) DO UPDATE SET sketch_json = excluded.sketch_json
+            """,
+            [(run_id, name, json.dumps(sketch)) for name, sketch in sketches.items()],
+        )
+
+    def get_operation_sketches(self, run_id: str) -> dict:
+        """Fetches the stored duration sketches of a run, or builds them from its operations if it has none
+        (runs logged before sketches existed)."""
+        rows = (
+            self.connect()
+            .execute(
+                "SELECT name, sketch_json FROM operation_sketches WHERE run_id = ?",
+                (run_id,),
+            )
+            .fetchall()
+        )
+        if not rows:
+            return super().get_operation_sketches(run_id)
+        return {row["name"]: json.loads(row["sketch_json"]) for row in rows}
+
     def start_update_run(self, run_id: str, status: str):
         """Updates the status of a run."""
         conn = self.connect()
@@ -271,13 +852,18 @@ class Chrima(Limani):
         conn.commit()
 
     def end_run_update(self, run_id: str, end_time: float, status: str, summary: dict):
-        """Updates a run at the end with final status, time, and summary."""
+        """Updates a run at the end with final status, time, and summary, then folds it into the daily rollups."""
         conn = self.connect()
         conn.execute(
             "UPDATE runs SET end_time = ?, status = ?, summary_json = ? WHERE id = ?",
             (end_time, status, json.dumps(summary), run_id),
         )
         conn.commit()
+        try:
+            self._fold_daily_rollups()
+        except sqlite3.Error:
+            # The run is saved, the next fold (stats, prune or the end of another run) picks it up.
+            conn.rollback()
 
     def get_facts_for_timespan(
         self, run_id: str, start_time: float, end_time: float
@@ -292,40 +878,82 @@ class Chrima(Limani):
         return [dict(row) for row in cursor.fetchall()]
 
     def get_run_summary_stats(self, run_id: str) -> dict:
-        """Calculates summary statistics for a given run."""
-        conn = self.connect()
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT count(*) FROM operations WHERE run_id = ?", (run_id,))
-        total_ops = cursor.fetchone()[0]
-
-        cursor.execute(
-            "SELECT count(*) FROM operations WHERE run_id = ? AND changed = 1",
-            (run_id,),
+        """Reads the summary statistics of a run from its rollup, counting them for runs that have none."""
+        row = (
+            self.connect()
+            .execute("SELECT * FROM run_rollups WHERE run_id = ?", (run_id,))
+            .fetchone()
         )
-        changed_ops = cursor.fetchone()[0]
+        if row is None:
+            return self._count_summary_stats(run_id)
+        return rollup_summary(self._run_rollup(row))
 
-        cursor.execute(
-            "SELECT count(*) FROM operations WHERE run_id = ? AND success = 0",
+    def get_run_progress(self, run_id: str) -> dict:
+        """Reads the rollups of a run and its hosts, without touching its operations (see Limani.get_run_progress)."""
+        conn = self.connect()
+        row = conn.execute(
+            "SELECT * FROM run_rollups WHERE run_id = ?", (run_id,)
+        ).fetchone()
+        hosts = conn.execute(
+            "SELECT name, summary_json FROM hosts WHERE run_id = ? ORDER BY name ASC",
             (run_id,),
-        )
-        failed_ops = cursor.fetchone()[0]
+        ).fetchall()
+        if row is None or any(host["summary_json"] is None for host in hosts):
+            return super().get_run_progress(run_id)
 
-        cursor.execute(
-            "SELECT sum(duration) FROM operations WHERE run_id = ?", (run_id,)
-        )
-        total_duration_result = cursor.fetchone()[0]
-        total_duration = (
-            round(total_duration_result, 4) if total_duration_result else 0.0
-        )
+        return {
+            "run": rollup_summary(self._run_rollup(row)),
+            "hosts": {
+                host["name"]: rollup_summary(json.loads(host["summary_json"]))
+                for host in hosts
+            },
+        }
 
+    def _run_rollup(self, row: sqlite3.Row) -> dict:
+        """Turns a run_rollups row into a rollup dict."""
         return {
-            "total_operations": total_ops,
-            "changed_operations": changed_ops,
-            "successful_operations": total_ops - failed_ops,
-            "failed_operations": failed_ops,
-            "total_duration": total_duration,
+            "total_operations": row["total_operations"],
+            "changed_operations": row["changed_operations"],
+            "failed_operations": row["failed_operations"],
+            "total_duration": row["total_duration"],
+            "slowest_operation": {
+                "name": row["slowest_name"],
+                "host": row["slowest_host"],
+                "duration": row["slowest_duration"],
+            }
+            if row["slowest_duration"] is not None
+            else None,
+        }
+
+    def _count_summary_stats(self, run_id: str) -> dict:
+        """Counts the summary statistics of a run logged before rollups (or archived) from its operations."""
+        if self._archived(run_id):
+            return super().get_run_progress(run_id)["run"]
+
+        conn = self.connect()
+        total, changed, failed, duration = conn.execute(
+            "SELECT count(*), coalesce(sum(changed), 0), coalesce(sum(1 - success), 0), coalesce(sum(duration), 0.0) FROM operations WHERE run_id = ?",
+            (run_id,),
+        ).fetchone()
+        slowest = conn.execute(
+            "SELECT o.name, h.name, o.duration FROM operations o JOIN hosts h ON o.host_id = h.id WHERE o.run_id = ? ORDER BY o.duration DESC LIMIT 1",
+            (run_id,),
+        ).fetchone()
+
+        rollup = {
+            "total_operations": total,
+            "changed_operations": changed,
+            "failed_operations": failed,
+            "total_duration": duration,
+            "slowest_operation": {
+                "name": slowest[0],
+                "host": slowest[1],
+                "duration": slowest[2],
+            }
+            if slowest
+            else None,
         }
+        return rollup_summary(rollup)
 
     def get_run_data(self, run_id: str):
         """Fetches all data for a specific run."""
@@ -335,15 +963,15 @@ class Chrima(Limani):
 
         run = conn.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
         if not run:
-            return None
+            return self._load_archive(run_id)
 
         ops_by_host = defaultdict(list)
         ops_cursor = conn.execute(
             "SELECT * FROM operations WHERE run_id = ? ORDER BY timestamp ASC",
             (run_id,),
         )
-        for op in ops_cursor:
-            ops_by_host[op["host_id"]].append(dict(op))
+        for op in self._hydrate(ops_cursor):
+            ops_by_host[op["host_id"]].append(op)
 
         hosts_cursor = conn.execute("SELECT * FROM hosts WHERE run_id = ?", (run_id,))
         hosts = []
@@ -370,3 +998,426 @@ class Chrima(Limani):
             "snapshots": snapshots,
             "fact_logs": fact_logs,
         }
+
+    def get_run(self, run_id: str):
+        """Fetches the row of a run."""
+        row = (
+            self.connect()
+            .execute("SELECT * FROM runs WHERE id = ?", (run_id,))
+            .fetchone()
+        )
+        if row:
+            return dict(row)
+        archived = self._load_archive(run_id)
+        return archived["run"] if archived else None
+
+    def iter_hosts(self, run_id: str):
+        """Iterates over the hosts of a run, ordered by name."""
+        if self._archived(run_id):
+            yield from super().iter_hosts(run_id)
+            return
+
+        cursor = self.connect().execute(
+            "SELECT * FROM hosts WHERE run_id = ? ORDER BY name ASC", (run_id,)
+        )
+        for row in cursor:
+            yield dict(row)
+
+    def iter_operations(self, run_id: str, order_by: str = "timestamp"):
+        """Iterates over the operations of a run straight from a cursor."""
+        if self._archived(run_id):
+            yield from super().iter_operations(run_id, order_by)
+            return
+
+        orders = {
+            "timestamp": "o.timestamp ASC, o.id ASC",
+            "host": "h.name ASC, o.timestamp ASC, o.id ASC",
+            "name": "o.name ASC, o.duration ASC",
+        }
+        if order_by not in orders:
+            raise ValueError(f"Unknown operation order: {order_by}")
+
+        cursor = self.connect().execute(
+            f"SELECT o.*, h.name as host_name FROM operations o JOIN hosts h ON o.host_id = h.id WHERE o.run_id = ? ORDER BY {orders[order_by]}",
+            (run_id,),
+        )
+        yield from self._hydrate(cursor)
+
+    def iter_snapshots(self, run_id: str):
+        """Iterates over the resource snapshots of a run straight from a cursor."""
+        if self._archived(run_id):
+            yield from super().iter_snapshots(run_id)
+            return
+
+        cursor = self.connect().execute(
+            "SELECT s.*, h.name as host_name FROM resource_snapshots s JOIN hosts h ON s.host_id = h.id WHERE s.run_id = ? ORDER BY s.timestamp ASC",
+            (run_id,),
+        )
+        for row in cursor:
+            yield dict(row)
+
+    def iter_fact_logs(self, run_id: str):
+        """Iterates over the fact logs of a run straight from a cursor."""
+        if self._archived(run_id):
+            yield from super().iter_fact_logs(run_id)
+            return
+
+        cursor = self.connect().execute(
+            "SELECT * FROM command_n_facts_in_order WHERE run_id = ? ORDER BY timestamp ASC",
+            (run_id,),
+        )
+        for row in cursor:
+            yield dict(row)
+
+    def iter_operation_stats(
+        self,
+        run_ids: list[str],
+        names: list[str] | None = None,
+        hosts: list[str] | None = None,
+    ):
+        """Iterates over the numbers of the operations of some runs, straight from idx_operations_stats."""
+        archived = [run_id for run_id in run_ids if self._archived(run_id)]
+        if archived:
+            yield from super().iter_operation_stats(archived, names=names, hosts=hosts)
+
+        live = [run_id for run_id in run_ids if run_id not in archived]
+        conn = self.connect()
+        for start in range(0, len(live), 500):
+            chunk = live[start : start + 500]
+            conditions = [f"o.run_id IN ({', '.join('?' for _ in chunk)})"]
+            params = list(chunk)
+            if names:
+                conditions.append(f"o.name IN ({', '.join('?' for _ in names)})")
+                params += names
+            if hosts:
+                conditions.append(f"h.name IN ({', '.join('?' for _ in hosts)})")
+                params += hosts
+
+            cursor = conn.execute(
+                f"""
+                SELECT o.run_id, o.name, h.name AS host, o.timestamp, o.duration, o.changed, o.success
+                FROM operations o JOIN hosts h ON h.id = o.host_id
+                WHERE {" AND ".join(conditions)}
+                """,
+                params,
+            )
+            for row in cursor:
+                yield dict(row)
+
+    def iter_daily_rollups(
+        self,
+        since_day: int,
+        until_day: int,
+        names: list[str] | None = None,
+        hosts: list[str] | None = None,
+        by_name: bool = True,
+        by_host: bool = True,
+    ):
+        """Iterates over the stored daily rollups, folding the finished runs that weren't yet first.
+
+        Runs are folded as they end, so that's only the ones that didn't end through end_run_update. Rollups per
+            name and host aren't stored (see chaos.lib.analytics.ROLLUP_LEVELS), those are folded on the fly from
+            idx_operations_stats.
+        """
+        from chaos.lib.analytics import ALL
+
+        if (by_name or names) and (by_host or hosts):
+            yield from super().iter_daily_rollups(
+                since_day, until_day, names, hosts, by_name, by_host
+            )
+            return
+
+        self._fold_daily_rollups()
+
+        conditions = ["day BETWEEN ? AND ?"]
+        params: list[Any] = [since_day, until_day]
+        for column, values, split in (
+            ("name", names, by_name),
+            ("host", hosts, by_host),
+        ):
+            if values:
+                conditions.append(f"{column} IN ({', '.join('?' for _ in values)})")
+                params += values
+            else:
+                conditions.append(f"{column} {'!=' if split else '='} ?")
+                params.append(ALL)
+
+        cursor = self.connect().execute(
+            f"SELECT * FROM daily_rollups WHERE {' AND '.join(conditions)}", params
+        )
+        for row in cursor:
+            rollup = dict(row)
+            rollup["sketch"] = json.loads(rollup.pop("sketch_json"))
+            yield rollup
+
+    def _fold_daily_rollups(self, batch_operations: int = 200_000) -> int:
+        """Folds the finished runs that aren't in the daily rollups yet into them (see ROLLUP_LEVELS).
+
+        Runs are folded in batches of about `batch_operations` operations, each batch committed together with
+            the runs it folded, so an interrupted fold just picks up where it stopped.
+
+        Returns:
+            - How many runs were folded.
+        """
+        import time
+
+        from chaos.lib.analytics import fold_operations
+
+        conn = self.connect()
+        pending = conn.execute(
+            """
+            SELECT r.id, (SELECT count(*) FROM operations o WHERE o.run_id = r.id) AS operations
+            FROM runs r
+            WHERE r.status != 'in_progress' AND r.id NOT IN (SELECT run_id FROM daily_rollup_runs)
+            ORDER BY r.start_time ASC
+            """
+        ).fetchall()
+
+        batches: list[list[str]] = [[]]
+        size = 0
+        for run in pending:
+            if batches[-1] and size + run["operations"] > batch_operations:
+                batches.append([])
+                size = 0
+            batches[-1].append(run["id"])
+            size += run["operations"]
+
+        for run_ids in batches:
+            if not run_ids:
+                continue
+            entries = fold_operations(self.iter_operation_stats(run_ids))
+            self._merge_daily_rollups(conn, entries)
+            folded_at = time.time()
+            conn.executemany(
+                "INSERT OR IGNORE INTO daily_rollup_runs (run_id, folded_at) VALUES (?, ?)",
+                [(run_id, folded_at) for run_id in run_ids],
+            )
+            conn.commit()
+
+        return len(pending)
+
+    def _merge_daily_rollups(self, conn: sqlite3.Connection, entries: dict) -> None:
+        """Adds freshly folded rollups (see chaos.lib.analytics.fold_operations) into the stored ones, without committing."""
+        from chaos.lib.analytics import merge_entry
+        from chaos.lib.sketch import QuantileSketch
+
+        for day in sorted({key[0] for key in entries}):
+            for row in conn.execute(
+                "SELECT * FROM daily_rollups WHERE day = ?", (day,)
+            ):
+                entry = entries.get((day, row["name"], row["host"]))
+                if entry is None:
+                    continue
+                merge_entry(
+                    entry,
+                    {
+                        "count": row["count"],
+                        "changed": row["changed"],
+                        "failed": row["failed"],
+                        "total_duration": row["total_duration"],
+                        "max_duration": row["max_duration"],
+                        "sketch": QuantileSketch.from_dict(
+                            json.loads(row["sketch_json"])
+                        ),
+                    },
+                )
+
+        conn.executemany(
+            """
+            INSERT INTO daily_rollups (day, name, host, count, changed, failed, total_duration, max_duration, sketch_json)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (day, name, host) DO UPDATE SET
+                count = excluded.count,
+                changed = excluded.changed,
+                failed = excluded.failed,
+                total_duration = excluded.total_duration,
+                max_duration = excluded.max_duration,
+                sketch_json = excluded.sketch_json
+            """,
+            [
+                (
+                    day,
+                    name,
+                    host,
+                    entry["count"],
+                    entry["changed"],
+                    entry["failed"],
+                    entry["total_duration"],
+                    entry["max_duration"],
+                    json.dumps(entry["sketch"].to_dict()),
+                )
+                for (day, name, host), entry in entries.items()
+            ],
+        )
+
+    def _archive_path(self, run_id: str) -> Path:
+        """Where the archive of a run goes, next to the database."""
+        return (
+            self.get_db_path().parent
+            / "archive"
+            / f"{run_id.replace(os.sep, '_')}.json.gz"
+        )
+
+    def _load_archive(self, run_id: str):
+        """Reads an archived run back, in the same shape as get_run_data, or None if it isn't archived."""
+        import gzip
+
+        path = self._archive_path(run_id)
+        if not path.exists():
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _archived(self, run_id: str) -> bool:
+        """Whether a run only lives in its archive anymore."""
+        if not self._archive_path(run_id).exists():
+            return False
+        row = (
+            self.connect()
+            .execute("SELECT 1 FROM runs WHERE id = ?", (run_id,))
+            .fetchone()
+        )
+        return row is None
+
+    def _write_archive(self, run_id: str) -> Path:
+        """Writes a run to a gzipped JSON archive shaped like get_run_data, one row at a time."""
+        import gzip
+
+        conn = self.connect()
+        path = self._archive_path(run_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(path.name + ".partial")
+
+        run = conn.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+        if not run:
+            raise ValueError(f"Run {run_id} not found.")
+
+        with gzip.open(partial, "wt", encoding="utf-8") as f:
+            f.write(f'{{"run": {json.dumps(dict(run))}, "hosts": [')
+            hosts = conn.execute(
+                "SELECT * FROM hosts WHERE run_id = ? ORDER BY name ASC", (run_id,)
+            ).fetchall()
+            for i, host in enumerate(hosts):
+                # The host object, left open to append its operations.
+                f.write(
+                    ("," if i else "")
+                    + json.dumps(dict(host))[:-1]
+                    + ', "operations": ['
+                )
+                ops = conn.execute(
+                    "SELECT * FROM operations WHERE run_id = ? AND host_id = ? ORDER BY timestamp ASC, id ASC",
+                    (run_id, host["id"]),
+                )
+                for j, op in enumerate(self._hydrate(ops)):
+                    f.write(("," if j else "") + json.dumps(op))
+                f.write("]}")
+
+            f.write('], "snapshots": [')
+            for i, snap in enumerate(self.iter_snapshots(run_id)):
+                f.write(("," if i else "") + json.dumps(snap))
+
+            f.write('], "fact_logs": [')
+            for i, log in enumerate(self.iter_fact_logs(run_id)):
+                f.write(("," if i else "") + json.dumps(log))
+            f.write("]}")
+
+        os.replace(partial, path)
+        return path
+
+    def list_runs(self):
+        """Lists the runs in the database, newest first (archived runs aren't listed)."""
+        rows = (
+            self.connect()
+            .execute(
+                "SELECT id, run_id_human, start_time, end_time, status FROM runs ORDER BY start_time DESC"
+            )
+            .fetchall()
+        )
+        return [dict(row) for row in rows]
+
+    def delete_runs(self, run_ids: list[str], archive: bool = False):
+        """Deletes runs, archiving each one first if asked to.
+
+        Follows the ON DELETE CASCADE chain of the schema by hand, children first, so every delete goes
+            through a run_id index (letting the cascade do it would scan `operations` for every deleted host,
+            there's no index on operations.host_id). The finished runs are folded into the daily rollups first,
+            so the stats over days keep counting the deleted ones.
+        """
+        self._fold_daily_rollups()
+
+        archived = {}
+        if archive:
+            for run_id in run_ids:
+                archived[run_id] = str(self._write_archive(run_id))
+
+        conn = self.connect()
+        tables = [
+            ("operations", "run_id"),
+            ("resource_snapshots", "run_id"),
+            ("command_n_facts_in_order", "run_id"),
+            ("operation_sketches", "run_id"),
+            ("run_rollups", "run_id"),
+            ("hosts", "run_id"),
+            ("runs", "id"),
+        ]
+        try:
+            for start in range(0, len(run_ids), 500):
+                chunk = run_ids[start : start + 500]
+                marks = ", ".join("?" for _ in chunk)
+                self._release_blobs(conn, f"run_id IN ({marks})", chunk)
+                for table, column in tables:
+                    conn.execute(
+                        f"DELETE FROM {table} WHERE {column} IN ({marks})", chunk
+                    )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        return archived
+
+    def compact(self, mode: str = "incremental"):
+        """Frees the pages of deleted rows: with incremental_vacuum, or a full VACUUM.
+
+        Databases created before auto_vacuum was turned on can't vacuum incrementally, the first
+            incremental compaction switches them over, which takes a full VACUUM. Databases created before
+            the blobs table get their old operation texts moved to it first (see _migrate_inline_texts).
+        """
+        if mode not in ("incremental", "full"):
+            raise ValueError(f"Unknown compaction mode: {mode}")
+
+        db_path = self.get_db_path()
+
+        def _size() -> int:
+            return sum(
+                p.stat().st_size
+                for p in db_path.parent.glob(f"{db_path.name}*")
+                if p.is_file()
+            )
+
+        conn = self.connect()
+        conn.commit()
+        size_before = _size()
+        migrated = self._migrate_inline_texts()
+
+        if (
+            mode == "incremental"
+            and conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2
+        ):
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            mode = "full"
+
+        if mode == "full":
+            conn.execute("VACUUM")
+        else:
+            # executescript runs it to completion, execute would only free the first page.
+            conn.executescript("PRAGMA incremental_vacuum;")
+
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        conn.commit()
+        return {
+            "mode": mode,
+            "size_before": size_before,
+            "size_after": _size(),
+            "migrated": migrated,
+        }
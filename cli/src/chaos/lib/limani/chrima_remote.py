@@ -0,0 +1,475 @@
+"""
+Ch-rima behind a logbook daemon, for when several `chaos apply --logbook` share one
+database.
+
+SQLite takes one writer at a time, so a handful of processes each committing their own
+    batches end up waiting on each other's locks until one gives up with "database is
+    locked". The daemon (`chaos logbook serve`) is the only writer instead: it listens
+    on a unix socket next to the database, takes the committed batches of any number of
+    processes and writes them from a single thread, as many batches per transaction as
+    there are waiting.
+
+RemoteChrima is the Limani for the clients (`limani: chrima-remote`): writes go through
+    the daemon, reads go straight to the database (WAL lets them run next to the
+    writer), and with no daemon around it's just Ch-rima.
+
+Protocol: one JSON object per line each way. A request is {"method", "args", "kwargs"}
+    for a call (CALLS) or {"method": "commit", "writes": [[method, args, kwargs], ...]}
+    for a batch (WRITES), the reply is {"ok": true, "result": ...} or
+    {"ok": false, "error": "..."}.
+"""
+
+from __future__ import annotations
+
+import json
+import queue
+import socket
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any
+
+from .chrima import Chrima
+
+_thread_local = threading.local()
+_warned = threading.Event()
+
+# What the daemon runs for its clients: calls reply with their result and commit by
+# themselves, writes are buffered by the client until it commits and then written (and
+# committed) by the daemon in one go.
+CALLS = (
+    "init_db",
+    "create_run",
+    "register_hosts",
+    "get_or_create_host",
+    "start_update_run",
+    "end_run_update",
+)
+WRITES = (
+    "insert_many_operations",
+    "insert_many_snapshots",
+    "insert_many_fact_logs",
+    "save_operation_sketches",
+)
+
+# How many waiting batches the daemon puts in one transaction, and how long a client
+# waits for a reply.
+DAEMON_MAX_GROUP = 64
+DAEMON_TIMEOUT = 60.0
+
+
+class DaemonUnavailable(ConnectionError):
+    """The request never got to the daemon, so it's safe to write it directly."""
+
+
+def default_socket_path(limani: Chrima) -> Path:
+    """The daemon socket of a database: `chrima_socket`, or `<database>.sock`."""
+    configured = limani.config.get("chrima_socket")
+    if configured:
+        return Path(str(configured)).expanduser()
+    db_path = limani.get_db_path()
+    return db_path.with_name(f"{db_path.name}.sock")
+
+
+def _send(stream: Any, message: dict[str, Any]) -> None:
+    stream.write(json.dumps(message).encode() + b"\n")
+    stream.flush()
+
+
+class RemoteChrima(Chrima):
+    """Ch-rima writing through the logbook daemon (see the module docstring), or
+    straight to SQLite without one.
+
+    Each thread gets its own connection to the daemon, like it gets its own SQLite
+        connection. If the daemon isn't running when a thread first writes (or goes away
+        later), that thread falls back to direct writes for good. A batch that reached
+        the daemon but got no reply is not written again (it may well be committed);
+        the error goes up to the caller, same as a failed commit.
+    """
+
+    def _daemon(self) -> Any | None:
+        """This thread's connection to the daemon (a binary file over the socket).
+
+        Returns None when writing directly.
+        """
+        if hasattr(_thread_local, "daemon"):
+            return _thread_local.daemon
+
+        _thread_local.daemon = None
+        _thread_local.writes = []
+        if not hasattr(socket, "AF_UNIX"):
+            return None
+
+        path = default_socket_path(self)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(DAEMON_TIMEOUT)
+        try:
+            sock.connect(str(path))
+        except OSError:
+            sock.close()
+            if not _warned.is_set():
+                import sys
+
+                _warned.set()
+                print(
+                    f"Warning: no logbook daemon at {path} "
+                    "(see `chaos logbook serve`), writing to the logbook directly.",
+                    file=sys.stderr,
+                )
+            return None
+
+        _thread_local.socket = sock
+        _thread_local.daemon = sock.makefile("rwb")
+        return _thread_local.daemon
+
+    def _drop_daemon(self) -> None:
+        """Closes this thread's daemon connection, writing directly from then on."""
+        stream = getattr(_thread_local, "daemon", None)
+        sock = getattr(_thread_local, "socket", None)
+        for owned in (stream, sock):
+            if owned is not None:
+                try:
+                    owned.close()
+                except OSError:
+                    pass
+        _thread_local.daemon = None
+        _thread_local.socket = None
+
+    def _request(self, stream: Any, message: dict[str, Any]) -> Any:
+        """Sends a request to the daemon and waits for its reply.
+
+        Raises:
+            DaemonUnavailable: If the request couldn't be sent.
+            ConnectionError: If the daemon went away before replying.
+            RuntimeError: If the daemon replied with an error.
+        """
+        try:
+            _send(stream, message)
+        except OSError as e:
+            self._drop_daemon()
+            raise DaemonUnavailable(str(e))
+
+        try:
+            line = stream.readline()
+        except OSError as e:
+            line = b""
+            error = e
+        else:
+            error = None
+        if not line:
+            self._drop_daemon()
+            reason = error or "connection closed"
+            raise ConnectionError(
+                f"The logbook daemon went away before replying: {reason}"
+            )
+
+        reply = json.loads(line)
+        if not reply.get("ok"):
+            raise RuntimeError(f"Logbook daemon: {reply.get('error')}")
+        return reply.get("result")
+
+    def _call(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        """Runs one of CALLS on the daemon, or directly without one.
+
+        Calls commit by themselves in Ch-rima, taking whatever was written before along,
+            so the buffered writes are sent first here too.
+        """
+        self.commit()
+        stream = self._daemon()
+        if stream is not None:
+            try:
+                return self._request(
+                    stream, {"method": method, "args": list(args), "kwargs": kwargs}
+                )
+            except DaemonUnavailable:
+                pass
+        return getattr(super(), method)(*args, **kwargs)
+
+    def _write(self, method: str, *args: Any) -> None:
+        """Buffers one of WRITES until the next commit (or writes it directly)."""
+        if self._daemon() is not None:
+            _thread_local.writes.append([method, list(args), {}])
+            return
+        getattr(super(), method)(*args)
+
+    def disconnect(self):
+        """Closes this thread's connections, to the daemon and to the database.
+
+        Uncommitted writes are dropped.
+        """
+        self._drop_daemon()
+        _thread_local.writes = []
+        del _thread_local.daemon
+        super().disconnect()
+
+    # The writing side of the Limani: CALLS go to the daemon right away, WRITES wait for
+    # the next commit.
+
+    def init_db(self):
+        return self._call("init_db")
+
+    def create_run(
+        self,
+        run_id: str,
+        run_id_human: str,
+        start_time: float,
+        hailer_info: dict,
+        needed_secrets: set,
+    ) -> str:
+        return self._call(
+            "create_run",
+            run_id,
+            run_id_human,
+            start_time,
+            hailer_info,
+            sorted(needed_secrets),
+        )
+
+    def register_hosts(self, run_id: str, host_names: list[str]) -> dict[str, int]:
+        return self._call("register_hosts", run_id, host_names)
+
+    def get_or_create_host(self, run_id: str, host_name: str) -> int:
+        return self._call("get_or_create_host", run_id, host_name)
+
+    def start_update_run(self, run_id: str, status: str):
+        return self._call("start_update_run", run_id, status)
+
+    def end_run_update(self, run_id: str, end_time: float, status: str, summary: dict):
+        return self._call("end_run_update", run_id, end_time, status, summary)
+
+    def insert_many_operations(self, rows: list[dict]):
+        self._write("insert_many_operations", rows)
+
+    def insert_many_snapshots(self, rows: list[dict]):
+        self._write("insert_many_snapshots", rows)
+
+    def insert_many_fact_logs(self, rows: list[dict]):
+        self._write("insert_many_fact_logs", rows)
+
+    def save_operation_sketches(self, run_id: str, sketches: dict):
+        self._write("save_operation_sketches", run_id, sketches)
+
+    def insert_snapshot(
+        self, run_id: str, host_id: int, stage: str, timestamp: float, metrics: dict
+    ):
+        self.insert_many_snapshots(
+            [
+                {
+                    "run_id": run_id,
+                    "host_id": host_id,
+                    "stage": stage,
+                    "timestamp": timestamp,
+                    "metrics": metrics,
+                }
+            ]
+        )
+        self.commit()
+
+    def insert_fact_log(
+        self, run_id: str, timestamp: float, log_level: str, context: str, command: str
+    ):
+        self.insert_many_fact_logs(
+            [
+                {
+                    "run_id": run_id,
+                    "timestamp": timestamp,
+                    "log_level": log_level,
+                    "context": context,
+                    "command": command,
+                }
+            ]
+        )
+        self.commit()
+
+    def commit(self):
+        """Sends the writes buffered since the last commit to the daemon, as one batch.
+
+        Without a daemon, it just commits directly.
+        """
+        stream = self._daemon()
+        if stream is None:
+            return super().commit()
+
+        writes, _thread_local.writes = _thread_local.writes, []
+        if not writes:
+            return None
+        try:
+            self._request(stream, {"method": "commit", "writes": writes})
+        except DaemonUnavailable:
+            for method, args, kwargs in writes:
+                getattr(super(), method)(*args, **kwargs)
+            super().commit()
+
+    def rollback(self):
+        """Drops the writes buffered since the last commit (or rolls back directly)."""
+        if self._daemon() is None:
+            return super().rollback()
+        _thread_local.writes = []
+
+
+class _Request:
+    """A request waiting for the daemon's writer, and its reply once done."""
+
+    __slots__ = ("message", "reply", "done")
+
+    def __init__(self, message: dict[str, Any]):
+        self.message = message
+        self.reply: dict[str, Any] = {"ok": True, "result": None}
+        self.done = threading.Event()
+
+    def fail(self, error: BaseException) -> None:
+        self.reply = {"ok": False, "error": f"{type(error).__name__}: {error}"}
+
+
+class LogbookDaemon:
+    """The only writer of a Ch-rima database, serving RemoteChrima clients.
+
+    Every client connection gets a thread that reads its requests and waits for their
+        replies, while a single writer thread runs them. The writer takes whatever is
+        waiting (up to DAEMON_MAX_GROUP requests) and writes all the committed batches
+        in one transaction, each in a savepoint so a bad batch is rolled back and
+        reported alone. Calls (creating runs, registering hosts...) run between batches,
+        in arrival order.
+
+    Usage:
+        ```python
+        daemon = LogbookDaemon(Chrima(config), socket_path)
+        daemon.serve_forever()  # until daemon.shutdown(), from another thread
+        ```
+    """
+
+    def __init__(self, limani: Chrima, path: Path):
+        self.limani = limani
+        self.path = Path(path)
+        self.requests: queue.Queue[_Request | None] = queue.Queue()
+        self.served = 0
+        self._server: Any = None
+        self._writer: threading.Thread | None = None
+
+    def bind(self) -> None:
+        """Creates the socket (only readable by this user).
+
+        A stale socket left by a daemon that died is replaced.
+
+        Raises:
+            RuntimeError: If another daemon is already serving that socket.
+        """
+        import os
+        import socketserver
+
+        if self.path.exists():
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(str(self.path))
+            except OSError:
+                self.path.unlink()
+            else:
+                raise RuntimeError(f"A logbook daemon is already serving {self.path}.")
+            finally:
+                probe.close()
+
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                for line in self.rfile:
+                    request = _Request(json.loads(line))
+                    daemon.requests.put(request)
+                    request.done.wait()
+                    _send(self.wfile, request.reply)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._server = socketserver.ThreadingUnixStreamServer(str(self.path), Handler)
+        self._server.daemon_threads = True
+        os.chmod(self.path, 0o600)
+
+    def serve_forever(self) -> None:
+        """Serves until shutdown, then writes what's left and removes the socket."""
+        if self._server is None:
+            self.bind()
+        self.limani.init_db()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            self.requests.put(None)
+            self._writer.join()
+            self.path.unlink(missing_ok=True)
+
+    def shutdown(self) -> None:
+        """Stops serve_forever (from another thread)."""
+        if self._server is not None:
+            self._server.shutdown()
+
+    def _write_loop(self) -> None:
+        self.limani.connect()
+        stop = False
+        while not stop:
+            group = [self.requests.get()]
+            while len(group) < DAEMON_MAX_GROUP and group[-1] is not None:
+                try:
+                    group.append(self.requests.get_nowait())
+                except queue.Empty:
+                    break
+            stop = group[-1] is None
+            self._run_group([request for request in group if request is not None])
+        self.limani.disconnect()
+
+    def _run_group(self, group: list[_Request]) -> None:
+        """Runs a group of requests, batches between two calls sharing a transaction."""
+        batches: list[_Request] = []
+        for request in group:
+            method = request.message.get("method")
+            if method == "commit":
+                batches.append(request)
+                continue
+
+            self._commit_batches(batches)
+            batches = []
+            try:
+                if method not in CALLS:
+                    raise ValueError(f"Unknown logbook call: {method}")
+                result = getattr(self.limani, method)(
+                    *request.message.get("args", []),
+                    **request.message.get("kwargs", {}),
+                )
+                request.reply = {"ok": True, "result": result}
+            except Exception as e:
+                self.limani.connect().rollback()
+                request.fail(e)
+            self.served += 1
+            request.done.set()
+
+        self._commit_batches(batches)
+
+    def _commit_batches(self, batches: list[_Request]) -> None:
+        """Writes some batches in one transaction, each in its own savepoint."""
+        if not batches:
+            return
+
+        conn = self.limani.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for request in batches:
+                conn.execute("SAVEPOINT batch")
+                try:
+                    for method, args, kwargs in request.message.get("writes", []):
+                        if method not in WRITES:
+                            raise ValueError(f"Unknown logbook write: {method}")
+                        getattr(self.limani, method)(*args, **kwargs)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO batch")
+                    request.fail(e)
+                conn.execute("RELEASE batch")
+            conn.commit()
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.rollback()
+            for request in batches:
+                request.fail(e)
+
+        for request in batches:
+            self.served += 1
+            request.done.set()
@@ -1,8 +1,60 @@
 """Abstract base class for Limani logbook and telemetry database drivers."""
 
 from abc import ABC, abstractmethod
+from collections.abc import Iterator
 from typing import Any
 
+OPERATION_ORDERS = ("timestamp", "host", "name")
+
+
+def empty_rollup() -> dict[str, Any]:
+    """The counters of a run or host that has no operations yet, see Limani.get_run_progress."""
+    return {
+        "total_operations": 0,
+        "changed_operations": 0,
+        "failed_operations": 0,
+        "total_duration": 0.0,
+        "slowest_operation": None,
+    }
+
+
+def add_to_rollup(
+    rollup: dict[str, Any],
+    name: str,
+    host: str | None,
+    duration: float,
+    changed: bool,
+    success: bool,
+) -> dict[str, Any]:
+    """Counts one operation into a rollup (see empty_rollup), in place.
+
+    Returns:
+        - The same rollup.
+    """
+    rollup["total_operations"] += 1
+    rollup["changed_operations"] += int(bool(changed))
+    rollup["failed_operations"] += int(not success)
+    rollup["total_duration"] += duration
+    slowest = rollup["slowest_operation"]
+    if slowest is None or duration > slowest["duration"]:
+        rollup["slowest_operation"] = {"name": name, "host": host, "duration": duration}
+    return rollup
+
+
+def rollup_summary(rollup: dict[str, Any]) -> dict[str, Any]:
+    """Turns a rollup into the summary a run (or host) reports, as get_run_summary_stats returns it."""
+    return {
+        "total_operations": rollup["total_operations"],
+        "changed_operations": rollup["changed_operations"],
+        "successful_operations": rollup["total_operations"]
+        - rollup["failed_operations"],
+        "failed_operations": rollup["failed_operations"],
+        "total_duration": round(rollup["total_duration"], 4)
+        if rollup["total_duration"]
+        else 0.0,
+        "slowest_operation": rollup["slowest_operation"],
+    }
+
 
 class Limani(ABC):
     """Abstract base class for Limani implementations.
@@ -146,6 +198,269 @@ class Limani(ABC):
 
         raise NotImplementedError
 
+    def register_hosts(self, run_id: str, host_names: list[str]) -> dict[str, int]:
+        """Gets or creates every host of a run at once.
+
+        Called once at the start of a run for the whole inventory, so the telemetry can resolve
+            host IDs from memory afterwards. The default implementation loops over `get_or_create_host`.
+
+        Args:
+            run_id (str): The ID of the run the hosts belong to.
+            host_names (list[str]): The names of the hosts.
+
+        Returns:
+            dict[str, int]: The ID of each host, by name.
+        """
+
+        return {name: self.get_or_create_host(run_id, name) for name in host_names}
+
+    def insert_many_operations(self, rows: list[dict[str, Any]]) -> None:
+        """Inserts several operations at once, without committing (see `commit`).
+
+        The default implementation just loops over `insert_operation`, so Limanis that don't care
+            about batching keep working as they are.
+
+        Args:
+            rows (list[dict]): The keyword arguments of one `insert_operation` call per operation.
+        """
+
+        for row in rows:
+            self.insert_operation(**row)
+
+    def insert_many_snapshots(self, rows: list[dict[str, Any]]) -> None:
+        """Inserts several resource snapshots at once, without committing (see `commit`).
+
+        Args:
+            rows (list[dict]): The keyword arguments of one `insert_snapshot` call per snapshot.
+        """
+
+        for row in rows:
+            self.insert_snapshot(**row)
+
+    def insert_many_fact_logs(self, rows: list[dict[str, Any]]) -> None:
+        """Inserts several fact log entries at once, without committing (see `commit`).
+
+        Args:
+            rows (list[dict]): The keyword arguments of one `insert_fact_log` call per entry.
+        """
+
+        for row in rows:
+            self.insert_fact_log(**row)
+
+    def commit(self) -> None:
+        """Commits everything written by the insert_many_* methods.
+
+        Called once per batch by the telemetry writer. The default is a no-op, since the default
+            insert_many_* methods go through the single inserts, which commit by themselves.
+        """
+
+        return None
+
+    def rollback(self) -> None:
+        """Drops everything written by the insert_many_* methods since the last commit.
+
+        Called by the telemetry writer when a batch fails, before writing it again row by row. The default
+            is a no-op, like `commit`.
+        """
+
+        return None
+
+    def save_operation_sketches(
+        self, run_id: str, sketches: dict[str, dict[str, Any]]
+    ) -> None:
+        """Stores (replacing) the duration sketches of some operations of a run, without committing.
+
+        Sent by the telemetry every few seconds during a run (and once at its end) with the sketches
+            that changed, see chaos.lib.sketch. The default is a no-op: `get_operation_sketches` then
+            rebuilds them from the operations.
+
+        Args:
+            run_id (str): The ID of the run.
+            sketches (dict): The state (QuantileSketch.to_dict) of each sketch, by operation name.
+        """
+
+        return None
+
+    def list_runs(self) -> list[dict[str, Any]]:
+        """Lists every run stored, newest first, for `chaos logbook` retention.
+
+        Optional, Limanis that don't implement it can't be pruned.
+
+        Returns:
+            list[dict]: The id, run_id_human, start_time, end_time and status of each run.
+        """
+
+        raise NotImplementedError(
+            f"{type(self).__name__} doesn't support listing runs."
+        )
+
+    def delete_runs(self, run_ids: list[str], archive: bool = False) -> dict[str, str]:
+        """Deletes runs with everything that belongs to them (hosts, operations, snapshots, fact logs...).
+
+        Optional, Limanis that don't implement it can't be pruned.
+
+        Args:
+            run_ids (list[str]): The IDs of the runs to delete.
+            archive (bool): Write each run to a compressed archive first, which `get_run_data` keeps reading from.
+
+        Returns:
+            dict[str, str]: Where each archived run went, by run ID (empty without `archive`).
+        """
+
+        raise NotImplementedError(
+            f"{type(self).__name__} doesn't support deleting runs."
+        )
+
+    def compact(self, mode: str = "incremental") -> dict[str, Any]:
+        """Gives the space freed by deleted runs back to the system.
+
+        Optional, Limanis that don't implement it just aren't compacted.
+
+        Args:
+            mode (str): "incremental" (cheap, can be done after every prune) or "full" (rewrites everything).
+
+        Returns:
+            dict: What was done ("mode") and the size before and after, in bytes ("size_before", "size_after").
+        """
+
+        raise NotImplementedError(f"{type(self).__name__} doesn't support compaction.")
+
+    def get_operation_sketches(self, run_id: str) -> dict[str, dict[str, Any]]:
+        """Gets the duration sketches of every operation of a run.
+
+        The default implementation builds them from `iter_operations`.
+
+        Args:
+            run_id (str): The ID of the run.
+
+        Returns:
+            dict: The state (QuantileSketch.to_dict) of each sketch, by operation name.
+        """
+        from chaos.lib.sketch import QuantileSketch
+
+        sketches: dict[str, QuantileSketch] = {}
+        for op in self.iter_operations(run_id, order_by="name"):
+            sketches.setdefault(op["name"], QuantileSketch()).add(op["duration"])
+        return {name: sketch.to_dict() for name, sketch in sketches.items()}
+
+    def get_run_progress(self, run_id: str) -> dict[str, Any]:
+        """Gets the counters of a run and of each of its hosts, as they are right now.
+
+        Meant to be polled while the run goes (dashboards, `chaos logbook`...). The default implementation
+            counts them from `iter_operations`, Limanis that keep rollups as they write should override it.
+
+        Args:
+            run_id (str): The ID of the run.
+
+        Returns:
+            dict: "run" with the summary of the whole run (see rollup_summary) and "hosts" with one per host
+                name.
+        """
+
+        run = empty_rollup()
+        hosts = {host["name"]: empty_rollup() for host in self.iter_hosts(run_id)}
+        for op in self.iter_operations(run_id, order_by="host"):
+            for rollup in (run, hosts.setdefault(op["host_name"], empty_rollup())):
+                add_to_rollup(
+                    rollup,
+                    op["name"],
+                    op["host_name"],
+                    op["duration"],
+                    op["changed"],
+                    op["success"],
+                )
+        return {
+            "run": rollup_summary(run),
+            "hosts": {name: rollup_summary(rollup) for name, rollup in hosts.items()},
+        }
+
+    def iter_operation_stats(
+        self,
+        run_ids: list[str],
+        names: list[str] | None = None,
+        hosts: list[str] | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """Iterates over the numbers of the operations of some runs, for `chaos logbook stats`.
+
+        The default goes through `iter_operations`, Limanis that can read just these columns (from an index,
+            ideally) should override it.
+
+        Args:
+            run_ids (list[str]): The IDs of the runs.
+            names (list[str] | None): Only these operation names.
+            hosts (list[str] | None): Only these hosts.
+
+        Yields:
+            dict: run_id, name, host, timestamp, duration, changed and success of one operation at a time.
+        """
+
+        for run_id in run_ids:
+            for op in self.iter_operations(run_id):
+                if names and op["name"] not in names:
+                    continue
+                if hosts and op["host_name"] not in hosts:
+                    continue
+                yield {
+                    "run_id": run_id,
+                    "name": op["name"],
+                    "host": op["host_name"],
+                    "timestamp": op["timestamp"],
+                    "duration": op["duration"],
+                    "changed": bool(op["changed"]),
+                    "success": bool(op["success"]),
+                }
+
+    def iter_daily_rollups(
+        self,
+        since_day: int,
+        until_day: int,
+        names: list[str] | None = None,
+        hosts: list[str] | None = None,
+        by_name: bool = True,
+        by_host: bool = True,
+    ) -> Iterator[dict[str, Any]]:
+        """Iterates over the daily rollups of finished runs between two UTC days, for `chaos logbook stats`.
+
+        The default folds them from `list_runs` and `iter_operation_stats` on every call, Limanis that can keep
+            them precomputed should override it (see chaos.lib.analytics).
+
+        Args:
+            since_day (int): The first day (days since the epoch, UTC).
+            until_day (int): The last day, included.
+            names (list[str] | None): Only these operation names.
+            hosts (list[str] | None): Only these hosts.
+            by_name (bool): One rollup per operation name, otherwise ALL ("*") of them together (unless `names`
+                is given, the caller merges those itself).
+            by_host (bool): Same, for hosts.
+
+        Yields:
+            dict: day, name, host, count, changed, failed, total_duration, max_duration and the duration
+                sketch (QuantileSketch.to_dict) of one rollup at a time.
+        """
+        from chaos.lib.analytics import DAY, fold_operations, iter_windowed_operations
+
+        runs = [
+            run["id"]
+            for run in self.list_runs()
+            if run["status"] != "in_progress"
+            and run["start_time"] < (until_day + 1) * DAY
+            and (run["end_time"] or run["start_time"]) >= since_day * DAY
+        ]
+        operations = iter_windowed_operations(
+            self.iter_operation_stats(runs, names=names, hosts=hosts),
+            since_day,
+            until_day,
+        )
+        levels = [(by_name or bool(names), by_host or bool(hosts))]
+        for (day, name, host), entry in fold_operations(operations, levels).items():
+            yield {
+                "day": day,
+                "name": name,
+                "host": host,
+                **{key: value for key, value in entry.items() if key != "sketch"},
+                "sketch": entry["sketch"].to_dict(),
+            }
+
     @abstractmethod
     def create_run(
         self,
@@ -229,6 +544,102 @@ class Limani(ABC):
             run_id (str): The ID of the run to get summary statistics for.
 
         Returns:
-            dict: A dictionary containing summary statistics for the run.
+            dict: A dictionary containing summary statistics for the run (the keys of rollup_summary).
         """
         raise NotImplementedError
+
+    def get_run(self, run_id: str) -> dict[str, Any] | None:
+        """Gets the row of a run, without any of its operations, snapshots or logs.
+
+        The default implementation goes through `get_run_data`, override it to avoid loading the whole run.
+
+        Args:
+            run_id (str): The ID of the run.
+
+        Returns:
+            dict | None: The run (id, run_id_human, start_time, end_time, status, summary_json, hailer_json,
+                required_secrets), or None if it doesn't exist.
+        """
+
+        data = self.get_run_data(run_id)
+        return data["run"] if data else None
+
+    def iter_hosts(self, run_id: str) -> Iterator[dict[str, Any]]:
+        """Iterates over the hosts of a run, ordered by name.
+
+        Args:
+            run_id (str): The ID of the run.
+
+        Yields:
+            dict: One host (id, run_id, name, summary_json) at a time.
+        """
+
+        data = self.get_run_data(run_id)
+        for host in sorted(
+            data["hosts"] if data else [], key=lambda host: host["name"]
+        ):
+            yield {key: value for key, value in host.items() if key != "operations"}
+
+    def iter_operations(
+        self, run_id: str, order_by: str = "timestamp"
+    ) -> Iterator[dict[str, Any]]:
+        """Iterates over the operations of a run, one row at a time.
+
+        Limanis backed by something with cursors should override this (and the other iter_* methods) so
+            exporting a run never holds more than a row in memory. The default goes through `get_run_data`.
+
+        Args:
+            run_id (str): The ID of the run.
+            order_by (str): One of OPERATION_ORDERS:
+                - "timestamp": by timestamp.
+                - "host": by host name, then timestamp (the same order as `iter_hosts`).
+                - "name": by operation name, then duration.
+
+        Yields:
+            dict: One operation row (as stored, with the *_json columns still encoded) plus its "host_name".
+
+        Raises:
+            ValueError: If order_by is not a known order.
+        """
+
+        if order_by not in OPERATION_ORDERS:
+            raise ValueError(f"Unknown operation order: {order_by}")
+
+        data = self.get_run_data(run_id)
+        rows = [
+            {**op, "host_name": host["name"]}
+            for host in (data["hosts"] if data else [])
+            for op in host["operations"]
+        ]
+        keys = {
+            "timestamp": lambda row: row["timestamp"],
+            "host": lambda row: (row["host_name"], row["timestamp"]),
+            "name": lambda row: (row["name"], row["duration"]),
+        }
+        yield from sorted(rows, key=keys[order_by])
+
+    def iter_snapshots(self, run_id: str) -> Iterator[dict[str, Any]]:
+        """Iterates over the resource snapshots of a run, ordered by timestamp.
+
+        Args:
+            run_id (str): The ID of the run.
+
+        Yields:
+            dict: One snapshot row plus its "host_name".
+        """
+
+        data = self.get_run_data(run_id)
+        yield from data["snapshots"] if data else []
+
+    def iter_fact_logs(self, run_id: str) -> Iterator[dict[str, Any]]:
+        """Iterates over the fact/command logs of a run, ordered by timestamp.
+
+        Args:
+            run_id (str): The ID of the run.
+
+        Yields:
+            dict: One fact log row.
+        """
+
+        data = self.get_run_data(run_id)
+        yield from data["fact_logs"] if data else []
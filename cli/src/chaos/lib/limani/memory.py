@@ -0,0 +1,360 @@
+import json
+import threading
+from itertools import count
+from typing import Any
+
+from .limani import Limani, add_to_rollup, empty_rollup, rollup_summary
+
+
+class MemoryLimani(Limani):
+    """Limani implementation that keeps everything in memory.
+
+    Meant for benchmarks (see benchmarks/bench_logbook_overhead.py), tests and throwaway runs: nothing outlives the
+        process. Rows are kept the way Ch-rima stores them (booleans as ints, the *_json columns encoded), so the
+        telemetry pays the same encoding it does with a database and reports come out the same.
+    """
+
+    def __init__(self, config: dict[str, Any]):
+        """Initializes an empty logbook.
+
+        Args:
+            config (dict): The global configuration, nothing in it is used.
+        """
+        super().__init__(config)
+        self._lock = threading.Lock()
+        self._ids = count(1)
+        self.runs: dict[str, dict[str, Any]] = {}
+        self.rollups: dict[str, dict[str, Any]] = {}
+        self.hosts: dict[str, dict[str, dict[str, Any]]] = {}
+        self.host_rollups: dict[int, dict[str, Any]] = {}
+        self._host_names: dict[int, str] = {}
+        self.operations: dict[str, list[dict[str, Any]]] = {}
+        self.snapshots: dict[str, list[dict[str, Any]]] = {}
+        self.fact_logs: dict[str, list[dict[str, Any]]] = {}
+        self.sketches: dict[str, dict[str, dict[str, Any]]] = {}
+
+    def connect(self):
+        """There's nothing to connect to, returns the Limani itself."""
+        return self
+
+    def disconnect(self):
+        """There's nothing to disconnect from."""
+        return None
+
+    def init_db(self):
+        """Everything is created as it's first written."""
+        return None
+
+    def create_run(
+        self,
+        run_id: str,
+        run_id_human: str,
+        start_time: float,
+        hailer_info: dict,
+        needed_secrets: set,
+    ) -> str:
+        """Creates a new run, in progress."""
+        with self._lock:
+            self.runs[run_id] = {
+                "id": run_id,
+                "run_id_human": run_id_human,
+                "start_time": start_time,
+                "end_time": None,
+                "status": "in_progress",
+                "summary_json": None,
+                "hailer_json": json.dumps(hailer_info),
+                "required_secrets": json.dumps(list(needed_secrets)),
+            }
+            self.rollups[run_id] = empty_rollup()
+            self.hosts.setdefault(run_id, {})
+        return run_id
+
+    def get_or_create_host(self, run_id: str, host_name: str) -> int:
+        """Gets the ID of a host of a run, creating the host if it's new."""
+        return self.register_hosts(run_id, [host_name])[host_name]
+
+    def register_hosts(self, run_id: str, host_names: list[str]) -> dict[str, int]:
+        """Creates the missing hosts of a run and returns the ID of every host of it."""
+        with self._lock:
+            hosts = self.hosts.setdefault(run_id, {})
+            for name in host_names:
+                if name not in hosts:
+                    host_id = next(self._ids)
+                    hosts[name] = {"id": host_id, "run_id": run_id, "name": name}
+                    self.host_rollups[host_id] = empty_rollup()
+                    self._host_names[host_id] = name
+            return {name: host["id"] for name, host in hosts.items()}
+
+    def insert_operation(
+        self,
+        run_id: str,
+        host_id: int,
+        op_hash: str,
+        name: str,
+        changed: bool,
+        success: bool,
+        duration: float,
+        timestamp: float,
+        logs: dict,
+        diff: str,
+        arguments: dict,
+        retry_stats: dict,
+        command_n_facts: list,
+    ):
+        """Inserts a new operation."""
+        self.insert_many_operations(
+            [
+                {
+                    "run_id": run_id,
+                    "host_id": host_id,
+                    "op_hash": op_hash,
+                    "name": name,
+                    "changed": changed,
+                    "success": success,
+                    "duration": duration,
+                    "timestamp": timestamp,
+                    "logs": logs,
+                    "diff": diff,
+                    "arguments": arguments,
+                    "retry_stats": retry_stats,
+                    "command_n_facts": command_n_facts,
+                }
+            ]
+        )
+
+    def insert_many_operations(self, rows: list[dict]):
+        """Inserts several operations, counting them into the rollups of their run and hosts as they go."""
+        encoded = [
+            {
+                "run_id": row["run_id"],
+                "host_id": row["host_id"],
+                "op_hash": row["op_hash"],
+                "name": row["name"],
+                "changed": int(row["changed"]),
+                "success": int(row["success"]),
+                "duration": row["duration"],
+                "timestamp": row["timestamp"],
+                "logs_json": json.dumps(row["logs"]),
+                "diff": row["diff"],
+                "arguments_json": json.dumps(row["arguments"]),
+                "retry_stats_json": json.dumps(row["retry_stats"]),
+                "command_n_facts_in_order_json": json.dumps(row["command_n_facts"]),
+            }
+            for row in rows
+        ]
+        with self._lock:
+            for row in encoded:
+                row["id"] = next(self._ids)
+                self.operations.setdefault(row["run_id"], []).append(row)
+
+                host_name = self._host_names.get(row["host_id"])
+                rollups = [self.rollups.setdefault(row["run_id"], empty_rollup())]
+                if row["host_id"] in self.host_rollups:
+                    rollups.append(self.host_rollups[row["host_id"]])
+                for rollup in rollups:
+                    add_to_rollup(
+                        rollup,
+                        row["name"],
+                        host_name,
+                        row["duration"],
+                        row["changed"],
+                        row["success"],
+                    )
+
+    def insert_snapshot(
+        self, run_id: str, host_id: int, stage: str, timestamp: float, metrics: dict
+    ):
+        """Inserts a resource snapshot."""
+        self.insert_many_snapshots(
+            [
+                {
+                    "run_id": run_id,
+                    "host_id": host_id,
+                    "stage": stage,
+                    "timestamp": timestamp,
+                    "metrics": metrics,
+                }
+            ]
+        )
+
+    def insert_many_snapshots(self, rows: list[dict]):
+        """Inserts several resource snapshots."""
+        with self._lock:
+            for row in rows:
+                self.snapshots.setdefault(row["run_id"], []).append(
+                    {
+                        "id": next(self._ids),
+                        "run_id": row["run_id"],
+                        "host_id": row["host_id"],
+                        "stage": row["stage"],
+                        "timestamp": row["timestamp"],
+                        "metrics_json": json.dumps(row["metrics"]),
+                    }
+                )
+
+    def insert_fact_log(
+        self, run_id: str, timestamp: float, log_level: str, context: str, command: str
+    ):
+        """Inserts a fact log entry."""
+        self.insert_many_fact_logs(
+            [
+                {
+                    "run_id": run_id,
+                    "timestamp": timestamp,
+                    "log_level": log_level,
+                    "context": context,
+                    "command": command,
+                }
+            ]
+        )
+
+    def insert_many_fact_logs(self, rows: list[dict]):
+        """Inserts several fact log entries."""
+        with self._lock:
+            for row in rows:
+                self.fact_logs.setdefault(row["run_id"], []).append(
+                    {"id": next(self._ids), **row}
+                )
+
+    def save_operation_sketches(self, run_id: str, sketches: dict):
+        """Keeps (replacing) the duration sketches of some operations of a run."""
+        with self._lock:
+            self.sketches.setdefault(run_id, {}).update(sketches)
+
+    def get_operation_sketches(self, run_id: str) -> dict:
+        """Gets the kept duration sketches of a run, or builds them from its operations if it has none."""
+        with self._lock:
+            sketches = dict(self.sketches.get(run_id) or {})
+        return sketches or super().get_operation_sketches(run_id)
+
+    def start_update_run(self, run_id: str, status: str):
+        """Updates the status of a run."""
+        with self._lock:
+            self.runs[run_id]["status"] = status
+
+    def end_run_update(self, run_id: str, end_time: float, status: str, summary: dict):
+        """Updates a run at the end with final status, time, and summary."""
+        with self._lock:
+            self.runs[run_id].update(
+                end_time=end_time, status=status, summary_json=json.dumps(summary)
+            )
+
+    def get_facts_for_timespan(
+        self, run_id: str, start_time: float, end_time: float
+    ) -> list[dict]:
+        """Gets the fact logs of a run within a timespan."""
+        with self._lock:
+            logs = list(self.fact_logs.get(run_id, []))
+        return [dict(log) for log in logs if start_time <= log["timestamp"] < end_time]
+
+    def get_run_summary_stats(self, run_id: str) -> dict:
+        """Reads the summary statistics of a run from its rollup."""
+        with self._lock:
+            return rollup_summary(self.rollups.get(run_id) or empty_rollup())
+
+    def get_run_progress(self, run_id: str) -> dict:
+        """Reads the rollups of a run and its hosts (see Limani.get_run_progress)."""
+        with self._lock:
+            hosts = sorted(
+                self.hosts.get(run_id, {}).values(), key=lambda host: host["name"]
+            )
+            return {
+                "run": rollup_summary(self.rollups.get(run_id) or empty_rollup()),
+                "hosts": {
+                    host["name"]: rollup_summary(self.host_rollups[host["id"]])
+                    for host in hosts
+                },
+            }
+
+    def get_run_data(self, run_id: str):
+        """Gets all data of a run, shaped like Ch-rima's, or None if there's no such run."""
+        with self._lock:
+            run = self.runs.get(run_id)
+            if run is None:
+                return None
+
+            hosts = sorted(
+                self.hosts.get(run_id, {}).values(), key=lambda host: host["name"]
+            )
+            names = {host["id"]: host["name"] for host in hosts}
+            operations = sorted(
+                self.operations.get(run_id, []), key=lambda op: op["timestamp"]
+            )
+            by_host: dict[int, list[dict[str, Any]]] = {}
+            for op in operations:
+                by_host.setdefault(op["host_id"], []).append(dict(op))
+
+            return {
+                "run": dict(run),
+                "hosts": [
+                    {
+                        **host,
+                        "summary_json": json.dumps(self.host_rollups[host["id"]]),
+                        "operations": by_host.get(host["id"], []),
+                    }
+                    for host in hosts
+                ],
+                "snapshots": [
+                    {**snapshot, "host_name": names.get(snapshot["host_id"])}
+                    for snapshot in sorted(
+                        self.snapshots.get(run_id, []), key=lambda row: row["timestamp"]
+                    )
+                ],
+                "fact_logs": [
+                    dict(log)
+                    for log in sorted(
+                        self.fact_logs.get(run_id, []), key=lambda row: row["timestamp"]
+                    )
+                ],
+            }
+
+    def get_run(self, run_id: str):
+        """Gets the row of a run."""
+        with self._lock:
+            run = self.runs.get(run_id)
+            return dict(run) if run else None
+
+    def list_runs(self):
+        """Lists the runs, newest first."""
+        with self._lock:
+            runs = sorted(
+                self.runs.values(), key=lambda run: run["start_time"], reverse=True
+            )
+            return [
+                {
+                    key: run[key]
+                    for key in (
+                        "id",
+                        "run_id_human",
+                        "start_time",
+                        "end_time",
+                        "status",
+                    )
+                }
+                for run in runs
+            ]
+
+    def delete_runs(self, run_ids: list[str], archive: bool = False):
+        """Deletes runs with everything that belongs to them.
+
+        Raises:
+            NotImplementedError: If asked to archive them, there's nowhere to archive them to.
+        """
+        if archive:
+            raise NotImplementedError("MemoryLimani doesn't support archiving runs.")
+
+        with self._lock:
+            for run_id in run_ids:
+                for host in self.hosts.pop(run_id, {}).values():
+                    self.host_rollups.pop(host["id"], None)
+                    self._host_names.pop(host["id"], None)
+                for rows in (
+                    self.runs,
+                    self.rollups,
+                    self.operations,
+                    self.snapshots,
+                    self.fact_logs,
+                    self.sketches,
+                ):
+                    rows.pop(run_id, None)
+        return {}
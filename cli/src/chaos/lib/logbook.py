@@ -0,0 +1,377 @@
+"""
+`chaos logbook`: housekeeping for the runs a Limani keeps.
+
+    - prune: deletes the runs that fall out of the retention (older than --older-than, or past the --keep newest),
+        optionally archiving each one first (Ch-rima keeps reading archived runs through get_run_data), then
+        compacts the database.
+    - compact: gives the space of deleted rows back, incrementally or with a full VACUUM.
+    - stats: cross-run stats of the operations in a time window or the last N runs (see chaos.lib.analytics).
+    - serve: runs the logbook daemon in the foreground, the single writer of Ch-rima for every `limani: chrima-remote`
+        (see chaos.lib.limani.chrima_remote).
+
+Runs still in progress are never pruned, nor counted against --keep, nor counted in stats.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Any
+
+from chaos.lib.args.dataclasses import ResultPayload
+
+if TYPE_CHECKING:
+    from chaos.lib.args.dataclasses import LogbookPayload
+    from chaos.lib.limani.limani import Limani
+
+_AGE_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+
+def parse_age(text: str) -> float:
+    """Parses an age like "90d", "12h", "2w" or "45m" into seconds, a bare number is days.
+
+    Raises:
+        ValueError: If the age can't be parsed or isn't positive.
+    """
+    text = text.strip().lower()
+    unit = text[-1:] if text[-1:] in _AGE_UNITS else "d"
+    number = text[:-1] if text[-1:] in _AGE_UNITS else text
+    try:
+        seconds = float(number) * _AGE_UNITS[unit]
+    except ValueError:
+        raise ValueError(f"Invalid age '{text}', use something like 30d, 12h or 2w.")
+    if seconds <= 0:
+        raise ValueError(f"Invalid age '{text}', it has to be positive.")
+    return seconds
+
+
+def select_prunable_runs(
+    runs: list[dict[str, Any]],
+    older_than: float | None = None,
+    keep: int | None = None,
+    now: float | None = None,
+) -> list[dict[str, Any]]:
+    """Picks the runs that fall out of the retention.
+
+    Args:
+        runs (list[dict]): The runs, as returned by Limani.list_runs.
+        older_than (float | None): Prune the runs that started more than this many seconds ago.
+        keep (int | None): Prune everything past the `keep` newest runs.
+        now (float | None): The current time, defaults to time.time().
+
+    Returns:
+        - The runs to prune, newest first.
+    """
+    now = time.time() if now is None else now
+    finished = sorted(
+        (run for run in runs if run["status"] != "in_progress"),
+        key=lambda run: run["start_time"],
+        reverse=True,
+    )
+
+    prunable = []
+    for position, run in enumerate(finished):
+        too_old = older_than is not None and run["start_time"] < now - older_than
+        too_many = keep is not None and position >= keep
+        if too_old or too_many:
+            prunable.append(run)
+    return prunable
+
+
+def _global_config() -> dict[str, Any]:
+    """The global config (~/.config/chaos/config.yml), empty if there's none."""
+    import os
+    from pathlib import Path
+    from typing import cast
+
+    from omegaconf import OmegaConf
+
+    CONFIG_DIR = os.getenv("CHAOS_CONFIG_DIR", Path.home() / ".config" / "chaos")
+    CONFIG_FILE_PATH = os.path.join(CONFIG_DIR, "config.yml")
+    global_config = OmegaConf.create()
+    if os.path.exists(CONFIG_FILE_PATH):
+        global_config = OmegaConf.load(CONFIG_FILE_PATH) or OmegaConf.create()
+    return cast(dict, global_config)
+
+
+def _load_limani(payload: LogbookPayload) -> Limani:
+    """Loads the Limani from --limani, the `limani` of the global config, or Ch-rima."""
+    from chaos.lib.telemetry import ChaosTelemetry
+
+    global_config = _global_config()
+    limani_name = payload.limani or global_config.get("limani", "") or "chrima"
+    return ChaosTelemetry.load_limani_plugin(limani_name, global_config)
+
+
+def _human_size(size: int) -> str:
+    value = float(size)
+    for unit in ("B", "KiB", "MiB"):
+        if value < 1024:
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GiB"
+
+
+def _compaction_message(compaction: dict[str, Any]) -> str:
+    freed = compaction["size_before"] - compaction["size_after"]
+    message = (
+        f"Compacted the logbook ({compaction['mode']}): {_human_size(compaction['size_before'])} -> "
+        f"{_human_size(compaction['size_after'])}, {_human_size(max(freed, 0))} freed."
+    )
+    if compaction.get("migrated"):
+        message += f" Moved the texts of {compaction['migrated']} old operation(s) to the blob store."
+    return message
+
+
+def prune(
+    payload: LogbookPayload, limani: Limani
+) -> ResultPayload[dict[str, Any] | None]:
+    """Deletes (and optionally archives) the runs out of the retention, then compacts the Limani."""
+    if payload.older_than is None and payload.keep is None:
+        return ResultPayload(
+            success=False,
+            message=[],
+            error=["Nothing to prune by, pass --older-than and/or --keep."],
+            data=None,
+        )
+
+    try:
+        older_than = parse_age(payload.older_than) if payload.older_than else None
+    except ValueError as e:
+        return ResultPayload(success=False, message=[], error=[str(e)], data=None)
+
+    runs = limani.list_runs()
+    prunable = select_prunable_runs(runs, older_than=older_than, keep=payload.keep)
+    data: dict[str, Any] = {
+        "pruned": [run["id"] for run in prunable],
+        "kept": len(runs) - len(prunable),
+        "archived": {},
+        "compaction": None,
+    }
+
+    if payload.dry_run or not prunable:
+        verb = "Would prune" if payload.dry_run else "Pruned"
+        return ResultPayload(
+            success=True,
+            message=[f"{verb} {len(prunable)} run(s), keeping {data['kept']}."],
+            error=[],
+            data=data,
+        )
+
+    data["archived"] = limani.delete_runs(data["pruned"], archive=payload.archive)
+    message = [f"Pruned {len(prunable)} run(s), keeping {data['kept']}."]
+    if data["archived"]:
+        message.append(f"Archived {len(data['archived'])} run(s) before deleting them.")
+
+    if payload.vacuum != "none":
+        data["compaction"] = limani.compact(payload.vacuum)
+        message.append(_compaction_message(data["compaction"]))
+
+    return ResultPayload(success=True, message=message, error=[], data=data)
+
+
+def _parse_group_by(text: str) -> tuple[str, ...]:
+    """Parses --group-by, like "name,host".
+
+    Raises:
+        ValueError: On an unknown key.
+    """
+    from chaos.lib.analytics import GROUP_KEYS
+
+    keys = tuple(key.strip() for key in text.split(",") if key.strip())
+    unknown = [key for key in keys if key not in GROUP_KEYS]
+    if unknown:
+        raise ValueError(
+            f"Can't group by {', '.join(unknown)}, use any of: {', '.join(GROUP_KEYS)}."
+        )
+    return keys
+
+
+def _parse_percentiles(text: str) -> tuple[float, ...]:
+    """Parses --percentiles, like "50,95,99" (or "none").
+
+    Raises:
+        ValueError: If a percentile isn't a number between 0 and 100.
+    """
+    if text.strip().lower() == "none":
+        return ()
+    try:
+        percentiles = tuple(float(p) for p in text.split(",") if p.strip())
+    except ValueError:
+        raise ValueError(f"Invalid percentiles '{text}', use something like 50,95,99.")
+    if any(not 0 <= p <= 100 for p in percentiles):
+        raise ValueError(f"Invalid percentiles '{text}', they go from 0 to 100.")
+    return percentiles
+
+
+def stats(
+    payload: LogbookPayload, limani: Limani, now: float | None = None
+) -> ResultPayload[dict[str, Any] | None]:
+    """Cross-run stats of the operations in a time window (--since/--until) or the last --runs runs.
+
+    Returns:
+        - A ResultPayload with the window, the group keys and one row per group in its data field.
+    """
+    from chaos.lib.analytics import (
+        compare,
+        comparison_metric,
+        day_label,
+        day_of,
+        query_days,
+        query_runs,
+    )
+
+    now = time.time() if now is None else now
+    try:
+        group_by = _parse_group_by(payload.group_by)
+        percentiles = _parse_percentiles(payload.percentiles)
+        filters = {"names": payload.names or None, "hosts": payload.hosts or None}
+
+        if payload.runs is not None:
+            if payload.since or payload.until:
+                raise ValueError("--runs can't be combined with --since/--until.")
+            if payload.runs <= 0:
+                raise ValueError("--runs has to be positive.")
+
+            finished = [
+                run for run in limani.list_runs() if run["status"] != "in_progress"
+            ]
+            runs = finished[: payload.runs]
+            rows = query_runs(limani, runs, group_by, percentiles, **filters)
+            if payload.compare:
+                previous = finished[payload.runs : payload.runs * 2]
+                previous_rows = query_runs(
+                    limani, previous, group_by, percentiles, **filters
+                )
+                rows = compare(rows, previous_rows, group_by, percentiles)
+            window = {"runs": [run["run_id_human"] for run in runs]}
+            description = f"the last {len(runs)} run(s)"
+        else:
+            since_day = day_of(now - parse_age(payload.since or "30d"))
+            until_day = (
+                day_of(now - parse_age(payload.until)) if payload.until else day_of(now)
+            )
+            if since_day > until_day:
+                raise ValueError("--since has to be further back than --until.")
+
+            rows = query_days(
+                limani, since_day, until_day, group_by, percentiles, **filters
+            )
+            if payload.compare:
+                length = until_day - since_day + 1
+                previous_rows = query_days(
+                    limani,
+                    since_day - length,
+                    since_day - 1,
+                    group_by,
+                    percentiles,
+                    **filters,
+                )
+                rows = compare(rows, previous_rows, group_by, percentiles)
+            window = {"since": day_label(since_day), "until": day_label(until_day)}
+            description = f"{window['since']} to {window['until']} (UTC)"
+    except ValueError as e:
+        return ResultPayload(success=False, message=[], error=[str(e)], data=None)
+
+    if payload.top:
+        rows = rows[: payload.top]
+
+    return ResultPayload(
+        success=True,
+        message=[f"{len(rows)} group(s) over {description}."],
+        error=[],
+        data={
+            "window": window,
+            "group_by": list(group_by),
+            "compared_by": comparison_metric(percentiles) if payload.compare else None,
+            "rows": rows,
+        },
+    )
+
+
+def serve(payload: LogbookPayload) -> ResultPayload[dict[str, Any] | None]:
+    """Runs the logbook daemon over Ch-rima in the foreground, until interrupted (Ctrl+C or SIGTERM).
+
+    Returns:
+        - A ResultPayload with how many requests were served, or why the daemon couldn't start.
+    """
+    import signal
+    from pathlib import Path
+
+    from chaos.lib.limani.chrima import Chrima
+    from chaos.lib.limani.chrima_remote import LogbookDaemon, default_socket_path
+
+    try:
+        chrima = Chrima(_global_config())
+        path = (
+            Path(payload.socket).expanduser()
+            if payload.socket
+            else default_socket_path(chrima)
+        )
+        daemon = LogbookDaemon(chrima, path)
+        daemon.bind()
+    except (RuntimeError, ValueError, OSError) as e:
+        return ResultPayload(success=False, message=[], error=[str(e)], data=None)
+
+    def _stop(*_: Any) -> None:
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, _stop)
+    print(
+        f"Serving the logbook at {path} ({chrima.get_db_path()}), Ctrl+C to stop.",
+        flush=True,
+    )
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+    return ResultPayload(
+        success=True,
+        message=[f"Logbook daemon stopped after {daemon.served} requests."],
+        error=[],
+        data={"socket": str(path), "served": daemon.served},
+    )
+
+
+def handle_logbook(payload: LogbookPayload) -> ResultPayload[dict[str, Any] | None]:
+    """Entry point for `chaos logbook prune|compact|stats|serve`.
+
+    Returns:
+        - A ResultPayload carrying what was done in its data field.
+    """
+    if payload.logbook_command == "serve":
+        return serve(payload)
+
+    try:
+        limani = _load_limani(payload)
+    except (ImportError, ValueError) as e:
+        return ResultPayload(success=False, message=[], error=[str(e)], data=None)
+
+    try:
+        limani.init_db()
+        match payload.logbook_command:
+            case "prune":
+                return prune(payload, limani)
+
+            case "stats":
+                return stats(payload, limani)
+
+            case "compact":
+                compaction = limani.compact("full" if payload.full else "incremental")
+                return ResultPayload(
+                    success=True,
+                    message=[_compaction_message(compaction)],
+                    error=[],
+                    data={"compaction": compaction},
+                )
+
+        return ResultPayload(
+            success=False,
+            message=[],
+            error=[f"Unknown logbook command: {payload.logbook_command}"],
+            data=None,
+        )
+    except NotImplementedError as e:
+        return ResultPayload(success=False, message=[], error=[str(e)], data=None)
+    finally:
+        limani.disconnect()
@@ -0,0 +1,296 @@
+"""
+Adaptive fleet parallelism, used when the Ch-obolo says `fleet.parallelism: auto`.
+
+pyinfra runs every host greenlet in a fixed-size gevent pool (PARALLEL). With `auto`, the pools of the state are swapped
+for AdaptivePools, which start small, and a ParallelismTuner (a pyinfra callback handler) resizes them during the run:
+
+    - it grows while the pool is the bottleneck (slow start: doubling until the first back off, then one by one),
+    - it backs off when operations get much slower than the best latency it has seen (the hosts, the network or us
+        are choking), when the boatswain runs out of CPU or file descriptors, or when too many targets are saturated
+        according to the RAM/load snapshots taken when connecting.
+
+Every change is recorded in the logbook (when enabled) as a `parallelism` snapshot of the boatswain.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from typing import TYPE_CHECKING, Any
+
+from gevent.pool import Pool
+from pyinfra.api.state import BaseStateCallback
+
+if TYPE_CHECKING:
+    from pyinfra.api.host import Host
+    from pyinfra.api.state import State
+
+AUTO_START_WORKERS = 4
+EVALUATION_INTERVAL = 1.0
+LATENCY_BACKOFF_GRADIENT = 0.5
+SATURATED_RAM_PERCENT = 90.0
+SATURATED_LOAD_PER_CPU = 2.0
+SATURATED_HOSTS_RATIO = 0.25
+LOCAL_CPU_LIMIT = 1.0
+LOCAL_FD_LIMIT = 0.8
+FDS_PER_HOST = 3
+
+
+class AdaptivePool(Pool):
+    """A gevent Pool that can be resized while greenlets are running in it.
+
+    Growing releases extra slots right away. Shrinking can't take slots away from running greenlets, so
+        it leaves a "debt" that a helper greenlet pays by grabbing slots as they are freed.
+    """
+
+    def __init__(self, size: int):
+        super().__init__(size)
+        self._debt = 0
+        self._collector: Any = None
+
+    def resize(self, size: int) -> None:
+        """Changes the number of greenlets allowed to run at once (never below 1)."""
+        import gevent
+
+        size = max(int(size), 1)
+        difference = size - (self.size or 0)
+        self.size = size
+
+        if difference > 0:
+            cancelled = min(difference, self._debt)
+            self._debt -= cancelled
+            for _ in range(difference - cancelled):
+                self._semaphore.release()
+        elif difference < 0:
+            self._debt -= difference
+            if self._collector is None or self._collector.dead:
+                self._collector = gevent.spawn(self._collect_debt)
+
+    def _collect_debt(self) -> None:
+        while self._debt > 0:
+            self._semaphore.acquire()
+            if self._debt > 0:
+                self._debt -= 1
+            else:
+                self._semaphore.release()
+
+
+def local_pressure() -> tuple[float, float]:
+    """How loaded the boatswain is.
+
+    Returns:
+        - The 1 minute load average per CPU, and the ratio of open file descriptors to the soft limit (0.0 when unknown).
+    """
+    import resource
+
+    try:
+        cpu = os.getloadavg()[0] / (os.cpu_count() or 1)
+    except OSError:
+        cpu = 0.0
+
+    fd_ratio = 0.0
+    soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft not in (resource.RLIM_INFINITY, 0) and os.path.isdir("/proc/self/fd"):
+        fd_ratio = len(os.listdir("/proc/self/fd")) / soft
+
+    return cpu, fd_ratio
+
+
+def max_auto_workers(host_count: int) -> int:
+    """The hard ceiling for `auto`: one worker per host, bounded by what the open files limit can take."""
+    import resource
+
+    soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft in (resource.RLIM_INFINITY, 0):
+        return max(host_count, 1)
+    return max(min(host_count, (soft - 10) // FDS_PER_HOST), 1)
+
+
+class ParallelismTuner(BaseStateCallback):
+    """Resizes the pyinfra pools of a state based on operation latency, local pressure and target saturation.
+
+    Usage:
+        ```python
+        tuner = ParallelismTuner(state, max_workers=len(hosts), telemetry=payload.logbook)
+        tuner.install()  # swaps the pools and registers the callbacks
+        ...
+        tuner.observe_health(host, ram_data, load_data, cpus)  # from the health snapshots
+        tuner.observe_latency(seconds)  # anything that measures a unit of per-host work
+        ```
+
+    Attributes:
+        workers (int): The current worker count.
+        history (list[dict]): Every decision taken, in order, with the measurements behind it.
+    """
+
+    def __init__(
+        self,
+        state: State,
+        max_workers: int,
+        start_workers: int = AUTO_START_WORKERS,
+        interval: float = EVALUATION_INTERVAL,
+        telemetry: bool = False,
+    ):
+        self.state = state
+        self.max_workers = max(max_workers, 1)
+        self.workers = max(min(start_workers, self.max_workers), 1)
+        self.interval = interval
+        self.telemetry = telemetry
+        self.history: list[dict[str, Any]] = []
+        self.host_health: dict[str, dict[str, float]] = {}
+
+        self._slow_start = True
+        self._baseline: float | None = None
+        self._window: list[float] = []
+        self._last_evaluation = time.monotonic()
+        self._starts: dict[tuple[str, str], float] = {}
+
+    def install(self) -> None:
+        """Swaps the state pools for adaptive ones and starts listening to operation callbacks."""
+        self.state.pool = AdaptivePool(self.workers)
+        self.state.fact_pool = AdaptivePool(self.workers)
+        self.state.add_callback_handler(self)
+        self._record(self.workers, "start", {})
+
+    def observe_health(
+        self,
+        host: Host,
+        ram_data: dict[str, float] | None,
+        load_data: tuple[float, float, float] | list[float] | None,
+        cpus: int = 1,
+    ) -> None:
+        """Keeps the latest RAM/load snapshot of a host, used to back off from saturated targets."""
+        self.host_health[host.name] = {
+            "ram_percent": float(ram_data["percent"]) if ram_data else 0.0,
+            "load_per_cpu": (float(load_data[0]) / max(cpus, 1)) if load_data else 0.0,
+        }
+
+    def observe_latency(self, seconds: float) -> None:
+        """Feeds one per-host work latency sample, evaluating the worker count at most once per interval."""
+        self._window.append(seconds)
+        now = time.monotonic()
+        if now - self._last_evaluation >= self.interval:
+            self.evaluate(now)
+
+    def saturated_hosts(self) -> list[str]:
+        return [
+            name
+            for name, health in self.host_health.items()
+            if health["ram_percent"] >= SATURATED_RAM_PERCENT
+            or health["load_per_cpu"] >= SATURATED_LOAD_PER_CPU
+        ]
+
+    def evaluate(self, now: float | None = None) -> int:
+        """Decides the worker count from the samples gathered since the last evaluation and applies it.
+
+        Returns:
+            - The (possibly unchanged) worker count.
+        """
+        import statistics
+
+        self._last_evaluation = time.monotonic() if now is None else now
+        window, self._window = self._window, []
+
+        latency = statistics.median(window) if window else None
+        if latency is not None:
+            if self._baseline is None or latency < self._baseline:
+                self._baseline = latency
+            else:
+                # Creep towards the current latency, so a baseline from a lucky moment doesn't pin us down forever.
+                self._baseline = self._baseline * 0.95 + latency * 0.05
+
+        cpu, fd_ratio = local_pressure()
+        saturated = self.saturated_hosts()
+        saturated_ratio = (
+            len(saturated) / len(self.host_health) if self.host_health else 0.0
+        )
+        gradient = (self._baseline / latency) if latency and self._baseline else 1.0
+
+        metrics = {
+            "latency_p50": round(latency, 4) if latency is not None else None,
+            "baseline_latency": round(self._baseline, 4)
+            if self._baseline is not None
+            else None,
+            "local_cpu": round(cpu, 3),
+            "local_fds": round(fd_ratio, 3),
+            "saturated_hosts": saturated,
+            "busy": len(self.state.pool or ()),
+        }
+
+        workers = self.workers
+        reason = ""
+        if fd_ratio >= LOCAL_FD_LIMIT:
+            workers, reason = (
+                self.workers // 2,
+                "boatswain is running out of file descriptors",
+            )
+        elif cpu >= LOCAL_CPU_LIMIT:
+            workers, reason = int(self.workers * 0.75), "boatswain CPU is saturated"
+        elif saturated_ratio >= SATURATED_HOSTS_RATIO:
+            workers, reason = int(self.workers * 0.75), "target hosts are saturated"
+        elif gradient < LATENCY_BACKOFF_GRADIENT:
+            workers, reason = int(self.workers * 0.75), "operation latency went up"
+        elif window and len(self.state.pool or ()) >= self.workers:
+            workers = self.workers * 2 if self._slow_start else self.workers + 1
+            reason = "pool is the bottleneck"
+
+        workers = max(min(workers, self.max_workers), 1)
+        if workers < self.workers:
+            self._slow_start = False
+
+        if workers != self.workers:
+            self._apply(workers, reason, metrics)
+        return self.workers
+
+    def _apply(self, workers: int, reason: str, metrics: dict[str, Any]) -> None:
+        for pool in (self.state.pool, self.state.fact_pool):
+            if isinstance(pool, AdaptivePool):
+                pool.resize(workers)
+        previous, self.workers = self.workers, workers
+        self._record(workers, reason, metrics, previous)
+
+    def _record(
+        self,
+        workers: int,
+        reason: str,
+        metrics: dict[str, Any],
+        previous: int | None = None,
+    ) -> None:
+        entry = {
+            "timestamp": time.time(),
+            "workers": workers,
+            "previous": previous,
+            "reason": reason,
+            **metrics,
+        }
+        self.history.append(entry)
+
+        if self.telemetry:
+            from .telemetry import ChaosTelemetry
+
+            ChaosTelemetry.record_parallelism(entry)
+
+    # pyinfra callbacks, only used to time each host operation.
+
+    def operation_host_start(self, state: State, host: Host, op_hash: str) -> None:  # type: ignore[override]
+        self._starts[(host.name, op_hash)] = time.perf_counter()
+
+    def operation_host_success(  # type: ignore[override]
+        self, state: State, host: Host, op_hash: str, retry_count: int = 0
+    ) -> None:
+        self._finish(host, op_hash)
+
+    def operation_host_error(  # type: ignore[override]
+        self,
+        state: State,
+        host: Host,
+        op_hash: str,
+        retry_count: int = 0,
+        max_retries: int = 0,
+    ) -> None:
+        self._finish(host, op_hash)
+
+    def _finish(self, host: Host, op_hash: str) -> None:
+        started = self._starts.pop((host.name, op_hash), None)
+        if started is not None:
+            self.observe_latency(time.perf_counter() - started)
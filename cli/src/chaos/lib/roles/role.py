@@ -6,9 +6,12 @@ from abc import ABC, abstractmethod
 from typing import TYPE_CHECKING, Any
 
 if TYPE_CHECKING:
+    from pyinfra.api.facts import FactBase
     from pyinfra.api.host import Host
     from pyinfra.api.state import State
 
+    from chaos.lib.apply import FactCache
+
 from chaos.lib.args.dataclasses import Delta, ResultPayload
 
 
@@ -27,6 +30,9 @@ class Role(ABC):
 
         plan: This method should only stack the actions needed in pyinfra operations to achieve
             the desired state.
+
+        get_context_batch: Optional fleet-wide alternative to "get_context", it receives every host at once
+            alongside the facts declared in "necessary_facts", already fetched once per host.
     """
 
     def __init__(
@@ -35,6 +41,10 @@ class Role(ABC):
         needs_secrets: bool = False,
         necessary_chobolo_keys: list[str] = [],
         necessary_secret_dict_keys: list[str] = [],
+        necessary_facts: list[
+            type[FactBase] | tuple[type[FactBase], dict[str, Any]]
+        ] = [],
+        version: str = "0",
     ):
         """Initializes a Role.
 
@@ -43,11 +53,17 @@ class Role(ABC):
             needs_secrets (bool, optional): Indicates if the role requires secrets to operate. Defaults to False.
             necessary_chobolo_keys (list[str], optional): The list of configuration keys required from the chobolo state. Defaults to [].
             necessary_secret_dict_keys (list[str], optional): The list of secret keys required from the secrets store. Defaults to [].
+            necessary_facts (list, optional): The pyinfra facts used by "get_context_batch", either as a fact class or as a
+                (fact class, fact kwargs) tuple. Defaults to [].
+            version (str, optional): The version of the role's logic, part of the delta cache key.
+                Bump it whenever get_context or delta change, so stale cached deltas are dropped. Defaults to "0".
         """
         self.name = name
         self.needs_secrets = needs_secrets
         self.necessary_chobolo_keys = necessary_chobolo_keys
         self.necessary_secret_dict_keys = necessary_secret_dict_keys
+        self.necessary_facts = necessary_facts
+        self.version = version
 
     def get_context(
         self,
@@ -62,8 +78,9 @@ class Role(ABC):
             state: Pyinfra state object.
             host: Pyinfra host object.
             chobolo (dict, optional): The desired state of the system as represented in the Chobolo.
-                It contains only the keys specified in the "necessary_chobolo_keys" attribute of the role
-                merged with the secret keys specified in the "necessary_secret_dict_keys" attribute of the role. Defaults to {}.
+                It contains only the keys specified in the "necessary_chobolo_keys" attribute of the role (dotted
+                keys are kept nested, "fleet.hosts" arrives as {"fleet": {"hosts": ...}}), or the whole document if
+                the role declares none. It is a read-only view shared between every host, copy it before mutating. Defaults to {}.
             secrets (dict[str, Any], optional): The secrets required for the role, if any. Defaults to {}.
 
         Returns:
@@ -75,6 +92,34 @@ class Role(ABC):
         """
         return {}
 
+    def get_context_batch(
+        self,
+        state: State,
+        hosts: list[Host],
+        chobolo: dict[str, Any] = {},
+        secrets: dict[str, Any] = {},
+        facts: FactCache | None = None,
+    ) -> dict[str, dict[str, Any]]:
+        """Optional fleet-wide version of get_context, gathering the context of every host at once.
+
+        Args:
+            state: Pyinfra state object.
+            hosts: Every pyinfra host this role will be applied to.
+            chobolo (dict, optional): Same as in get_context. Defaults to {}.
+            secrets (dict[str, Any], optional): Same as in get_context. Defaults to {}.
+            facts (FactCache, optional): The facts declared in "necessary_facts", fetched once per host and shared
+                between all roles that declared them. Facts that were not declared are fetched (and cached) on demand.
+
+        Returns:
+            dict[str, dict[str, Any]]: The context of each host, keyed by host name.
+
+        Notes:
+            Roles that don't override this method have get_context called once per host instead.
+        """
+        return {
+            host.name: self.get_context(state, host, chobolo, secrets) for host in hosts
+        }
+
     def delta(self, context: dict[str, Any] = {}) -> Delta:
         """Optional method to implement for roles that require calculating a delta to achieve their goals.
 
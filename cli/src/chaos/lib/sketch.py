@@ -0,0 +1,215 @@
+"""
+Mergeable quantile sketches for operation durations (DDSketch style).
+
+A sketch keeps counts in logarithmic buckets instead of the durations themselves: a duration x > 0 lands in bucket
+ceil(log_gamma(x)), with gamma = (1 + alpha) / (1 - alpha), and every bucket is read back as the value with the smallest
+relative distance to all the values it can hold. So:
+
+    - memory is bounded by the spread of the durations, not their number (~1200 buckets from a microsecond to
+        three hours at alpha = 1%, usually a few dozen in practice),
+    - two sketches built with the same alpha merge by adding their bucket counts, which gives exactly the sketch of
+        all the values of both (so runs can be merged into fleet-wide trends),
+    - every order statistic read from a sketch is within a relative error of alpha of the real one
+        (|estimate - exact| <= alpha * exact), and percentiles interpolated between two of them (like
+        ChaosTelemetry.percentile does) keep that same bound. The minimum and maximum are exact, and estimates are
+        clamped between them.
+
+Durations of 0 (or below MIN_INDEXABLE) are counted apart and read back as exactly 0.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Any
+
+DEFAULT_ALPHA = 0.01
+MIN_INDEXABLE = 1e-9
+
+
+class QuantileSketch:
+    """A DDSketch-style quantile sketch.
+
+    Usage:
+        ```python
+        sketch = QuantileSketch()
+        for duration in durations:
+            sketch.add(duration)
+        sketch.percentile(99)
+
+        merged = QuantileSketch.from_dict(stored_a)
+        merged.merge(QuantileSketch.from_dict(stored_b))
+        ```
+
+    Attributes:
+        alpha (float): The relative accuracy of the sketch.
+        count (int): How many values were added.
+        total (float): Their sum (exact).
+        min (float): The smallest value added (exact).
+        max (float): The largest value added (exact).
+    """
+
+    def __init__(self, alpha: float = DEFAULT_ALPHA):
+        if not 0 < alpha < 1:
+            raise ValueError("alpha must be between 0 and 1.")
+        self.alpha = alpha
+        self._gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self._gamma)
+        self.bins: dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, count: int = 1) -> None:
+        """Adds a (non-negative) value, `count` times."""
+        value = max(float(value), 0.0)
+        if value < MIN_INDEXABLE:
+            self.zeros += count
+        else:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[key] = self.bins.get(key, 0) + count
+
+        self.count += count
+        self.total += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def extend(self, values: list[float]) -> None:
+        """Adds many (non-negative) values at once, what add does for each of them, minus the per-call overhead."""
+        if not values:
+            return
+        values = [max(float(value), 0.0) for value in values]
+        bins, log_gamma, ceil, log = self.bins, self._log_gamma, math.ceil, math.log
+        for value in values:
+            if value < MIN_INDEXABLE:
+                self.zeros += 1
+            else:
+                key = ceil(log(value) / log_gamma)
+                bins[key] = bins.get(key, 0) + 1
+
+        self.count += len(values)
+        self.total += sum(values)
+        self.min = min(self.min, min(values))
+        self.max = max(self.max, max(values))
+
+    def merge(self, other: QuantileSketch) -> None:
+        """Adds every value of another sketch (built with the same alpha) into this one."""
+        if not math.isclose(other.alpha, self.alpha):
+            raise ValueError("Only sketches with the same alpha can be merged.")
+
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def _value_at_ranks(self, ranks: list[int]) -> dict[int, float]:
+        """Estimates the values at the given 0-based ranks with a single walk over the buckets."""
+        wanted = sorted(set(ranks))
+        values: dict[int, float] = {}
+
+        for rank in wanted:
+            if rank <= 0:
+                values[rank] = self.min
+            elif rank >= self.count - 1:
+                values[rank] = self.max
+
+        pending = [rank for rank in wanted if rank not in values]
+        seen = self.zeros
+        while pending and pending[0] < seen:
+            values[pending.pop(0)] = 0.0
+
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            estimate = 2 * self._gamma**key / (self._gamma + 1)
+            while pending and pending[0] < seen:
+                values[pending.pop(0)] = min(max(estimate, self.min), self.max)
+            if not pending:
+                break
+
+        return values
+
+    def percentiles(self, percentiles: tuple[float, ...]) -> dict[float, float]:
+        """Estimates several percentiles (0 - 100) at once, interpolated like ChaosTelemetry.percentile.
+
+        Returns:
+            - Each percentile and its estimate, rounded to 4 decimals (0.0 for an empty sketch).
+        """
+        if self.count <= 0:
+            return {p: 0.0 for p in percentiles}
+
+        positions = {p: (self.count - 1) * (p / 100) for p in percentiles}
+        ranks = [int(k) for k in positions.values()]
+        ranks += [int(k) + 1 for k in positions.values() if int(k) + 1 < self.count]
+        values = self._value_at_ranks(ranks)
+
+        result = {}
+        for p, k in positions.items():
+            f = int(k)
+            c = k - f
+            if f + 1 < self.count:
+                result[p] = round(values[f] + (c * (values[f + 1] - values[f])), 4)
+            else:
+                result[p] = round(values[f], 4)
+        return result
+
+    def percentile(self, percentile_val: float) -> float:
+        """Estimates a single percentile (0 - 100)."""
+        return self.percentiles((percentile_val,))[percentile_val]
+
+    def to_dict(self) -> dict[str, Any]:
+        """The JSON-friendly state of the sketch, as stored in the Limani."""
+        return {
+            "alpha": self.alpha,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "zeros": self.zeros,
+            "bins": {str(key): count for key, count in self.bins.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> QuantileSketch:
+        """Rebuilds a sketch from `to_dict`."""
+        sketch = cls(data.get("alpha", DEFAULT_ALPHA))
+        sketch.count = int(data.get("count", 0))
+        sketch.total = float(data.get("total", 0.0))
+        sketch.zeros = int(data.get("zeros", 0))
+        sketch.bins = {
+            int(key): int(count) for key, count in data.get("bins", {}).items()
+        }
+        if sketch.count:
+            sketch.min = float(data["min"])
+            sketch.max = float(data["max"])
+        return sketch
+
+
+def operation_summary(sketches: dict[str, QuantileSketch]) -> dict[str, dict[str, Any]]:
+    """The logbook's operation_summary (count, total, average and p50/p90/p95/p99 durations) from sketches.
+
+    Args:
+        sketches (dict): A sketch per operation name.
+
+    Returns:
+        - The summary of each operation, in the order of `sketches`.
+    """
+    summary = {}
+    for name, sketch in sketches.items():
+        total_duration = round(sketch.total, 4)
+        values = sketch.percentiles((50, 90, 95, 99))
+        summary[name] = {
+            "count": sketch.count,
+            "total_duration": total_duration,
+            "average_duration": round(total_duration / sketch.count, 4)
+            if sketch.count > 0
+            else 0.0,
+            "p50_duration": values[50],
+            "p90_duration": values[90],
+            "p95_duration": values[95],
+            "p99_duration": values[99],
+        }
+    return summary
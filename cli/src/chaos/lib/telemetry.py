@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import contextlib
 import contextvars
 import json
 import logging
@@ -9,11 +10,10 @@ import os
 import queue
 import re
 import socket
-import subprocess
 import threading
 import time
 from pathlib import Path
-from typing import TYPE_CHECKING, Any
+from typing import IO, TYPE_CHECKING, Any
 from urllib import parse as urllib_parse
 
 from pyinfra.api.host import Host
@@ -30,8 +30,11 @@ from chaos.lib.plugDiscovery import get_plugins
 from .limani.limani import Limani
 
 if TYPE_CHECKING:
+    from collections.abc import Iterator
     from typing import TypedDict
 
+    from chaos.lib.sketch import QuantileSketch
+
     class OpPercentileReturn(TypedDict):
         count: int
         total_duration: float
@@ -45,6 +48,517 @@ if TYPE_CHECKING:
 op_hash_context: contextvars.ContextVar[str | None] = contextvars.ContextVar(
     "op_hash", default=None
 )
+# Off (per greenlet) inside ChaosTelemetry.unrecorded, see there.
+recording_context: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "recording", default=True
+)
+
+WRITE_BATCH_SIZE = 500
+WRITE_BATCH_WINDOW = 0.05
+EXPORT_SPOOL_SIZE = 8 * 1024 * 1024
+SKETCH_SAVE_INTERVAL = 2.0
+EVENT_QUEUE_SIZE = 10_000
+EVENT_BATCH_SIZE = 256
+EVENT_FLUSH_INTERVAL = 0.1
+
+_ANSI_ESCAPE = re.compile(r"\x1b\[([0-9]{1,2}(;[0-9]{1,2})?)?[m|K]")
+
+# Queued Limani calls that the writer groups into one call per batch.
+_BATCHED_INSERTS: dict[str, str] = {
+    "insert_operation": "insert_many_operations",
+    "insert_snapshot": "insert_many_snapshots",
+    "insert_fact_log": "insert_many_fact_logs",
+}
+
+
+FACT_EVENT_CAPACITY = 50_000
+
+
+class FactEventIndex:
+    """A bounded, timestamp-ordered in-memory index of the fact/command events of the current run.
+
+    The fact log handler appends to it, and the operation callbacks slice the events of their timespan
+        out of it with a binary search, instead of reading them back from the Limani (which may not even
+        have written them yet).
+
+    Notes:
+        Only the newest `capacity` events are guaranteed to be kept, older ones are dropped in chunks,
+            so an operation that ran for longer than that many events only gets the tail of its history.
+    """
+
+    def __init__(self, capacity: int = FACT_EVENT_CAPACITY):
+        self.capacity = max(capacity, 1)
+        self._timestamps: list[float] = []
+        self._events: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def add(self, event: dict[str, Any]) -> None:
+        """Adds an event, keeping the index ordered by its `timestamp`."""
+        import bisect
+
+        timestamp = event["timestamp"]
+        with self._lock:
+            if not self._timestamps or timestamp >= self._timestamps[-1]:
+                self._timestamps.append(timestamp)
+                self._events.append(event)
+            else:
+                # Records from other threads can arrive slightly out of order.
+                position = bisect.bisect_right(self._timestamps, timestamp)
+                self._timestamps.insert(position, timestamp)
+                self._events.insert(position, event)
+
+            # Dropping in chunks keeps appends amortised O(1).
+            if len(self._events) >= 2 * self.capacity:
+                del self._timestamps[: self.capacity]
+                del self._events[: self.capacity]
+
+    def between(self, start_time: float, end_time: float) -> list[dict[str, Any]]:
+        """The events with start_time <= timestamp < end_time, in order (same span as Limani.get_facts_for_timespan)."""
+        import bisect
+
+        with self._lock:
+            first = bisect.bisect_left(self._timestamps, start_time)
+            last = bisect.bisect_left(self._timestamps, end_time, lo=first)
+            return self._events[first:last]
+
+
+_NOT_SECRETS = ("true", "false", "null", "none")
+
+
+def _trie_pattern(words: list[str]) -> str:
+    """Builds a regex matching any of the words, with common prefixes factored out.
+
+    `re` tries alternatives one by one at every position, so a flat alternation of hundreds of secrets is slow,
+        while a trie only ever follows the branches that match. ASCII words are lowered for the trie (the pattern
+        is meant for re.IGNORECASE), other words are left as plain alternatives, since lowering them isn't safe.
+    """
+    trie: dict[str, Any] = {}
+    others: list[str] = []
+    for word in words:
+        if not word.isascii():
+            others.append(re.escape(word))
+            continue
+        node = trie
+        for char in word.lower():
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def _build(node: dict[str, Any]) -> str:
+        optional = "" in node
+        branches = [
+            re.escape(char) + _build(child)
+            for char, child in sorted(node.items())
+            if char
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if optional:
+            return "(?:" + body + ")?"
+        return body
+
+    if trie:
+        others.insert(0, _build(trie))
+    return "|".join(others)
+
+
+class ReportWriter:
+    """A streaming JSON writer that writes twice at once: indented (4 spaces) to `pretty` and compact to `compact`.
+
+    Containers are opened and closed explicitly and filled with values, the writer takes care of the commas
+        and the indentation, so a document of any size can be written without ever building it in memory.
+
+    Usage:
+        ```python
+        out = ReportWriter([pretty_file], [sys.stdout])
+        out.open("{")
+        out.value("v1", key="api_version")
+        out.open("[", key="history")
+        out.value({"operation": "..."})
+        out.close("]")
+        out.close("}")
+        ```
+    """
+
+    def __init__(self, pretty: list[IO[str]], compact: list[IO[str]], depth: int = 0):
+        self.pretty = pretty
+        self.compact = compact
+        # How many values were written in each open container.
+        self._counts: list[int] = [0] * depth
+        self._owned: list[IO[str]] = []
+
+    @classmethod
+    def spooled(cls, depth: int) -> ReportWriter:
+        """A writer into temporary files (in memory until EXPORT_SPOOL_SIZE), to be `absorb`ed later
+        into a container opened at `depth`. Use it as a context manager so the files get closed."""
+        import tempfile
+
+        pretty = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE, mode="w+")
+        compact = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE, mode="w+")
+        writer = cls([pretty], [compact], depth)  # type: ignore[list-item]
+        writer._owned = [pretty, compact]  # type: ignore[list-item]
+        return writer
+
+    def __enter__(self) -> ReportWriter:
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        for spool in self._owned:
+            spool.close()
+
+    def write(self, pretty: str, compact: str) -> None:
+        for sink in self.pretty:
+            sink.write(pretty)
+        for sink in self.compact:
+            sink.write(compact)
+
+    def _start(self, key: str | None) -> tuple[str, str]:
+        """The separator, indentation and key that go before a new value."""
+        pretty = compact = ""
+        if self._counts:
+            if self._counts[-1]:
+                pretty = compact = ","
+            self._counts[-1] += 1
+            pretty += "\n" + "    " * len(self._counts)
+        if key is not None:
+            pretty += f"{json.dumps(key)}: "
+            compact += f"{json.dumps(key)}:"
+        return pretty, compact
+
+    def value(self, value: Any, key: str | None = None) -> None:
+        """Writes a value into the current container (with its key, if the container is an object)."""
+        pretty, compact = self._start(key)
+        indented = json.dumps(value, indent=4).replace(
+            "\n", "\n" + "    " * len(self._counts)
+        )
+        self.write(
+            pretty + indented, compact + json.dumps(value, separators=(",", ":"))
+        )
+
+    def open(self, bracket: str, key: str | None = None) -> None:
+        """Opens a container ("{" or "[") inside the current one."""
+        pretty, compact = self._start(key)
+        self.write(pretty + bracket, compact + bracket)
+        self._counts.append(0)
+
+    def close(self, bracket: str) -> None:
+        """Closes the current container with "}" or "]"."""
+        count = self._counts.pop()
+        newline = "\n" + "    " * len(self._counts) if count else ""
+        self.write(newline + bracket, bracket)
+
+    def absorb(self, other: ReportWriter) -> None:
+        """Appends everything written to a `spooled` writer as values of the current container."""
+        import shutil
+
+        if not other._counts or not other._counts[-1]:
+            return
+        if self._counts[-1]:
+            self.write(",", ",")
+        self._counts[-1] += other._counts[-1]
+
+        for sinks, spools in (
+            (self.pretty, other.pretty),
+            (self.compact, other.compact),
+        ):
+            for spool in spools:
+                for sink in sinks:
+                    spool.seek(0)
+                    shutil.copyfileobj(spool, sink)
+
+
+def _open_archive(path: Path, compression: str | None) -> IO[str]:
+    """Opens the archived logbook for writing, compressed with "gzip" or "zstd" if asked to.
+
+    Returns:
+        - A text file object. Its name gets the .gz/.zst suffix when compressed.
+    """
+    import gzip
+    import sys
+
+    if compression == "zstd":
+        zstd: Any = None
+        try:
+            from compression import zstd  # type: ignore[import-not-found, no-redef]
+        except ImportError:
+            try:
+                import zstandard as zstd  # type: ignore[import-not-found, no-redef]
+            except ImportError:
+                print(
+                    "Warning: zstd needs Python 3.14+ or the 'zstandard' package, archiving the logbook with gzip.",
+                    file=sys.stderr,
+                )
+                compression = "gzip"
+        if zstd is not None:
+            return zstd.open(path.with_name(path.name + ".zst"), "wt", encoding="utf-8")
+
+    if compression == "gzip":
+        return gzip.open(path.with_name(path.name + ".gz"), "wt", encoding="utf-8")
+
+    if compression:
+        print(
+            f"Warning: unknown logbook compression '{compression}', archiving it uncompressed.",
+            file=sys.stderr,
+        )
+    return open(path, "w", encoding="utf-8")
+
+
+class EventSink:
+    """Writes CHAOS_EVENT lines (NDJSON, one event per line) from a dedicated thread.
+
+    Events are serialized by whoever emits them and queued, the writer thread joins whatever is queued
+        (up to EVENT_BATCH_SIZE lines, or EVENT_FLUSH_INTERVAL seconds) into a single write and flush. Being
+        the only one writing, lines never interleave, and pyinfra's callbacks never wait on a slow reader.
+
+    When the queue is full the policy decides: "block" waits for room (nothing is lost), "drop" throws the
+        event away and counts it by type, see `dropped`. Events emitted with `force=True` (run_start,
+        run_end) always block.
+
+    Usage:
+        ```python
+        sink = EventSink.from_config({"event_sink": "unix:/run/dashboard.sock", "event_sink_policy": "drop"})
+        sink.start()
+        sink.emit({"type": "progress", ...})
+        sink.close()
+        ```
+    """
+
+    def __init__(
+        self,
+        stream: IO[str],
+        policy: str = "block",
+        capacity: int = EVENT_QUEUE_SIZE,
+        owned: list[Any] | None = None,
+    ):
+        if policy not in ("block", "drop"):
+            raise ValueError(f"Unknown event sink policy: {policy}")
+        self.stream = stream
+        self.policy = policy
+        self.dropped: dict[str, int] = {}
+        self._queue: queue.Queue = queue.Queue(maxsize=capacity)
+        self._lock = threading.Lock()
+        self._stop = object()
+        self._thread: threading.Thread | None = None
+        # What close() has to close (files and sockets opened by from_config), stdout is never closed.
+        self._owned = owned or []
+
+    @classmethod
+    def from_config(cls, global_config: dict[str, Any]) -> EventSink:
+        """Builds the sink described by the config:
+        - `event_sink`: "stdout" (default), "fd:<number>" (eg: a pipe opened by a wrapper) or "unix:<path>"
+            (a listening unix socket).
+        - `event_sink_policy`: "block" (default) or "drop".
+        - `event_queue_size`: how many events can wait to be written, EVENT_QUEUE_SIZE by default.
+        """
+        import sys
+
+        target = str(global_config.get("event_sink") or "stdout")
+        policy = str(global_config.get("event_sink_policy") or "block")
+        capacity = int(global_config.get("event_queue_size") or EVENT_QUEUE_SIZE)
+
+        if target == "stdout":
+            return cls(sys.stdout, policy, capacity)
+
+        if target.startswith("fd:"):
+            stream = os.fdopen(int(target[3:]), "w", encoding="utf-8", closefd=False)
+            return cls(stream, policy, capacity, owned=[stream])
+
+        if target.startswith("unix:"):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(target[5:])
+            stream = sock.makefile("w", encoding="utf-8")
+            return cls(stream, policy, capacity, owned=[stream, sock])
+
+        raise ValueError(f"Unknown event sink: {target}")
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+
+    def emit(self, data: dict[str, Any], force: bool = False) -> None:
+        """Queues an event, dropping it if the queue is full under the "drop" policy (unless `force`)."""
+        line = f"CHAOS_EVENT::{json.dumps(data)}\n"
+        if force or self.policy == "block":
+            self._queue.put(line)
+            return
+
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            event_type = str(data.get("type", "unknown"))
+            with self._lock:
+                self.dropped[event_type] = self.dropped.get(event_type, 0) + 1
+
+    def flush(self) -> None:
+        """Waits until every queued event is written."""
+        if self._thread:
+            self._queue.join()
+
+    def close(self) -> None:
+        """Writes everything still queued, stops the writer thread and closes what the sink opened."""
+        if self._thread:
+            self._queue.put(self._stop)
+            self._thread.join()
+            self._thread = None
+
+        for owned in self._owned:
+            with contextlib.suppress(OSError):
+                owned.close()
+        self._owned = []
+
+    def _worker(self) -> None:
+        broken = False
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + EVENT_FLUSH_INTERVAL
+            while len(batch) < EVENT_BATCH_SIZE and batch[-1] is not self._stop:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        batch.append(self._queue.get(timeout=remaining))
+                    else:
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = batch[-1] is self._stop
+            lines = [line for line in batch if line is not self._stop]
+            try:
+                if lines and not broken:
+                    self.stream.write("".join(lines))
+                    self.stream.flush()
+            except (OSError, ValueError) as e:
+                # The reader went away, whatever comes next can only be counted.
+                import sys
+
+                print(
+                    f"Error writing CHAOS_EVENT stream: {e}",
+                    file=sys.stderr,
+                    flush=True,
+                )
+                broken = True
+            if broken and lines:
+                with self._lock:
+                    self.dropped["sink_error"] = self.dropped.get(
+                        "sink_error", 0
+                    ) + len(lines)
+            for _ in batch:
+                self._queue.task_done()
+
+
+class SecretRedactor:
+    """Everything needed to redact a set of secret strings, compiled once per set.
+
+    Redaction is done in two phases:
+        - Every secret (and every line of multi-line secrets) of at least 4 characters, longest first, is replaced
+            case-insensitively by [REDACTED], its URL-encoded form by [REDACTED_URL] and its JSON-escaped form by
+            [REDACTED_JSON].
+        - Lines left that are a piece of a secret are replaced by [REDACTED_LINE].
+
+    Notes:
+        All variants are also compiled into a single (prefix-factored) alternation, so texts without any secret (nearly all of them) are
+            checked in one regex pass. Texts that do have one go through the per-variant substitutions in the same order
+            as always, skipping variants that aren't in the text, since overlapping secrets depend on that order.
+    """
+
+    def __init__(self, secret_strings: set[str]):
+        self.source = secret_strings
+
+        valid_secrets_set = set()
+        for s in secret_strings:
+            s_str = str(s)
+            if len(s_str) >= 4 and s_str.lower() not in _NOT_SECRETS:
+                valid_secrets_set.add(s_str)
+            for line in s_str.splitlines():
+                clean_line = line.strip()
+                if len(clean_line) >= 4 and clean_line.lower() not in _NOT_SECRETS:
+                    valid_secrets_set.add(clean_line)
+
+        valid_secrets = list(valid_secrets_set)
+        valid_secrets.sort(key=len, reverse=True)
+
+        # (variant, lowered variant or None when the `in` shortcut isn't safe, compiled pattern, replacement)
+        self.steps: list[tuple[str, str | None, re.Pattern[str], str]] = []
+        for term in valid_secrets:
+            variants = [(term, "[REDACTED]")]
+
+            url_encoded = urllib_parse.quote(term)
+            if url_encoded != term:
+                variants.append((url_encoded, "[REDACTED_URL]"))
+
+            json_escaped = json.dumps(term)[1:-1]
+            if json_escaped != term:
+                variants.append((json_escaped, "[REDACTED_JSON]"))
+
+            for variant, replacement in variants:
+                self.steps.append(
+                    (
+                        variant,
+                        variant.lower() if variant.isascii() else None,
+                        re.compile(re.escape(variant), re.IGNORECASE),
+                        replacement,
+                    )
+                )
+
+        self.combined: re.Pattern[str] | None = (
+            re.compile(
+                _trie_pattern([variant for variant, *_ in self.steps]), re.IGNORECASE
+            )
+            if self.steps
+            else None
+        )
+
+        # Secrets a line may be a piece of, joined so "is this line in any of them" is a single `in`.
+        self.line_terms = [
+            str(term)
+            for term in secret_strings
+            if len(str(term)) >= 4 and str(term).lower() not in _NOT_SECRETS
+        ]
+        self.lowered_terms = [term.lower() for term in self.line_terms]
+        self._haystack = "\0".join(self.line_terms)
+
+    def _in_any_secret(self, line: str) -> bool:
+        if "\0" in line:
+            return any(line in term for term in self.line_terms)
+        return line in self._haystack
+
+    def redact(self, text: str) -> str:
+        """Redacts the secrets and their escaped forms from a text.
+
+        Args:
+            text (str): The raw text.
+
+        Returns:
+            str: Redacted text.
+        """
+        if not text:
+            return text
+
+        if self.combined is not None and self.combined.search(text) is not None:
+            # The `in` shortcut only agrees with re.IGNORECASE on ASCII (eg: "k" also matches the Kelvin sign).
+            ascii_text = text.isascii()
+            lowered = text.lower()
+            for _, lowered_variant, pattern, replacement in self.steps:
+                if ascii_text and lowered_variant is not None:
+                    if lowered_variant not in lowered:
+                        continue
+                elif pattern.search(text) is None:
+                    continue
+
+                text = pattern.sub(replacement, text)
+                ascii_text = text.isascii()
+                lowered = text.lower()
+
+        if self.line_terms:
+            for line in text.splitlines():
+                if len(line.strip()) >= 4 and self._in_any_secret(line):
+                    text = text.replace(line, "[REDACTED_LINE]")
+
+        return text
 
 
 class ChaosTelemetry(BaseStateCallback):
@@ -58,39 +572,196 @@ class ChaosTelemetry(BaseStateCallback):
     _diff_log_buffer: dict[str, list[str]] = {}
     _active_diffs: set[str] = set()
     _db_writer_thread: threading.Thread | None = None
+    _db_queue: queue.Queue | None = None
     _poison_pill: object = object()
     _limani_plugin: Limani | None = None
     _secret_strings: set[str] = set()
+    _redactor: SecretRedactor | None = None
+    _fact_events: FactEventIndex = FactEventIndex()
+    _host_ids: dict[str, int] = {}
+    _host_ids_lock: threading.Lock = threading.Lock()
+    _sketches: dict[str, QuantileSketch] = {}
+    _dirty_sketches: set[str] = set()
+    _sketches_saved_at: float = 0.0
+    _sketches_lock: threading.Lock = threading.Lock()
     _needed_secret_keys: set[str] = set()
+    _event_sink: EventSink | None = None
+    # The last CPU counters of each host, to turn the next ones into a utilisation (see record_snapshot).
+    _cpu_counters: dict[str, dict[str, int]] = {}
+    # The pyinfra functions wrapped by install_capture, to put back at uninstall_capture.
+    _captured: list[tuple[Any, str, Any]] = []
 
     @classmethod
     def _database_writer_worker(cls) -> None:
-        """Worker thread to process database write operations asynchronously."""
+        """Worker thread to process database write operations asynchronously.
+
+        Notes:
+            The queue is drained in batches of up to WRITE_BATCH_SIZE items, waiting at most WRITE_BATCH_WINDOW
+                seconds for a batch to fill. Each batch is written with the Limani insert_many_* methods and
+                committed once (plus around the few calls that aren't inserts), instead of once per row.
+        """
         if not cls._limani_plugin:
             raise RuntimeError("Limani plugin is not loaded.")
 
         cls._limani_plugin.connect()
 
-        while True:
+        stop = False
+        while not stop:
+            if not cls._db_queue:
+                raise RuntimeError("DB queue is not initialized.")
+
+            batch = cls._drain_batch(cls._db_queue)
             try:
-                if not cls._db_queue:
-                    raise RuntimeError("DB queue is not initialized.")
-                item = cls._db_queue.get()
-                if item is cls._poison_pill:
+                stop = cls._write_batch(batch)
+            except Exception as e:
+                print(f"Error in telemetry DB writer thread: {e}", flush=True)
+            finally:
+                for _ in batch:
                     cls._db_queue.task_done()
-                    break
 
+        cls._limani_plugin.disconnect()
+
+    @classmethod
+    def _drain_batch(cls, db_queue: queue.Queue) -> list[Any]:
+        """Blocks for one item, then keeps taking items until the batch is full, the window closes
+        or the poison pill shows up."""
+        batch = [db_queue.get()]
+        deadline = time.monotonic() + WRITE_BATCH_WINDOW
+
+        while len(batch) < WRITE_BATCH_SIZE:
+            if batch[-1] is cls._poison_pill:
+                break
+
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(db_queue.get(timeout=remaining))
+                else:
+                    batch.append(db_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        return batch
+
+    @classmethod
+    def _write_batch(cls, batch: list[Any]) -> bool:
+        """Writes a batch of queued calls, grouping the inserts into insert_many_* calls and committing once.
+
+        Any other call (eg: start_update_run) flushes and commits the grouped inserts first, and is committed
+            right after, so the order between them is kept and everything before it is settled. If an insert_many_*
+            call (or the last commit) fails, what's left since the last commit is rolled back and written again row
+            by row (see _write_rows), so one bad row doesn't take the rest of its group with it and no row is
+            written twice.
+
+        Limanis that keep the default insert_many_* loops (which commit row by row) get their rows one by one
+            straight away, the same loop with each row failing on its own.
+
+        Returns:
+            - Whether the poison pill was in the batch.
+        """
+        limani = cls._limani_plugin
+        if not limani:
+            raise RuntimeError("Limani plugin is not loaded.")
+
+        grouped: dict[str, list[dict[str, Any]]] = {
+            name: [] for name in _BATCHED_INSERTS
+        }
+
+        def _flush() -> None:
+            for name, rows in grouped.items():
+                if not rows:
+                    continue
+                grouped[name] = []
+                many = _BATCHED_INSERTS[name]
+                if getattr(type(limani), many) is getattr(Limani, many):
+                    cls._write_rows([(getattr(limani, name), [], row) for row in rows])
+                else:
+                    getattr(limani, many)(rows)
+
+        stop = False
+        committed = 0
+        try:
+            for index, item in enumerate(batch):
+                if item is cls._poison_pill:
+                    stop = True
+                    continue
                 func, args, kwargs = item
+                name = getattr(func, "__name__", "")
+                if name in grouped and not args:
+                    grouped[name].append(kwargs)
+                    continue
+
+                _flush()
+                limani.commit()
+                try:
+                    func(*args, **kwargs)
+                    limani.commit()
+                except Exception as e:
+                    print(f"Error in telemetry DB writer thread: {e}", flush=True)
+                    limani.rollback()
+                committed = index + 1
+
+            _flush()
+            limani.commit()
+        except Exception as e:
+            print(
+                f"Error in telemetry DB writer thread, writing the batch row by row: {e}",
+                flush=True,
+            )
+            limani.rollback()
+            cls._write_rows(batch[committed:])
+            limani.commit()
+        return stop
+
+    @classmethod
+    def _write_rows(cls, batch: list[Any]) -> None:
+        """Writes queued inserts one by one, the slow path of _write_batch, without committing.
+
+        Each insert goes through its single-row method, and a row that fails is rolled back and skipped
+            (losing only that row, eg: one whose arguments can't be encoded).
+        """
+        limani = cls._limani_plugin
+        if not limani:
+            raise RuntimeError("Limani plugin is not loaded.")
+
+        for item in batch:
+            if item is cls._poison_pill:
+                continue
+            func, args, kwargs = item
+            try:
                 func(*args, **kwargs)
-                cls._db_queue.task_done()
             except Exception as e:
                 print(f"Error in telemetry DB writer thread: {e}", flush=True)
-        cls._limani_plugin.disconnect()
+                limani.rollback()
+
+    @classmethod
+    def _host_id(cls, host_name: str) -> int:
+        """Resolves the ID of a host of the current run, from memory for every host registered at start_run.
+
+        Hosts that weren't registered are created through the Limani once and cached too.
+        """
+        host_id = cls._host_ids.get(host_name)
+        if host_id is not None:
+            return host_id
+
+        if not cls._limani_plugin or not cls._run_id:
+            raise RuntimeError("Limani plugin is not loaded.")
+
+        with cls._host_ids_lock:
+            host_id = cls._host_ids.get(host_name)
+            if host_id is None:
+                host_id = cls._limani_plugin.get_or_create_host(cls._run_id, host_name)
+                cls._host_ids[host_name] = host_id
+        return host_id
 
     @classmethod
-    def start_run(cls) -> None:
+    def start_run(cls, host_names: list[str] | None = None) -> None:
         """Initializes the database, creates a new run entry, and starts the async DB writer.
 
+        Args:
+            host_names (list[str] | None): The hosts of the inventory, registered in bulk so their IDs never
+                have to be looked up during the run. The boatswain is always registered.
+
         Notes:
             This should be called once at the beginning of a `chaos apply` execution.
         """
@@ -98,6 +769,16 @@ class ChaosTelemetry(BaseStateCallback):
             raise RuntimeError("Limani plugin is not loaded.")
 
         cls._limani_plugin.init_db()
+        cls._fact_events = FactEventIndex()
+        cls._cpu_counters = {}
+        if cls._event_sink is None:
+            import sys
+
+            cls.set_event_sink(EventSink(sys.stdout))
+        with cls._sketches_lock:
+            cls._sketches = {}
+            cls._dirty_sketches = set()
+            cls._sketches_saved_at = time.monotonic()
 
         # Start the DB writer thread
         cls._db_queue = queue.Queue()
@@ -123,6 +804,10 @@ class ChaosTelemetry(BaseStateCallback):
         )
         print(f"CHAOS_RUN_ID::{cls._run_id}", flush=True)
 
+        names = list(dict.fromkeys([*(host_names or []), socket.gethostname()]))
+        with cls._host_ids_lock:
+            cls._host_ids = dict(cls._limani_plugin.register_hosts(cls._run_id, names))
+
         cls._stream_chaos_event(
             {
                 "type": "run_start",
@@ -131,7 +816,8 @@ class ChaosTelemetry(BaseStateCallback):
                 "timestamp": start_time,
                 "hailer": hailer_info,
                 "secrets_required": list(needed_secrets),
-            }
+            },
+            force=True,
         )
 
     @classmethod
@@ -150,16 +836,15 @@ class ChaosTelemetry(BaseStateCallback):
         if cls._run_id:
             # Wait for all pending writes to complete before finishing the run
             if cls._db_queue:
+                cls._save_sketches()
                 cls._db_queue.join()
 
-            conn = cls._limani_plugin.connect()
+            cls._limani_plugin.connect()
             try:
-                final_status_row = conn.execute(
-                    "SELECT status FROM runs WHERE id = ?", (cls._run_id,)
-                ).fetchone()
+                run_row = cls._limani_plugin.get_run(cls._run_id)
                 final_status = (
-                    final_status_row["status"]
-                    if final_status_row and final_status_row["status"] == "failure"
+                    run_row["status"]
+                    if run_row and run_row["status"] == "failure"
                     else status
                 )
 
@@ -181,8 +866,16 @@ class ChaosTelemetry(BaseStateCallback):
                     "status": final_status,
                     "timestamp": end_time,
                     "summary": summary,
-                }
+                    "operation_summary": cls.operation_percentiles(),
+                    "dropped_events": dict(cls._event_sink.dropped)
+                    if cls._event_sink
+                    else {},
+                },
+                force=True,
             )
+            if cls._event_sink:
+                cls._event_sink.close()
+                cls._event_sink = None
 
             # Stop the writer thread
             if cls._db_queue and cls._db_writer_thread:
@@ -191,8 +884,74 @@ class ChaosTelemetry(BaseStateCallback):
                 cls._db_writer_thread = None
                 cls._db_queue = None
 
+            cls.uninstall_capture()
             print(f"CHAOS_RUN_ENDED::{cls._run_id}", flush=True)
             cls._run_id = None
+            cls._host_ids = {}
+            with cls._sketches_lock:
+                cls._sketches = {}
+                cls._dirty_sketches = set()
+
+    @classmethod
+    def _queue_operation(cls, op_data: dict[str, Any]) -> None:
+        """Queues the insert of an operation and adds its duration to the live sketch of its name.
+
+        The sketches that changed are sent to the Limani at most every SKETCH_SAVE_INTERVAL seconds
+            (and once more at end_run), so the percentiles of a run can be read while it runs.
+
+        Args:
+            op_data (dict): The keyword arguments of Limani.insert_operation.
+        """
+        from chaos.lib.sketch import QuantileSketch
+
+        if not cls._db_queue or not cls._limani_plugin:
+            raise RuntimeError("Telemetry run is not started.")
+
+        cls._db_queue.put((cls._limani_plugin.insert_operation, [], op_data))
+
+        name = op_data["name"]
+        with cls._sketches_lock:
+            sketch = cls._sketches.get(name)
+            if sketch is None:
+                sketch = cls._sketches[name] = QuantileSketch()
+            sketch.add(op_data["duration"])
+            cls._dirty_sketches.add(name)
+            due = time.monotonic() - cls._sketches_saved_at >= SKETCH_SAVE_INTERVAL
+
+        if due:
+            cls._save_sketches()
+
+    @classmethod
+    def _save_sketches(cls) -> None:
+        """Queues the save of every sketch that changed since the last save."""
+        if not cls._db_queue or not cls._limani_plugin or not cls._run_id:
+            return
+
+        with cls._sketches_lock:
+            cls._sketches_saved_at = time.monotonic()
+            if not cls._dirty_sketches:
+                return
+            states = {
+                name: cls._sketches[name].to_dict() for name in cls._dirty_sketches
+            }
+            cls._dirty_sketches = set()
+
+        cls._db_queue.put(
+            (cls._limani_plugin.save_operation_sketches, [cls._run_id, states], {})
+        )
+
+    @classmethod
+    def operation_percentiles(cls) -> dict[str, OpPercentileReturn]:
+        """The live operation_summary of the current run: count, total, average and p50/p90/p95/p99
+        durations of each operation name, from the in-memory sketches (within 1% of the exact percentiles).
+
+        Returns:
+            dict: The summary of each operation name, empty outside of a run.
+        """
+        from chaos.lib.sketch import operation_summary
+
+        with cls._sketches_lock:
+            return operation_summary(cls._sketches)  # type: ignore[return-value]
 
     @staticmethod
     def _strip_ansi_codes(text: str) -> str:
@@ -204,8 +963,29 @@ class ChaosTelemetry(BaseStateCallback):
         Returns:
             str: The clean text.
         """
-        ansi_escape = re.compile(r"\x1b\[([0-9]{1,2}(;[0-9]{1,2})?)?[m|K]")
-        return ansi_escape.sub("", text)
+        return _ANSI_ESCAPE.sub("", text)
+
+    @classmethod
+    def set_event_sink(cls, sink: EventSink) -> None:
+        """Sets (and starts) where the CHAOS_EVENT stream of the next run goes, see EventSink.from_config.
+
+        Without one, start_run streams to stdout with the "block" policy.
+        """
+        cls._event_sink = sink
+        sink.start()
+
+    @classmethod
+    def set_secret_strings(cls, secret_strings: set[str]) -> None:
+        """Sets the secret strings to redact from everything the logbook records, compiling their redactor."""
+        cls._secret_strings = secret_strings
+        cls._redactor = SecretRedactor(secret_strings)
+
+    @classmethod
+    def _get_redactor(cls) -> SecretRedactor:
+        """The redactor of the current secret strings, rebuilt if _secret_strings was replaced behind our back."""
+        if cls._redactor is None or cls._redactor.source is not cls._secret_strings:
+            cls._redactor = SecretRedactor(cls._secret_strings)
+        return cls._redactor
 
     @staticmethod
     def _sanitize_diff_text(text: str) -> str:
@@ -220,65 +1000,24 @@ class ChaosTelemetry(BaseStateCallback):
         if not text:
             return text
 
-        sensitive_strings = ChaosTelemetry._secret_strings
-
-        valid_secrets_set = set()
-        for s in sensitive_strings:
-            s_str = str(s)
-            if len(s_str) >= 4 and s_str.lower() not in (
-                "true",
-                "false",
-                "null",
-                "none",
-            ):
-                valid_secrets_set.add(s_str)
-            for line in s_str.splitlines():
-                clean_line = line.strip()
-                if len(clean_line) >= 4 and clean_line.lower() not in (
-                    "true",
-                    "false",
-                    "null",
-                    "none",
-                ):
-                    valid_secrets_set.add(clean_line)
-
-        valid_secrets = list(valid_secrets_set)
-        valid_secrets.sort(key=len, reverse=True)
-
-        for term in valid_secrets:
-            escaped_term = re.escape(term)
-            text = re.sub(escaped_term, "[REDACTED]", text, flags=re.IGNORECASE)
-
-            url_encoded = urllib_parse.quote(term)
-            if url_encoded != term:
-                escaped_url = re.escape(url_encoded)
-                text = re.sub(escaped_url, "[REDACTED_URL]", text, flags=re.IGNORECASE)
-
-            json_escaped = json.dumps(term)[1:-1]
-            if json_escaped != term:
-                escaped_json = re.escape(json_escaped)
-                text = re.sub(
-                    escaped_json, "[REDACTED_JSON]", text, flags=re.IGNORECASE
-                )
-
-        for line in text.splitlines():
-            if len(line.strip()) >= 4 and any(
-                line in str(term)
-                for term in sensitive_strings
-                if len(str(term)) >= 4
-                and str(term).lower() not in ("true", "false", "null", "none")
-            ):
-                text = text.replace(line, "[REDACTED_LINE]")
-
-        return text
+        return ChaosTelemetry._get_redactor().redact(text)
 
     @classmethod
-    def record_setup_phase(cls, state: State, setup_duration: float) -> None:
+    def record_setup_phase(
+        cls,
+        state: State,
+        setup_duration: float,
+        host: Host | None = None,
+        error: str | None = None,
+    ) -> None:
         """Records the setup phase duration as a special operation in the database.
 
         Args:
             state (State): The pyinfra state object.
             setup_duration (float): The duration taken for the setup phase.
+            host (Host | None): The host this duration belongs to. If given, it is recorded as a "chaos_connect" operation
+                of that host (its connection latency), otherwise as a fleet-wide "chaos_setup" operation of the local machine.
+            error (str | None): Why the host could not be connected to, marks the operation as failed.
         """
         if not cls._run_id or not cls._db_queue:
             return
@@ -286,16 +1025,20 @@ class ChaosTelemetry(BaseStateCallback):
         if not cls._limani_plugin:
             raise RuntimeError("Limani plugin is not loaded.")
 
-        boatswain_hostname = socket.gethostname()
-        host_id = cls._limani_plugin.get_or_create_host(
-            cls._run_id, boatswain_hostname
-        )  # This can remain sync
+        boatswain_hostname = host.name if host else socket.gethostname()
+        host_id = cls._host_id(boatswain_hostname)
 
         ts = time.time()
         op_hash = f"setup-{time.perf_counter_ns()}"
-        op_name = "chaos_setup"
+        op_name = "chaos_connect" if host else "chaos_setup"
 
-        arguments = {"message": "Time spent connecting to hosts and preparing the run."}
+        arguments = {
+            "message": "Time spent connecting to the host."
+            if host
+            else "Time spent connecting to hosts and preparing the run."
+        }
+        if error:
+            arguments["error"] = error
 
         op_data = {
             "run_id": ChaosTelemetry._run_id,
@@ -303,7 +1046,7 @@ class ChaosTelemetry(BaseStateCallback):
             "op_hash": op_hash,
             "name": op_name,
             "changed": False,
-            "success": True,
+            "success": error is None,
             "duration": round(setup_duration, 4),
             "timestamp": ts,
             "logs": {},
@@ -312,14 +1055,14 @@ class ChaosTelemetry(BaseStateCallback):
             "retry_stats": {},
             "command_n_facts": [],
         }
-        cls._db_queue.put((cls._limani_plugin.insert_operation, [], op_data))
+        cls._queue_operation(op_data)
 
         streamed_event = {
             "type": "progress",
             "host": boatswain_hostname,
             "operation": op_name,
             "changed": False,
-            "success": True,
+            "success": error is None,
             "duration": round(setup_duration, 4),
             "timestamp": ts,
             "logs": {},
@@ -330,6 +1073,47 @@ class ChaosTelemetry(BaseStateCallback):
         }
         cls._stream_chaos_event(streamed_event)
 
+    @classmethod
+    def record_parallelism(cls, decision: dict[str, Any]) -> None:
+        """Records a worker count decision of `parallelism: auto` as a "parallelism" snapshot of the boatswain.
+
+        It goes with the resource snapshots rather than the operations, so it doesn't count as an operation in the
+        rollups, the duration sketches or the stats.
+
+        Args:
+            decision (dict): The decision as built by ParallelismTuner, holding the new worker count ("workers"),
+                the previous one ("previous"), why it changed ("reason") and the measurements behind it.
+        """
+        if not cls._run_id or not cls._db_queue:
+            return
+
+        if not cls._limani_plugin:
+            raise RuntimeError("Limani plugin is not loaded.")
+
+        boatswain_hostname = socket.gethostname()
+        host_id = cls._host_id(boatswain_hostname)
+
+        ts = decision.get("timestamp") or time.time()
+        snapshot_data = {
+            "run_id": cls._run_id,
+            "host_id": host_id,
+            "stage": "parallelism",
+            "timestamp": ts,
+            "metrics": decision,
+        }
+        cls._db_queue.put((cls._limani_plugin.insert_snapshot, [], snapshot_data))
+
+        cls._stream_chaos_event(
+            {
+                "type": "parallelism",
+                "host": boatswain_hostname,
+                "timestamp": ts,
+                "workers": decision.get("workers"),
+                "previous": decision.get("previous"),
+                "reason": decision.get("reason"),
+            }
+        )
+
     @classmethod
     def record_snapshot(
         cls,
@@ -337,6 +1121,7 @@ class ChaosTelemetry(BaseStateCallback):
         ram_data: dict[str, float],
         load_data: tuple[float, float, float],
         stage: str = "checkpoint",
+        cpu_data: dict[str, int] | None = None,
     ) -> None:
         """Records a snapshot of the host's resource usage into the database.
 
@@ -345,6 +1130,8 @@ class ChaosTelemetry(BaseStateCallback):
             ram_data (dict): The gathered dictionary containing RAM usage facts.
             load_data (dict): The gathered dictionary containing CPU Load facts.
             stage (str, optional): The identifier describing at what phase the snapshot was taken. Defaults to "checkpoint".
+            cpu_data (dict | None): The CPU counters of the HostResources fact. With them the snapshot gets the CPU
+                count and the CPU utilisation since the previous snapshot of the host (None on the first one).
         """
         if not cls._run_id or not cls._db_queue:
             return
@@ -352,13 +1139,21 @@ class ChaosTelemetry(BaseStateCallback):
         if not cls._limani_plugin:
             raise RuntimeError("Limani plugin is not loaded.")
 
-        metrics = {
+        metrics: dict[str, Any] = {
             "cpu_load_1min": load_data[0] if load_data else 0.0,
             "cpu_load_5min": load_data[1] if load_data else 0.0,
             "ram_percent": ram_data["percent"] if ram_data else 0.0,
             "ram_used_gb": round(ram_data["used_mb"] / 1024, 2) if ram_data else 0.0,
             "ram_total_gb": round(ram_data["total_mb"] / 1024, 2) if ram_data else 0.0,
         }
+        if cpu_data:
+            from chaos.lib.facts.facts import HostResources
+
+            metrics["cpus"] = cpu_data["cpus"]
+            metrics["cpu_percent"] = HostResources.cpu_percent(
+                cls._cpu_counters.get(host.name), cpu_data
+            )
+            cls._cpu_counters[host.name] = cpu_data
 
         ts = time.time()
         cls._stream_chaos_event(
@@ -371,9 +1166,7 @@ class ChaosTelemetry(BaseStateCallback):
             }
         )
 
-        host_id = cls._limani_plugin.get_or_create_host(
-            cls._run_id, host.name
-        )  # Sync is fine
+        host_id = cls._host_id(host.name)
         snapshot_data = {
             "run_id": cls._run_id,
             "host_id": host_id,
@@ -407,10 +1200,156 @@ class ChaosTelemetry(BaseStateCallback):
 
         return "", ""
 
+    @classmethod
+    def _record_command(
+        cls, context: str, command: str, timestamp: float, log_level: str = "DEBUG"
+    ) -> None:
+        """Logs a gathered fact or a ran command: to the in-memory index (for the operation history),
+        to the event stream and to the database.
+
+        Args:
+            context (str): "fact_gathering" or "running_command_on_<host>".
+            command (str): The fact (with its arguments) or the command, redacted here.
+            timestamp (float): When it happened.
+            log_level (str): The log level it is recorded with.
+        """
+        run_id = cls._run_id
+        if not run_id or not command or not recording_context.get():
+            return
+        if not cls._limani_plugin:
+            raise RuntimeError("Limani plugin is not loaded.")
+
+        command = cls._sanitize_diff_text(command)
+        log_data = {
+            "run_id": run_id,
+            "timestamp": timestamp,
+            "log_level": log_level,
+            "context": context,
+            "command": command,
+        }
+        cls._fact_events.add(log_data)
+
+        cls._stream_chaos_event(
+            {
+                "type": "fact",
+                "timestamp": timestamp,
+                "log_level": log_level,
+                "context": context,
+                "command": command,
+            }
+        )
+
+        if cls._db_queue:
+            cls._db_queue.put((cls._limani_plugin.insert_fact_log, [], log_data))
+
+    @classmethod
+    @contextlib.contextmanager
+    def unrecorded(cls) -> Iterator[None]:
+        """Leaves the facts gathered and commands run by the current greenlet out of the logbook while inside.
+
+        For Ch-aOS' own background work (eg: the health samples taken while operations run), that would
+            otherwise show up in the history of whatever operation runs at the time.
+        """
+        token = recording_context.set(False)
+        try:
+            yield
+        finally:
+            recording_context.reset(token)
+
+    @classmethod
+    def install_capture(cls) -> bool:
+        """Hooks pyinfra's fact gathering and command execution, so they are recorded as they happen
+        without having pyinfra log (and format) everything at DEBUG for PyinfraFactLogHandler to parse.
+
+        Wraps `pyinfra.api.facts._get_fact` (what logs "Getting fact:") and `Host.run_shell_command`
+            (what every connector runs commands through). Commands are recorded as the operation or fact
+            built them, before the connector wraps them (sudo, env...).
+
+        Returns:
+            - Whether the hooks are in place. If they are not (pyinfra changed its internals), use the
+                PyinfraFactLogHandler at DEBUG instead.
+        """
+        import inspect
+
+        import pyinfra.api.facts as pyinfra_facts
+        from pyinfra.api.arguments import all_global_arguments
+        from pyinfra.api.util import get_kwargs_str
+
+        if cls._captured:
+            return True
+
+        get_fact = getattr(pyinfra_facts, "_get_fact", None)
+        run_shell_command = getattr(Host, "run_shell_command", None)
+        if not (get_fact and run_shell_command):
+            return False
+
+        # Global arguments (_sudo, _timeout...) aren't fact arguments, pyinfra leaves them out of its log too.
+        global_names = {name for name, _ in all_global_arguments()}
+
+        def _get_fact(
+            state,
+            host,
+            fact_cls,
+            args=None,
+            kwargs=None,
+            ensure_hosts=None,
+            *rest,
+            **extra,
+        ):
+            fact_kwargs = {
+                k: v for k, v in (kwargs or {}).items() if k not in global_names
+            }
+            try:
+                if args or fact_kwargs:
+                    fact_kwargs = inspect.getcallargs(
+                        fact_cls().command, *(args or []), **fact_kwargs
+                    )
+            except TypeError:
+                pass
+            cls._record_command(
+                "fact_gathering",
+                f"{fact_cls.name} ({get_kwargs_str(fact_kwargs)}) (ensure_hosts: {ensure_hosts!r})",
+                time.time(),
+            )
+            return get_fact(
+                state, host, fact_cls, args, kwargs, ensure_hosts, *rest, **extra
+            )
+
+        def _run_shell_command(host, command, *args, **kwargs):
+            cls._record_command(
+                f"running_command_on_{host.name}".replace(" ", "_").lower(),
+                str(command),
+                time.time(),
+            )
+            return run_shell_command(host, command, *args, **kwargs)
+
+        pyinfra_facts._get_fact = _get_fact
+        Host.run_shell_command = _run_shell_command  # type: ignore[method-assign]
+        cls._captured = [
+            (pyinfra_facts, "_get_fact", get_fact),
+            (Host, "run_shell_command", run_shell_command),
+        ]
+        return True
+
+    @classmethod
+    def uninstall_capture(cls) -> None:
+        """Puts back what install_capture wrapped."""
+        for owner, name, original in cls._captured:
+            setattr(owner, name, original)
+        cls._captured = []
+
     class PyinfraFactLogHandler(logging.Handler):
-        """Gets command logs from pyinfra's logger and logs them to the database."""
+        """Gets command logs from pyinfra's logger and logs them to the database.
+
+        With install_capture in place only the diffs are taken from here (they are logged at INFO),
+            facts and commands come from the hooks. Otherwise, this is the fallback: pyinfra's logger
+            has to be at DEBUG, and facts and commands are parsed out of its messages.
+        """
 
         def emit(self, record) -> None:
+            if ChaosTelemetry._captured and record.levelno < logging.INFO:
+                return
+
             msg = record.getMessage()
             op_hash = op_hash_context.get()
             if not ChaosTelemetry._limani_plugin:
@@ -441,13 +1380,14 @@ class ChaosTelemetry(BaseStateCallback):
 
                     return
 
-            is_fact_gathering = "Getting fact:" in msg and record.levelname == "DEBUG"
-            is_command_running = (
-                "--> Running command" in msg and record.levelname == "DEBUG"
-            )
+            if ChaosTelemetry._captured or record.levelname != "DEBUG":
+                return
 
-            run_id = ChaosTelemetry._run_id
-            if not run_id or not (is_fact_gathering or is_command_running):
+            is_fact_gathering = "Getting fact:" in msg
+            is_command_running = "--> Running command" in msg
+            if not ChaosTelemetry._run_id or not (
+                is_fact_gathering or is_command_running
+            ):
                 return
 
             context, command = None, None
@@ -465,32 +1405,11 @@ class ChaosTelemetry(BaseStateCallback):
                     context = "running_command"
                     command = msg
 
-            if command is not None:
-                command = ChaosTelemetry._sanitize_diff_text(command)
-
             if context and command:
-                ChaosTelemetry._stream_chaos_event(
-                    {
-                        "type": "fact",
-                        "timestamp": record.created,
-                        "log_level": record.levelname,
-                        "context": context,
-                        "command": command,
-                    }
+                ChaosTelemetry._record_command(
+                    context, command, record.created, record.levelname
                 )
 
-                if ChaosTelemetry._db_queue:
-                    log_data = {
-                        "run_id": run_id,
-                        "timestamp": record.created,
-                        "log_level": record.levelname,
-                        "context": context,
-                        "command": command,
-                    }
-                    ChaosTelemetry._db_queue.put(
-                        (ChaosTelemetry._limani_plugin.insert_fact_log, [], log_data)
-                    )
-
     @staticmethod
     def operation_host_start(state: State, host: Host, op_hash: str) -> None:
         """Records the start time of an operation on a specific host.
@@ -577,10 +1496,7 @@ class ChaosTelemetry(BaseStateCallback):
                 clean_data[key] = "<function>"
 
             elif isinstance(value, str) and any(
-                str(term).lower() in value
-                for term in ChaosTelemetry._secret_strings
-                if len(str(term)) >= 4
-                and str(term).lower() not in ("true", "false", "null", "none")
+                term in value for term in ChaosTelemetry._get_redactor().lowered_terms
             ):
                 clean_data[key] = "********"
 
@@ -590,13 +1506,18 @@ class ChaosTelemetry(BaseStateCallback):
         return clean_data
 
     @staticmethod
-    def _stream_chaos_event(data: dict) -> None:
-        """Helper to print event data as a structured JSON string.
+    def _stream_chaos_event(data: dict, force: bool = False) -> None:
+        """Helper to stream event data as a structured JSON line, through the event sink of the run.
 
         Args:
             data (dict): Dictionary context of the generated trace JSON.
+            force (bool): Never drop this event, even under the "drop" policy.
         """
-        print(f"CHAOS_EVENT::{json.dumps(data)}", flush=True)
+        sink = ChaosTelemetry._event_sink
+        if sink is None:
+            print(f"CHAOS_EVENT::{json.dumps(data)}", flush=True)
+            return
+        sink.emit(data, force=force)
 
     @staticmethod
     def operation_host_success(
@@ -650,9 +1571,7 @@ class ChaosTelemetry(BaseStateCallback):
 
         command_n_facts = []
         if start_time:
-            command_n_facts = ChaosTelemetry._limani_plugin.get_facts_for_timespan(
-                ChaosTelemetry._run_id, start_time, end_time
-            )
+            command_n_facts = ChaosTelemetry._fact_events.between(start_time, end_time)
 
         streamed_event = {
             "type": "progress",
@@ -671,9 +1590,7 @@ class ChaosTelemetry(BaseStateCallback):
 
         ChaosTelemetry._stream_chaos_event(streamed_event)
 
-        host_id = ChaosTelemetry._limani_plugin.get_or_create_host(
-            ChaosTelemetry._run_id, host.name
-        )
+        host_id = ChaosTelemetry._host_id(host.name)
 
         db_op_data = {
             "run_id": ChaosTelemetry._run_id,
@@ -690,9 +1607,7 @@ class ChaosTelemetry(BaseStateCallback):
             "retry_stats": retry_stats,
             "command_n_facts": command_n_facts,
         }
-        ChaosTelemetry._db_queue.put(
-            (ChaosTelemetry._limani_plugin.insert_operation, [], db_op_data)
-        )
+        ChaosTelemetry._queue_operation(db_op_data)
 
     @staticmethod
     def operation_host_error(
@@ -750,9 +1665,7 @@ class ChaosTelemetry(BaseStateCallback):
 
         command_n_facts = []
         if start_time:
-            command_n_facts = ChaosTelemetry._limani_plugin.get_facts_for_timespan(
-                ChaosTelemetry._run_id, start_time, end_time
-            )
+            command_n_facts = ChaosTelemetry._fact_events.between(start_time, end_time)
 
         streamed_event = {
             "type": "progress",
@@ -771,9 +1684,7 @@ class ChaosTelemetry(BaseStateCallback):
 
         ChaosTelemetry._stream_chaos_event(streamed_event)
 
-        host_id = ChaosTelemetry._limani_plugin.get_or_create_host(
-            ChaosTelemetry._run_id, host.name
-        )
+        host_id = ChaosTelemetry._host_id(host.name)
 
         db_op_data = {
             "run_id": ChaosTelemetry._run_id,
@@ -790,9 +1701,7 @@ class ChaosTelemetry(BaseStateCallback):
             "retry_stats": retry_stats,
             "command_n_facts": command_n_facts,
         }
-        ChaosTelemetry._db_queue.put(
-            (ChaosTelemetry._limani_plugin.insert_operation, [], db_op_data)
-        )
+        ChaosTelemetry._queue_operation(db_op_data)
         ChaosTelemetry._db_queue.put(
             (
                 ChaosTelemetry._limani_plugin.start_update_run,
@@ -859,117 +1768,144 @@ class ChaosTelemetry(BaseStateCallback):
         return op_summary
 
     @classmethod
-    def export_report(cls, filepath: str = "chaos_logbook.json") -> None:
-        """Fetches run data and generates a structured JSON report by streaming.
+    def _write_report(cls, out: ReportWriter, run_info: dict[str, Any]) -> None:
+        """Writes the logbook JSON of a run section by section, never holding more than a row (or a host's
+        history, spilled to disk past EXPORT_SPOOL_SIZE) in memory.
 
-        Args:
-            filepath (str, optional): The target local export file. Defaults to "chaos_logbook.json".
+        Operations are read once, ordered by host, and each row is decoded once: its history entry goes
+            straight out, its streamed_history event to a temporary writer appended later, and its duration
+            into the sketch of its name, from which the operation_summary percentiles come (see chaos.lib.sketch).
 
-        Notes:
-            Streaming avoids loading the entire dataset into memory.
-            Yeah, i know it writes directly to a file first, but it's still better than loading everything into memory before writing.
+        Args:
+            out (ReportWriter): Where to write the report (pretty and compact at once), at depth 0.
+            run_info (dict): The row of the run, as returned by Limani.get_run.
         """
-        import shutil
+        from chaos.lib.sketch import QuantileSketch, operation_summary
 
-        if not cls._run_id:
-            print("No active run to export.")
-            return
-
-        if not cls._limani_plugin:
+        limani = cls._limani_plugin
+        if not limani:
             raise RuntimeError("Limani plugin is not loaded.")
+        run_id = run_info["id"]
+
+        out.open("{")
+        out.value("v1", key="api_version")
+        out.value(run_info["run_id_human"], key="run_id")
+        out.value(run_info["id"], key="uggly_run_id")
+        out.value(
+            json.loads(run_info["hailer_json"]) if run_info["hailer_json"] else {},
+            key="hailer",
+        )
+        out.value(list(cls._needed_secret_keys), key="secrets_required")
 
-        # Ensure all pending writes are finished before exporting
-        if cls._db_queue:
-            cls._db_queue.join()
+        # In order of first appearance.
+        op_sketches: dict[str, QuantileSketch] = {}
 
-        db_data = cls._limani_plugin.get_run_data(cls._run_id)
-        if not db_data:
-            print(f"Could not find data for run_id: {cls._run_id}")
-            return
+        with ReportWriter.spooled(depth=2) as streamed:
+            out.open("{", key="hosts")
+            operations = limani.iter_operations(run_id, order_by="host")
+            pending = next(operations, None)
 
-        run_info = db_data["run"]
+            for host in limani.iter_hosts(run_id):
+                # Operations of hosts that aren't in the run (there shouldn't be any) are skipped, as they always were.
+                while pending is not None and pending["host_name"] < host["name"]:
+                    pending = next(operations, None)
 
-        try:
-            with open(filepath, "w") as f:
-                f.write("{\n")
-                # Write top-level info
-                f.write('    "api_version": "v1",\n')
-                f.write(f'    "run_id": {json.dumps(run_info["run_id_human"])},\n')
-                f.write(f'    "uggly_run_id": {json.dumps(run_info["id"])},\n')
-                f.write(
-                    f'    "hailer": {json.dumps(json.loads(run_info["hailer_json"]) if run_info["hailer_json"] else {})},\n'
-                )
-                f.write(
-                    f'    "secrets_required": {json.dumps(list(cls._needed_secret_keys))},\n'
-                )
+                total_ops = changed_ops = failed_ops = 0
+                host_duration = 0.0
 
-                f.write('    "hosts": {\n')
-                op_durations_for_percentiles = {}
-                host_entries = []
-
-                for host_data in db_data["hosts"]:
-                    host_name = host_data["name"]
-                    host_history = []
-                    host_total_ops = len(host_data["operations"])
-                    host_changed_ops = 0
-                    host_failed_ops = 0
-                    host_duration = 0.0
+                with ReportWriter.spooled(depth=4) as history:
+                    while pending is not None and pending["host_id"] == host["id"]:
+                        op_row = pending
+                        logs = (
+                            json.loads(op_row["logs_json"])
+                            if op_row["logs_json"]
+                            else {}
+                        )
+                        arguments = (
+                            json.loads(op_row["arguments_json"])
+                            if op_row["arguments_json"]
+                            else {}
+                        )
+                        retry_stats = (
+                            json.loads(op_row["retry_stats_json"])
+                            if op_row["retry_stats_json"]
+                            else {}
+                        )
 
-                    for op_row in host_data["operations"]:
                         op_details = {
                             "operation": op_row["name"],
                             "changed": bool(op_row["changed"]),
                             "success": bool(op_row["success"]),
                             "duration": op_row["duration"],
-                            "stdout": json.loads(op_row["logs_json"]).get("stdout", "")
+                            "stdout": logs.get("stdout", "")
                             if op_row["logs_json"]
                             else "",
-                            "stderr": json.loads(op_row["logs_json"]).get("stderr", "")
+                            "stderr": logs.get("stderr", "")
                             if op_row["logs_json"]
                             else "",
                             "diff": op_row["diff"],
-                            "operation_arguments": json.loads(op_row["arguments_json"])
-                            if op_row["arguments_json"]
-                            else {},
-                            "retry_statistics": json.loads(op_row["retry_stats_json"])
-                            if op_row["retry_stats_json"]
-                            else {},
+                            "operation_arguments": arguments,
+                            "retry_statistics": retry_stats,
+                        }
+                        history.value(op_details)
+
+                        streamed_event = {
+                            "type": "progress",
+                            "host": host["name"],
+                            "operation": op_row["name"],
+                            "changed": bool(op_row["changed"]),
+                            "success": bool(op_row["success"]),
+                            "duration": op_row["duration"],
+                            "logs": logs,
+                            "diff": op_row["diff"],
+                            "operation_arguments": arguments,
+                            "retry_statistics": retry_stats,
+                            "command_n_fact_history": json.loads(
+                                op_row["command_n_facts_in_order_json"]
+                            )
+                            if op_row["command_n_facts_in_order_json"]
+                            else [],
                         }
-                        host_history.append(op_details)
+                        streamed.value(streamed_event)
 
+                        total_ops += 1
                         host_duration += op_row["duration"]
                         if bool(op_row["changed"]):
-                            host_changed_ops += 1
+                            changed_ops += 1
                         if not bool(op_row["success"]):
-                            host_failed_ops += 1
-
-                        op_name = op_row["name"]
-                        if op_name not in op_durations_for_percentiles:
-                            op_durations_for_percentiles[op_name] = []
-                        op_durations_for_percentiles[op_name].append(op_row["duration"])
-
-                    host_summary = {
-                        "total_operations": host_total_ops,
-                        "changed_operations": host_changed_ops,
-                        "successful_operations": host_total_ops - host_failed_ops,
-                        "failed_operations": host_failed_ops,
-                        "duration": round(host_duration, 4),
-                        "history": host_history,
-                    }
-                    host_entries.append(
-                        f"        {json.dumps(host_name)}: {json.dumps(host_summary, indent=4)}"
-                    )
-
-                f.write(",\n".join(host_entries))
-                f.write("\n    },\n")
-
-                summary_stats = cls._limani_plugin.get_run_summary_stats(cls._run_id)
-                summary_stats["status"] = run_info["status"]
-                f.write(f'    "summary": {json.dumps(summary_stats, indent=4)},\n')
-
-                resource_history = [
+                            failed_ops += 1
+
+                        sketch = op_sketches.get(op_row["name"])
+                        if sketch is None:
+                            sketch = op_sketches[op_row["name"]] = QuantileSketch()
+                        sketch.add(op_row["duration"])
+
+                        pending = next(operations, None)
+
+                    out.open("{", key=host["name"])
+                    out.value(total_ops, key="total_operations")
+                    out.value(changed_ops, key="changed_operations")
+                    out.value(total_ops - failed_ops, key="successful_operations")
+                    out.value(failed_ops, key="failed_operations")
+                    out.value(round(host_duration, 4), key="duration")
+                    out.open("[", key="history")
+                    out.absorb(history)
+                    out.close("]")
+                    out.close("}")
+
+            out.close("}")
+
+            summary_stats = limani.get_run_summary_stats(run_id)
+            summary_stats["status"] = run_info["status"]
+            out.value(summary_stats, key="summary")
+
+            out.open("[", key="resource_history")
+            for snap_row in limani.iter_snapshots(run_id):
+                out.value(
                     {
-                        "type": "health_check",
+                        "type": "parallelism"
+                        if snap_row["stage"] == "parallelism"
+                        else "health_check",
                         "host": snap_row["host_name"],
                         "stage": snap_row["stage"],
                         "timestamp": snap_row["timestamp"],
@@ -977,103 +1913,113 @@ class ChaosTelemetry(BaseStateCallback):
                         if snap_row["metrics_json"]
                         else {},
                     }
-                    for snap_row in db_data["snapshots"]
-                ]
-                f.write(
-                    f'    "resource_history": {json.dumps(resource_history, indent=4)},\n'
                 )
+            out.close("]")
 
-                fact_history = [
-                    dict(log)
-                    for log in db_data["fact_logs"]
-                    if log["context"] == "fact_gathering"
-                ]
-                f.write(f'    "fact_history": {json.dumps(fact_history, indent=4)},\n')
+            out.open("[", key="fact_history")
+            fact_logs = (
+                log
+                for log in limani.iter_fact_logs(run_id)
+                if log["context"] == "fact_gathering"
+            )
+            for log in fact_logs:
+                out.value(dict(log))
+            out.close("]")
 
-                streamed_history = []
-                for host_data in db_data["hosts"]:
-                    for op in host_data["operations"]:
-                        streamed_event = {
-                            "type": "progress",
-                            "host": host_data["name"],
-                            "operation": op["name"],
-                            "changed": bool(op["changed"]),
-                            "success": bool(op["success"]),
-                            "duration": op["duration"],
-                            "logs": json.loads(op["logs_json"])
-                            if op["logs_json"]
-                            else {},
-                            "diff": op["diff"],
-                            "operation_arguments": json.loads(op["arguments_json"])
-                            if op["arguments_json"]
-                            else {},
-                            "retry_statistics": json.loads(op["retry_stats_json"])
-                            if op["retry_stats_json"]
-                            else {},
-                            "command_n_fact_history": json.loads(
-                                op["command_n_facts_in_order_json"]
-                            )
-                            if op["command_n_facts_in_order_json"]
-                            else [],
-                        }
-                        streamed_history.append(streamed_event)
+            out.open("[", key="streamed_history")
+            out.absorb(streamed)
+            out.close("]")
 
-                streamed_history.sort(key=lambda x: x.get("timestamp", 0))
-                f.write(
-                    f'    "streamed_history": {json.dumps(streamed_history, indent=4)},\n'
-                )
+        op_summary = operation_summary(op_sketches)
+        out.value(op_summary, key="operation_summary")
 
-                op_summary = cls.add_operation_percentiles(op_durations_for_percentiles)
-                f.write(
-                    f'    "operation_summary": {json.dumps(op_summary, indent=4)}\n'
-                )
+        out.close("}")
 
-                f.write("}\n")
+    @classmethod
+    def export_report(
+        cls, filepath: str = "chaos_logbook.json", compression: str | None = None
+    ) -> None:
+        """Writes the logbook of the run, in a single pass, to:
+            - stdout, as compact JSON after `CHAOS_LOGBOOK::` (what our consumers read),
+            - `filepath`, indented,
+            - an indented archive in the logbooks directory, optionally compressed.
 
-            try:
-                print("CHAOS_LOGBOOK::", end="", flush=True)
+        Args:
+            filepath (str, optional): The target local export file. Defaults to "chaos_logbook.json".
+            compression (str | None, optional): "gzip" or "zstd" to compress the archived copy. Defaults to None.
 
-                subprocess.run(["jq", "-c", ".", filepath], check=True)
+        Notes:
+            Streaming avoids loading the entire dataset into memory, see `_write_report`.
+            zstd needs Python 3.14+ or the `zstandard` package, without them the archive falls back to gzip.
+        """
+        import sys
 
-            except FileNotFoundError:
-                import sys
+        if not cls._run_id:
+            print("No active run to export.")
+            return
 
-                print("{}", flush=True)
-                print(
-                    "Warning: 'jq' not found. Please install 'jq' to format the logbook output.",
-                    file=sys.stderr,
-                )
-            except Exception as e:
-                import sys
+        if not cls._limani_plugin:
+            raise RuntimeError("Limani plugin is not loaded.")
 
-                print("{}", flush=True)
-                print(f"Error executing jq: {e}", file=sys.stderr)
+        # Ensure all pending writes (and events, which share stdout with the logbook line) are finished before exporting
+        if cls._db_queue:
+            cls._db_queue.join()
+        if cls._event_sink:
+            cls._event_sink.flush()
 
-            logbook_dir = Path(
-                os.getenv(
-                    "CHAOS_LOGBOOK_DIR",
-                    Path.home() / ".local" / "share" / "chaos" / "logbooks",
-                )
+        run_info = cls._limani_plugin.get_run(cls._run_id)
+        if not run_info:
+            print(f"Could not find data for run_id: {cls._run_id}")
+            return
+
+        logbook_dir = Path(
+            os.getenv(
+                "CHAOS_LOGBOOK_DIR",
+                Path.home() / ".local" / "share" / "chaos" / "logbooks",
             )
-            amount = len(list(logbook_dir.glob("chaos_logbook_*.json")))
-            shutil.copy(
-                filepath,
-                logbook_dir / f"chaos_logbook_run{amount + 1}_{int(time.time())}.json",
+        )
+
+        streaming = False
+        try:
+            logbook_dir.mkdir(parents=True, exist_ok=True)
+            amount = len(list(logbook_dir.glob("chaos_logbook_*.json*")))
+            archive_path = (
+                logbook_dir / f"chaos_logbook_run{amount + 1}_{int(time.time())}.json"
             )
 
+            with (
+                open(filepath, "w") as pretty,
+                _open_archive(archive_path, compression) as archive,
+            ):
+                sys.stdout.write("CHAOS_LOGBOOK::")
+                streaming = True
+                cls._write_report(
+                    ReportWriter([pretty, archive], [sys.stdout]), run_info
+                )
+                pretty.write("\n")
+                archive.write("\n")
+                sys.stdout.write("\n")
+                sys.stdout.flush()
+                streaming = False
+
         except Exception as e:
+            if streaming:
+                print(flush=True)
             print(f"Error writing final report: {e}")
 
     @classmethod
     def load_limani_plugin(
         cls, limani_name: str, global_config: dict[str, Any]
-    ) -> None:
+    ) -> Limani:
         """Loads a given limani plugin by its name.
 
         Args:
             limani_name (str): The name identifier for the specific limani data store extension.
             global_config (dict): The global configuration dictionary.
 
+        Returns:
+            Limani: The loaded plugin, also kept as the telemetry's Limani.
+
         Raises:
             ImportError: Upon plugin loading error attributes failing.
             ValueError: If specific limani definition name is unassigned in known namespace.
@@ -1087,7 +2033,7 @@ class ChaosTelemetry(BaseStateCallback):
                 try:
                     Plugin = ep.load()
                     cls._limani_plugin = Plugin(global_config)
-                    return
+                    return cls._limani_plugin
                 except (ImportError, AttributeError, ValueError) as e:
                     raise ImportError(
                         f"Could not load Limani plugin '{limani_name}': {e}"
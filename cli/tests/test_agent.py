@@ -0,0 +1,274 @@
+import sys
+import textwrap
+import threading
+import time
+
+import pytest
+
+from chaos.lib.agent import (
+    MultiplexAgent,
+    agent_request,
+    attach_agent_connections,
+    serve,
+)
+
+# Stands in for OpenSSH: masters are plain files at the control path, and commands
+# riding on a master run locally, so "the remote" is this machine (like sshd on localhost).
+FAKE_SSH = textwrap.dedent(
+    """\
+    #!{python}
+    import os, subprocess, sys
+
+    args = sys.argv[1:]
+    control_path = args[args.index("-S") + 1]
+
+    if "-O" in args:
+        op = args[args.index("-O") + 1]
+        if op == "check":
+            sys.exit(0 if os.path.exists(control_path) else 255)
+        if op == "exit" and os.path.exists(control_path):
+            os.remove(control_path)
+        sys.exit(0)
+
+    if "-M" in args:
+        hostname = args[-1]
+        if hostname == "unreachable":
+            sys.stderr.write("ssh: connect to host unreachable port 22: Connection refused\\n")
+            sys.exit(255)
+        open(control_path, "w").close()
+        with open(os.environ["FAKE_SSH_LOG"], "a") as log:
+            log.write(hostname + "\\n")
+        sys.exit(0)
+
+    if not os.path.exists(control_path):
+        sys.exit(255)
+    with open(os.environ["FAKE_SSH_LOG"] + ".argv", "a") as log:
+        log.write(" ".join(args) + "\\n")
+    sys.exit(subprocess.call(["sh", "-c", args[-1]]))
+    """
+)
+
+
+@pytest.fixture
+def fake_ssh(tmp_path, monkeypatch):
+    ssh = tmp_path / "ssh"
+    ssh.write_text(FAKE_SSH.format(python=sys.executable))
+    ssh.chmod(0o755)
+    log = tmp_path / "masters.log"
+    log.touch()
+    monkeypatch.setenv("CHAOS_AGENT_SSH", str(ssh))
+    monkeypatch.setenv("FAKE_SSH_LOG", str(log))
+    return log
+
+
+@pytest.fixture
+def running_agent(tmp_path, monkeypatch, fake_ssh):
+    socket_path = tmp_path / "agent.sock"
+    monkeypatch.setenv("CHAOS_AGENT_SOCKET", str(socket_path))
+    ready = threading.Event()
+    thread = threading.Thread(
+        target=serve,
+        kwargs={"socket_path": socket_path, "max_connections": 4, "ready": ready},
+        daemon=True,
+    )
+    thread.start()
+    assert ready.wait(5)
+    yield socket_path
+    agent_request({"op": "stop"}, socket_path)
+    thread.join(5)
+
+
+def _target(hostname, port=22):
+    return {
+        "hostname": hostname,
+        "port": port,
+        "user": "chaos",
+        "key": None,
+        "config_file": None,
+        "known_hosts_file": None,
+        "strict_host_key_checking": "accept-new",
+    }
+
+
+def test_attach_reuses_masters_across_requests(running_agent, fake_ssh):
+    hosts = {"web1": _target("10.0.0.1"), "web1-alias": _target("10.0.0.1")}
+
+    first = agent_request({"op": "attach", "hosts": hosts}, running_agent)
+    second = agent_request({"op": "attach", "hosts": hosts}, running_agent)
+
+    assert first.success and second.success
+    assert first.data["paths"] == second.data["paths"]
+    assert first.data["paths"]["web1"] == first.data["paths"]["web1-alias"]
+    assert fake_ssh.read_text().splitlines() == ["10.0.0.1"]
+
+    status = agent_request({"op": "status"}, running_agent).data
+    assert len(status["connections"]) == 1
+    assert status["connections"][0]["hosts"] == ["web1", "web1-alias"]
+    assert status["connections"][0]["alive"]
+
+
+def test_unreachable_hosts_are_reported_not_fatal(running_agent):
+    hosts = {"ok": _target("10.0.0.2"), "down": _target("unreachable")}
+
+    result = agent_request({"op": "attach", "hosts": hosts}, running_agent)
+
+    assert result.success
+    assert list(result.data["paths"]) == ["ok"]
+    assert "Connection refused" in result.data["errors"]["down"]
+
+
+def test_cap_evicts_least_recently_used_and_idle_masters(tmp_path, fake_ssh):
+    agent = MultiplexAgent(tmp_path / "cm", idle_timeout=60, max_connections=2)
+
+    agent.attach({"a": _target("a")})
+    agent.attach({"b": _target("b")})
+    agent.attach({"a": _target("a")})
+    agent.attach({"c": _target("c")})
+
+    assert sorted(c["hosts"][0] for c in agent.status()["connections"]) == ["a", "c"]
+
+    over = agent.attach({"d": _target("d"), "e": _target("e"), "f": _target("f")})
+    assert len(over["paths"]) == 2
+    assert len(over["errors"]) == 1
+
+    assert len(agent.evict_idle(now=time.time() + 120)) == 2
+    assert agent.status()["connections"] == []
+    assert list((tmp_path / "cm").iterdir()) == []
+
+
+def test_pyinfra_hosts_run_through_the_agent(running_agent, tmp_path):
+    from pyinfra.api.config import Config
+    from pyinfra.api.inventory import Inventory
+    from pyinfra.api.state import State
+
+    inventory = Inventory(
+        ([("box", {"ssh_hostname": "127.0.0.1", "ssh_user": "chaos"}), "@local"], {})
+    )
+    state = State(inventory, Config())
+
+    result = attach_agent_connections(state)
+    assert result.success
+    assert list(result.data) == ["box"]
+
+    host = inventory.get_host("box")
+    host.connect(raise_exceptions=True)
+
+    status, output = host.run_shell_command("echo hello from the agent")
+    assert status
+    assert output.stdout == "hello from the agent"
+
+    remote = tmp_path / "remote.txt"
+    local = tmp_path / "local.txt"
+    local.write_text("some content\n")
+    assert host.put_file(str(local), str(remote))
+    assert remote.read_text() == "some content\n"
+
+    fetched = tmp_path / "fetched.txt"
+    assert host.get_file(str(remote), str(fetched))
+    assert fetched.read_text() == "some content\n"
+
+
+def test_commands_stay_out_of_the_local_argv(running_agent, fake_ssh, tmp_path):
+    from pyinfra.api.config import Config
+    from pyinfra.api.inventory import Inventory
+    from pyinfra.api.state import State
+
+    inventory = Inventory(([("box", {"ssh_hostname": "127.0.0.1"})], {}))
+    state = State(inventory, Config())
+    attach_agent_connections(state)
+    host = inventory.get_host("box")
+    host.connect(raise_exceptions=True)
+
+    # What sudo/su passwords ride on, anyone on the bastion can read an argv.
+    status, output = host.run_shell_command("echo hunter2; cat", _stdin=["piped", "in"])
+    assert status
+    assert output.stdout_lines == ["hunter2", "piped", "in"]
+    status, _ = host.run_shell_command("exit 3", _success_exit_codes=[3])
+    assert status
+
+    argv = (tmp_path / "masters.log.argv").read_text()
+    assert argv and "hunter2" not in argv and "exit 3" not in argv
+
+
+def test_rsync_goes_through_the_fallback(running_agent):
+    from pyinfra.api.config import Config
+    from pyinfra.api.inventory import Inventory
+    from pyinfra.api.state import State
+
+    inventory = Inventory(([("box", {"ssh_hostname": "127.0.0.2"})], {}))
+    state = State(inventory, Config())
+    attach_agent_connections(state)
+    connector = inventory.get_host("box").connector
+    calls = []
+    connector.fallback.check_can_rsync = lambda: calls.append("check")
+    connector.fallback.rsync = lambda src, dest, flags, **kwargs: (
+        calls.append((src, dest)) or True
+    )
+
+    connector.check_can_rsync()
+    assert connector.rsync("src/", "/dest", ["-a"], _sudo=True)
+    assert calls == ["check", ("src/", "/dest")]
+
+
+def test_dead_masters_fall_back_to_the_ssh_connector(running_agent):
+    from pyinfra.api.config import Config
+    from pyinfra.api.inventory import Inventory
+    from pyinfra.api.state import State
+    from pyinfra.connectors.ssh import SSHConnector
+
+    inventory = Inventory(([("box", {"ssh_hostname": "127.0.0.2"})], {}))
+    state = State(inventory, Config())
+    paths = attach_agent_connections(state).data
+
+    host = inventory.get_host("box")
+    fallback = host.connector.fallback
+    fallback.connect = lambda: None
+
+    import os
+
+    os.remove(paths["box"])
+    host.connect(raise_exceptions=True)
+
+    assert isinstance(host.connector, SSHConnector)
+
+
+def test_wedged_masters_fall_back_to_the_ssh_connector(running_agent, monkeypatch):
+    import subprocess
+
+    from pyinfra.api.config import Config
+    from pyinfra.api.inventory import Inventory
+    from pyinfra.api.state import State
+    from pyinfra.connectors.ssh import SSHConnector
+
+    inventory = Inventory(([("box", {"ssh_hostname": "127.0.0.2"})], {}))
+    state = State(inventory, Config())
+    attach_agent_connections(state)
+
+    host = inventory.get_host("box")
+    fallback = host.connector.fallback
+    fallback.connect = lambda: None
+
+    def wedged(command, **kwargs):
+        assert kwargs.get("timeout")
+        raise subprocess.TimeoutExpired(command, kwargs["timeout"])
+
+    monkeypatch.setattr("chaos.lib.agent.subprocess.run", wedged)
+    host.connect(raise_exceptions=True)
+
+    assert isinstance(host.connector, SSHConnector)
+
+
+def test_no_agent_is_a_noop(tmp_path, monkeypatch):
+    from pyinfra.api.config import Config
+    from pyinfra.api.inventory import Inventory
+    from pyinfra.api.state import State
+    from pyinfra.connectors.ssh import SSHConnector
+
+    monkeypatch.setenv("CHAOS_AGENT_SOCKET", str(tmp_path / "nope.sock"))
+    inventory = Inventory((["box"], {}))
+    state = State(inventory, Config())
+
+    result = attach_agent_connections(state)
+
+    assert result.success and result.data == {}
+    assert isinstance(inventory.get_host("box").connector, SSHConnector)
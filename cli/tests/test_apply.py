@@ -0,0 +1,612 @@
+import copy
+import time
+from unittest.mock import Mock
+
+import gevent
+import pytest
+from gevent.pool import Pool
+
+from chaos.lib.apply import (
+    ApplyPipeline,
+    ConnectionManager,
+    FleetHealthSampler,
+    build_role_chobolos,
+    compile_restrictions,
+    resolve_allowlist_blacklist,
+    resolve_limit,
+)
+from chaos.lib.args.dataclasses import Delta, ResultPayload
+from chaos.lib.roles.role import Role
+
+
+class SlowRole(Role):
+    def __init__(self, name, delays):
+        super().__init__(name)
+        self.delays = delays
+        self.planned = []
+
+    def get_context(self, state, host, chobolo={}, secrets={}):
+        gevent.sleep(self.delays.get(host.name, 0))
+        return {"host": host.name}
+
+    def delta(self, context={}):
+        if context["host"] == "noop":
+            return Delta()
+        return Delta(to_add={"pkgs": [context["host"]]})
+
+    def plan(self, state, host, delta=Delta()):
+        self.planned.append(host.name)
+        return ResultPayload(success=True)
+
+
+def _host(name):
+    host = Mock()
+    host.name = name
+    return host
+
+
+@pytest.fixture
+def payload():
+    payload = Mock()
+    payload.secrets = False
+    payload.trust_cache = False
+    payload.refresh_cache = False
+    payload.connections = None
+    payload.tuner = None
+    payload.pyinfra_state = Mock()
+    payload.pyinfra_state.pool = Pool(4)
+    return payload
+
+
+def test_pipeline_yields_deltas_in_host_order(payload):
+    hosts = [_host("a"), _host("b"), _host("noop")]
+    role = SlowRole("pkgs", {"a": 0.05, "b": 0.0})
+
+    pipeline = ApplyPipeline(payload, [role], hosts, {}, {})
+    pipeline.start()
+    try:
+        names = [r.data["host"].name for r in pipeline.iter_deltas()]
+        assert names == ["a", "b", "noop"]
+        assert role.planned == []
+
+        pipeline.release(approved=True)
+        planned = [r.data["host"].name for r in pipeline.iter_plans()]
+    finally:
+        pipeline.close()
+
+    assert planned == ["a", "b", "noop"]
+    assert sorted(role.planned) == ["a", "b"]
+
+
+def test_pipeline_denied_gate_never_plans(payload):
+    role = SlowRole("pkgs", {})
+    pipeline = ApplyPipeline(payload, [role], [_host("a"), _host("b")], {}, {})
+    pipeline.start()
+    list(pipeline.iter_deltas())
+    pipeline.close()
+
+    assert list(pipeline.iter_plans()) == []
+    assert role.planned == []
+
+
+def test_pipeline_without_pool_runs_sequentially(payload):
+    payload.pyinfra_state.pool = None
+    role = SlowRole("pkgs", {})
+    pipeline = ApplyPipeline(payload, [role], [_host("a")], {}, {})
+    pipeline.start()
+    deltas = list(pipeline.iter_deltas())
+    pipeline.release(approved=True)
+    plans = list(pipeline.iter_plans())
+
+    assert deltas[0].data["deltas"][0]["result"].data.to_add == {"pkgs": ["a"]}
+    assert plans[0].data["plans"][0]["result"].success
+    assert role.planned == ["a"]
+
+
+class FakeFact:
+    pass
+
+
+class BatchRole(Role):
+    def __init__(self, name):
+        super().__init__(name, necessary_facts=[FakeFact])
+        self.batch_calls = 0
+
+    def get_context_batch(self, state, hosts, chobolo={}, secrets={}, facts=None):
+        self.batch_calls += 1
+        return {
+            host.name: {"host": host.name, "fact": facts.get(host, FakeFact)}
+            for host in hosts
+        }
+
+    def plan(self, state, host, delta=Delta()):
+        return ResultPayload(success=True)
+
+
+def test_batched_roles_share_one_fact_fetch_per_host(payload):
+    hosts = [_host("a"), _host("b")]
+    for host in hosts:
+        host.get_fact.return_value = f"{host.name}-fact"
+    roles = [BatchRole("one"), BatchRole("two"), SlowRole("plain", {})]
+
+    pipeline = ApplyPipeline(payload, roles, hosts, {}, {})
+    pipeline.start()
+    try:
+        results = list(pipeline.iter_deltas())
+    finally:
+        pipeline.close()
+
+    for host in hosts:
+        host.get_fact.assert_called_once_with(FakeFact)
+    assert [role.batch_calls for role in roles[:2]] == [1, 1]
+    assert [entry["role_name"] for entry in results[0].data["deltas"]] == [
+        "one",
+        "two",
+        "plain",
+    ]
+
+
+def test_batched_roles_respect_restrictions(payload):
+    hosts = [_host("a"), _host("b")]
+    role = BatchRole("one")
+    restrictions = {"black_list": {"b": {"one": True}}}
+
+    pipeline = ApplyPipeline(payload, [role], hosts, {}, restrictions)
+    pipeline.start()
+    try:
+        results = list(pipeline.iter_deltas())
+    finally:
+        pipeline.close()
+
+    hosts[1].get_fact.assert_not_called()
+    assert len(results[0].data["deltas"]) == 1
+    assert results[1].data["deltas"] == []
+
+
+class CountingRole(SlowRole):
+    def __init__(self, name):
+        super().__init__(name, {})
+        self.necessary_chobolo_keys = ["users"]
+        self.context_calls = 0
+
+    def get_context(self, state, host, chobolo={}, secrets={}):
+        self.context_calls += 1
+        return super().get_context(state, host, chobolo, secrets)
+
+
+def _run_cached(payload, role, hosts, chobolo):
+    pipeline = ApplyPipeline(payload, [role], hosts, chobolo, {})
+    pipeline.start()
+    try:
+        return list(pipeline.iter_deltas())
+    finally:
+        pipeline.close()
+
+
+def test_trust_cache_skips_unchanged_noop_roles(payload, tmp_path, monkeypatch):
+    monkeypatch.setenv("CHAOS_CACHE_DIR", str(tmp_path))
+    payload.trust_cache = True
+    hosts = [_host("noop"), _host("b")]
+    for host in hosts:
+        host.get_fact.return_value = f"{host.name}-fingerprint"
+    role = CountingRole("one")
+    chobolo = {"users": ["dex"], "unrelated": 1}
+
+    _run_cached(payload, role, hosts, chobolo)
+    assert role.context_calls == 2
+
+    chobolo["unrelated"] = 2
+    results = _run_cached(payload, role, hosts, chobolo)
+    assert role.context_calls == 3
+    assert results[0].data["deltas"][0]["cached"] is True
+    assert results[1].data["deltas"][0]["cached"] is False
+
+    chobolo["users"].append("bob")
+    _run_cached(payload, role, hosts, chobolo)
+    assert role.context_calls == 5
+
+
+def test_rotated_secrets_miss_the_cache(payload, tmp_path, monkeypatch):
+    monkeypatch.setenv("CHAOS_CACHE_DIR", str(tmp_path))
+    payload.trust_cache = True
+    payload.secrets = True
+    secrets = {"api_token": "old"}
+    monkeypatch.setattr(
+        "chaos.lib.apply._handle_secrets_for_role",
+        lambda role, payload: ResultPayload(success=True, data=dict(secrets)),
+    )
+    host = _host("noop")
+    host.get_fact.return_value = "fingerprint"
+    role = CountingRole("one")
+    role.needs_secrets = True
+
+    _run_cached(payload, role, [host], {"users": []})
+    _run_cached(payload, role, [host], {"users": []})
+    assert role.context_calls == 1
+
+    secrets["api_token"] = "rotated"
+    results = _run_cached(payload, role, [host], {"users": []})
+    assert role.context_calls == 2
+    assert results[0].data["deltas"][0]["cached"] is False
+    assert not any("old" in path.read_text() for path in tmp_path.rglob("*.json"))
+
+
+def test_refresh_cache_ignores_cached_deltas(payload, tmp_path, monkeypatch):
+    monkeypatch.setenv("CHAOS_CACHE_DIR", str(tmp_path))
+    payload.trust_cache = True
+    host = _host("noop")
+    host.get_fact.return_value = "fingerprint"
+    role = CountingRole("one")
+
+    _run_cached(payload, role, [host], {"users": []})
+    payload.refresh_cache = True
+    results = _run_cached(payload, role, [host], {"users": []})
+
+    assert role.context_calls == 2
+    assert results[0].data["deltas"][0]["cached"] is False
+
+
+class ViewRole(SlowRole):
+    def __init__(self, name, keys):
+        super().__init__(name, {})
+        self.necessary_chobolo_keys = keys
+        self.seen = []
+
+    def get_context(self, state, host, chobolo={}, secrets={}):
+        self.seen.append(chobolo)
+        return super().get_context(state, host, chobolo, secrets)
+
+
+def test_role_chobolo_views_are_sliced_and_read_only():
+    chobolo = {
+        "users": [{"name": "dex"}],
+        "fleet": {"hosts": {"a": {}}, "parallelism": 2},
+    }
+    views = build_role_chobolos(
+        [
+            ViewRole("users", ["users"]),
+            ViewRole("fleet", ["fleet.hosts"]),
+            ViewRole("all", []),
+        ],
+        chobolo,
+    )
+
+    assert views["users"] == {"users": [{"name": "dex"}]}
+    assert views["fleet"] == {"fleet": {"hosts": {"a": {}}}}
+    assert views["all"] == chobolo
+    with pytest.raises(TypeError):
+        views["users"]["users"].append({"name": "bob"})
+    with pytest.raises(TypeError):
+        views["users"]["users"][0]["name"] = "bob"
+
+    copied = copy.deepcopy(views["users"])
+    copied["users"].append({"name": "bob"})
+    assert type(copied) is dict and len(views["users"]["users"]) == 1
+
+
+def test_pipeline_shares_one_view_across_hosts(payload):
+    role = ViewRole("users", ["users"])
+    pipeline = ApplyPipeline(
+        payload, [role], [_host("a"), _host("b")], {"users": [], "other": 1}, {}
+    )
+    pipeline.start()
+    try:
+        list(pipeline.iter_deltas())
+    finally:
+        pipeline.close()
+
+    assert role.seen[0] == {"users": []}
+    assert role.seen[0] is role.seen[1]
+
+
+FLEET = [
+    ("web-1", {"tags": {"environment": "prod"}, "roles": ["nginx", "php"]}),
+    ("web-2", {"tags": {"environment": "staging"}}),
+    ("db-1", {"tags": {"environment": "prod"}}),
+]
+
+
+@pytest.mark.parametrize(
+    "limit, expected",
+    [
+        (["web-*"], ["web-1", "web-2"]),
+        (["tags.environment=prod"], ["web-1", "db-1"]),
+        (["web-*,!tags.environment=staging"], ["web-1"]),
+        (["!db-*"], ["web-1", "web-2"]),
+        (["db-1", "web-2"], ["web-2", "db-1"]),
+        (["roles=php"], ["web-1"]),
+    ],
+)
+def test_resolve_limit(payload, limit, expected):
+    payload.target_hosts = FLEET
+    payload.limit = limit
+
+    result = resolve_limit(payload)
+
+    assert result.success
+    assert [name for name, _ in result.data] == expected
+
+
+def test_resolve_limit_fails_when_nothing_matches(payload):
+    payload.target_hosts = FLEET
+    payload.limit = ["mail-*"]
+
+    assert not resolve_limit(payload).success
+
+
+RESTRICTIONS = {
+    "allow_list": {"a": {"one": True}, "c": {"one": True, "two": True}, "d": {}},
+    "black_list": {"b": {}, "c": {"two": True}, "e": {"one": True, "two": False}},
+}
+
+
+def test_restriction_index_matches_resolve_allowlist_blacklist():
+    index = compile_restrictions(RESTRICTIONS, ["one", "two", "three"]).data
+
+    for host_name in ["a", "b", "c", "d", "e", "unrestricted"]:
+        for role_name in ["one", "two", "three", "not-compiled"]:
+            legacy = resolve_allowlist_blacklist(
+                RESTRICTIONS, role_name, _host(host_name)
+            )
+            assert index.allows(host_name, role_name) == (legacy is None), (
+                host_name,
+                role_name,
+            )
+
+
+def test_compile_restrictions_reports_every_conflict():
+    restrictions = {
+        "allow_list": {"a": {"one": True, "two": True}, "b": {"one": True}},
+        "black_list": {"a": {"one": True, "two": True}, "b": {"one": True}},
+    }
+
+    result = compile_restrictions(restrictions, ["one", "two"])
+
+    assert not result.success
+    assert len(result.error) == 3
+    assert not result.data.allows("a", "one")
+
+
+class FakeConnectHost:
+    def __init__(self, name, delay, fails=False):
+        self.name = name
+        self.delay = delay
+        self.fails = fails
+        self.connected = False
+
+    def connect(self, raise_exceptions=False):
+        from pyinfra.api.exceptions import ConnectError
+
+        gevent.sleep(self.delay)
+        if self.fails:
+            raise ConnectError("Connection refused")
+        self.connected = True
+
+
+def _connection_state(parallel=0):
+    state = Mock()
+    state.config.PARALLEL = parallel
+    return state
+
+
+def test_connection_manager_reports_unreachable_hosts_and_continues():
+    hosts = [
+        FakeConnectHost("fast", 0),
+        FakeConnectHost("refused", 0, fails=True),
+        FakeConnectHost("slow", 5),
+    ]
+    state = _connection_state()
+    connections = ConnectionManager(state, hosts, deadline=0.2)
+
+    connections.start()
+    result = connections.join()
+
+    assert result.success
+    assert [connections.wait(host) for host in hosts] == [True, False, False]
+    assert connections.unreachable["refused"] == "Connection refused"
+    assert "deadline" in connections.unreachable["slow"]
+    state.activate_host.assert_called_once_with(hosts[0])
+    state.fail_hosts.assert_called_once_with({hosts[1], hosts[2]}, activated_count=3)
+
+
+def test_connection_manager_bounds_concurrent_connects():
+    hosts = [FakeConnectHost(str(i), 0.05) for i in range(4)]
+    connections = ConnectionManager(_connection_state(), hosts, max_concurrent=2)
+
+    started = time.perf_counter()
+    connections.start()
+    connections.join()
+
+    assert time.perf_counter() - started >= 0.1
+
+
+class BlockingSSHHost(FakeConnectHost):
+    """Connects like paramiko does without monkey-patching: blocking the hub, until its own timeout."""
+
+    def __init__(self, name, delay):
+        super().__init__(name, delay)
+        self.connector = Mock(spec=["state", "data"])
+        self.connector.state.config.CONNECT_TIMEOUT = 10
+        self.connector.data = {
+            "ssh_paramiko_connect_kwargs": None,
+            "ssh_connect_retries": 3,
+        }
+
+    def connect(self, raise_exceptions=False):
+        from pyinfra.api.exceptions import ConnectError
+
+        timeout = self.connector.data["ssh_paramiko_connect_kwargs"]["timeout"]
+        time.sleep(min(self.delay, timeout))
+        if self.delay > timeout:
+            raise ConnectError("timed out")
+        self.connected = True
+
+
+def test_connection_deadline_caps_blocking_connects():
+    hosts = [BlockingSSHHost("hung", 5), BlockingSSHHost("late", 0)]
+    connections = ConnectionManager(
+        _connection_state(), hosts, max_concurrent=1, deadline=0.3
+    )
+
+    started = time.perf_counter()
+    connections.start()
+    connections.join()
+
+    assert time.perf_counter() - started < 1
+    assert hosts[0].connector.data["ssh_connect_retries"] == 0
+    assert hosts[0].connector.data["ssh_paramiko_connect_kwargs"]["timeout"] <= 0.3
+    assert "hung" in connections.unreachable
+    assert "deadline" in connections.unreachable["late"]
+
+
+def test_blocking_connects_run_side_by_side():
+    hosts = [BlockingSSHHost(str(i), 0.2) for i in range(4)]
+    connections = ConnectionManager(
+        _connection_state(), hosts, max_concurrent=4, deadline=5
+    )
+
+    started = time.perf_counter()
+    connections.start()
+    result = connections.join()
+
+    assert time.perf_counter() - started < 0.6
+    assert result.success
+    assert all(connections.wait(host) for host in hosts)
+
+
+def test_pipeline_starts_hosts_as_they_connect(payload):
+    hosts = [FakeConnectHost("slow", 0.3), FakeConnectHost("fast", 0)]
+    payload.connections = ConnectionManager(_connection_state(), hosts)
+    order = []
+
+    class OrderRole(SlowRole):
+        def get_context(self, state, host, chobolo={}, secrets={}):
+            order.append(host.name)
+            return super().get_context(state, host, chobolo, secrets)
+
+    pipeline = ApplyPipeline(payload, [OrderRole("one", {})], hosts, {}, {})
+    payload.connections.start()
+    pipeline.start()
+    try:
+        results = list(pipeline.iter_deltas())
+    finally:
+        pipeline.close()
+
+    assert order == ["fast", "slow"]
+    assert [r.data["host"].name for r in results] == ["slow", "fast"]
+
+
+def test_pipeline_with_fewer_workers_than_hosts(payload):
+    payload.pyinfra_state.pool = Pool(1)
+    hosts = [_host("a"), _host("b"), _host("c")]
+    role = SlowRole("pkgs", {})
+
+    pipeline = ApplyPipeline(payload, [role], hosts, {}, {})
+    with gevent.Timeout(5):
+        pipeline.start()
+        try:
+            names = [r.data["host"].name for r in pipeline.iter_deltas()]
+            pipeline.release(approved=True)
+            planned = [r.data["host"].name for r in pipeline.iter_plans()]
+        finally:
+            pipeline.close()
+
+    assert names == planned == ["a", "b", "c"]
+
+
+class FakeSampledHost:
+    def __init__(self, name, connected=True):
+        self.name = name
+        self.connected = connected
+        self.sampled = 0
+
+    def get_fact(self, fact_cls):
+        self.sampled += 1
+        return {
+            "ram": {"percent": 10.0},
+            "load": [0.1, 0.1, 0.1],
+            "cpu": {"total": 0, "idle": 0, "cpus": 2},
+        }
+
+
+def _sampled_state(hosts, failed=()):
+    state = Mock()
+    state.inventory.iter_activated_hosts = lambda: iter(hosts)
+    state.failed_hosts = set(failed)
+    return state
+
+
+def test_health_sampler_spreads_its_budget_over_the_fleet():
+    hosts = [FakeSampledHost(name) for name in "edcba"]
+    hosts.append(FakeSampledHost("offline", connected=False))
+    failed = FakeSampledHost("failed")
+    tuner = Mock()
+    tuner.saturated_hosts.return_value = ["e"]
+    sampler = FleetHealthSampler(
+        _sampled_state([*hosts, failed], [failed]), budget=3, tuner=tuner
+    )
+
+    sampler.sample_round()
+    assert {host.name: host.sampled for host in hosts} == {
+        "a": 1,
+        "b": 1,
+        "c": 1,
+        "d": 0,
+        "e": 0,
+        "offline": 0,
+    }
+    sampler.sample_round()
+    assert {host.name: host.sampled for host in hosts} == {
+        "a": 2,
+        "b": 2,
+        "c": 1,
+        "d": 1,
+        "e": 0,
+        "offline": 0,
+    }
+    assert failed.sampled == 0
+    assert sampler.samples == 6
+    assert tuner.observe_health.call_count == 6
+
+
+class BrokenSampledHost(FakeSampledHost):
+    def get_fact(self, fact_cls):
+        raise OSError("channel closed")
+
+
+def test_health_sampler_reports_failed_samples():
+    hosts = [FakeSampledHost("a"), BrokenSampledHost("b")]
+    sampler = FleetHealthSampler(_sampled_state(hosts), budget=2)
+
+    sampler.sample_round()
+    sampler.sample_round()
+
+    assert sampler.samples == 2
+    assert sampler.failures == 2
+    assert sampler.errors == {"b": "channel closed"}
+    assert sampler.warnings() == [
+        "2 health sample(s) failed on 1 host(s).",
+        "Health sample of host 'b' failed: channel closed",
+    ]
+
+
+def test_health_sampler_runs_in_the_background_until_stopped():
+    host = FakeSampledHost("a")
+    sampler = FleetHealthSampler(_sampled_state([host]), interval=0.01)
+
+    sampler.start()
+    gevent.sleep(0.1)
+    sampler.stop()
+    sampled = host.sampled
+    gevent.sleep(0.05)
+
+    assert sampled >= 3
+    assert host.sampled == sampled
+    assert FleetHealthSampler.from_config(Mock(), {}) is None
+    assert FleetHealthSampler.from_config(Mock(), {"health_interval": 0}) is None
+    assert (
+        FleetHealthSampler.from_config(
+            Mock(), {"health_interval": 30, "health_budget": 5}
+        ).budget
+        == 5
+    )
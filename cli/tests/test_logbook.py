@@ -0,0 +1,507 @@
+import pytest
+
+from chaos.lib.args.dataclasses import LogbookPayload
+from chaos.lib.limani.chrima import Chrima
+from chaos.lib.limani.limani import Limani
+from chaos.lib.logbook import parse_age, prune, select_prunable_runs
+
+DAY = 86400.0
+
+
+@pytest.fixture
+def chrima(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHAOS_LOGBOOK_DIR", str(tmp_path))
+    chrima = Chrima({})
+    chrima.init_db()
+    yield chrima
+    chrima.disconnect()
+
+
+def _fill_run(chrima, run_id, start_time, operations=20, status="success"):
+    chrima.create_run(run_id, f"human {run_id}", start_time, {"user": "me"}, set())
+    ids = chrima.register_hosts(run_id, ["web1", "db1"])
+    chrima.insert_many_operations(
+        [
+            {
+                "run_id": run_id,
+                "host_id": ids["web1" if i % 2 else "db1"],
+                "op_hash": f"op-{i}",
+                "name": "files.put",
+                "changed": True,
+                "success": True,
+                "duration": i / 10,
+                "timestamp": start_time + i,
+                "logs": {"stdout": "x" * 2000, "stderr": ""},
+                "diff": "+ line",
+                "arguments": {"i": i},
+                "retry_stats": {},
+                "command_n_facts": [],
+            }
+            for i in range(operations)
+        ]
+    )
+    chrima.insert_many_snapshots(
+        [
+            {
+                "run_id": run_id,
+                "host_id": ids["web1"],
+                "stage": "start",
+                "timestamp": start_time,
+                "metrics": {"ram": 1},
+            }
+        ]
+    )
+    chrima.insert_many_fact_logs(
+        [
+            {
+                "run_id": run_id,
+                "timestamp": start_time,
+                "log_level": "DEBUG",
+                "context": "fact_gathering",
+                "command": "server.Os",
+            }
+        ]
+    )
+    chrima.save_operation_sketches(run_id, {"files.put": {"count": 1}})
+    chrima.commit()
+    chrima.start_update_run(run_id, status)
+
+
+def test_parse_age():
+    assert parse_age("90d") == 90 * DAY
+    assert parse_age("12h") == 12 * 3600
+    assert parse_age("2w") == 14 * DAY
+    assert parse_age("3") == 3 * DAY
+    for bad in ["soon", "-1d", "0"]:
+        with pytest.raises(ValueError):
+            parse_age(bad)
+
+
+def test_retention_skips_runs_in_progress():
+    now = 100 * DAY
+    runs = [
+        {"id": "new", "start_time": now - DAY, "status": "success"},
+        {"id": "running", "start_time": now - 50 * DAY, "status": "in_progress"},
+        {"id": "mid", "start_time": now - 10 * DAY, "status": "failure"},
+        {"id": "old", "start_time": now - 40 * DAY, "status": "success"},
+    ]
+    ids = lambda selected: [run["id"] for run in selected]  # noqa: E731
+
+    assert ids(select_prunable_runs(runs, older_than=30 * DAY, now=now)) == ["old"]
+    assert ids(select_prunable_runs(runs, keep=1, now=now)) == ["mid", "old"]
+    assert ids(select_prunable_runs(runs, older_than=5 * DAY, keep=3, now=now)) == [
+        "mid",
+        "old",
+    ]
+
+
+def test_prune_deletes_every_row_of_the_pruned_runs(chrima):
+    import time
+
+    now = time.time()
+    _fill_run(chrima, "old", now - 60 * DAY)
+    _fill_run(chrima, "new", now - DAY)
+
+    dry = prune(LogbookPayload("prune", older_than="30d", dry_run=True), chrima)
+    assert dry.data["pruned"] == ["old"]
+    assert chrima.get_run("old") is not None
+
+    result = prune(LogbookPayload("prune", older_than="30d", vacuum="full"), chrima)
+    assert result.success, result.error
+    assert result.data["pruned"] == ["old"]
+    assert (
+        result.data["compaction"]["size_after"]
+        <= result.data["compaction"]["size_before"]
+    )
+
+    conn = chrima.connect()
+    for table in [
+        "hosts",
+        "operations",
+        "resource_snapshots",
+        "command_n_facts_in_order",
+        "operation_sketches",
+    ]:
+        run_ids = {
+            row[0] for row in conn.execute(f"SELECT DISTINCT run_id FROM {table}")
+        }
+        assert run_ids == {"new"}, table
+    assert chrima.get_run("old") is None
+    assert [run["id"] for run in chrima.list_runs()] == ["new"]
+
+
+def test_archived_runs_stay_readable(chrima):
+    _fill_run(chrima, "old", 1000.0)
+    before = chrima.get_run_data("old")
+    operations = list(chrima.iter_operations("old", order_by="host"))
+
+    archived = chrima.delete_runs(["old"], archive=True)
+    assert archived["old"].endswith("old.json.gz")
+    assert chrima.list_runs() == []
+
+    assert chrima.get_run_data("old") == before
+    assert chrima.get_run("old") == before["run"]
+    assert list(chrima.iter_operations("old", order_by="host")) == operations
+    assert [host["name"] for host in chrima.iter_hosts("old")] == ["db1", "web1"]
+    assert len(list(chrima.iter_fact_logs("old"))) == 1
+
+
+def test_incremental_compaction_frees_pages(chrima):
+    for i in range(5):
+        _fill_run(chrima, f"run{i}", 1000.0 + i, operations=200)
+
+    # New databases are created with auto_vacuum = INCREMENTAL.
+    assert chrima.connect().execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+    chrima.delete_runs([f"run{i}" for i in range(4)])
+    chrima.connect().execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+    compaction = chrima.compact("incremental")
+    assert compaction["mode"] == "incremental"
+    assert compaction["size_after"] < compaction["size_before"]
+    assert chrima.connect().execute("PRAGMA freelist_count").fetchone()[0] == 0
+
+
+def _blob_count(chrima):
+    return tuple(
+        chrima.connect()
+        .execute("SELECT count(*), coalesce(sum(refs), 0) FROM blobs")
+        .fetchone()
+    )
+
+
+@pytest.mark.parametrize("codec", ["zlib", "zstd", "raw"])
+def test_fleet_texts_are_stored_once_and_read_back_whole(tmp_path, monkeypatch, codec):
+    if codec == "zstd":
+        from chaos.lib.limani.chrima import _zstd
+
+        if _zstd() is None:
+            pytest.skip("no zstd around")
+
+    monkeypatch.setenv("CHAOS_LOGBOOK_DIR", str(tmp_path / "inline"))
+    inline = Chrima({"chrima_blobs": "off"})
+    inline.init_db()
+    _fill_run(inline, "run", 1000.0)
+    expected = inline.get_run_data("run")
+    assert _blob_count(inline) == (0, 0)
+    inline.disconnect()
+
+    monkeypatch.setenv("CHAOS_LOGBOOK_DIR", str(tmp_path / codec))
+    chrima = Chrima({"chrima_blobs": codec})
+    chrima.init_db()
+    try:
+        _fill_run(chrima, "run", 1000.0)
+        # 20 operations share one stdout, the small diffs and arguments stay inline.
+        assert _blob_count(chrima) == (1, 20)
+        assert chrima.get_run_data("run") == expected
+        assert list(chrima.iter_operations("run", order_by="host")) == [
+            {**op, "host_name": host["name"]}
+            for host in sorted(expected["hosts"], key=lambda host: host["name"])
+            for op in host["operations"]
+        ]
+    finally:
+        chrima.disconnect()
+
+
+def test_deleting_runs_releases_their_blobs(chrima):
+    _fill_run(chrima, "old", 1000.0)
+    _fill_run(chrima, "new", 2000.0)
+    assert _blob_count(chrima) == (1, 40)
+
+    chrima.delete_runs(["old"])
+    assert _blob_count(chrima) == (1, 20)
+    assert (
+        chrima.get_run_data("new")["hosts"][0]["operations"][0]["logs_json"].count("x")
+        == 2000
+    )
+
+    chrima.delete_runs(["new"])
+    assert _blob_count(chrima) == (0, 0)
+
+
+def test_compaction_moves_old_inline_texts_to_blobs(tmp_path, monkeypatch):
+    import sqlite3
+
+    monkeypatch.setenv("CHAOS_LOGBOOK_DIR", str(tmp_path))
+    db_path = tmp_path / "ch-rima.db" / "ch-rima.db"
+    db_path.parent.mkdir()
+    # The operations table as it was before the blobs table.
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""
+        CREATE TABLE operations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, run_id TEXT NOT NULL, host_id INTEGER NOT NULL, op_hash TEXT,
+            name TEXT NOT NULL, changed INTEGER NOT NULL, success INTEGER NOT NULL, duration REAL NOT NULL,
+            timestamp REAL NOT NULL, logs_json TEXT, diff TEXT, arguments_json TEXT, retry_stats_json TEXT,
+            command_n_facts_in_order_json TEXT
+        )
+        """)
+    conn.close()
+
+    old = Chrima({"chrima_blobs": "off"})
+    old.init_db()
+    _fill_run(old, "run", 1000.0)
+    expected = old.get_run_data("run")
+    old.disconnect()
+
+    chrima = Chrima({})
+    chrima.init_db()
+    try:
+        assert _blob_count(chrima) == (0, 0)
+        compaction = chrima.compact("full")
+        assert compaction["migrated"] == 20
+        assert _blob_count(chrima) == (1, 20)
+        assert chrima.get_run_data("run") == expected
+        # Only once.
+        assert chrima.compact("full")["migrated"] == 0
+    finally:
+        chrima.disconnect()
+
+
+def _fill_fleet_run(chrima, run_id, start_time, slow_host=None, status="success"):
+    """Two operations on three hosts, `slow_host` taking ten times longer."""
+    hosts = ["web1", "web2", "db1"]
+    chrima.create_run(run_id, f"human {run_id}", start_time, {}, set())
+    ids = chrima.register_hosts(run_id, hosts)
+    rows = []
+    for i, host in enumerate(hosts):
+        for j, name in enumerate(["apt.packages", "files.put"]):
+            duration = (i + 1) * (j + 1) / 10 * (10 if host == slow_host else 1)
+            rows.append(
+                {
+                    "run_id": run_id,
+                    "host_id": ids[host],
+                    "op_hash": f"{name}-{host}",
+                    "name": name,
+                    "changed": j == 0,
+                    "success": host != "db1" or j == 0,
+                    "duration": duration,
+                    "timestamp": start_time + i,
+                    "logs": {},
+                    "diff": "",
+                    "arguments": {},
+                    "retry_stats": {},
+                    "command_n_facts": [],
+                }
+            )
+    chrima.insert_many_operations(rows)
+    chrima.commit()
+    chrima.start_update_run(run_id, status)
+
+
+def _stats(chrima, now, **kwargs):
+    from chaos.lib.logbook import stats
+
+    result = stats(LogbookPayload("stats", **kwargs), chrima, now=now)
+    assert result.success, result.error
+    return result.data["rows"]
+
+
+class DefaultStatsChrima(Chrima):
+    """Chrima through the Limani default stats methods, like a third-party Limani would be."""
+
+    iter_operation_stats = Limani.iter_operation_stats
+    iter_daily_rollups = Limani.iter_daily_rollups
+
+
+def test_stats_from_rollups_match_the_ones_folded_on_the_fly(chrima):
+    now = 100 * DAY + 3600
+    for i in range(6):
+        _fill_fleet_run(chrima, f"run{i}", now - i * DAY / 2)
+    _fill_fleet_run(chrima, "running", now - 60, status="in_progress")
+
+    queries = [
+        {"group_by": "name"},
+        {"group_by": "host,day", "since": "2d"},
+        {"group_by": "", "names": ["files.put"], "hosts": ["web1", "db1"]},
+    ]
+    for query in queries:
+        rows = _stats(chrima, now, **query)
+        assert rows == _stats(DefaultStatsChrima({}), now, **query), query
+
+    by_name = {row["name"]: row for row in _stats(chrima, now)}
+    assert by_name["apt.packages"]["count"] == 18
+    assert by_name["files.put"]["failed"] == 6
+    assert by_name["files.put"]["max_duration"] == 0.6
+
+    # Runs finished after the last fold are folded on the next query.
+    _fill_fleet_run(chrima, "late", now - 30)
+    assert {row["name"]: row for row in _stats(chrima, now)}["apt.packages"][
+        "count"
+    ] == 21
+
+
+def test_runs_are_folded_as_they_end(chrima):
+    now = 100 * DAY + 3600
+    _fill_fleet_run(chrima, "run", now - 60, status="in_progress")
+    chrima.end_run_update("run", now, "success", {})
+
+    conn = chrima.connect()
+    assert [
+        row["run_id"] for row in conn.execute("SELECT run_id FROM daily_rollup_runs")
+    ] == ["run"]
+    # Per name and host would be a row per operation, those come from the operations instead.
+    assert (
+        conn.execute(
+            "SELECT count(*) FROM daily_rollups WHERE name != '*' AND host != '*'"
+        ).fetchone()[0]
+        == 0
+    )
+
+    rows = _stats(chrima, now, group_by="name,host", since="2d")
+    assert rows == _stats(DefaultStatsChrima({}), now, group_by="name,host", since="2d")
+    assert len(rows) == 6
+
+
+def test_stats_over_days_outlive_pruned_runs(chrima):
+    now = 100 * DAY + 3600
+    _fill_fleet_run(chrima, "old", now - 2 * DAY)
+    _fill_fleet_run(chrima, "new", now - 60)
+
+    # Neither run was folded by a query before the prune.
+    chrima.delete_runs(["old"])
+
+    by_name = {row["name"]: row for row in _stats(chrima, now, since="7d")}
+    assert by_name["apt.packages"]["count"] == 6
+
+
+def test_stats_over_runs_find_the_regressed_host(chrima):
+    now = 100 * DAY
+    for i in range(3):
+        _fill_fleet_run(chrima, f"before{i}", now - 10 * DAY + i)
+    for i in range(3):
+        _fill_fleet_run(chrima, f"after{i}", now - DAY + i, slow_host="web2")
+
+    rows = _stats(
+        chrima,
+        now,
+        runs=3,
+        names=["apt.packages"],
+        group_by="host",
+        percentiles="95",
+        compare=True,
+    )
+    assert [row["host"] for row in rows] == ["web2", "db1", "web1"]
+    assert rows[0]["change"] == pytest.approx(9.0, rel=0.02)
+    assert rows[0]["previous"]["p95_duration"] == pytest.approx(0.2, rel=0.01)
+    assert rows[1]["change"] == pytest.approx(0.0, abs=0.02)
+
+    by_run = _stats(chrima, now, runs=2, group_by="run", percentiles="none")
+    assert [row["run"] for row in by_run] == ["human after1", "human after2"]
+    assert all(row["count"] == 6 for row in by_run)
+
+
+def test_stats_reject_bad_queries(chrima):
+    from chaos.lib.logbook import stats
+
+    for query in [
+        {"group_by": "name,color"},
+        {"percentiles": "50,150"},
+        {"group_by": "run"},
+        {"runs": 3, "since": "7d"},
+        {"since": "1d", "until": "7d"},
+    ]:
+        result = stats(LogbookPayload("stats", **query), chrima)
+        assert not result.success, query
+
+
+@pytest.fixture
+def daemon(chrima, tmp_path):
+    import threading
+
+    from chaos.lib.limani.chrima_remote import LogbookDaemon
+
+    daemon = LogbookDaemon(Chrima({}), tmp_path / "logbook.sock")
+    daemon.bind()
+    thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+    thread.start()
+    yield daemon
+    daemon.shutdown()
+    thread.join()
+
+
+def test_remote_chrima_writes_every_process_through_the_daemon(
+    chrima, daemon, tmp_path
+):
+    import threading
+
+    from chaos.lib.limani.chrima_remote import RemoteChrima
+
+    errors = []
+
+    def _client(n):
+        remote = RemoteChrima({"chrima_socket": str(tmp_path / "logbook.sock")})
+        try:
+            for i in range(5):
+                _fill_run(remote, f"client{n}-run{i}", 1000.0 * n + i)
+            assert remote._daemon() is not None
+        except Exception as e:
+            errors.append(e)
+        finally:
+            remote.disconnect()
+
+    clients = [threading.Thread(target=_client, args=(n,)) for n in range(6)]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+
+    assert errors == []
+    conn = chrima.connect()
+    assert (
+        conn.execute("SELECT count(*) FROM runs WHERE status = 'success'").fetchone()[0]
+        == 30
+    )
+    assert conn.execute("SELECT count(*) FROM operations").fetchone()[0] == 30 * 20
+    assert chrima.get_run_summary_stats("client3-run2")["total_operations"] == 20
+    # Per run: create_run, register_hosts, one batch and start_update_run.
+    assert daemon.served == 30 * 4
+
+
+def test_remote_chrima_rolls_back_a_bad_batch_alone(chrima, daemon, tmp_path):
+    from chaos.lib.limani.chrima_remote import RemoteChrima
+
+    remote = RemoteChrima({"chrima_socket": str(tmp_path / "logbook.sock")})
+    try:
+        _fill_run(remote, "good", 0.0)
+        remote.insert_many_snapshots(
+            [
+                {
+                    "run_id": "good",
+                    "host_id": 1,
+                    "stage": "end",
+                    "timestamp": 1.0,
+                    "metrics": {},
+                }
+            ]
+        )
+        remote.insert_many_operations(
+            [{"run_id": "good", "name": "missing.everything"}]
+        )
+        with pytest.raises(RuntimeError, match="KeyError"):
+            remote.commit()
+
+        _fill_run(remote, "after", 10.0)
+    finally:
+        remote.disconnect()
+
+    conn = chrima.connect()
+    assert (
+        conn.execute(
+            "SELECT count(*) FROM resource_snapshots WHERE stage = 'end'"
+        ).fetchone()[0]
+        == 0
+    )
+    assert conn.execute("SELECT count(*) FROM operations").fetchone()[0] == 40
+
+
+def test_remote_chrima_writes_directly_without_a_daemon(chrima, tmp_path):
+    from chaos.lib.limani.chrima_remote import RemoteChrima
+
+    remote = RemoteChrima({"chrima_socket": str(tmp_path / "nobody-home.sock")})
+    try:
+        _fill_run(remote, "direct", 0.0)
+        assert remote._daemon() is None
+    finally:
+        remote.disconnect()
+
+    assert chrima.get_run_summary_stats("direct")["total_operations"] == 20
+    assert chrima.get_run("direct")["status"] == "success"
@@ -0,0 +1,107 @@
+import gevent
+import pytest
+
+from chaos.lib import parallelism
+from chaos.lib.parallelism import AdaptivePool, ParallelismTuner
+
+
+class FakeState:
+    def __init__(self):
+        self.pool = None
+        self.fact_pool = None
+        self.callback_handlers = []
+
+    def add_callback_handler(self, handler):
+        self.callback_handlers.append(handler)
+
+
+class FakeHost:
+    def __init__(self, name):
+        self.name = name
+
+
+@pytest.fixture
+def no_local_pressure(monkeypatch):
+    monkeypatch.setattr(parallelism, "local_pressure", lambda: (0.0, 0.0))
+
+
+def _max_concurrency(pool, jobs, resize_to=None):
+    running = {"now": 0, "max": 0}
+
+    def job():
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        gevent.sleep(0.01)
+        running["now"] -= 1
+
+    greenlets = [gevent.spawn(pool.spawn(job).get) for _ in range(jobs)]
+    if resize_to is not None:
+        gevent.sleep(0)
+        pool.resize(resize_to)
+    gevent.joinall(greenlets)
+    return running["max"]
+
+
+def test_adaptive_pool_grows_and_shrinks_while_running():
+    assert _max_concurrency(AdaptivePool(2), 20) == 2
+
+    pool = AdaptivePool(2)
+    pool.resize(6)
+    assert _max_concurrency(pool, 20) == 6
+
+    pool = AdaptivePool(6)
+    pool.resize(2)
+    gevent.sleep(0.05)
+    assert _max_concurrency(pool, 20) == 2
+    assert pool.free_count() == 2
+
+
+def test_tuner_slow_starts_then_backs_off_on_latency(no_local_pressure):
+    state = FakeState()
+    tuner = ParallelismTuner(state, max_workers=64, start_workers=2)
+    tuner.install()
+
+    def tick(latency):
+        # Keep the pool full, so it looks like the bottleneck.
+        tuner._window = [latency] * 5
+        for _ in range(tuner.workers - len(state.pool)):
+            state.pool.spawn(gevent.sleep, 1)
+        return tuner.evaluate()
+
+    assert [tick(0.1) for _ in range(3)] == [4, 8, 16]
+    assert tick(0.5) == 12
+    assert tick(0.1) == 13
+
+    gevent.killall(list(state.pool))
+    assert [entry["workers"] for entry in tuner.history] == [2, 4, 8, 16, 12, 13]
+    assert tuner.history[4]["reason"] == "operation latency went up"
+
+
+def test_tuner_backs_off_from_saturated_targets(no_local_pressure):
+    state = FakeState()
+    tuner = ParallelismTuner(state, max_workers=16, start_workers=8)
+    tuner.install()
+
+    tuner.observe_health(FakeHost("a"), {"percent": 95.0}, [0.5, 0.5, 0.5], cpus=4)
+    tuner.observe_health(FakeHost("b"), {"percent": 20.0}, [9.0, 9.0, 9.0], cpus=2)
+    tuner.observe_health(FakeHost("c"), {"percent": 20.0}, [0.5, 0.5, 0.5], cpus=2)
+    tuner._window = [0.1]
+
+    assert tuner.saturated_hosts() == ["a", "b"]
+    assert tuner.evaluate() == 6
+    assert tuner.history[-1]["reason"] == "target hosts are saturated"
+    assert state.pool.size == state.fact_pool.size == 6
+
+
+def test_tuner_times_operations_through_callbacks(no_local_pressure):
+    state = FakeState()
+    tuner = ParallelismTuner(state, max_workers=4, interval=3600)
+    tuner.install()
+
+    host = FakeHost("a")
+    tuner.operation_host_start(state, host, "op1")
+    tuner.operation_host_success(state, host, "op1")
+    tuner.operation_host_start(state, host, "op2")
+    tuner.operation_host_error(state, host, "op2")
+
+    assert len(tuner._window) == 2
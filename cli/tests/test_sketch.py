@@ -0,0 +1,130 @@
+import json
+import random
+
+import pytest
+
+from chaos.lib.limani.chrima import Chrima
+from chaos.lib.sketch import QuantileSketch, operation_summary
+from chaos.lib.telemetry import ChaosTelemetry
+
+
+def _durations(rng, count):
+    """Log-normal durations with a few instant ones, like a real run."""
+    return [
+        0.0 if rng.random() < 0.02 else round(rng.lognormvariate(-2, 1.5), 6)
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.parametrize("count", [1, 2, 5, 100, 5000])
+def test_percentiles_are_within_the_relative_error(count):
+    rng = random.Random(count)
+    durations = _durations(rng, count)
+    sketch = QuantileSketch()
+    for duration in durations:
+        sketch.add(duration)
+
+    for p in (0, 50, 90, 95, 99, 100):
+        exact = ChaosTelemetry.percentile(durations, p)
+        assert sketch.percentile(p) == pytest.approx(exact, rel=0.01, abs=1e-4)
+    assert sketch.percentile(0) == round(min(durations), 4)
+    assert sketch.percentile(100) == round(max(durations), 4)
+
+
+def test_empty_sketch_reads_zero():
+    assert QuantileSketch().percentiles((50, 99)) == {50: 0.0, 99: 0.0}
+    assert (
+        operation_summary({"files.put": QuantileSketch()})["files.put"][
+            "average_duration"
+        ]
+        == 0.0
+    )
+
+
+def test_merge_equals_the_sketch_of_every_value():
+    rng = random.Random(5)
+    first, second = _durations(rng, 300), _durations(rng, 700)
+    a, b, both = QuantileSketch(), QuantileSketch(), QuantileSketch()
+    for duration in first:
+        a.add(duration)
+        both.add(duration)
+    for duration in second:
+        b.add(duration)
+        both.add(duration)
+
+    a.merge(b)
+    assert a.bins == both.bins
+    assert a.percentiles((50, 90, 99)) == both.percentiles((50, 90, 99))
+
+    with pytest.raises(ValueError):
+        a.merge(QuantileSketch(alpha=0.05))
+
+
+def test_extend_equals_adding_one_by_one():
+    rng = random.Random(6)
+    durations = _durations(rng, 1000)
+    one_by_one, extended = QuantileSketch(), QuantileSketch()
+    for duration in durations:
+        one_by_one.add(duration)
+    extended.extend(durations[:400])
+    extended.extend(durations[400:])
+    extended.extend([])
+
+    assert extended.bins == one_by_one.bins
+    assert (extended.zeros, extended.count, extended.min, extended.max) == (
+        one_by_one.zeros,
+        one_by_one.count,
+        one_by_one.min,
+        one_by_one.max,
+    )
+    assert extended.total == pytest.approx(one_by_one.total)
+
+
+def test_serialized_sketch_round_trips():
+    rng = random.Random(8)
+    sketch = QuantileSketch()
+    for duration in _durations(rng, 500):
+        sketch.add(duration)
+
+    restored = QuantileSketch.from_dict(json.loads(json.dumps(sketch.to_dict())))
+    assert restored.to_dict() == sketch.to_dict()
+    assert restored.percentiles((50, 99)) == sketch.percentiles((50, 99))
+
+
+def test_chrima_stores_sketches_and_rebuilds_missing_ones(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHAOS_LOGBOOK_DIR", str(tmp_path))
+    chrima = Chrima({})
+    chrima.init_db()
+    try:
+        chrima.create_run("run", "human", 0.0, {}, set())
+        host_id = chrima.register_hosts("run", ["web1"])["web1"]
+        base = {
+            "run_id": "run",
+            "host_id": host_id,
+            "op_hash": "op",
+            "changed": False,
+            "success": True,
+            "timestamp": 0.0,
+            "logs": {},
+            "diff": "",
+            "arguments": {},
+            "retry_stats": {},
+            "command_n_facts": [],
+        }
+        chrima.insert_many_operations(
+            [{**base, "name": "files.put", "duration": d} for d in (0.1, 0.2, 0.4)]
+        )
+        chrima.commit()
+
+        # Nothing stored yet (eg: a run from before sketches): rebuilt from the operations.
+        rebuilt = chrima.get_operation_sketches("run")
+        assert QuantileSketch.from_dict(rebuilt["files.put"]).count == 3
+
+        stored = QuantileSketch()
+        stored.add(1.0)
+        chrima.save_operation_sketches("run", {"files.put": stored.to_dict()})
+        chrima.save_operation_sketches("run", {"files.put": stored.to_dict()})
+        chrima.commit()
+        assert chrima.get_operation_sketches("run") == {"files.put": stored.to_dict()}
+    finally:
+        chrima.disconnect()
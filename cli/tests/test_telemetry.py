@@ -0,0 +1,1035 @@
+import queue
+import threading
+
+import pytest
+
+from chaos.lib.limani.chrima import Chrima
+from chaos.lib.limani.limani import Limani
+from chaos.lib.limani.memory import MemoryLimani
+from chaos.lib.telemetry import ChaosTelemetry, FactEventIndex, ReportWriter
+
+
+class RecordingLimani(Limani):
+    """Only implements the single-row inserts, to check the default insert_many_* loops."""
+
+    def __init__(self):
+        super().__init__({})
+        self.calls = []
+
+    def connect(self):
+        return None
+
+    def disconnect(self):
+        return None
+
+    def end_run_update(self, run_id, end_time, status, summary):
+        self.calls.append(("end_run_update", run_id))
+
+    def start_update_run(self, run_id, status):
+        self.calls.append(("start_update_run", status))
+
+    def insert_fact_log(self, run_id, timestamp, log_level, context, command):
+        self.calls.append(("insert_fact_log", command))
+
+    def insert_operation(self, **kwargs):
+        self.calls.append(("insert_operation", kwargs["name"]))
+
+    def insert_snapshot(self, run_id, host_id, stage, timestamp, metrics):
+        self.calls.append(("insert_snapshot", stage))
+
+    def create_run(self, run_id, run_id_human, start_time, hailer_info, needed_secrets):
+        return run_id
+
+    def init_db(self):
+        return None
+
+    def get_or_create_host(self, run_id, host_name):
+        return 1
+
+    def get_run_data(self, run_id):
+        return {}
+
+    def get_facts_for_timespan(self, run_id, start_time, end_time):
+        return []
+
+    def get_run_summary_stats(self, run_id):
+        return {}
+
+    def commit(self):
+        self.calls.append(("commit", None))
+
+
+def _operation(name, run_id="run", host_id=1):
+    return {
+        "run_id": run_id,
+        "host_id": host_id,
+        "op_hash": name,
+        "name": name,
+        "changed": True,
+        "success": True,
+        "duration": 0.1,
+        "timestamp": 1.0,
+        "logs": {},
+        "diff": "",
+        "arguments": {},
+        "retry_stats": {},
+        "command_n_facts": [],
+    }
+
+
+def _fact(command):
+    return {
+        "run_id": "run",
+        "timestamp": 1.0,
+        "log_level": "INFO",
+        "context": "facts",
+        "command": command,
+    }
+
+
+@pytest.fixture
+def limani(monkeypatch):
+    plugin = RecordingLimani()
+    monkeypatch.setattr(ChaosTelemetry, "_limani_plugin", plugin)
+    return plugin
+
+
+def test_batch_keeps_order_and_commits_around_other_calls(limani):
+    batch = [
+        (limani.insert_operation, [], _operation("a")),
+        (limani.insert_fact_log, [], _fact("echo")),
+        (limani.start_update_run, ["run", "failure"], {}),
+        (limani.insert_operation, [], _operation("b")),
+        ChaosTelemetry._poison_pill,
+    ]
+
+    assert ChaosTelemetry._write_batch(batch) is True
+    assert limani.calls == [
+        ("insert_operation", "a"),
+        ("insert_fact_log", "echo"),
+        ("commit", None),
+        ("start_update_run", "failure"),
+        ("commit", None),
+        ("insert_operation", "b"),
+        ("commit", None),
+    ]
+
+
+def test_drain_batch_stops_at_the_poison_pill_and_size(monkeypatch):
+    monkeypatch.setattr("chaos.lib.telemetry.WRITE_BATCH_SIZE", 3)
+    db_queue = queue.Queue()
+    pill = ChaosTelemetry._poison_pill
+    for item in [1, pill, 2, 3, 4, 5]:
+        db_queue.put(item)
+
+    assert ChaosTelemetry._drain_batch(db_queue) == [1, pill]
+    assert ChaosTelemetry._drain_batch(db_queue) == [2, 3, 4]
+    assert ChaosTelemetry._drain_batch(db_queue) == [5]
+
+
+def test_writer_thread_groups_rows_and_commits(limani, monkeypatch):
+    monkeypatch.setattr(ChaosTelemetry, "_db_queue", queue.Queue())
+    for name in "abc":
+        ChaosTelemetry._db_queue.put((limani.insert_operation, [], _operation(name)))
+
+    thread = threading.Thread(
+        target=ChaosTelemetry._database_writer_worker, daemon=True
+    )
+    monkeypatch.setattr(ChaosTelemetry, "_db_writer_thread", thread)
+    thread.start()
+
+    ChaosTelemetry._db_queue.join()
+    assert [call for call, _ in limani.calls].count("insert_operation") == 3
+    assert ("commit", None) in limani.calls
+
+    ChaosTelemetry._db_queue.put(ChaosTelemetry._poison_pill)
+    thread.join(5)
+    assert not thread.is_alive()
+
+
+def test_chrima_insert_many_writes_every_row(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHAOS_LOGBOOK_DIR", str(tmp_path))
+    chrima = Chrima({})
+    chrima.init_db()
+    chrima.create_run("run", "human", 0.0, {}, set())
+    host_id = chrima.get_or_create_host("run", "web1")
+
+    chrima.insert_many_operations(
+        [_operation(str(i), host_id=host_id) for i in range(50)]
+    )
+    chrima.insert_many_fact_logs([_fact(f"cmd {i}") for i in range(5)])
+    chrima.insert_many_snapshots(
+        [
+            {
+                "run_id": "run",
+                "host_id": host_id,
+                "stage": "start",
+                "timestamp": 1.0,
+                "metrics": {},
+            }
+        ]
+    )
+    chrima.commit()
+
+    conn = chrima.connect()
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM operations").fetchone()[0] == 50
+        assert (
+            conn.execute("SELECT COUNT(*) FROM command_n_facts_in_order").fetchone()[0]
+            == 5
+        )
+        assert (
+            conn.execute("SELECT COUNT(*) FROM resource_snapshots").fetchone()[0] == 1
+        )
+    finally:
+        chrima.disconnect()
+
+
+def test_one_bad_row_only_loses_itself(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHAOS_LOGBOOK_DIR", str(tmp_path))
+    chrima = Chrima({})
+    chrima.init_db()
+    chrima.create_run("run", "human", 0.0, {}, set())
+    host_id = chrima.get_or_create_host("run", "web1")
+    monkeypatch.setattr(ChaosTelemetry, "_limani_plugin", chrima)
+
+    # Sets (eg: an `_if` list of callables) pass the sanitizing untouched and can't be encoded.
+    bad = {**_operation("bad", host_id=host_id), "arguments": {"_if": {lambda: True}}}
+    batch = [(chrima.insert_fact_log, [], _fact("echo"))]
+    batch += [
+        (chrima.insert_operation, [], _operation(str(i), host_id=host_id))
+        for i in range(499)
+    ]
+    batch.insert(250, (chrima.insert_operation, [], bad))
+
+    assert ChaosTelemetry._write_batch(batch) is False
+
+    conn = chrima.connect()
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM operations").fetchone()[0] == 499
+        assert (
+            conn.execute(
+                "SELECT COUNT(*) FROM operations WHERE name = 'bad'"
+            ).fetchone()[0]
+            == 0
+        )
+        assert (
+            conn.execute("SELECT COUNT(*) FROM command_n_facts_in_order").fetchone()[0]
+            == 1
+        )
+        assert chrima.get_run_summary_stats("run")["total_operations"] == 499
+    finally:
+        chrima.disconnect()
+
+
+def test_a_bad_row_after_a_commit_only_replays_what_was_not_committed(
+    tmp_path, monkeypatch
+):
+    monkeypatch.setenv("CHAOS_LOGBOOK_DIR", str(tmp_path))
+    chrima = Chrima({})
+    chrima.init_db()
+    chrima.create_run("run", "human", 0.0, {}, set())
+    host_id = chrima.get_or_create_host("run", "web1")
+    monkeypatch.setattr(ChaosTelemetry, "_limani_plugin", chrima)
+
+    # start_update_run commits by itself, what was inserted before it can't be rolled back anymore.
+    bad = {**_operation("bad", host_id=host_id), "arguments": {"_if": {lambda: True}}}
+    batch = [
+        (chrima.insert_operation, [], _operation("op1", host_id=host_id)),
+        (chrima.insert_operation, [], _operation("op2", host_id=host_id)),
+        (chrima.start_update_run, ["run", "failure"], {}),
+        (chrima.insert_operation, [], _operation("op3", host_id=host_id)),
+        (chrima.insert_operation, [], bad),
+    ]
+    ChaosTelemetry._write_batch(batch)
+
+    conn = chrima.connect()
+    try:
+        names = [
+            row[0] for row in conn.execute("SELECT name FROM operations ORDER BY id")
+        ]
+        assert names == ["op1", "op2", "op3"]
+        assert chrima.get_run_summary_stats("run")["total_operations"] == 3
+        assert chrima.get_run("run")["status"] == "failure"
+    finally:
+        chrima.disconnect()
+
+
+def test_limanis_without_batching_lose_only_the_bad_row(limani, monkeypatch):
+    def insert_operation(**kwargs):
+        if kwargs["name"] == "bad":
+            raise TypeError("can't encode")
+        limani.calls.append(("insert_operation", kwargs["name"]))
+
+    monkeypatch.setattr(limani, "insert_operation", insert_operation)
+    batch = [
+        (limani.insert_operation, [], _operation(name)) for name in ("a", "bad", "b")
+    ]
+
+    ChaosTelemetry._write_batch(batch)
+    assert limani.calls == [
+        ("insert_operation", "a"),
+        ("insert_operation", "b"),
+        ("commit", None),
+    ]
+
+
+def _legacy_sanitize(text, sensitive_strings):
+    """The redaction as it was before SecretRedactor, the output must not change."""
+    import json
+    import re
+    from urllib import parse as urllib_parse
+
+    if not text:
+        return text
+    valid = set()
+    for s in sensitive_strings:
+        if len(s) >= 4 and s.lower() not in ("true", "false", "null", "none"):
+            valid.add(s)
+        for line in s.splitlines():
+            line = line.strip()
+            if len(line) >= 4 and line.lower() not in ("true", "false", "null", "none"):
+                valid.add(line)
+    for term in sorted(valid, key=len, reverse=True):
+        text = re.sub(re.escape(term), "[REDACTED]", text, flags=re.IGNORECASE)
+        url = urllib_parse.quote(term)
+        if url != term:
+            text = re.sub(re.escape(url), "[REDACTED_URL]", text, flags=re.IGNORECASE)
+        escaped = json.dumps(term)[1:-1]
+        if escaped != term:
+            text = re.sub(
+                re.escape(escaped), "[REDACTED_JSON]", text, flags=re.IGNORECASE
+            )
+    for line in text.splitlines():
+        if len(line.strip()) >= 4 and any(
+            line in term
+            for term in sensitive_strings
+            if len(term) >= 4 and term.lower() not in ("true", "false", "null", "none")
+        ):
+            text = text.replace(line, "[REDACTED_LINE]")
+    return text
+
+
+def test_redactor_matches_the_legacy_redaction(monkeypatch):
+    import random
+
+    # Distinct lengths, so the legacy "longest first" order doesn't depend on set ordering.
+    secrets = {
+        "hunter22",
+        "p@ss word/+=",
+        'quo"te\\d',
+        "abcdefg",
+        "cdefghij-xyz",
+        "multi\n  line secret\nsecond",
+        "Straße-ſecret-K",
+        "true",
+        "xyz",
+    }
+    monkeypatch.setattr(ChaosTelemetry, "_secret_strings", secrets)
+
+    rng = random.Random(7)
+    pieces = [
+        "+ password = HUNTER22",
+        "- token: p%40ss%20word/%2B%3D",
+        '{"k": "quo\\"te\\\\d"}',
+        "xx abcdefghij-xyz yy",
+        "line secret",
+        "second",
+        "strasse-secret-k STRASSE-ſECRET-K",
+        "nothing to see here",
+        "ıı hunter22 ß",
+        "true",
+    ]
+    for _ in range(300):
+        text = "\n".join(rng.choice(pieces) for _ in range(rng.randint(1, 6)))
+        assert ChaosTelemetry._sanitize_diff_text(text) == _legacy_sanitize(
+            text, secrets
+        ), text
+
+
+def test_redactor_is_rebuilt_when_secrets_change():
+    ChaosTelemetry.set_secret_strings({"first-secret"})
+    assert ChaosTelemetry._sanitize_diff_text("a first-secret") == "a [REDACTED]"
+
+    ChaosTelemetry._secret_strings = {"second-secret"}
+    assert ChaosTelemetry._sanitize_diff_text("a first-secret") == "a first-secret"
+    assert ChaosTelemetry._sanitize_diff_text("a second-secret") == "a [REDACTED]"
+    ChaosTelemetry.set_secret_strings(set())
+
+
+def test_fact_event_index_slices_by_timespan_and_stays_bounded():
+    index = FactEventIndex(capacity=4)
+    for timestamp in [1.0, 2.0, 3.0, 2.5]:
+        index.add({"timestamp": timestamp, "command": str(timestamp)})
+
+    assert [e["timestamp"] for e in index.between(2.0, 3.0)] == [2.0, 2.5]
+    assert index.between(3.5, 10.0) == []
+
+    for timestamp in range(4, 10):
+        index.add({"timestamp": float(timestamp), "command": ""})
+    assert len(index) < 8
+    assert [e["timestamp"] for e in index.between(8.0, 10.0)] == [8.0, 9.0]
+
+
+def test_fact_log_handler_feeds_the_operation_history(monkeypatch):
+    import logging
+
+    monkeypatch.setattr(ChaosTelemetry, "_limani_plugin", RecordingLimani())
+    monkeypatch.setattr(ChaosTelemetry, "_run_id", "run")
+    monkeypatch.setattr(ChaosTelemetry, "_db_queue", None)
+    monkeypatch.setattr(ChaosTelemetry, "_fact_events", FactEventIndex())
+
+    handler = ChaosTelemetry.PyinfraFactLogHandler()
+    record = logging.LogRecord(
+        "pyinfra", logging.DEBUG, __file__, 1, "Getting fact: server.Os ()", None, None
+    )
+    record.created = 5.0
+    handler.emit(record)
+
+    history = ChaosTelemetry._fact_events.between(4.0, 6.0)
+    assert history == [
+        {
+            "run_id": "run",
+            "timestamp": 5.0,
+            "log_level": "DEBUG",
+            "context": "fact_gathering",
+            "command": "server.Os ()",
+        }
+    ]
+
+
+def _gather_local_facts(hooks):
+    """Gathers two facts on @local, through the capture hooks or the DEBUG log fallback."""
+    import logging
+
+    from pyinfra.api import Config, Inventory, State
+    from pyinfra.api.connect import connect_all
+    from pyinfra.facts.server import Hostname, Which
+
+    logger = logging.getLogger("pyinfra")
+    level = logger.level
+    handler = ChaosTelemetry.PyinfraFactLogHandler()
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO if hooks else logging.DEBUG)
+    if hooks:
+        assert ChaosTelemetry.install_capture()
+    try:
+        inventory = Inventory((["@local"], {}))
+        state = State(inventory, Config())
+        connect_all(state)
+        host = inventory.get_host("@local")
+        host.get_fact(Hostname)
+        host.get_fact(Which, command="ls")
+    finally:
+        ChaosTelemetry.uninstall_capture()
+        logger.removeHandler(handler)
+        logger.setLevel(level)
+    return ChaosTelemetry._fact_events.between(0.0, float("inf"))
+
+
+def test_capture_hooks_record_what_the_debug_logs_did(monkeypatch):
+    monkeypatch.setattr(ChaosTelemetry, "_limani_plugin", RecordingLimani())
+    monkeypatch.setattr(ChaosTelemetry, "_run_id", "run")
+    monkeypatch.setattr(ChaosTelemetry, "_db_queue", None)
+
+    monkeypatch.setattr(ChaosTelemetry, "_fact_events", FactEventIndex())
+    parsed = _gather_local_facts(hooks=False)
+    monkeypatch.setattr(ChaosTelemetry, "_fact_events", FactEventIndex())
+    hooked = _gather_local_facts(hooks=True)
+
+    facts = [e["command"] for e in hooked if e["context"] == "fact_gathering"]
+    assert facts == [e["command"] for e in parsed if e["context"] == "fact_gathering"]
+    assert facts == [
+        "server.Hostname () (ensure_hosts: None)",
+        "server.Which (command=ls) (ensure_hosts: None)",
+    ]
+
+    commands = [
+        (e["context"], e["command"]) for e in hooked if e["context"] != "fact_gathering"
+    ]
+    assert commands == [
+        ("running_command_on_@local", "uname -n"),
+        ("running_command_on_@local", "command -v ls || true"),
+    ]
+
+    import pyinfra.api.facts
+    from pyinfra.api.host import Host
+
+    assert ChaosTelemetry._captured == []
+    assert pyinfra.api.facts._get_fact.__module__ == "pyinfra.api.facts"
+    assert Host.run_shell_command.__module__ == "pyinfra.api.host"
+
+
+def test_health_samples_carry_cpu_deltas_and_stay_out_of_the_fact_log(monkeypatch):
+    from pyinfra.api import Config, Inventory, State
+    from pyinfra.api.connect import connect_all
+
+    from chaos.lib.facts.facts import HostResources
+
+    db_queue = queue.Queue()
+    monkeypatch.setattr(ChaosTelemetry, "_limani_plugin", RecordingLimani())
+    monkeypatch.setattr(ChaosTelemetry, "_run_id", "run")
+    monkeypatch.setattr(ChaosTelemetry, "_db_queue", db_queue)
+    monkeypatch.setattr(ChaosTelemetry, "_host_ids", {"@local": 1})
+    monkeypatch.setattr(ChaosTelemetry, "_cpu_counters", {})
+    monkeypatch.setattr(ChaosTelemetry, "_fact_events", FactEventIndex())
+
+    assert ChaosTelemetry.install_capture()
+    try:
+        inventory = Inventory((["@local"], {}))
+        connect_all(State(inventory, Config()))
+        host = inventory.get_host("@local")
+        with ChaosTelemetry.unrecorded():
+            first = host.get_fact(HostResources)
+            second = host.get_fact(HostResources)
+        host.get_fact(HostResources)
+    finally:
+        ChaosTelemetry.uninstall_capture()
+
+    # Only the fact gathered outside of unrecorded (and its command) made it to the fact log.
+    assert [
+        e["context"] for e in ChaosTelemetry._fact_events.between(0.0, float("inf"))
+    ] == [
+        "fact_gathering",
+        "running_command_on_@local",
+    ]
+
+    assert (
+        first["ram"]["total_mb"] > 0
+        and len(first["load"]) == 3
+        and first["cpu"]["cpus"] >= 1
+    )
+    for sample in (first, second):
+        ChaosTelemetry.record_snapshot(
+            host, sample["ram"], sample["load"], cpu_data=sample["cpu"]
+        )
+    queued = [db_queue.get_nowait() for _ in range(db_queue.qsize())]
+    snapshots = [
+        kwargs["metrics"]
+        for func, _, kwargs in queued
+        if func.__name__ == "insert_snapshot"
+    ]
+    assert len(snapshots) == 2
+    assert snapshots[0]["cpu_percent"] is None
+    assert snapshots[1]["cpu_percent"] == HostResources.cpu_percent(
+        first["cpu"], second["cpu"]
+    )
+    assert snapshots[1]["cpus"] == first["cpu"]["cpus"]
+
+
+def test_a_whole_run_goes_through_a_limani_without_a_database(monkeypatch):
+    import io
+    import json
+    from types import SimpleNamespace
+
+    from pyinfra.api.operation import OperationMeta
+    from pyinfra.api.state import StateOperationHostData, StateOperationMeta
+
+    from chaos.lib.telemetry import EventSink
+
+    memory = MemoryLimani({})
+    meta = StateOperationMeta((1,))
+    meta.names.add("files.put")
+    web, db = SimpleNamespace(name="web1"), SimpleNamespace(name="db1")
+    data = {
+        host.name: StateOperationHostData(
+            lambda: iter(()), {"_sudo": False}, OperationMeta("op", True)
+        )
+        for host in (web, db)
+    }
+    state = SimpleNamespace(
+        get_op_meta=lambda op_hash: meta,
+        get_op_data_for_host=lambda host, op_hash: data[host.name],
+    )
+
+    monkeypatch.setattr(ChaosTelemetry, "_limani_plugin", memory)
+    monkeypatch.setattr(ChaosTelemetry, "_event_sink", None)
+    monkeypatch.setattr(ChaosTelemetry, "_timers", {})
+    ChaosTelemetry.set_event_sink(EventSink(io.StringIO()))
+    ChaosTelemetry.start_run(["web1", "db1"])
+    run_id = ChaosTelemetry._run_id
+    for host in (web, db):
+        ChaosTelemetry.operation_host_start(state, host, "op")
+        ChaosTelemetry._record_command("fact_gathering", "server.Os", 1.0)
+    ChaosTelemetry.operation_host_success(state, web, "op")
+    ChaosTelemetry.operation_host_error(state, db, "op")
+    ChaosTelemetry.record_parallelism({"workers": 4, "previous": 2, "reason": "grow"})
+    ChaosTelemetry.end_run()
+
+    # The failure of db1 sticks, even though the run ended as a success.
+    run = memory.get_run(run_id)
+    assert run["status"] == "failure" and run["end_time"]
+    assert json.loads(run["summary_json"]) == {
+        **memory.get_run_summary_stats(run_id),
+        "status": "failure",
+    }
+    progress = memory.get_run_progress(run_id)
+    assert (
+        progress["run"]["total_operations"] == 2
+        and progress["run"]["failed_operations"] == 1
+    )
+    assert progress["hosts"]["web1"]["changed_operations"] == 1
+    assert [
+        op["host_name"] for op in memory.iter_operations(run_id, order_by="host")
+    ] == ["db1", "web1"]
+    assert [log["command"] for log in memory.iter_fact_logs(run_id)] == [
+        "server.Os",
+        "server.Os",
+    ]
+    assert memory.get_operation_sketches(run_id).keys() == {"files.put"}
+    # Tuner decisions are kept with the snapshots, they aren't operations.
+    assert [
+        json.loads(snap["metrics_json"])["workers"]
+        for snap in memory.iter_snapshots(run_id)
+    ] == [4]
+
+
+def test_host_resources_parse_every_section_and_cpu_deltas():
+    from chaos.lib.facts.facts import HostResources
+
+    output = [
+        "MemTotal:        8000000 kB",
+        "MemAvailable:    6000000 kB",
+        "--",
+        "0.50 0.40 0.30 1/123 4567",
+        "--",
+        "cpu  100 0 100 700 100 0 0 0 0 0",
+        "cpu0 50 0 50 350 50 0 0 0 0 0",
+        "cpu1 50 0 50 350 50 0 0 0 0 0",
+    ]
+    before = HostResources().process(output)
+    assert before["ram"]["percent"] == 25.0
+    assert before["load"] == [0.5, 0.4, 0.3]
+    assert before["cpu"] == {"total": 1000, "idle": 800, "cpus": 2}
+
+    after = {"total": 1200, "idle": 850, "cpus": 2}
+    assert HostResources.cpu_percent(before["cpu"], after) == 75.0
+    assert HostResources.cpu_percent(None, after) is None
+    assert HostResources.cpu_percent(after, after) is None
+
+
+def test_chrima_register_hosts_is_idempotent(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHAOS_LOGBOOK_DIR", str(tmp_path))
+    chrima = Chrima({})
+    chrima.init_db()
+    chrima.create_run("run", "human", 0.0, {}, set())
+    existing = chrima.get_or_create_host("run", "web2")
+
+    try:
+        ids = chrima.register_hosts("run", ["web1", "web2", "web3"])
+        assert ids["web2"] == existing
+        assert len(set(ids.values())) == 3
+        assert chrima.register_hosts("run", ["web1"])["web1"] == ids["web1"]
+    finally:
+        chrima.disconnect()
+
+
+def test_chrima_rollups_match_the_counted_stats(tmp_path, monkeypatch):
+    import random
+
+    monkeypatch.setenv("CHAOS_LOGBOOK_DIR", str(tmp_path))
+    chrima = Chrima({})
+    chrima.init_db()
+    chrima.create_run("run", "human", 0.0, {}, set())
+    ids = chrima.register_hosts("run", ["web1", "web2", "idle"])
+    rng = random.Random(3)
+
+    try:
+        assert chrima.get_run_summary_stats("run")["total_operations"] == 0
+        for batch in range(5):
+            chrima.insert_many_operations(
+                [
+                    {
+                        **_operation(
+                            f"op{i % 4}", host_id=ids[rng.choice(["web1", "web2"])]
+                        ),
+                        "changed": rng.random() < 0.5,
+                        "success": rng.random() < 0.9,
+                        "duration": round(rng.random(), 3),
+                    }
+                    for i in range(40)
+                ]
+            )
+            chrima.commit()
+
+        # Not committed, so not counted either.
+        chrima.insert_many_operations([_operation("late", host_id=ids["web1"])])
+        chrima.connect().rollback()
+
+        summary = chrima.get_run_summary_stats("run")
+        assert summary == chrima._count_summary_stats("run")
+        assert summary["total_operations"] == 200
+        assert chrima.get_run_progress("run") == Limani.get_run_progress(chrima, "run")
+        assert (
+            chrima.get_run_progress("run")["hosts"]["idle"]["slowest_operation"] is None
+        )
+    finally:
+        chrima.disconnect()
+
+
+def test_chrima_runs_without_rollups_are_counted(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHAOS_LOGBOOK_DIR", str(tmp_path))
+    chrima = Chrima({})
+    chrima.init_db()
+    chrima.create_run("run", "human", 0.0, {}, set())
+    host_id = chrima.get_or_create_host("run", "web1")
+    chrima.insert_many_operations(
+        [{**_operation(f"op{i}", host_id=host_id), "duration": i} for i in range(3)]
+    )
+    chrima.commit()
+
+    # As if logged before rollups existed.
+    conn = chrima.connect()
+    conn.execute("DELETE FROM run_rollups")
+    conn.execute("UPDATE hosts SET summary_json = NULL")
+    conn.commit()
+
+    try:
+        summary = chrima.get_run_summary_stats("run")
+        assert summary["total_operations"] == 3
+        assert summary["slowest_operation"] == {
+            "name": "op2",
+            "host": "web1",
+            "duration": 2,
+        }
+        assert chrima.get_run_progress("run")["hosts"]["web1"] == summary
+    finally:
+        chrima.disconnect()
+
+
+def test_host_ids_resolve_from_memory(monkeypatch):
+    limani = RecordingLimani()
+    lookups = []
+    limani.get_or_create_host = lambda run_id, name: (
+        lookups.append(name) or len(lookups)
+    )
+    monkeypatch.setattr(ChaosTelemetry, "_limani_plugin", limani)
+    monkeypatch.setattr(ChaosTelemetry, "_run_id", "run")
+
+    monkeypatch.setattr(
+        ChaosTelemetry, "_host_ids", limani.register_hosts("run", ["a", "b"])
+    )
+    assert lookups == ["a", "b"]
+
+    assert ChaosTelemetry._host_id("b") == 2
+    assert ChaosTelemetry._host_id("late") == 3
+    assert ChaosTelemetry._host_id("late") == 3
+    assert lookups == ["a", "b", "late"]
+
+
+def _legacy_report(chrima, run_id, needed_secrets):
+    """The logbook as export_report built it from get_run_data, before it streamed."""
+    import json
+
+    data = chrima.get_run_data(run_id)
+    run = data["run"]
+    report = {
+        "api_version": "v1",
+        "run_id": run["run_id_human"],
+        "uggly_run_id": run["id"],
+        "hailer": json.loads(run["hailer_json"]) if run["hailer_json"] else {},
+        "secrets_required": list(needed_secrets),
+        "hosts": {},
+    }
+    durations, streamed = {}, []
+    for host in data["hosts"]:
+        history = []
+        for op in host["operations"]:
+            logs = json.loads(op["logs_json"]) if op["logs_json"] else {}
+            history.append(
+                {
+                    "operation": op["name"],
+                    "changed": bool(op["changed"]),
+                    "success": bool(op["success"]),
+                    "duration": op["duration"],
+                    "stdout": logs.get("stdout", ""),
+                    "stderr": logs.get("stderr", ""),
+                    "diff": op["diff"],
+                    "operation_arguments": json.loads(op["arguments_json"]),
+                    "retry_statistics": json.loads(op["retry_stats_json"]),
+                }
+            )
+            streamed.append(
+                {
+                    "type": "progress",
+                    "host": host["name"],
+                    "operation": op["name"],
+                    "changed": bool(op["changed"]),
+                    "success": bool(op["success"]),
+                    "duration": op["duration"],
+                    "logs": logs,
+                    "diff": op["diff"],
+                    "operation_arguments": json.loads(op["arguments_json"]),
+                    "retry_statistics": json.loads(op["retry_stats_json"]),
+                    "command_n_fact_history": json.loads(
+                        op["command_n_facts_in_order_json"]
+                    ),
+                }
+            )
+            durations.setdefault(op["name"], []).append(op["duration"])
+        failed = sum(1 for h in history if not h["success"])
+        report["hosts"][host["name"]] = {
+            "total_operations": len(history),
+            "changed_operations": sum(1 for h in history if h["changed"]),
+            "successful_operations": len(history) - failed,
+            "failed_operations": failed,
+            "duration": round(sum((h["duration"] for h in history), 0.0), 4),
+            "history": history,
+        }
+    summary = chrima.get_run_summary_stats(run_id)
+    summary["status"] = run["status"]
+    report["summary"] = summary
+    report["resource_history"] = [
+        {
+            "type": "health_check",
+            "host": s["host_name"],
+            "stage": s["stage"],
+            "timestamp": s["timestamp"],
+            "metrics": json.loads(s["metrics_json"]),
+        }
+        for s in data["snapshots"]
+    ]
+    report["fact_history"] = [
+        dict(log) for log in data["fact_logs"] if log["context"] == "fact_gathering"
+    ]
+    report["streamed_history"] = streamed
+    report["operation_summary"] = ChaosTelemetry.add_operation_percentiles(durations)
+    return report
+
+
+class DefaultIterChrima(Chrima):
+    """Chrima through the Limani default iter_* implementations, like a third-party Limani would be."""
+
+    get_run = Limani.get_run
+    iter_hosts = Limani.iter_hosts
+    iter_operations = Limani.iter_operations
+    iter_snapshots = Limani.iter_snapshots
+    iter_fact_logs = Limani.iter_fact_logs
+
+
+@pytest.mark.parametrize("limani_class", [Chrima, DefaultIterChrima, MemoryLimani])
+def test_streamed_report_matches_the_materialized_one(
+    tmp_path, monkeypatch, limani_class
+):
+    import io
+    import json
+    import random
+
+    monkeypatch.setenv("CHAOS_LOGBOOK_DIR", str(tmp_path))
+    monkeypatch.setattr("chaos.lib.telemetry.EXPORT_SPOOL_SIZE", 512)
+    chrima = limani_class({})
+    chrima.init_db()
+    chrima.create_run("run", "human", 0.0, {"user": "me"}, set())
+    ids = chrima.register_hosts("run", ["web1", "web2", "idle", "db1"])
+
+    rng = random.Random(3)
+    operations = []
+    for i in range(200):
+        op = _operation(
+            rng.choice(["files.put", "apt.packages", "server.shell"]),
+            host_id=ids[rng.choice(["web1", "web2", "db1"])],
+        )
+        op.update(
+            duration=round(rng.random(), 6),
+            timestamp=float(rng.randint(0, 1000)),
+            changed=rng.random() < 0.5,
+            success=rng.random() < 0.9,
+            logs={"stdout": f"out {i}", "stderr": ""},
+            arguments={"i": i},
+            command_n_facts=[{"command": f"cmd {i}"}],
+        )
+        operations.append(op)
+    chrima.insert_many_operations(operations)
+    chrima.insert_many_snapshots(
+        [
+            {
+                "run_id": "run",
+                "host_id": ids["web1"],
+                "stage": "start",
+                "timestamp": 1.0,
+                "metrics": {"ram": 1},
+            }
+        ]
+    )
+    chrima.insert_many_fact_logs(
+        [_fact("server.Os"), {**_fact("ls"), "context": "running_command"}]
+    )
+    chrima.commit()
+
+    monkeypatch.setattr(ChaosTelemetry, "_limani_plugin", chrima)
+    monkeypatch.setattr(ChaosTelemetry, "_needed_secret_keys", {"key"})
+    pretty, compact = io.StringIO(), io.StringIO()
+    try:
+        ChaosTelemetry._write_report(
+            ReportWriter([pretty], [compact]), chrima.get_run("run")
+        )
+        expected = _legacy_report(chrima, "run", {"key"})
+
+        # Percentiles now come from sketches: same keys, within 1% of the exact ones.
+        summary = json.loads(compact.getvalue())["operation_summary"]
+        assert summary.keys() == expected["operation_summary"].keys()
+        for name, exact in expected["operation_summary"].items():
+            for key, value in exact.items():
+                assert summary[name][key] == pytest.approx(value, rel=0.01, abs=1e-4)
+        expected["operation_summary"] = summary
+
+        assert json.loads(pretty.getvalue()) == expected
+        assert json.loads(compact.getvalue()) == expected
+        assert compact.getvalue() == json.dumps(expected, separators=(",", ":"))
+        assert pretty.getvalue() == json.dumps(expected, indent=4)
+    finally:
+        chrima.disconnect()
+
+
+def test_operations_feed_live_sketches_saved_to_the_limani(limani, monkeypatch):
+    monkeypatch.setattr(ChaosTelemetry, "_run_id", "run")
+    monkeypatch.setattr(ChaosTelemetry, "_db_queue", queue.Queue())
+    monkeypatch.setattr(ChaosTelemetry, "_sketches", {})
+    monkeypatch.setattr(ChaosTelemetry, "_dirty_sketches", set())
+    monkeypatch.setattr(ChaosTelemetry, "_sketches_saved_at", float("inf"))
+
+    for duration in [0.1, 0.2, 0.3]:
+        ChaosTelemetry._queue_operation(
+            {**_operation("files.put"), "duration": duration}
+        )
+
+    live = ChaosTelemetry.operation_percentiles()["files.put"]
+    assert live["count"] == 3
+    assert live["p50_duration"] == pytest.approx(0.2, rel=0.01)
+    assert ChaosTelemetry._db_queue.qsize() == 3
+
+    ChaosTelemetry._save_sketches()
+    func, args, _ = ChaosTelemetry._db_queue.queue[-1]
+    assert func == limani.save_operation_sketches
+    assert args[0] == "run"
+    assert args[1]["files.put"]["count"] == 3
+    assert ChaosTelemetry._dirty_sketches == set()
+
+
+def test_export_report_streams_compact_and_archives_pretty(
+    tmp_path, monkeypatch, capsys
+):
+    import gzip
+    import json
+
+    monkeypatch.setenv("CHAOS_LOGBOOK_DIR", str(tmp_path))
+    chrima = Chrima({})
+    chrima.init_db()
+    chrima.create_run("run", "human", 0.0, {}, set())
+    host_id = chrima.register_hosts("run", ["web1"])["web1"]
+    chrima.insert_many_operations([_operation("files.put", host_id=host_id)])
+    chrima.commit()
+
+    monkeypatch.setattr(ChaosTelemetry, "_limani_plugin", chrima)
+    monkeypatch.setattr(ChaosTelemetry, "_run_id", "run")
+    monkeypatch.setattr(ChaosTelemetry, "_db_queue", None)
+    report = tmp_path / "chaos_logbook.json"
+    try:
+        ChaosTelemetry.export_report(str(report), compression="gzip")
+    finally:
+        chrima.disconnect()
+
+    line = capsys.readouterr().out.strip()
+    assert line.startswith("CHAOS_LOGBOOK::{")
+    streamed = json.loads(line.removeprefix("CHAOS_LOGBOOK::"))
+    assert streamed["hosts"]["web1"]["total_operations"] == 1
+
+    assert report.read_text() == json.dumps(streamed, indent=4) + "\n"
+    (archive,) = tmp_path.glob("chaos_logbook_run1_*.json.gz")
+    with gzip.open(archive, "rt") as f:
+        assert f.read() == report.read_text()
+
+
+def test_event_sink_writes_whole_lines_from_many_threads():
+    import io
+    import json
+
+    from chaos.lib.telemetry import EventSink
+
+    stream = io.StringIO()
+    sink = EventSink(stream, capacity=16)
+    sink.start()
+
+    def emit(host):
+        for i in range(200):
+            sink.emit({"type": "progress", "host": host, "i": i, "stdout": "x" * 100})
+
+    threads = [threading.Thread(target=emit, args=(f"web{n}",)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sink.close()
+
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 1600
+    assert all(
+        json.loads(line.removeprefix("CHAOS_EVENT::"))["type"] == "progress"
+        for line in lines
+    )
+    assert sink.dropped == {}
+
+
+def test_event_sink_drops_and_counts_when_the_reader_is_slow():
+    import io
+
+    from chaos.lib.telemetry import EventSink
+
+    class SlowStream(io.StringIO):
+        def __init__(self):
+            super().__init__()
+            self.unblocked = threading.Event()
+
+        def write(self, text):
+            self.unblocked.wait()
+            return super().write(text)
+
+    stream = SlowStream()
+    sink = EventSink(stream, policy="drop", capacity=4)
+    sink.start()
+    for i in range(50):
+        sink.emit({"type": "progress", "i": i})
+    stream.unblocked.set()
+    sink.emit({"type": "run_end"}, force=True)
+    sink.close()
+
+    written = stream.getvalue().count("CHAOS_EVENT::")
+    assert sink.dropped["progress"] > 0
+    assert written + sink.dropped["progress"] == 51
+    assert stream.getvalue().rstrip("\n").endswith('{"type": "run_end"}')
+
+
+def test_event_sink_streams_to_a_unix_socket(tmp_path):
+    import json
+    import socket
+
+    from chaos.lib.telemetry import EventSink
+
+    path = tmp_path / "events.sock"
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(str(path))
+    server.listen(1)
+    try:
+        sink = EventSink.from_config(
+            {"event_sink": f"unix:{path}", "event_sink_policy": "drop"}
+        )
+        conn, _ = server.accept()
+        sink.start()
+        sink.emit({"type": "progress", "host": "web1"})
+        sink.close()
+
+        received = b""
+        while chunk := conn.recv(4096):
+            received += chunk
+        conn.close()
+    finally:
+        server.close()
+
+    (line,) = received.decode().splitlines()
+    assert json.loads(line.removeprefix("CHAOS_EVENT::")) == {
+        "type": "progress",
+        "host": "web1",
+    }
+
+    with pytest.raises(ValueError):
+        EventSink.from_config({"event_sink": "carrier-pigeon"})